@@ -0,0 +1,266 @@
+"""
+analytics.py
+
+이 모듈은 대화 로그(chat_logs) 분석을 위한 인덱스, 시간별/일별 사전 집계(rollup), 원본 로그 내보내기를 제공합니다.
+대시보드가 원본 로그 전체를 스캔하지 않도록, 로그가 저장될 때마다 (구간, 카테고리, 경로)별 집계를 증분으로 갱신합니다.
+
+구성:
+- `ensure_indexes`: 카테고리/유저/프롬프트 키 + 시각(ts) 복합 인덱스와 집계 컬렉션 인덱스 생성 (서버 시작 시 warmup에서 호출)
+- `record_rollups`: 새로 저장된 로그만으로 hour/day 집계를 증분 갱신 (log writer가 저장 직후 호출, 중복 재저장 로그는 제외됨)
+- `get_rollups`: 구간별 집계 조회
+- `route_shares`: 기간 내 경로별 턴 수와 비율 (예: LLM 호출 없이 고정 응답으로 끝난 canned 경로 비율)
+- `rebuild_rollups`: 원본 로그로 기간 내 집계를 다시 계산 (집계 갱신 실패 후 복구용)
+- `export_logs`: 커서로 원본 로그를 스트리밍하여 JSONL/Parquet로 내보내기 (컬렉션 전체를 메모리에 올리지 않음)
+
+집계 구간은 UTC 기준이며, 저장소별 구현은 log backend(mongoDB.MongoLogBackend, log_backends.SQLiteLogBackend)가 담당합니다.
+
+실행:
+    python -m adaptive_rag.utils.analytics export logs.parquet --start 2025-06-01 --end 2025-07-01
+    python -m adaptive_rag.utils.analytics rollups day --start 2025-06-01
+    python -m adaptive_rag.utils.analytics routes --start 2025-06-01
+    python -m adaptive_rag.utils.analytics rebuild --start 2025-06-01 --end 2025-06-08
+"""
+
+import argparse
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from adaptive_rag.utils import metrics
+
+# 집계 구간 종류
+GRANULARITIES = ("hour", "day")
+
+# Parquet 내보내기 시 한 번에 쓰는 로그 수
+EXPORT_BATCH_SIZE = 1000
+
+def _backend(backend):
+    if backend is None:
+        from adaptive_rag.utils.mongoDB import get_log_backend
+        return get_log_backend()
+    return backend
+
+def _utc(ts: datetime) -> datetime:
+    # timezone 정보가 없는 시각은 UTC로 간주
+    return ts.astimezone(timezone.utc) if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    """
+    시각이 속한 집계 구간의 시작 시각 (UTC)
+    """
+    ts = _utc(ts)
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def rollup_increments(documents: list) -> dict:
+    """
+    로그 리스트를 (구간 종류, 구간 시작, 카테고리, 경로)별 증분 값으로 묶는다.
+    """
+    increments = defaultdict(lambda: {
+        "count": 0, "latency_ms_sum": 0.0, "latency_ms_count": 0, "latency_ms_max": 0.0, "relevant": 0, "scored": 0,
+    })
+    for doc in documents:
+        ts = doc.get("ts")
+        if not isinstance(ts, datetime):
+            continue
+        category = doc.get("category") or "미지정"
+        route = doc.get("route") or "unknown"
+        latency = doc.get("latency_ms")
+        score = doc.get("relevance_score")
+        for granularity in GRANULARITIES:
+            inc = increments[(granularity, bucket_start(ts, granularity), category, route)]
+            inc["count"] += 1
+            if latency is not None:
+                inc["latency_ms_sum"] += latency
+                inc["latency_ms_count"] += 1
+                inc["latency_ms_max"] = max(inc["latency_ms_max"], latency)
+            if score is not None:
+                inc["scored"] += 1
+                inc["relevant"] += int(score == 1)
+    return dict(increments)
+
+def record_rollups(documents: list, backend=None):
+    """
+    새로 저장된 로그로 집계를 증분 갱신한다. 실패해도 로그 저장에는 영향을 주지 않는다.
+    """
+    if not documents:
+        return
+    try:
+        _backend(backend).apply_rollups(rollup_increments(documents))
+    except Exception as e:
+        metrics.inc("adaptive_rag_analytics_rollup_errors_total")
+        print(f"[ANALYTICS ERROR] 집계 갱신 실패 (로그 {len(documents)}건, rebuild_rollups로 복구 가능): {e}")
+
+def ensure_indexes(backend=None):
+    """
+    로그/집계 저장소에 분석 쿼리용 인덱스를 만든다 (이미 있으면 그대로 둠).
+    """
+    _backend(backend).ensure_indexes()
+
+def get_rollups(granularity: str = "day", start: datetime = None, end: datetime = None,
+                category: str = None, backend=None) -> list:
+    """
+    기간 [start, end) 의 집계 행 목록 (구간 시작 순). 평균 지연 시간과 관련성 통과율을 함께 계산해 돌려준다.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"지원하지 않는 집계 구간입니다: {granularity}")
+    rows = _backend(backend).query_rollups(granularity, start, end, category)
+    for row in rows:
+        row["latency_ms_avg"] = round(row["latency_ms_sum"] / row["latency_ms_count"], 1) if row["latency_ms_count"] else None
+        row["relevance_rate"] = round(row["relevant"] / row["scored"], 3) if row["scored"] else None
+    return rows
+
+def route_shares(start: datetime = None, end: datetime = None, category: str = None, backend=None) -> dict:
+    """
+    기간 [start, end) 의 경로별 턴 수와 전체 대비 비율 (일별 집계 기준, 턴 수 내림차순)
+    """
+    counts = defaultdict(int)
+    for row in get_rollups("day", start, end, category, backend=backend):
+        counts[row["route"]] += row["count"]
+    total = sum(counts.values())
+    return {
+        route: {"count": count, "share": round(count / total, 4)}
+        for route, count in sorted(counts.items(), key=lambda x: x[1], reverse=True)
+    }
+
+def rebuild_rollups(start: datetime, end: datetime, backend=None) -> int:
+    """
+    기간 내 집계를 지우고 원본 로그로 다시 계산한다. 일별 집계가 잘리지 않도록 기간은 UTC 일 단위로 넓혀 처리한다.
+
+    Returns:
+        int: 다시 집계한 로그 수
+    """
+    backend = _backend(backend)
+    start = bucket_start(start, "day")
+    end_day = bucket_start(end, "day")
+    if end_day != _utc(end):
+        end_day += timedelta(days=1)
+    end = end_day
+    backend.delete_rollups(start, end)
+
+    total = 0
+    chunk = []
+    for doc in backend.iter_logs(start=start, end=end, batch_size=EXPORT_BATCH_SIZE):
+        chunk.append(doc)
+        if len(chunk) >= EXPORT_BATCH_SIZE:
+            backend.apply_rollups(rollup_increments(chunk))
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        backend.apply_rollups(rollup_increments(chunk))
+        total += len(chunk)
+    return total
+
+# ---------------------------------------------------------------------------
+# 원본 로그 내보내기
+# ---------------------------------------------------------------------------
+
+# 내보낼 필드 (Parquet 스키마 순서)
+EXPORT_FIELDS = ("_id", "ts", "user_id", "category", "route", "prompt_key", "relevance_score", "latency_ms", "user", "bot")
+
+def _export_row(doc: dict) -> dict:
+    return {field: doc.get(field) for field in EXPORT_FIELDS}
+
+def _parquet_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("_id", pa.string()),
+        ("ts", pa.timestamp("us", tz="UTC")),
+        ("user_id", pa.string()),
+        ("category", pa.string()),
+        ("route", pa.string()),
+        ("prompt_key", pa.string()),
+        ("relevance_score", pa.int8()),
+        ("latency_ms", pa.float64()),
+        ("user", pa.string()),
+        ("bot", pa.string()),
+    ])
+
+def export_logs(path: str, start: datetime = None, end: datetime = None, category: str = None,
+                fmt: str = None, backend=None) -> int:
+    """
+    원본 로그를 ts 순서로 스트리밍하여 파일로 내보낸다.
+
+    Args:
+        path (str): 출력 경로 (.parquet 이면 Parquet, 그 외 JSONL)
+        start, end (datetime): 기간 [start, end) (None이면 제한 없음)
+        category (str): 카테고리 필터
+        fmt (str): "jsonl" | "parquet" (None이면 확장자로 판단)
+
+    Returns:
+        int: 내보낸 로그 수
+    """
+    fmt = fmt or ("parquet" if path.endswith(".parquet") else "jsonl")
+    logs = _backend(backend).iter_logs(start=start, end=end, category=category, batch_size=EXPORT_BATCH_SIZE)
+    count = 0
+
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet 내보내기에는 pyarrow 패키지가 필요합니다: pip install pyarrow") from e
+        schema = _parquet_schema()
+        with pq.ParquetWriter(path, schema) as writer:
+            chunk = []
+            for doc in logs:
+                chunk.append(_export_row(doc))
+                if len(chunk) >= EXPORT_BATCH_SIZE:
+                    writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+                    count += len(chunk)
+                    chunk = []
+            if chunk:
+                writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+                count += len(chunk)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            for doc in logs:
+                row = _export_row(doc)
+                if isinstance(row["ts"], datetime):
+                    row["ts"] = row["ts"].isoformat()
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                count += 1
+
+    metrics.inc("adaptive_rag_analytics_exported_logs_total", count, format=fmt)
+    return count
+
+def _parse_date(value: str) -> datetime:
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc) if value else None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="대화 로그 분석 도구")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="원본 로그를 JSONL/Parquet로 내보내기")
+    p_export.add_argument("output")
+    p_export.add_argument("--category", default=None)
+
+    p_rollups = sub.add_parser("rollups", help="구간별 집계 조회")
+    p_rollups.add_argument("granularity", choices=GRANULARITIES)
+    p_rollups.add_argument("--category", default=None)
+
+    p_routes = sub.add_parser("routes", help="경로별 턴 수와 비율")
+    p_routes.add_argument("--category", default=None)
+
+    p_rebuild = sub.add_parser("rebuild", help="기간 내 집계 다시 계산")
+
+    for p in (p_export, p_rollups, p_routes, p_rebuild):
+        p.add_argument("--start", default=None, help="시작 날짜/시각 (UTC, ISO 형식)")
+        p.add_argument("--end", default=None, help="끝 날짜/시각 (UTC, ISO 형식, 미포함)")
+    args = parser.parse_args()
+
+    start, end = _parse_date(args.start), _parse_date(args.end)
+    if args.command == "export":
+        n = export_logs(args.output, start=start, end=end, category=args.category)
+        print(f"[ANALYTICS] 로그 {n}건 내보내기 완료 → {args.output}")
+    elif args.command == "rollups":
+        for row in get_rollups(args.granularity, start, end, args.category):
+            print(json.dumps(row, ensure_ascii=False, default=str))
+    elif args.command == "routes":
+        print(json.dumps(route_shares(start, end, args.category), ensure_ascii=False, indent=2))
+    else:
+        if start is None or end is None:
+            parser.error("rebuild에는 --start와 --end가 필요합니다.")
+        n = rebuild_rollups(start, end)
+        print(f"[ANALYTICS] 로그 {n}건으로 집계 재계산 완료")
@@ -0,0 +1,192 @@
+"""
+batch.py
+
+이 모듈은 큐레이션된 학생 질문 파일(JSONL/CSV)을 Adaptive RAG 그래프에 병렬로 통과시키는 배치 평가 러너입니다.
+프롬프트나 인덱스를 바꾼 뒤 수백 개의 질문을 한 번에 다시 돌려 라우팅/관련성/답변 변화를 비교하는 데 사용합니다.
+
+특징:
+- `build_adaptive_rag()` 그래프를 worker pool로 동시 실행 (동시성 상한 지정)
+- provider별 분당 요청 한도(rate limit)를 지키도록 질문 시작 속도를 조절
+- 결과를 한 줄씩 바로 기록하는 checkpoint 방식으로, 중단된 실행을 같은 출력 파일로 다시 실행하면 이어서 진행
+  (실패(error)로 기록된 질문은 다시 실행해 결과를 덧붙이며, 같은 id는 마지막 줄이 최종 결과)
+- 모든 질문은 ephemeral 모드로 실행되어 유저 메모리와 chat_logs를 건드리지 않음
+
+입력 형식:
+- JSONL: {"id": ..., "question": ..., "category": ...} (id, category는 선택)
+- CSV: question 열 필수, id / category 열 선택
+
+실행:
+    python -m adaptive_rag.utils.batch questions.jsonl results.jsonl --concurrency 8 --openai-rpm 500
+    python -m adaptive_rag.utils.batch questions.jsonl fused.jsonl --preprocess-mode fused   # 전처리 방식별 라우팅 비교
+"""
+
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+from adaptive_rag.utils import docstore, llm_gateway, tracing
+from adaptive_rag.utils.ratelimit import ProviderRateLimiter
+
+# 질문 1개를 처리할 때 provider별로 예상되는 최대 호출 수
+# (OpenAI: 라우팅·재작성·관련성·재라우팅·재작성·관련성·생성 + 질의 임베딩 2회, Cohere: 리랭크 2회, Pinecone: 검색 2회)
+CALLS_PER_QUESTION = {"openai": 9, "cohere": 2, "pinecone": 2}
+
+def load_batch_questions(path: str) -> list:
+    """
+    JSONL 또는 CSV 질문 파일을 읽어 [{"id", "question", "category"}] 리스트로 반환한다.
+    id가 없으면 파일 내 순번을 id로 사용한다.
+    """
+    items = []
+    if path.endswith(".csv"):
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    for i, row in enumerate(rows):
+        question = (row.get("question") or "").strip()
+        if not question:
+            continue
+        items.append({
+            "id": str(row.get("id") or i),
+            "question": question,
+            "category": row.get("category") or None,
+        })
+    return items
+
+def load_completed_ids(output_path: str) -> set:
+    """
+    이미 성공한 결과가 기록된 질문 id 집합 (중단된 실행 재개용). 마지막 줄이 잘려 있으면 무시한다.
+    error가 기록된 질문은 다시 실행하며, 같은 id가 여러 번 기록되어 있으면 마지막 줄을 따른다.
+    """
+    succeeded = {}
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                id_ = str(record["id"])
+            except (ValueError, KeyError, TypeError):
+                continue
+            succeeded[id_] = record.get("error") is None
+    return {id_ for id_, ok in succeeded.items() if ok}
+
+def run_question(graph, item: dict) -> dict:
+    """
+    질문 하나를 ephemeral 모드로 그래프에 통과시키고 결과 레코드를 만든다.
+    """
+    inputs = {
+        "question": item["question"],
+        "user_id": f"batch-{item['id']}",
+        "category": item.get("category"),
+        "ephemeral": True,
+    }
+    record = {"id": item["id"], "question": item["question"], "category": item.get("category"),
+              "started_at": datetime.now().isoformat()}
+    t0 = time.perf_counter()
+    try:
+        # 배치 평가는 가장 낮은 우선순위 (실서비스 요청이 먼저 LLM 호출 순서를 받음)
+        with tracing.turn(user_id=inputs["user_id"], category=inputs["category"]) as trace, \
+                llm_gateway.context(user_id=inputs["user_id"], priority="batch"), docstore.scope():
+            state = graph.invoke(inputs, config=tracing.graph_config())
+            trace.finish(state)
+        visited = state.get("visited_nodes", [])
+        record.update({
+            "route": visited[0] if visited else state.get("next_node"),
+            "visited_nodes": visited,
+            "retried": state.get("retried", False),
+            "prompt_key": state.get("prompt_key"),
+            "relevance_score": state.get("relevance_score"),
+            "answer": state.get("generation"),
+            "error": None,
+        })
+        spans = getattr(trace, "spans", None)
+        if spans:
+            record["node_ms"] = [[span.node, round(span.wall_ms, 1)] for span in spans]
+    except Exception as e:
+        record.update({"answer": None, "error": f"{type(e).__name__}: {e}"})
+    record["latency_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return record
+
+def run_batch(input_path: str, output_path: str, concurrency: int = 4, rate_limits: dict = None, graph=None,
+              preprocess_mode: str = None) -> dict:
+    """
+    질문 파일을 동시성 상한과 rate limit을 지키며 그래프에 통과시키고 결과를 JSONL로 기록한다.
+
+    Args:
+        input_path (str): 질문 파일 경로 (JSONL/CSV)
+        output_path (str): 결과 JSONL 경로 (이미 있으면 기록된 id는 건너뛰고 이어서 실행)
+        concurrency (int): 동시에 실행할 질문 수
+        rate_limits (dict): provider별 분당 요청 한도 (예: {"openai": 500, "cohere": 100})
+        graph: 사용할 컴파일된 그래프 (없으면 build_adaptive_rag()로 생성)
+        preprocess_mode (str): graph가 없을 때 사용할 검색 전 전처리 방식 ("legacy" | "fused", 라우팅 A/B 비교용)
+
+    Returns:
+        dict: 전체/건너뜀/완료/실패 건수와 소요 시간
+    """
+    if graph is None:
+        from adaptive_rag.utils.pipeline import build_adaptive_rag
+        graph = build_adaptive_rag(preprocess_mode=preprocess_mode)
+
+    items = load_batch_questions(input_path)
+    done = load_completed_ids(output_path)
+    pending = [item for item in items if item["id"] not in done]
+    limiter = ProviderRateLimiter(rate_limits or {})
+    write_lock = threading.Lock()
+    summary = {"total": len(items), "skipped": len(items) - len(pending), "completed": 0, "failed": 0}
+
+    print(f"[BATCH] {len(pending)}개 질문 실행 (이미 완료 {summary['skipped']}개, 동시성 {concurrency})")
+    t0 = time.perf_counter()
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        def submit(item):
+            limiter.acquire(CALLS_PER_QUESTION)
+            return pool.submit(run_question, graph, item)
+
+        in_flight = set()
+        for item in pending:
+            in_flight.add(submit(item))
+            if len(in_flight) < concurrency:
+                continue
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                _write_record(out, write_lock, future.result(), summary)
+        for future in wait(in_flight).done:
+            _write_record(out, write_lock, future.result(), summary)
+
+    summary["elapsed_s"] = round(time.perf_counter() - t0, 2)
+    print(f"[BATCH] 완료 {summary['completed']}개, 실패 {summary['failed']}개, {summary['elapsed_s']}초")
+    return summary
+
+def _write_record(out, lock, record: dict, summary: dict):
+    # 결과를 즉시 flush하여 checkpoint로 사용
+    with lock:
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+        summary["failed" if record.get("error") else "completed"] += 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="질문 파일 배치 평가 러너")
+    parser.add_argument("input", help="질문 파일 (JSONL/CSV)")
+    parser.add_argument("output", help="결과 JSONL (재실행 시 이어서 진행)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--openai-rpm", type=float, default=500)
+    parser.add_argument("--cohere-rpm", type=float, default=100)
+    parser.add_argument("--pinecone-rpm", type=float, default=1000)
+    parser.add_argument("--preprocess-mode", choices=["legacy", "fused"], default=None,
+                        help="검색 전 전처리 방식 (기본값은 ADAPTIVE_RAG_PREPROCESS_MODE)")
+    args = parser.parse_args()
+
+    run_batch(
+        args.input,
+        args.output,
+        concurrency=args.concurrency,
+        rate_limits={"openai": args.openai_rpm, "cohere": args.cohere_rpm, "pinecone": args.pinecone_rpm},
+        preprocess_mode=args.preprocess_mode,
+    )
@@ -0,0 +1,134 @@
+"""
+boot.py
+
+이 모듈은 API worker의 시작(boot) 순서를 정의합니다.
+무거운 의존성(transformers/torch 기반 kor_unsmile 모델, Pinecone/Cohere 리트리버, 슬랭 사전 다운로드, 로그 저장소 연결)은
+import 시 만들지 않고 이 단계에서 한 번에 준비하며, 서로 의존하지 않는 단계는 thread pool에서 동시에 실행합니다.
+모든 단계가 끝난 뒤에만 ready 상태가 되므로, 헬스 체크가 ready를 보고 트래픽을 보내면 첫 요청이 초기화 비용을 치르지 않습니다.
+
+구성:
+- `run(steps, required=..., retry=...)`: {단계 이름: 함수}를 실행하고 단계별 결과를 반환
+  - required 단계가 실패하면 예외
+  - retry 단계가 실패하면 ready로 바꾸지 않고 백그라운드에서 BOOT_RETRY_INTERVAL마다 다시 실행하여, 모두 성공하면 ready
+  - 나머지 단계는 실패해도 기록만 하고 진행 (처음 쓸 때 다시 시도됨)
+- `is_ready()` / `wait_ready(timeout)`: 시작 단계가 모두 끝났는지 (헬스 체크 엔드포인트용)
+- `pending()`: ready를 막고 있는(재시도 중인) 단계 이름
+- `timings()`: 마지막 boot의 단계별 소요 시간(ms)과 전체 소요 시간
+- 메트릭: adaptive_rag_boot_step_seconds{step}, adaptive_rag_boot_seconds, adaptive_rag_ready, adaptive_rag_boot_retries_total{step,status}
+
+설정 (환경 변수):
+- BOOT_PARALLEL=0 이면 단계를 차례로 실행 (기본 1, 동시 실행)
+- BOOT_WORKERS: 동시에 실행할 단계 수 상한 (기본 8)
+- BOOT_RETRY_INTERVAL: retry 단계를 다시 실행하기까지 기다릴 시간(초, 기본 30)
+
+시작 시간 측정 / import 회귀 검사: `python -m benchmarks.bench_startup`
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from adaptive_rag.utils import metrics
+
+BOOT_PARALLEL = os.environ.get("BOOT_PARALLEL", "1") != "0"
+BOOT_WORKERS = int(os.environ.get("BOOT_WORKERS", "8"))
+BOOT_RETRY_INTERVAL = float(os.environ.get("BOOT_RETRY_INTERVAL", "30"))
+
+_ready = threading.Event()
+_timings = {}
+_pending = set()
+
+def _timed(name: str, fn):
+    t0 = time.perf_counter()
+    try:
+        return fn(), None
+    except Exception as e:
+        return None, e
+    finally:
+        elapsed = time.perf_counter() - t0
+        _timings[name] = round(elapsed * 1000, 1)
+        metrics.set_gauge("adaptive_rag_boot_step_seconds", elapsed, step=name)
+
+def _set_ready():
+    _ready.set()
+    metrics.set_gauge("adaptive_rag_ready", 1)
+
+def _retry_loop(steps: dict):
+    # ready를 막고 있는 단계를 성공할 때까지 다시 실행하고, 모두 성공하면 ready
+    while steps:
+        time.sleep(BOOT_RETRY_INTERVAL)
+        for name in list(steps):
+            value, error = _timed(name, steps[name])
+            metrics.inc("adaptive_rag_boot_retries_total", step=name, status="error" if error else "ok")
+            if error is not None:
+                print(f"[BOOT ERROR] {name} 단계 재시도 실패: {type(error).__name__}: {error}")
+                continue
+            print(f"[BOOT] {name} 단계 재시도 성공")
+            del steps[name]
+            _pending.discard(name)
+    _set_ready()
+
+def run(steps: dict, required: tuple = (), retry: tuple = (), parallel: bool = None) -> dict:
+    """
+    시작 단계를 실행하고 ready 상태로 바꾼다.
+
+    Args:
+        steps (dict): {단계 이름: 인자 없는 함수}
+        required (tuple): 실패하면 예외를 올릴 단계 이름
+        retry (tuple): 실패하면 ready로 바꾸지 않고 백그라운드에서 성공할 때까지 다시 실행할 단계 이름
+            (나머지 단계는 실패해도 처음 쓸 때 다시 시도됨)
+        parallel (bool): 단계를 동시에 실행할지 (None이면 BOOT_PARALLEL)
+
+    Returns:
+        dict: 단계별 반환값
+    """
+    parallel = BOOT_PARALLEL if parallel is None else parallel
+    _ready.clear()
+    metrics.set_gauge("adaptive_rag_ready", 0)
+    _timings.clear()
+    _pending.clear()
+
+    t0 = time.perf_counter()
+    if parallel and len(steps) > 1:
+        with ThreadPoolExecutor(max_workers=min(BOOT_WORKERS, len(steps)), thread_name_prefix="boot") as pool:
+            futures = {name: pool.submit(_timed, name, fn) for name, fn in steps.items()}
+            outcomes = {name: future.result() for name, future in futures.items()}
+    else:
+        outcomes = {name: _timed(name, fn) for name, fn in steps.items()}
+    elapsed = time.perf_counter() - t0
+    _timings["total"] = round(elapsed * 1000, 1)
+    metrics.set_gauge("adaptive_rag_boot_seconds", elapsed)
+
+    results, failed = {}, {}
+    for name, (value, error) in outcomes.items():
+        if error is not None:
+            print(f"[BOOT ERROR] {name} 단계 실패: {type(error).__name__}: {error}")
+            if name in required:
+                raise error
+            if name in retry:
+                failed[name] = steps[name]
+        results[name] = value
+    print(f"[BOOT] 시작 단계 완료 ({'동시' if parallel else '순차'} 실행): {_timings}")
+
+    if failed:
+        # 필수 기능이 준비되지 않은 worker에는 트래픽을 보내지 않도록 ready를 미룸
+        _pending.update(failed)
+        print(f"[BOOT] {sorted(failed)} 단계가 준비될 때까지 ready로 바꾸지 않고 {BOOT_RETRY_INTERVAL:g}초마다 다시 시도합니다.")
+        threading.Thread(target=_retry_loop, args=(failed,), name="boot-retry", daemon=True).start()
+        return results
+
+    _set_ready()
+    return results
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+def wait_ready(timeout: float = None) -> bool:
+    return _ready.wait(timeout)
+
+def pending() -> list:
+    return sorted(_pending)
+
+def timings() -> dict:
+    return dict(_timings)
@@ -0,0 +1,99 @@
+"""
+chains.py
+
+이 모듈은 Adaptive RAG 챗봇에서 사용하는 모든 `prompt | llm | parser` 체인을 import 시점에 한 번만 구성해 두는 레지스트리입니다.
+노드 함수들은 요청마다 체인을 새로 만들지 않고 `get_chain`으로 미리 만들어 둔 체인을 가져다 사용합니다.
+
+등록된 체인:
+- 답변 생성용 체인 (policy, subject, seteuk, book, admission, fallback)
+- 질문 라우팅 체인 (route) / 재라우팅 체인 (re_route)
+- 대화 이력 기반 질문 재작성 체인 (rephrase)
+- 대화 요약 체인 (summary)
+- 질문-문서 관련성 판단 체인 (check)
+- 슬랭 해석·라우팅·검색 질의 재작성을 한 번에 하는 fused 전처리 체인 (preprocess)
+
+모든 체인의 LLM 호출은 llm_gateway를 거치므로(동시 실행/분당 요청·토큰 한도/우선순위), 재시도도 gateway가 담당합니다.
+"""
+
+from typing import Literal
+from pydantic import BaseModel, Field
+from langchain_core.output_parsers import StrOutputParser
+from dotenv import load_dotenv
+import os
+from adaptive_rag.utils import clients, llm_gateway
+from adaptive_rag.utils.prompts import get_prompt_by_key
+
+# API 키 정보 로드
+load_dotenv()
+
+# API 키 읽어오기
+openai_api_key = os.environ.get('OPENAI_API_KEY')
+
+# 모든 체인이 공유하는 기본 LLM (stream_usage: 스트리밍 응답에서도 토큰 사용량을 받아 tracing에 기록)
+# 재시도는 llm_gateway가 한도를 지키면서 수행하므로 SDK 자체 재시도는 끔, 연결은 clients의 OpenAI 공유 연결 풀 사용
+llm = clients.chat_model(model="gpt-4o-mini", temperature=0, streaming=True, stream_usage=True, max_retries=0)
+
+# 라우팅 대상 도구 이름
+ToolName = Literal[
+    "search_policy",
+    "search_subject",
+    "search_admission",
+    "search_book",
+    "search_seteuk",
+    "llm_fallback"  # Fallback option if no tool is suitable
+]
+
+# 라우팅 결정용 데이터 모델
+class ToolSelector(BaseModel):
+    """Routes the user question to the most appropriate tool."""
+    tool: ToolName = Field(
+        description="Select one of the tools: search_policy, search_subject, search_admission, search_books, or search_seteuk, llm_fallback based on the user's question."
+    )
+
+# fused 전처리 결과 데이터 모델 (preprocess.py)
+class Preprocessed(BaseModel):
+    """Normalizes the user question, routes it and writes the retrieval query in one step."""
+    normalized_question: str = Field(
+        description="The user's question with every (slang/formal) pair replaced by the phrase that fits the context. Keep all other text unchanged."
+    )
+    tool: ToolName = Field(
+        description="The single most relevant tool for the normalized question."
+    )
+    runner_up: ToolName = Field(
+        description="The second most relevant tool, different from tool. Use llm_fallback if no other tool fits."
+    )
+    retrieval_query: str = Field(
+        description="A concise, self-contained search query for the normalized question, enriched with the conversation history."
+    )
+
+# 구조화된 출력을 위한 LLM 설정
+structured_llm = llm.with_structured_output(ToolSelector)
+preprocess_llm = llm.with_structured_output(Preprocessed)
+
+# 문자열 출력 체인에서 공유하는 파서
+parser = StrOutputParser()
+
+# 답변 생성에 사용하는 프롬프트 키
+GENERATION_KEYS = ["policy", "subject", "seteuk", "book", "admission", "fallback"]
+
+# 체인 레지스트리 (import 시점에 한 번만 구성)
+# (guard: 호출 종류별 기본 우선순위/예상 토큰으로 llm_gateway 스케줄링)
+CHAIN_REGISTRY = {key: get_prompt_by_key(key) | llm_gateway.guard(llm, "generate") | parser for key in GENERATION_KEYS}
+CHAIN_REGISTRY["rephrase"] = get_prompt_by_key("rephrase") | llm_gateway.guard(llm, "rephrase") | parser
+CHAIN_REGISTRY["summary"] = get_prompt_by_key("summary") | llm_gateway.guard(llm, "summary") | parser
+CHAIN_REGISTRY["check"] = get_prompt_by_key("check") | llm_gateway.guard(llm, "check") | parser
+CHAIN_REGISTRY["route"] = get_prompt_by_key("route") | llm_gateway.guard(structured_llm, "route")
+CHAIN_REGISTRY["re_route"] = get_prompt_by_key("re_route") | llm_gateway.guard(structured_llm, "route")
+CHAIN_REGISTRY["preprocess"] = get_prompt_by_key("preprocess") | llm_gateway.guard(preprocess_llm, "preprocess")
+
+def get_chain(key: str):
+    """
+    미리 구성된 체인을 키로 조회한다.
+
+    Args:
+        key (str): 체인 키 (예: "policy", "rephrase", "route")
+
+    Returns:
+        Runnable | None: 등록된 체인, 없으면 None
+    """
+    return CHAIN_REGISTRY.get(key)
@@ -0,0 +1,220 @@
+"""
+clients.py
+
+이 모듈은 외부 provider(OpenAI, Cohere, Pinecone) SDK 클라이언트를 한 곳에서 만들어 공유하는 client factory입니다.
+모듈마다 SDK 클라이언트를 따로 만들면 클라이언트마다 연결 풀과 TLS handshake가 따로 생기므로,
+provider별로 keep-alive 연결 풀 하나만 만들고 모든 LLM/임베딩/리랭커/벡터 저장소가 이를 재사용합니다.
+
+구성:
+- `http_client(provider)`: provider별 공유 httpx.Client (연결 수/keep-alive 상한, 타임아웃, h2 패키지가 있으면 HTTP/2)
+- `openai_client()`, `chat_model(...)`, `embeddings()`: OpenAI 연결 풀을 쓰는 SDK 클라이언트 / LangChain 모델
+- `cohere_client()`, `reranker(top_n)`: Cohere 연결 풀을 쓰는 리랭커
+- `pinecone_index()`, `vector_store(namespace)`: Pinecone 클라이언트와 Index 하나를 모든 네임스페이스가 공유
+- `warmup()`: 서버 시작 시 provider별로 연결을 미리 맺어 첫 요청의 연결 비용 제거 (CLIENT_WARMUP=0 이면 건너뜀)
+
+설정 (환경 변수): HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE, HTTP_KEEPALIVE_EXPIRY, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT,
+HTTP2 (기본 1, h2 패키지 필요), PINECONE_POOL_THREADS, PINECONE_INDEX_HOST, CLIENT_WARMUP_CONNECTIONS
+"""
+
+import atexit
+import importlib.util
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from dotenv import load_dotenv
+
+# API 키 정보 로드
+load_dotenv()
+
+# provider별 API 주소 (warmup 시 연결을 미리 맺는 곳)
+PROVIDER_BASE_URLS = {
+    "openai": os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+    "cohere": os.environ.get("CO_API_URL", "https://api.cohere.com"),
+}
+
+# 연결 풀 / 타임아웃 설정
+HTTP_LIMITS = httpx.Limits(
+    max_connections=int(os.environ.get("HTTP_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=int(os.environ.get("HTTP_MAX_KEEPALIVE", "20")),
+    keepalive_expiry=float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "60")),
+)
+HTTP_TIMEOUT = httpx.Timeout(
+    float(os.environ.get("HTTP_READ_TIMEOUT", "60")),
+    connect=float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5")),
+)
+# HTTP/2는 h2 패키지가 설치되어 있을 때만 사용 (pip install "httpx[http2]")
+HTTP2 = os.environ.get("HTTP2", "1") != "0" and importlib.util.find_spec("h2") is not None
+
+PINECONE_INDEX_NAME = "college-admission-chatbot"
+PINECONE_POOL_THREADS = int(os.environ.get("PINECONE_POOL_THREADS", "8"))
+
+# warmup 시 provider별로 미리 맺을 연결 수 (HTTP/2면 연결 하나로 충분)
+WARMUP_CONNECTIONS = int(os.environ.get("CLIENT_WARMUP_CONNECTIONS", "4"))
+
+RERANK_MODEL = "rerank-multilingual-v3.0"
+EMBEDDING_MODEL = "text-embedding-3-large"
+
+_lock = threading.RLock()
+_http_clients = {}
+_shared = {}
+
+def _get_or_create(key, factory):
+    # 처음 요청될 때 한 번만 만든다
+    if key not in _shared:
+        with _lock:
+            if key not in _shared:
+                _shared[key] = factory()
+    return _shared[key]
+
+def http_client(provider: str) -> httpx.Client:
+    """
+    provider별 공유 httpx.Client (keep-alive 연결 풀)
+    """
+    if provider not in _http_clients:
+        with _lock:
+            if provider not in _http_clients:
+                _http_clients[provider] = httpx.Client(http2=HTTP2, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    return _http_clients[provider]
+
+# ---------------------------------------------------------------------------
+# OpenAI
+# ---------------------------------------------------------------------------
+
+def openai_client():
+    """
+    공유 openai.OpenAI 클라이언트 (재시도는 llm_gateway가 담당하므로 SDK 자체 재시도는 끔)
+    """
+    import openai
+    return _get_or_create("openai", lambda: openai.OpenAI(http_client=http_client("openai"), max_retries=0))
+
+def chat_model(**kwargs):
+    """
+    OpenAI 연결 풀을 쓰는 ChatOpenAI를 만든다.
+    """
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(http_client=http_client("openai"), **kwargs)
+
+def embeddings():
+    """
+    공유 OpenAIEmbeddings
+    """
+    from langchain_openai import OpenAIEmbeddings
+    return _get_or_create("embeddings", lambda: OpenAIEmbeddings(
+        model=EMBEDDING_MODEL,
+        openai_api_key=os.environ.get("OPENAI_API_KEY"),
+        http_client=http_client("openai"),
+    ))
+
+# ---------------------------------------------------------------------------
+# Cohere
+# ---------------------------------------------------------------------------
+
+def cohere_client():
+    """
+    Cohere 연결 풀을 쓰는 공유 cohere.ClientV2
+    """
+    import cohere
+    return _get_or_create("cohere", lambda: cohere.ClientV2(
+        os.environ.get("COHERE_API_KEY"),
+        client_name="langchain:partner",
+        httpx_client=http_client("cohere"),
+    ))
+
+def reranker(top_n: int):
+    """
+    공유 Cohere 클라이언트를 쓰는 CohereRerank를 만든다 (top_n만 다르고 연결은 같음).
+    느린 응답은 hedging으로 한 번 더 요청한다 (HEDGE_SITES에 rerank가 있을 때).
+    """
+    from langchain_cohere import CohereRerank
+    from adaptive_rag.utils.hedging import HedgedCompressor
+    return HedgedCompressor(compressor=CohereRerank(model=RERANK_MODEL, top_n=top_n, client=cohere_client()))
+
+# ---------------------------------------------------------------------------
+# Pinecone
+# ---------------------------------------------------------------------------
+
+def pinecone_index(index_name: str = PINECONE_INDEX_NAME):
+    """
+    공유 Pinecone Index (Pinecone SDK는 httpx가 아닌 자체 연결 풀을 쓰므로 클라이언트/Index를 하나만 만들어 공유)
+    PINECONE_INDEX_HOST를 지정하면 시작 시 describe_index 호출 없이 바로 연결한다.
+    """
+    def _create():
+        from pinecone import Pinecone
+        pc = _get_or_create("pinecone", lambda: Pinecone(
+            api_key=os.environ.get("PINECONE_API_KEY"), pool_threads=PINECONE_POOL_THREADS,
+        ))
+        return pc.Index(
+            name=index_name,
+            host=os.environ.get("PINECONE_INDEX_HOST", ""),
+            pool_threads=PINECONE_POOL_THREADS,
+            connection_pool_maxsize=HTTP_LIMITS.max_keepalive_connections,
+        )
+    return _get_or_create(("pinecone_index", index_name), _create)
+
+def vector_store(namespace: str, index_name: str = PINECONE_INDEX_NAME):
+    """
+    공유 Index와 임베딩을 쓰는 네임스페이스별 PineconeVectorStore를 만든다.
+    """
+    from langchain_pinecone import PineconeVectorStore
+    return PineconeVectorStore(index=pinecone_index(index_name), embedding=embeddings(), namespace=namespace)
+
+# ---------------------------------------------------------------------------
+# warmup / 종료
+# ---------------------------------------------------------------------------
+
+def warm_connections(provider: str, url: str, connections: int = WARMUP_CONNECTIONS):
+    """
+    provider 연결 풀에 url로 가는 연결을 connections개 미리 맺어 둔다.
+    인증 없는 가벼운 요청이므로 응답 코드는 상관없다 (HTTP/2면 연결 하나를 모든 요청이 공유).
+    """
+    client = http_client(provider)
+    n = 1 if HTTP2 else connections
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        list(pool.map(lambda _: client.head(url), range(n)))
+
+def warmup(connections: int = WARMUP_CONNECTIONS) -> dict:
+    """
+    provider별로 연결을 미리 맺는다 (API 서버 시작 시 호출). 실패해도 예외를 올리지 않는다.
+
+    Returns:
+        dict: provider별 소요 시간(ms) 또는 오류 메시지
+    """
+    if os.environ.get("CLIENT_WARMUP", "1") == "0":
+        return {}
+    tasks = {
+        "openai": lambda: warm_connections("openai", PROVIDER_BASE_URLS["openai"], connections),
+        "cohere": lambda: warm_connections("cohere", PROVIDER_BASE_URLS["cohere"], connections),
+        "pinecone": lambda: pinecone_index().describe_index_stats(),
+    }
+
+    def _run(item):
+        provider, fn = item
+        t0 = time.perf_counter()
+        try:
+            fn()
+            return provider, round((time.perf_counter() - t0) * 1000, 1)
+        except Exception as e:
+            return provider, f"{type(e).__name__}: {e}"
+
+    with ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+        result = dict(pool.map(_run, tasks.items()))
+    for provider, value in result.items():
+        if isinstance(value, str):
+            print(f"[CLIENTS ERROR] {provider} 연결 warmup 실패: {value}")
+    print(f"[CLIENTS] provider 연결 warmup 완료 (HTTP/2: {HTTP2}): {result}")
+    return result
+
+def close():
+    """
+    공유 연결 풀을 닫는다.
+    """
+    with _lock:
+        for client in _http_clients.values():
+            client.close()
+        _http_clients.clear()
+        _shared.clear()
+
+atexit.register(close)
@@ -0,0 +1,134 @@
+"""
+deadline.py
+
+이 모듈은 요청(턴) 단위 마감 시각(deadline)과, 남은 예산에 따른 호출별 timeout / 기능 축소(degradation)를 제공합니다.
+한 턴은 슬랭 GPT, 라우팅, 재작성, 검색, 리랭크, 관련성 판단, 재라우팅, 생성까지 외부 호출이 10회 가까이 이어질 수 있으므로,
+`get_chatbot_response`가 턴 시작 시 마감 시각을 정하고 각 노드가 남은 예산을 보고 동작을 줄입니다.
+
+구성:
+- state["deadline"]: 마감 시각 (time.time() 기준), 노드가 남은 예산을 읽는 곳
+- `scope(deadline)`: 같은 마감 시각을 contextvar로도 전달 (llm_gateway가 호출별 timeout 계산에 사용)
+- `call_timeout(kind)`: 남은 예산에서 생성 단계 몫(GENERATION_RESERVE)을 뺀 호출별 timeout (생성은 남은 예산 전체)
+- `bounded(kind, fn)`: SDK가 요청별 timeout을 받지 않는 호출(Pinecone 벡터 검색, Cohere 리랭크)을 call_timeout 안에서만 기다림
+  (시간이 지나면 TimeoutError, 늦은 호출은 DEADLINE_POOL_SIZE 크기의 전용 스레드에서 끝날 때까지 실행되고 결과는 버림)
+- `should_degrade(state, step)` / `degrade(state, step)`: 남은 예산이 단계별 기준보다 적으면 기능을 줄이고 state["degradations"]에 기록
+
+기능 축소 단계 (DEGRADE_BELOW: 이 단계를 정상 수행하려면 남아 있어야 하는 예산(초)):
+- skip_slang: 슬랭 문맥 판단 GPT 호출을 건너뛰고 사전의 정식 표현으로 치환
+- no_reroute: 관련성이 낮아도 재라우팅하지 않고 fallback 답변
+- small_k: 벡터 검색 k를 줄임
+- skip_check: 관련성 판단을 건너뛰고 검색 결과로 바로 답변 생성
+
+설정 (환경 변수): TURN_DEADLINE_SECONDS (0이면 마감 없음), DEADLINE_GENERATION_RESERVE, DEADLINE_POOL_SIZE
+"""
+
+import contextvars
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from adaptive_rag.utils import metrics
+
+# 턴 전체 예산(초)
+TURN_BUDGET = float(os.environ.get("TURN_DEADLINE_SECONDS", "20"))
+
+# 생성 단계를 위해 남겨 두는 예산(초) / 생성 호출의 최소 timeout
+GENERATION_RESERVE = float(os.environ.get("DEADLINE_GENERATION_RESERVE", "6"))
+GENERATION_MIN_TIMEOUT = 5.0
+
+# 생성 외 호출의 최소 timeout(초)
+MIN_CALL_TIMEOUT = 1.0
+
+# 단계별로 남아 있어야 하는 최소 예산(초), 이보다 적으면 해당 단계를 줄이거나 건너뜀
+DEGRADE_BELOW = {
+    "skip_slang": 14.0,
+    "no_reroute": 10.0,
+    "small_k": 9.0,
+    "skip_check": 7.0,
+}
+
+_current_deadline: ContextVar = ContextVar("adaptive_rag_deadline", default=None)
+
+# bounded 호출을 실행하는 전용 스레드 수 (timeout으로 버린 호출도 SDK timeout까지 스레드를 차지함)
+_bounded_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("DEADLINE_POOL_SIZE", "32")),
+                                       thread_name_prefix="deadline")
+
+def new_deadline(budget: float = None) -> float:
+    """
+    지금부터 budget초 뒤의 마감 시각 (budget이 None이면 TURN_BUDGET, 0 이하면 마감 없음 → None)
+    """
+    budget = TURN_BUDGET if budget is None else budget
+    return time.time() + budget if budget > 0 else None
+
+@contextmanager
+def scope(deadline: float = None):
+    """
+    이 블록 안의 외부 호출에 마감 시각을 전달한다 (LangGraph 노드 스레드로도 전달됨).
+    """
+    token = _current_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+def remaining(state: dict = None) -> float:
+    """
+    남은 예산(초). state가 있으면 state["deadline"], 없으면 현재 scope의 마감 시각 기준 (마감이 없으면 inf)
+    """
+    deadline = state.get("deadline") if state is not None else _current_deadline.get()
+    return deadline - time.time() if deadline else math.inf
+
+def call_timeout(kind: str = None) -> float:
+    """
+    현재 scope의 남은 예산으로 계산한 호출 timeout(초). 마감이 없으면 None.
+    생성 호출은 남은 예산 전체(최소 GENERATION_MIN_TIMEOUT), 나머지는 생성 몫을 뺀 예산(최소 MIN_CALL_TIMEOUT)
+    """
+    left = remaining()
+    if math.isinf(left):
+        return None
+    if kind == "generate":
+        return max(left, GENERATION_MIN_TIMEOUT)
+    return max(left - GENERATION_RESERVE, MIN_CALL_TIMEOUT)
+
+def timeout_kwargs(kind: str = None) -> dict:
+    """
+    SDK 호출에 넘길 timeout 인자 ({"timeout": 초}, 마감이 없으면 빈 dict → SDK 기본 timeout 유지)
+    """
+    timeout = call_timeout(kind)
+    return {"timeout": timeout} if timeout is not None else {}
+
+def bounded(kind: str, fn):
+    """
+    fn()을 현재 scope의 call_timeout(kind) 안에서만 기다려 결과를 반환한다. 마감이 없으면 그대로 실행한다.
+    시간 안에 끝나지 않으면 adaptive_rag_call_timeouts_total{kind}를 올리고 TimeoutError를 올린다.
+    """
+    timeout = call_timeout(kind)
+    if timeout is None:
+        return fn()
+    # tracing span / llm_gateway / deadline contextvar를 worker 스레드로 전달
+    future = _bounded_executor.submit(contextvars.copy_context().run, fn)
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        future.cancel()
+        metrics.inc("adaptive_rag_call_timeouts_total", kind=kind)
+        raise TimeoutError(f"{kind} 호출이 {timeout:.1f}초 안에 끝나지 않았습니다.") from None
+
+def should_degrade(state: dict, step: str) -> bool:
+    """
+    남은 예산이 step을 정상 수행하기에 부족한지
+    """
+    return remaining(state) < DEGRADE_BELOW[step]
+
+def degrade(state: dict, step: str) -> list:
+    """
+    step을 기능 축소로 기록한 degradations 목록을 반환한다 (state에 넣는 것은 호출한 노드가 함, 같은 단계는 한 번만 기록).
+    """
+    steps = list(state.get("degradations") or [])
+    if step not in steps:
+        metrics.inc("adaptive_rag_degradations_total", step=step)
+        steps.append(step)
+    return steps
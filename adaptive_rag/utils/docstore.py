@@ -0,0 +1,104 @@
+"""
+docstore.py
+
+이 모듈은 한 턴 동안 검색된 문서를 보관하는 요청 단위 문서 테이블을 제공합니다.
+그래프 state에는 문서 대신 문서 ID 목록(`doc_ids`)만 싣고, 검색 노드가 테이블에 넣은 문서를
+관련성 판단(check.py) / 답변 생성(generate.py) 노드가 ID로 꺼내 씁니다.
+LangGraph는 노드가 끝날 때마다 state 값을 채널에 기록하므로, 본문과 메타데이터가 긴 문서 목록 대신
+짧은 ID만 노드 사이로 넘겨 state 크기와 복사 비용을 줄입니다.
+
+구성:
+- `DocRecord`: 문서 한 건 (`__slots__`: id, namespace, content, metadata)
+- `DocTable`: 턴 하나의 문서 테이블 (add / get / discard)
+- `scope()`: 턴 실행 범위에서 쓸 테이블을 지정하는 context manager (LangGraph 노드 스레드로도 전달됨)
+  (pipeline._run_graph, pipeline.run_chatbot, batch.run_question이 그래프 실행을 이 범위로 감쌈)
+- `add(namespace, docs)` / `get(ids)` / `discard(ids)`: 현재 범위 테이블에 대한 함수
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, List
+
+class DocRecord:
+    """검색된 문서 한 건 (langchain Document 대신 state 밖에 보관)"""
+
+    __slots__ = ("id", "namespace", "content", "metadata")
+
+    def __init__(self, id: str, namespace: str, content: str, metadata: dict):
+        self.id = id
+        self.namespace = namespace
+        self.content = content
+        self.metadata = metadata
+
+    # langchain Document와 같은 이름으로도 읽을 수 있게 함
+    @property
+    def page_content(self) -> str:
+        return self.content
+
+    def __repr__(self) -> str:
+        return f"DocRecord(id={self.id!r}, namespace={self.namespace!r})"
+
+class DocTable:
+    """
+    턴 하나의 문서 테이블. 한 턴의 노드는 차례로 실행되므로 lock 없이 사용한다.
+    """
+
+    __slots__ = ("_records", "_seq")
+
+    def __init__(self):
+        self._records = {}
+        self._seq = 0
+
+    def add(self, namespace: str, docs: Iterable) -> List[str]:
+        """
+        문서(Document 또는 page_content/metadata를 가진 객체)를 테이블에 넣고 ID 목록을 반환한다.
+        """
+        ids = []
+        for doc in docs:
+            self._seq += 1
+            doc_id = f"{namespace}:{self._seq}"
+            self._records[doc_id] = DocRecord(doc_id, namespace, doc.page_content, doc.metadata or {})
+            ids.append(doc_id)
+        return ids
+
+    def get(self, ids: Iterable[str]) -> List[DocRecord]:
+        """
+        ID 순서대로 문서를 반환한다 (테이블에 없는 ID는 건너뜀).
+        """
+        return [self._records[doc_id] for doc_id in ids or () if doc_id in self._records]
+
+    def discard(self, ids: Iterable[str]):
+        for doc_id in ids or ():
+            self._records.pop(doc_id, None)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+_current_table: ContextVar = ContextVar("adaptive_rag_docstore", default=None)
+
+@contextmanager
+def scope():
+    """
+    이 블록 안에서 실행되는 그래프 노드가 쓸 문서 테이블을 만든다 (블록이 끝나면 테이블과 문서를 버림).
+    """
+    table = DocTable()
+    token = _current_table.set(table)
+    try:
+        yield table
+    finally:
+        _current_table.reset(token)
+
+def current() -> DocTable:
+    table = _current_table.get()
+    if table is None:
+        raise RuntimeError("문서 테이블 범위 밖에서 그래프를 실행했습니다 (docstore.scope()로 감싸 주세요).")
+    return table
+
+def add(namespace: str, docs: Iterable) -> List[str]:
+    return current().add(namespace, docs)
+
+def get(ids: Iterable[str]) -> List[DocRecord]:
+    return current().get(ids)
+
+def discard(ids: Iterable[str]):
+    current().discard(ids)
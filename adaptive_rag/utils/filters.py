@@ -0,0 +1,88 @@
+"""
+filters.py
+
+이 모듈은 요청의 category와 질문에서 찾은 개체(대학, 학과, 과목, 계열, 학년)를 네임스페이스별 메타데이터 필터로 바꿔 줍니다.
+필터는 벡터 검색(Pinecone의 filter 인자)에 그대로 넘겨, 유사도 계산 전에 후보 문서를 좁힙니다.
+세특·도서처럼 학과/과목 이름만 다르고 내용이 거의 같은 문서가 많은 네임스페이스에서는, 필터가 없으면 다른 학과 문서가 상위에 섞입니다.
+
+구성:
+- NAMESPACE_SCHEMA: 네임스페이스별 필터 가능한 메타데이터 필드 → 개체 종류 (적재 시 이 필드를 문서 메타데이터에 기록해야 함)
+- `extract(question, category)`: gazetteer 개체 + 학년. category("인문계열", "컴퓨터공학과", "고2" 등)에서 찾은 개체는
+  질문에 같은 종류의 개체가 없을 때만 사용 ("정책", "세특"처럼 네임스페이스를 가리키는 category는 개체가 없어 필터를 만들지 않음)
+  - 학과가 있으면 계열은 학과로 정해지므로 계열 필터는 만들지 않음
+- `build(namespace, question, category)`: Pinecone 메타데이터 필터 ({"major": {"$in": [...]}, "grade": {"$eq": 2}} 등, 없으면 빈 dict)
+- `filtered_k(default_k)`: 필터로 후보를 좁혔을 때의 검색 k (네임스페이스 기본 k와 PREFILTER_K 중 작은 값)
+
+필터 검색 결과가 없으면(필드가 없는 문서, 색인에 없는 대학 등) search.py가 필터 없이 기존 k로 다시 검색합니다.
+필터 적중/재검색 횟수는 adaptive_rag_prefilter_total{namespace, outcome}로 확인합니다.
+
+설정 (환경 변수): ADAPTIVE_RAG_PREFILTER (0이면 끔), PREFILTER_K
+"""
+
+import os
+import re
+
+from adaptive_rag.utils import gazetteer
+
+PREFILTER_ENABLED = os.environ.get("ADAPTIVE_RAG_PREFILTER", "1") != "0"
+
+# 필터로 후보를 좁혔을 때의 검색 k 상한 (admission 30 → 10)
+PREFILTER_K = int(os.environ.get("PREFILTER_K", "10"))
+
+# 네임스페이스별 필터 가능한 메타데이터 필드 → 개체 종류
+NAMESPACE_SCHEMA = {
+    "policy": {},
+    "subject": {"subject": "subjects", "grade": "grades"},
+    "admission": {"university": "universities", "major": "majors", "track": "tracks"},
+    "book": {"major": "majors", "track": "tracks"},
+    "seteuk": {"subject": "subjects", "major": "majors", "track": "tracks"},
+}
+
+# "2학년", "고2", "고등학교 2학년" ("2023학년도", "최고 3개", "12학년"처럼 다른 숫자·단어의 일부는 제외)
+_GRADE = re.compile(r"(?<![가-힣])(?:고등학교|고)\s*([1-3])(?!\d)(?!\s*학년도)(?:\s*학년)?|(?<!\d)([1-3])\s*학년(?!도)")
+
+def extract_grades(text: str) -> list:
+    grades = []
+    for match in _GRADE.finditer(text or ""):
+        grade = int(match.group(1) or match.group(2))
+        if grade not in grades:
+            grades.append(grade)
+    return grades
+
+def extract(question: str, category: str = None) -> dict:
+    """
+    질문과 category에서 필터에 쓸 개체를 찾는다.
+
+    Returns:
+        dict: gazetteer 개체 종류 + "grades" → 값 목록
+    """
+    entities = {**gazetteer.extract(question), "grades": extract_grades(question)}
+    if category:
+        from_category = {**gazetteer.extract(category), "grades": extract_grades(category)}
+        for kind, values in from_category.items():
+            if values and not entities[kind]:
+                entities[kind] = values
+    if entities["majors"]:
+        entities["tracks"] = []
+    return entities
+
+def to_filter(namespace: str, entities: dict) -> dict:
+    """
+    개체를 namespace의 메타데이터 필터로 바꾼다 (스키마에 없는 개체는 버림, 개체가 없으면 빈 dict).
+    """
+    flt = {}
+    for field, kind in NAMESPACE_SCHEMA.get(namespace, {}).items():
+        values = entities.get(kind) or []
+        if len(values) == 1:
+            flt[field] = {"$eq": values[0]}
+        elif values:
+            flt[field] = {"$in": values}
+    return flt
+
+def build(namespace: str, question: str, category: str = None) -> dict:
+    if not PREFILTER_ENABLED or not NAMESPACE_SCHEMA.get(namespace):
+        return {}
+    return to_filter(namespace, extract(question, category))
+
+def filtered_k(default_k: int) -> int:
+    return min(default_k, PREFILTER_K)
@@ -0,0 +1,150 @@
+"""
+gazetteer.py
+
+이 모듈은 대학/학과/과목/계열 이름과 줄임말 사전(gazetteer.json)으로 질문에서 개체를 찾아 줍니다.
+찾은 개체는 filters.py가 네임스페이스별 메타데이터 필터로 바꿔, 검색 전에 후보 문서를 좁히는 데 씁니다.
+
+구성:
+- 문자 trie: 정식 이름 + 자동 생성 줄임말("OO대학교" → "OO대"/"OO대학", "OO여자대학교" → "OO여대", "OO학과" → "OO학부"/"OO학",
+  "OO계열" → "OO계") + 사전에 적은 줄임말(aliases, 예: 설대, 컴공, 확통)을 공백을 없앤 형태로 저장
+  - 일반 단어와 겹치는 이름은 aliases_only로 두어 줄임말(예: "정보과목")로만 찾음
+- `extract(text)`: 질문을 앞에서부터 최장 일치로 훑어 {"universities", "majors", "subjects", "tracks"} (정식 이름 목록) 반환 (수 µs)
+  - 약한 줄임말(weak_aliases, 예: 연대·고대·문과처럼 일반 단어와 겹치는 말)은 종류별 문맥 용어(CONTEXT_TERMS)가 있거나,
+    대학/학과라면 다른 대학/학과 개체가 함께 있을 때만 인정
+- `track_of(major)`: 학과의 계열 (사전의 majors[].track)
+
+설정 (환경 변수): GAZETTEER_PATH, ADAPTIVE_RAG_GAZETTEER (0이면 끔)
+"""
+
+import json
+import os
+import re
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+GAZETTEER_PATH = os.environ.get("GAZETTEER_PATH", os.path.join(ROOT, "gazetteer.json"))
+GAZETTEER_ENABLED = os.environ.get("ADAPTIVE_RAG_GAZETTEER", "1") != "0"
+
+# 개체 종류 (gazetteer.json의 최상위 키)
+KINDS = ("universities", "majors", "subjects", "tracks")
+
+# 약한 줄임말을 인정할 때 함께 있어야 하는 종류별 용어
+ADMISSION_TERMS = ("대학", "학과", "학부", "전공", "전형", "수시", "정시", "학종", "입시", "입학", "합격", "경쟁률", "캠퍼스")
+SUBJECT_TERMS = ("과목", "세특", "교과", "수업", "이수", "성취", "수행평가", "탐구", "선택")
+CONTEXT_TERMS = {
+    "universities": ADMISSION_TERMS,
+    "majors": ADMISSION_TERMS,
+    "subjects": SUBJECT_TERMS,
+    "tracks": ADMISSION_TERMS + ("계열", "진로", "책", "도서", "추천", "세특"),
+}
+# 서로의 문맥이 되는 종류 (예: "연대 경영"의 연대)
+PAIRED_KINDS = ("universities", "majors")
+
+_END = "\0"
+
+def _aliases(kind: str, entry: dict) -> set:
+    # 정식 이름에서 자동으로 만드는 줄임말
+    name = entry["name"]
+    aliases = set(entry.get("aliases", []))
+    if not entry.get("aliases_only"):
+        aliases.add(name)
+    if kind == "universities" and name.endswith("대학교"):
+        stem = name[:-len("대학교")]
+        aliases |= {stem + "대", stem + "대학"}
+        if stem.endswith("여자"):
+            aliases |= {stem[:-len("여자")] + "여대", stem + "대"}
+    if kind == "majors" and name.endswith("학과") and len(name) > 3:
+        stem = name[:-len("학과")]
+        aliases |= {stem + "학부", stem + "학"}
+    if kind == "tracks" and name.endswith("계열"):
+        aliases.add(name[:-len("열")])
+    return aliases
+
+def _compact(text: str) -> str:
+    return re.sub(r"\s+", "", text.lower())
+
+class Gazetteer:
+    """
+    대학/학과/과목/계열 이름 trie (최장 일치 개체 추출)
+    """
+
+    def __init__(self, data: dict):
+        self._trie = {}
+        self._tracks = {}
+        self.size = 0
+        for kind in KINDS:
+            for entry in data.get(kind, []):
+                name = entry["name"]
+                for alias in _aliases(kind, entry):
+                    self._add(alias, (kind, name, False))
+                for alias in entry.get("weak_aliases", []):
+                    self._add(alias, (kind, name, True))
+                if kind == "majors" and entry.get("track"):
+                    self._tracks[name] = entry["track"]
+
+    @classmethod
+    def load(cls, path: str = GAZETTEER_PATH) -> "Gazetteer":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _add(self, alias: str, value: tuple):
+        node = self._trie
+        for ch in _compact(alias):
+            node = node.setdefault(ch, {})
+        # 같은 줄임말이 여러 번 나오면 강한 줄임말을 우선
+        if _END not in node or node[_END][2]:
+            if _END not in node:
+                self.size += 1
+            node[_END] = value
+
+    def _matches(self, text: str) -> list:
+        # 왼쪽부터 최장 일치, 일치한 구간은 건너뜀
+        matches, i = [], 0
+        while i < len(text):
+            node, found, j = self._trie, None, i
+            while j < len(text) and text[j] in node:
+                node = node[text[j]]
+                j += 1
+                if _END in node:
+                    found = (j, node[_END])
+            if found:
+                i, value = found
+                matches.append(value)
+            else:
+                i += 1
+        return matches
+
+    def extract(self, text: str) -> dict:
+        """
+        질문에서 대학/학과/과목/계열 개체를 찾는다.
+
+        Returns:
+            dict: {"universities": [...], "majors": [...], "subjects": [...], "tracks": [...]} (정식 이름, 질문에 나온 순서, 중복 제거)
+        """
+        compact = _compact(text or "")
+        matches = self._matches(compact)
+        paired = any(kind in PAIRED_KINDS and not weak for kind, _, weak in matches)
+        entities = {kind: [] for kind in KINDS}
+        for kind, name, weak in matches:
+            # 약한 줄임말은 종류별 문맥 용어나 다른 대학/학과 개체가 함께 있을 때만 인정
+            if weak and not ((kind in PAIRED_KINDS and paired) or any(term in compact for term in CONTEXT_TERMS[kind])):
+                continue
+            if name not in entities[kind]:
+                entities[kind].append(name)
+        return entities
+
+    def track_of(self, major: str):
+        return self._tracks.get(major)
+
+# 프로세스 전역 gazetteer (import 시 한 번만 로드, 파일이 없으면 개체 추출 없이 동작)
+try:
+    gazetteer = Gazetteer.load() if GAZETTEER_ENABLED else Gazetteer({})
+except (OSError, ValueError) as e:
+    print(f"[GAZETTEER ERROR] 사전 로드 실패 ({GAZETTEER_PATH}), 개체 필터 없이 검색합니다: {e}")
+    gazetteer = Gazetteer({})
+
+def extract(text: str) -> dict:
+    return gazetteer.extract(text)
+
+def track_of(major: str):
+    return gazetteer.track_of(major)
@@ -10,17 +10,16 @@ RAG 기반 응답(`generate_adaptive`)과 fallback 응답(`llm_fallback_adaptive
 두 함수 모두 사용자 메모리와 MongoDB 로그 저장 기능이 포함되어 있어, 대화 흐름 유지 및 사용성 분석이 가능합니다.
 """
 
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser  
-from adaptive_rag.utils.memory import get_user_memory
+from adaptive_rag.utils.memory import append_turn, get_state_memory
+from adaptive_rag.utils.history import history_text as render_history, schedule_summary
 from adaptive_rag.utils.mongoDB import save_chat_log
-from langchain_openai import ChatOpenAI
 from pprint import pprint
+import time
 from dotenv import load_dotenv
 import os
 from adaptive_rag.utils.state import AdaptiveRagState
-from adaptive_rag.utils.prompts import get_prompt_by_key
+from adaptive_rag.utils.chains import llm, get_chain
+from adaptive_rag.utils import docstore
 
 # API 키 정보 로드
 load_dotenv()
@@ -28,8 +27,39 @@ load_dotenv()
 # API 키 읽어오기
 openai_api_key = os.environ.get('OPENAI_API_KEY')
 
-# 기본 LLM
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, streaming=True)
+# 답변을 만든 뒤 더 쓰지 않는 검색 필드 (state에서 비움)
+CONSUMED = {"doc_ids": None, "retrieval_query": None, "runner_up": None}
+
+def record_turn(state: AdaptiveRagState, question: str, generation: str):
+    """
+    한 턴의 질문/응답을 유저 메모리와 MongoDB 로그에 저장한다.
+    ephemeral 실행(배치 평가 등)에서는 아무 것도 기록하지 않는다.
+
+    Args:
+        state (AdaptiveRagState): 사용자 ID, 카테고리 등이 담긴 상태 객체
+        question (str): 사용자 질문
+        generation (str): 생성된 응답
+    """
+    if state.get("ephemeral"):
+        return
+
+    user_id = state.get("user_id", "anonymous")
+    category = state.get("category", "미지정")
+    started_at = state.get("started_at")
+
+    # 메모리에 저장 후 누적 요약 갱신 예약 (백그라운드)
+    session = append_turn(user_id, question, generation)
+    schedule_summary(user_id, session)
+
+    # 로그 저장 (분석용 경로/프롬프트 키/관련성/지연 시간 포함)
+    save_chat_log(
+        question, generation, user_id=user_id, category=category,
+        route=state.get("route"),
+        prompt_key=state.get("prompt_key"),
+        relevance_score=state.get("relevance_score"),
+        latency_ms=(time.time() - started_at) * 1000 if started_at else None,
+    )
+
 
 def generate_adaptive(state: AdaptiveRagState):
     """
@@ -42,43 +72,32 @@ def generate_adaptive(state: AdaptiveRagState):
         state (AdaptiveRagState): 질문, 문서, 사용자 ID 등이 담긴 상태 객체
 
     Returns:
-        dict: 상태에 'generation' 키가 추가된 딕셔너리
+        dict: 'generation', 'route'와 비운 검색 필드만 담은 state 갱신 값
     """
     question = state.get("question", "")
-    documents = state.get("documents", [])
-    user_id = state.get("user_id", "anonymous")
-    category = state.get("category", "미지정")
+    documents = docstore.get(state.get("doc_ids"))
     prompt_key = state.get("prompt_key", None)
     
-    # 프롬프트 키에 해당하는 템플릿 불러오기
-    prompt_template = get_prompt_by_key(prompt_key)
+    # 프롬프트 키에 해당하는 체인 불러오기 (레지스트리에서 미리 구성됨)
+    rag_chain = get_chain(prompt_key)
  
-    # 프롬프트 템플릿이 없으면 에러 메시지 반환
-    if not prompt_template:
+    # 체인이 없으면 에러 메시지 반환
+    if not rag_chain:
       return {"generation": "적절한 프롬프트를 찾을 수 없습니다."}
 
     # 유저 메모리 가져오기
-    memory = get_user_memory(user_id)
-
-    # 문서 리스트 형태로 정제
-    if not isinstance(documents, list):
-        documents = [documents]
+    memory = get_state_memory(state)
 
     # 문서 내용을 텍스트 형태로 병합
     documents_text = "\n\n".join([
-        f"---\n본문: {doc.page_content}\n메타데이터:{str(doc.metadata)}\n---"
+        f"---\n본문: {doc.content}\n메타데이터:{str(doc.metadata)}\n---"
         for doc in documents
     ])
 
-    # 이전 대화 이력 가져오기
-    history = memory.chat_memory.messages  # 이전 대화 리스트
-    history_text = "\n".join([
-        f"User: {m.content}" if isinstance(m, HumanMessage) else f"Bot: {m.content}"
-        for m in history
-    ])
+    # 이전 대화 이력 가져오기 (누적 요약 + 최근 턴, 토큰 상한 적용)
+    history_text = render_history(memory, "generate")
 
     # RAG 체인 실행: prompt → LLM → 출력 파서
-    rag_chain = prompt_template | llm | StrOutputParser()
     generation = rag_chain.invoke({
         "documents": documents_text,
         "question": question,
@@ -86,12 +105,11 @@ def generate_adaptive(state: AdaptiveRagState):
     })
 
     # 메모리 & 로그 저장
-    memory.chat_memory.add_user_message(HumanMessage(content=question))
-    memory.chat_memory.add_ai_message(AIMessage(content=generation))
-
-    save_chat_log(question, generation, user_id=user_id, category=category)
+    visited = state.get("visited_nodes") or []
+    route = visited[-1] if visited else None
+    record_turn({**state, "route": route}, question, generation)
 
-    return {**state, "generation": generation}
+    return {"generation": generation, "route": route, **CONSUMED}
 
 
 def llm_fallback_adaptive(state: AdaptiveRagState):
@@ -105,26 +123,15 @@ def llm_fallback_adaptive(state: AdaptiveRagState):
         state (AdaptiveRagState): 질문, 사용자 ID 등이 담긴 상태 객체
 
     Returns:
-        dict: 상태에 'generation' 키가 추가된 딕셔너리
+        dict: 'generation', 'route'와 비운 검색 필드만 담은 state 갱신 값
     """
     question = state.get("question", "")
-    user_id = state.get("user_id", "anonymous")
-    category = state.get("category", "미지정")
-
-    # fallback 프롬프트 로드
-    prompt_template = get_prompt_by_key("fallback")
-
-    memory = get_user_memory(user_id)
     
-    # fallback 체인 실행
-    llm_chain = prompt_template | llm | StrOutputParser()
+    # fallback 체인 실행 (레지스트리에서 미리 구성됨)
+    llm_chain = get_chain("fallback")
     generation = llm_chain.invoke({"question": question})
 
-    # 메모리에 저장
-    memory.chat_memory.add_user_message(HumanMessage(content=question))
-    memory.chat_memory.add_ai_message(AIMessage(content=generation))
-
-    # 로그 저장
-    save_chat_log(question, generation, user_id=user_id, category=category)
+    # 메모리 & 로그 저장
+    record_turn({**state, "route": "llm_fallback"}, question, generation)
 
-    return {**state, "generation": generation}
\ No newline at end of file
+    return {"generation": generation, "route": "llm_fallback", **CONSUMED}
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""
+hedging.py
+
+이 모듈은 작고 멱등(idempotent)한 외부 호출의 꼬리 지연 시간을 줄이기 위한 hedged request를 제공합니다.
+호출이 그 호출 지점(site)에서 관측된 p90 지연 시간 안에 끝나지 않으면 같은 요청을 한 번 더 보내고,
+먼저 끝난 응답을 사용합니다. 늦은 쪽은 결과를 버립니다 (아직 시작하지 않았으면 취소).
+
+대상 호출 지점 (HEDGE_SITES, 기본값):
+- route: 라우팅/재라우팅 ToolSelector 호출
+- check: 관련성 판단 호출
+- rerank: Cohere 리랭크 호출
+생성(generate) 호출은 비용이 크고 응답이 길어 기본적으로 제외합니다 (HEDGE_SITES에 추가하면 사용).
+
+LLM 호출(route, check)은 llm_gateway.LLMGateway.run 안에서 실행 순서를 받은 뒤 hedge하므로 p90 기준은 큐 대기 없이
+provider 지연 시간만으로 계산됩니다. hedge 요청은 gateway 슬롯을 기다리지 않고 바로 받을 수 있을 때만 보내며(`admit`),
+받지 못하면(한도/cooldown/대기 중인 요청 있음) 보내지 않으므로 대기열에 남은 hedge가 나중에 provider를 호출하는 일이 없습니다.
+
+부하 제어:
+- 전체 hedge 비율 상한 (HEDGE_MAX_RATIO): 요청마다 비율만큼 적립되는 예산을 hedge 1회가 소모하는 방식이라,
+  provider가 느려진 순간에도 추가 요청이 상한 비율을 넘지 않음
+- 지연 시간 표본이 HEDGE_MIN_SAMPLES개 모이기 전에는 hedge하지 않음
+
+메트릭: adaptive_rag_hedge_requests_total / _fired_total / _won_total / _budget_exhausted_total / _throttled_total {site}
+"""
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Optional, Sequence
+
+from langchain_core.callbacks import Callbacks
+from langchain_core.documents import BaseDocumentCompressor, Document
+
+from adaptive_rag.utils import metrics
+
+# hedge를 적용할 호출 지점
+HEDGE_SITES = {s.strip() for s in os.environ.get("HEDGE_SITES", "route,check,rerank").split(",") if s.strip()}
+
+# 전체 요청 대비 hedge 요청 비율 상한 / 한꺼번에 쓸 수 있는 최대 hedge 수
+HEDGE_MAX_RATIO = float(os.environ.get("HEDGE_MAX_RATIO", "0.1"))
+HEDGE_BURST = 5.0
+
+# hedge 기준 백분위수 / 기준 계산에 필요한 최소 표본 수 / 호출 지점별 보관 표본 수
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", "90"))
+HEDGE_MIN_SAMPLES = int(os.environ.get("HEDGE_MIN_SAMPLES", "20"))
+WINDOW = 200
+
+class _Site:
+    """호출 지점별 최근 지연 시간 표본과 hedge 기준 지연 시간"""
+
+    def __init__(self):
+        self.samples = deque(maxlen=WINDOW)
+        self.threshold = None
+        self._since_update = 0
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+        self._since_update += 1
+        # 정렬 비용을 줄이기 위해 표본 10개마다 기준 갱신
+        if len(self.samples) >= HEDGE_MIN_SAMPLES and (self.threshold is None or self._since_update >= 10):
+            ordered = sorted(self.samples)
+            self.threshold = ordered[min(len(ordered) - 1, int(len(ordered) * HEDGE_PERCENTILE / 100))]
+            self._since_update = 0
+
+class Hedger:
+    """
+    호출 지점별 p90 기준으로 hedged request를 보내는 실행기
+    """
+
+    def __init__(self, sites=HEDGE_SITES, max_ratio: float = HEDGE_MAX_RATIO, burst: float = HEDGE_BURST,
+                 max_workers: int = 32):
+        self.sites = set(sites)
+        self.max_ratio = max_ratio
+        self.burst = burst
+        self._budget = burst
+        self._lock = threading.Lock()
+        self._sites = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self.stats = {"requests": 0, "fired": 0, "won": 0}
+
+    def _site(self, site: str) -> _Site:
+        with self._lock:
+            if site not in self._sites:
+                self._sites[site] = _Site()
+            return self._sites[site]
+
+    def threshold(self, site: str) -> Optional[float]:
+        return self._site(site).threshold
+
+    def _take_budget(self) -> bool:
+        with self._lock:
+            if self._budget >= 1.0:
+                self._budget -= 1.0
+                return True
+            return False
+
+    def _submit(self, fn):
+        # tracing span / llm_gateway / deadline contextvar를 worker 스레드로 전달
+        return self._executor.submit(contextvars.copy_context().run, fn)
+
+    def _admit(self, site: str, admit) -> bool:
+        # hedge 비율 예산과 호출 측 판단(admit)을 모두 통과해야 hedge (admit에서 막히면 예산은 돌려줌)
+        if not self._take_budget():
+            metrics.inc("adaptive_rag_hedge_budget_exhausted_total", site=site)
+            return False
+        if admit is not None and not admit():
+            with self._lock:
+                self._budget = min(self.burst, self._budget + 1.0)
+            metrics.inc("adaptive_rag_hedge_throttled_total", site=site)
+            return False
+        return True
+
+    def call(self, site: str, fn, admit=None, abandon=None):
+        """
+        fn()을 실행하고 결과를 반환한다. site가 hedge 대상이고 p90 안에 끝나지 않으면 한 번 더 보내 먼저 끝난 결과를 쓴다.
+
+        Args:
+            site (str): 호출 지점
+            fn: 실제 호출 함수
+            admit: hedge를 보내기 직전에 호출하여 추가 요청을 보내도 되는지 판단하는 함수 (False면 hedge하지 않음)
+            abandon: 시작 전에 취소된 실행마다 호출하는 함수 (admit으로 받은 자원 반납용)
+        """
+        if site not in self.sites:
+            return fn()
+        state = self._site(site)
+        with self._lock:
+            self._budget = min(self.burst, self._budget + self.max_ratio)
+        self.stats["requests"] += 1
+        metrics.inc("adaptive_rag_hedge_requests_total", site=site)
+
+        threshold = state.threshold
+        started = time.perf_counter()
+        if threshold is None:
+            result = fn()
+            state.observe(time.perf_counter() - started)
+            return result
+
+        primary = self._submit(fn)
+        done, _ = wait([primary], timeout=threshold)
+        if done or not self._admit(site, admit):
+            result = primary.result()
+            state.observe(time.perf_counter() - started)
+            return result
+
+        self.stats["fired"] += 1
+        metrics.inc("adaptive_rag_hedge_fired_total", site=site)
+        hedge = self._submit(fn)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                # 먼저 성공한 쪽을 사용하고 나머지는 버림 (시작 전이면 취소)
+                for other in pending:
+                    if other.cancel() and abandon is not None:
+                        abandon()
+                if future is hedge:
+                    self.stats["won"] += 1
+                    metrics.inc("adaptive_rag_hedge_won_total", site=site)
+                state.observe(time.perf_counter() - started)
+                return future.result()
+        raise error
+
+# 프로세스 전역 hedger
+hedger = Hedger()
+
+def call(site: str, fn, admit=None, abandon=None):
+    return hedger.call(site, fn, admit=admit, abandon=abandon)
+
+class HedgedCompressor(BaseDocumentCompressor):
+    """
+    리랭커(BaseDocumentCompressor) 호출을 hedge하는 래퍼 (ContextualCompressionRetriever의 base_compressor로 사용)
+    """
+
+    compressor: Any
+    site: str = "rerank"
+
+    def compress_documents(self, documents: Sequence[Document], query: str,
+                           callbacks: Optional[Callbacks] = None) -> Sequence[Document]:
+        return call(self.site, lambda: self.compressor.compress_documents(documents, query, callbacks=callbacks))
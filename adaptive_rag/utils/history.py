@@ -0,0 +1,223 @@
+"""
+history.py
+
+이 모듈은 프롬프트에 넣을 대화 이력(history_text)을 만드는 history manager입니다.
+표가 가득한 긴 답변이 그대로 반복해서 들어가 프롬프트가 커지는 것을 막기 위해,
+오래된 턴은 누적 요약으로 접고 최근 턴만 원문으로 넣습니다.
+
+구성:
+- 누적 요약: 매 턴이 끝난 뒤 요청 경로 밖(백그라운드 스레드)에서, 최근 RAW_TURNS 턴을 벗어난 턴들을
+  기존 요약에 합쳐 갱신 (`schedule_summary`). 턴 저장이 돌려준 세션으로 요약하므로 세션을 다시 읽지 않으며,
+  요약은 세션 저장소에 함께 보관됨
+- 원문 턴: 요약에 아직 포함되지 않은 턴은 원문 그대로 사용 (요약이 늦어져도 대화 내용이 빠지지 않음)
+- 프롬프트별 토큰 상한 (TOKEN_CAPS): 넘치면 오래된 원문 턴부터 빼고, 그래도 넘치면 답변을, 그다음 요약의 앞부분을 토큰 단위로 잘라냄
+- 렌더링 캐시: 목적별 history_text를 세션에 캐시하여 한 턴 안의 여러 노드가 다시 만들지 않음
+
+설정 (환경 변수):
+- HISTORY_SUMMARY=0 : 요약을 끄고 기존 방식(전체 이력 원문)으로 렌더링
+- HISTORY_RAW_TURNS : 원문으로 유지할 최근 턴 수 (기본 2)
+- HISTORY_REPHRASE_MAX_TOKENS / HISTORY_GENERATE_MAX_TOKENS : 프롬프트별 이력 토큰 상한
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from adaptive_rag.utils import llm_gateway, memory, metrics, tracing
+from adaptive_rag.utils.chains import get_chain
+from adaptive_rag.utils.prompts import count_tokens, truncate_tokens
+
+# 누적 요약 사용 여부 / 원문으로 유지할 최근 턴 수
+SUMMARY_ENABLED = os.environ.get("HISTORY_SUMMARY", "1") != "0"
+RAW_TURNS = int(os.environ.get("HISTORY_RAW_TURNS", "2"))
+
+# 프롬프트(목적)별 history_text 토큰 상한
+TOKEN_CAPS = {
+    "rephrase": int(os.environ.get("HISTORY_REPHRASE_MAX_TOKENS", "400")),
+    "generate": int(os.environ.get("HISTORY_GENERATE_MAX_TOKENS", "1200")),
+}
+
+# history_text에서 누적 요약 앞에 붙이는 머리말
+SUMMARY_HEADER = "[이전 대화 요약]"
+
+# 요약 백그라운드 worker 수
+SUMMARY_WORKERS = int(os.environ.get("HISTORY_SUMMARY_WORKERS", "2"))
+
+_executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="history-summary")
+
+# 유저별 요약 작업 상태 (같은 유저의 요약은 한 번에 하나만 실행하고, 실행 중 새 턴이 오면 끝난 뒤 최신 세션으로 다시 실행)
+_jobs_lock = threading.Lock()
+_running = set()
+_pending = {}
+_idle = threading.Condition(_jobs_lock)
+
+class SummaryUsageCallback(BaseCallbackHandler):
+    """
+    요약 LLM 호출의 토큰 사용량을 metrics에 기록하는 콜백 (요약은 턴 계측 밖에서 실행되므로 별도 집계)
+    """
+    run_inline = True
+
+    def on_llm_end(self, response, **kwargs):
+        prompt_tokens, completion_tokens = tracing.llm_usage(response)
+        metrics.inc("adaptive_rag_history_summary_tokens_total", prompt_tokens, type="prompt")
+        metrics.inc("adaptive_rag_history_summary_tokens_total", completion_tokens, type="completion")
+
+summary_usage_callback = SummaryUsageCallback()
+
+def _format_turns(turns) -> list:
+    lines = []
+    for question, answer in turns:
+        lines.append(f"User: {question}")
+        lines.append(f"Bot: {answer}")
+    return lines
+
+def _unsummarized(session) -> list:
+    """
+    요약에 아직 포함되지 않은 턴 목록. 요약의 마지막 턴이 보관 구간 밖으로 밀려났으면 보관된 턴 전체.
+    """
+    turns = list(session.turns)
+    if session.summary is None:
+        return turns
+    last_turn = session.summary[1]
+    for i in range(len(turns) - 1, -1, -1):
+        if turns[i] == last_turn:
+            return turns[i + 1:]
+    return turns
+
+def _fit(summary: str, turns: list, cap: int, purpose: str) -> str:
+    """
+    요약 + 원문 턴을 토큰 상한 안으로 맞춘다. 오래된 턴부터 빼고, 마지막 한 턴은 답변을 잘라 넣고,
+    그래도 넘치면 요약의 앞부분(오래된 내용)을 토큰 단위로 잘라낸다 (머리말은 유지).
+    """
+    head = [f"{SUMMARY_HEADER} {summary}"] if summary else []
+    text = "\n".join(head + _format_turns(turns))
+    tokens = count_tokens(text)
+    if tokens <= cap:
+        return text
+
+    metrics.inc("adaptive_rag_history_truncated_total", purpose=purpose)
+    turns = list(turns)
+    while len(turns) > 1 and tokens > cap:
+        turns.pop(0)
+        text = "\n".join(head + _format_turns(turns))
+        tokens = count_tokens(text)
+
+    if tokens > cap and turns:
+        question, answer = turns[0]
+        keep = len(answer)
+        while tokens > cap and keep > 0:
+            keep = int(keep * cap / tokens * 0.9)
+            turns = [(question, answer[:keep] + " …(생략)")]
+            text = "\n".join(head + _format_turns(turns))
+            tokens = count_tokens(text)
+
+    if tokens > cap and summary:
+        # 요약만으로도 상한을 넘는 경우 머리말은 두고 요약의 앞부분을 토큰 단위로 잘라냄
+        rest = "\n".join([""] + _format_turns(turns)) if turns else ""
+        room = cap - count_tokens(f"{SUMMARY_HEADER} …{rest}")
+        while tokens > cap and room > 0:
+            text = f"{SUMMARY_HEADER} …{truncate_tokens(summary, room, keep='tail')}{rest}"
+            tokens = count_tokens(text)
+            # 잘라낸 경계에서 토큰이 다시 합쳐져 조금 넘칠 수 있으므로 넘친 만큼 더 줄여 다시 자름
+            room -= max(1, tokens - cap)
+        if tokens > cap:
+            text = "\n".join(_format_turns(turns))
+            tokens = count_tokens(text)
+
+    if tokens > cap:
+        # 마지막 턴의 질문만으로도 상한을 넘는 경우 토큰 단위로 앞부분만 남김
+        text = truncate_tokens(text, cap, keep="head")
+    return text
+
+def history_text(session, purpose: str) -> str:
+    """
+    프롬프트 목적에 맞는 대화 이력 텍스트를 반환한다 (세션에 캐시됨).
+
+    Args:
+        session (memory.Session): 유저 세션
+        purpose (str): "rephrase" (질문 재작성) | "generate" (응답 생성)
+    """
+    if not SUMMARY_ENABLED:
+        # 기존 방식: 재작성은 최근 메시지 5개, 생성은 전체 이력
+        return session.render(last_messages=5 if purpose == "rephrase" else None)
+
+    cached = session.rendered
+    if cached is not None and purpose in cached:
+        return cached[purpose]
+
+    summary = session.summary[0] if session.summary else ""
+    text = _fit(summary, _unsummarized(session), TOKEN_CAPS.get(purpose, TOKEN_CAPS["generate"]), purpose)
+
+    # 렌더링 도중 턴/요약이 바뀌었으면 (rendered가 None으로 초기화됨) 새 dict로 시작
+    if session.rendered is None:
+        session.rendered = {}
+    session.rendered[purpose] = text
+    return text
+
+def _summarize(user_id: str, session):
+    """
+    턴 저장 후의 세션에서 최근 RAW_TURNS 턴 이전의 요약되지 않은 턴을 기존 요약에 합친다.
+    """
+    fold = _unsummarized(session)
+    fold = fold[:-RAW_TURNS] if RAW_TURNS > 0 else fold
+    if not fold:
+        return
+
+    previous = session.summary[0] if session.summary else "(없음)"
+    t0 = time.perf_counter()
+    with llm_gateway.context(user_id=user_id, priority="background"):
+        summary = get_chain("summary").invoke(
+            {"summary": previous, "turns": "\n".join(_format_turns(fold))},
+            config={"callbacks": [summary_usage_callback]},
+        )
+    metrics.observe("adaptive_rag_history_summary_latency_seconds", time.perf_counter() - t0)
+    memory.session_store.set_summary(user_id, summary.strip(), fold[-1])
+    return summary.strip(), fold[-1]
+
+def _summary_worker(user_id: str, session):
+    latest = None
+    while True:
+        try:
+            latest = _summarize(user_id, session) or latest
+            metrics.inc("adaptive_rag_history_summaries_total", status="ok")
+        except Exception as e:
+            # 요약 실패 시 다음 턴에 다시 시도 (그동안은 원문 턴이 상한 안에서 사용됨)
+            metrics.inc("adaptive_rag_history_summaries_total", status="error")
+            print(f"[HISTORY ERROR] {user_id} 대화 요약 실패: {e}")
+        with _jobs_lock:
+            session = _pending.pop(user_id, None)
+            if session is None:
+                _running.discard(user_id)
+                _idle.notify_all()
+                return
+        # 대기 중이던 세션은 방금 기록한 요약보다 먼저 읽혔을 수 있으므로 최신 요약으로 맞춘 뒤 다시 요약
+        if latest is not None:
+            session.set_summary(*latest)
+
+def schedule_summary(user_id: str, session):
+    """
+    턴이 저장된 뒤 호출하여, 요청 경로 밖에서 누적 요약을 갱신하도록 예약한다.
+
+    Args:
+        user_id (str): 유저 ID
+        session (memory.Session): 턴 저장(memory.append_turn)이 돌려준 갱신된 세션
+    """
+    if not SUMMARY_ENABLED:
+        return
+    user_id = str(user_id)
+    with _jobs_lock:
+        if user_id in _running:
+            _pending[user_id] = session
+            return
+        _running.add(user_id)
+    _executor.submit(_summary_worker, user_id, session)
+
+def flush(timeout: float = None) -> bool:
+    """
+    예약된 요약 작업이 모두 끝날 때까지 기다린다 (벤치마크/종료 처리용). 시간 안에 끝나면 True.
+    """
+    with _jobs_lock:
+        return _idle.wait_for(lambda: not _running, timeout=timeout)
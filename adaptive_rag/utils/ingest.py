@@ -0,0 +1,365 @@
+"""
+ingest.py
+
+이 모듈은 원본 문서를 5개 Pinecone 네임스페이스(policy, subject, admission, book, seteuk)에 적재하는 증분 적재 파이프라인입니다.
+tools.py는 이미 있는 네임스페이스에 연결만 하므로, 문서가 바뀔 때마다 전체를 다시 임베딩하지 않도록
+청크별 content hash를 manifest에 기록해 두고 새로 생기거나 바뀐 청크만 임베딩/업서트합니다.
+
+처리 순서:
+1. 원본 문서를 하나씩 읽음 (JSONL의 각 줄 / 디렉터리의 .jsonl·.txt·.md 파일, pypdf가 있으면 .pdf)
+2. filters.NAMESPACE_SCHEMA의 필터 필드(대학, 학과, 과목, 계열, 학년)가 메타데이터에 없으면 문서 제목에서 찾아 채움 (학과가 있으면 계열도)
+3. 청크로 나누고 (RecursiveCharacterTextSplitter) 청크 ID(원본 ID hash + 순번)와 content hash(본문 + 메타데이터) 계산
+4. manifest의 hash와 다른 청크만 EMBED_BATCH개씩 묶어 임베딩(text-embedding-3-large)하고, UPSERT_BATCH개씩 병렬로 업서트
+5. 이번 원본에 없는 manifest 청크(삭제/축소된 문서)를 ID로 삭제 (--keep-stale이면 건너뜀)
+6. 바뀐 청크가 있으면 네임스페이스 버전을 올림 → 하위 캐시는 `namespace_version(namespace)`가 바뀌면 무효화
+
+manifest는 INGEST_STATE_DIR/<namespace>.json ({"chunks": {청크 ID: hash}, 청크/임베딩 설정})에,
+네임스페이스 버전은 INGEST_STATE_DIR/versions.json에 저장합니다. 업서트가 끝난 청크만 manifest에 기록하므로
+중간에 실패해도 다시 실행하면 남은 청크부터 이어서 적재하고, 바뀐 것이 없으면 임베딩/업서트 호출 없이 끝납니다.
+청크 크기나 임베딩 모델이 manifest와 다르면 모든 청크를 다시 임베딩합니다.
+
+원본 형식:
+- JSONL: {"id": ..., "text": ..., "metadata": {...}} (id가 없으면 줄 번호, text 대신 page_content도 가능, 그 밖의 키는 메타데이터로 사용)
+- 디렉터리: 파일 하나가 문서 하나 (id는 상대 경로, 제목은 파일 이름)
+
+실행:
+    python -m adaptive_rag.utils.ingest book data/book.jsonl
+    python -m adaptive_rag.utils.ingest seteuk data/seteuk/ --workers 8 --dry-run
+
+설정 (환경 변수): INGEST_STATE_DIR, INGEST_CHUNK_SIZE, INGEST_CHUNK_OVERLAP, INGEST_EMBED_BATCH, INGEST_UPSERT_BATCH, INGEST_WORKERS
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+from adaptive_rag.utils import clients, filters, gazetteer, metrics
+from adaptive_rag.utils.ratelimit import ProviderRateLimiter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+INGEST_STATE_DIR = os.environ.get("INGEST_STATE_DIR", os.path.join(ROOT, ".ingest"))
+
+CHUNK_SIZE = int(os.environ.get("INGEST_CHUNK_SIZE", "800"))
+CHUNK_OVERLAP = int(os.environ.get("INGEST_CHUNK_OVERLAP", "100"))
+
+# 임베딩 호출 1회에 넣는 청크 수 / 업서트 요청 1회의 벡터 수 (Pinecone 권장 2MB 이하) / 동시에 처리하는 임베딩 묶음 수
+EMBED_BATCH = int(os.environ.get("INGEST_EMBED_BATCH", "96"))
+UPSERT_BATCH = int(os.environ.get("INGEST_UPSERT_BATCH", "100"))
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "4"))
+
+# 삭제 요청 1회의 ID 수 (Pinecone 상한 1000)
+DELETE_BATCH = 1000
+
+NAMESPACES = tuple(filters.NAMESPACE_SCHEMA)
+
+# PineconeVectorStore가 본문을 읽는 메타데이터 키
+TEXT_KEY = "text"
+
+SOURCE_SUFFIXES = (".jsonl", ".txt", ".md", ".pdf")
+
+# ---------------------------------------------------------------------------
+# 네임스페이스 버전 (하위 캐시 무효화용)
+# ---------------------------------------------------------------------------
+
+_versions_lock = threading.Lock()
+_versions_cache = {"mtime": None, "versions": {}}
+
+def _versions_path(state_dir: str = INGEST_STATE_DIR) -> str:
+    return os.path.join(state_dir, "versions.json")
+
+def _write_json(path: str, data: dict):
+    # 임시 파일에 쓴 뒤 교체 (중간에 끊겨도 이전 파일이 남음)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def namespace_version(namespace: str, state_dir: str = INGEST_STATE_DIR) -> int:
+    """
+    네임스페이스의 현재 적재 버전 (적재한 적이 없으면 0). 파일이 바뀌었을 때만 다시 읽는다.
+    """
+    path = _versions_path(state_dir)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+    with _versions_lock:
+        if _versions_cache["mtime"] != (path, mtime):
+            with open(path, encoding="utf-8") as f:
+                _versions_cache["versions"] = json.load(f)
+            _versions_cache["mtime"] = (path, mtime)
+        return _versions_cache["versions"].get(namespace, {}).get("version", 0)
+
+def bump_version(namespace: str, state_dir: str = INGEST_STATE_DIR) -> int:
+    path = _versions_path(state_dir)
+    with _versions_lock:
+        versions = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                versions = json.load(f)
+        version = versions.get(namespace, {}).get("version", 0) + 1
+        versions[namespace] = {"version": version, "updated_at": datetime.now().isoformat(timespec="seconds")}
+        _write_json(path, versions)
+    metrics.set_gauge("adaptive_rag_namespace_version", version, namespace=namespace)
+    return version
+
+# ---------------------------------------------------------------------------
+# 원본 문서 읽기 / 청크
+# ---------------------------------------------------------------------------
+
+def _read_jsonl(path: str, prefix: str = ""):
+    with open(path, encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            text = row.pop("text", None) or row.pop("page_content", None) or ""
+            doc_id = str(row.pop("id", None) or f"{prefix}{i}")
+            metadata = {**row.pop("metadata", {}), **row}
+            yield doc_id, text, metadata
+
+def _read_file(path: str) -> str:
+    if path.endswith(".pdf"):
+        from pypdf import PdfReader
+        return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+def iter_documents(source: str):
+    """
+    원본 문서를 (문서 ID, 본문, 메타데이터)로 하나씩 돌려준다.
+    """
+    if not os.path.isdir(source):
+        yield from _read_jsonl(source)
+        return
+
+    has_pdf = importlib.util.find_spec("pypdf") is not None
+    for dirpath, dirnames, filenames in os.walk(source):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            rel = os.path.relpath(path, source)
+            if not name.endswith(SOURCE_SUFFIXES):
+                continue
+            if name.endswith(".jsonl"):
+                yield from _read_jsonl(path, prefix=f"{rel}:")
+            elif name.endswith(".pdf") and not has_pdf:
+                print(f"[INGEST ERROR] pypdf가 없어 PDF를 건너뜁니다: {rel}")
+            else:
+                yield rel, _read_file(path), {"source": rel, "title": os.path.splitext(name)[0]}
+
+def enrich_metadata(namespace: str, doc_id: str, metadata: dict) -> dict:
+    """
+    네임스페이스 필터 필드가 메타데이터에 없으면 문서 제목(없으면 문서 ID)에서 찾아 채운다 (값이 하나로 정해질 때만).
+    """
+    metadata = {k: v for k, v in metadata.items() if v is not None}
+    schema = filters.NAMESPACE_SCHEMA.get(namespace, {})
+    if schema:
+        entities = filters.extract(metadata.get("title") or doc_id)
+        for field, kind in schema.items():
+            values = entities.get(kind) or []
+            if field not in metadata and len(values) == 1:
+                metadata[field] = values[0]
+        if "track" in schema and "track" not in metadata and metadata.get("major"):
+            track = gazetteer.track_of(metadata["major"])
+            if track:
+                metadata["track"] = track
+    return metadata
+
+def _splitter():
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+def chunk_id(namespace: str, doc_id: str, index: int) -> str:
+    # Pinecone ID는 ASCII만 쓰므로 원본 ID는 hash로 바꿈 (원본 ID는 메타데이터 source_id에 보관)
+    return f"{namespace}-{hashlib.sha1(doc_id.encode('utf-8')).hexdigest()[:16]}-{index}"
+
+def content_hash(text: str, metadata: dict) -> str:
+    payload = json.dumps([text, metadata], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def iter_chunks(namespace: str, source: str, splitter=None):
+    """
+    원본 문서를 청크로 나눠 (청크 ID, content hash, 본문, 메타데이터)를 하나씩 돌려준다.
+    """
+    splitter = splitter or _splitter()
+    for doc_id, text, metadata in iter_documents(source):
+        metadata = enrich_metadata(namespace, doc_id, metadata)
+        for i, chunk in enumerate(splitter.split_text(text)):
+            chunk_metadata = {**metadata, "source_id": doc_id, "chunk": i}
+            yield chunk_id(namespace, doc_id, i), content_hash(chunk, chunk_metadata), chunk, chunk_metadata
+
+# ---------------------------------------------------------------------------
+# manifest
+# ---------------------------------------------------------------------------
+
+def _settings() -> dict:
+    return {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP, "embedding_model": clients.EMBEDDING_MODEL}
+
+def manifest_path(namespace: str, state_dir: str = INGEST_STATE_DIR) -> str:
+    return os.path.join(state_dir, f"{namespace}.json")
+
+def load_manifest(namespace: str, state_dir: str = INGEST_STATE_DIR) -> dict:
+    path = manifest_path(namespace, state_dir)
+    if not os.path.exists(path):
+        return {"namespace": namespace, **_settings(), "chunks": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+# ---------------------------------------------------------------------------
+# 적재
+# ---------------------------------------------------------------------------
+
+def _embed_and_upsert(index, embeddings, namespace: str, batch: list, limiter: ProviderRateLimiter) -> list:
+    # 임베딩 1회 + UPSERT_BATCH개씩 업서트, 업서트가 끝난 (청크 ID, hash) 목록 반환
+    limiter.acquire({"openai": 1})
+    vectors = embeddings.embed_documents([text for _, _, text, _ in batch])
+    done = []
+    for start in range(0, len(batch), UPSERT_BATCH):
+        part = batch[start:start + UPSERT_BATCH]
+        limiter.acquire({"pinecone": 1})
+        index.upsert(
+            vectors=[(cid, vector, {**metadata, TEXT_KEY: text}) for (cid, _, text, metadata), vector in zip(part, vectors[start:start + UPSERT_BATCH])],
+            namespace=namespace,
+        )
+        done.extend((cid, digest) for cid, digest, _, _ in part)
+    return done
+
+def ingest(namespace: str, source: str, state_dir: str = INGEST_STATE_DIR, workers: int = INGEST_WORKERS,
+           delete_stale: bool = True, dry_run: bool = False, rate_limits: dict = None, index=None, embeddings=None) -> dict:
+    """
+    원본 문서를 네임스페이스에 증분 적재한다.
+
+    Args:
+        namespace (str): 적재할 네임스페이스
+        source (str): 원본 JSONL 파일 또는 디렉터리
+        state_dir (str): manifest / 버전 파일 디렉터리
+        workers (int): 동시에 처리할 임베딩 묶음 수
+        delete_stale (bool): 이번 원본에 없는 청크를 삭제할지 (원본 일부만 다시 적재할 때는 False)
+        dry_run (bool): 바뀐 청크 수만 세고 임베딩/업서트/삭제는 하지 않음
+        rate_limits (dict): provider별 분당 요청 한도 (예: {"openai": 3000, "pinecone": 600})
+        index, embeddings: 사용할 Pinecone Index / 임베딩 (없으면 clients의 공유 인스턴스)
+
+    Returns:
+        dict: 문서/청크/변경 없음/업서트/삭제 수, 임베딩 호출 수, 네임스페이스 버전, 소요 시간
+    """
+    if namespace not in NAMESPACES:
+        raise ValueError(f"알 수 없는 네임스페이스: {namespace} (가능: {', '.join(NAMESPACES)})")
+
+    t0 = time.perf_counter()
+    manifest = load_manifest(namespace, state_dir)
+    reset = bool(manifest["chunks"]) and any(manifest.get(k) != v for k, v in _settings().items())
+    if reset:
+        # 청크/임베딩 설정이 바뀌면 모든 청크를 다시 임베딩 (이전 ID는 삭제 대상 판단에만 사용)
+        print(f"[INGEST] {namespace}: 청크/임베딩 설정이 바뀌어 모든 청크를 다시 임베딩합니다")
+        previous = manifest["chunks"]
+        manifest = {"namespace": namespace, **_settings(), "chunks": {cid: None for cid in previous}}
+    chunks = manifest["chunks"]
+    manifest_lock = threading.Lock()
+    summary = {"namespace": namespace, "documents": 0, "chunks": 0, "unchanged": 0, "upserted": 0, "deleted": 0, "embedding_calls": 0}
+
+    if not dry_run:
+        index = index or clients.pinecone_index()
+        embeddings = embeddings or clients.embeddings()
+    limiter = ProviderRateLimiter(rate_limits or {})
+
+    def _record(future):
+        done = future.result()
+        with manifest_lock:
+            for cid, digest in done:
+                chunks[cid] = digest
+            summary["upserted"] += len(done)
+            summary["embedding_calls"] += 1
+
+    seen, pending, documents = set(), [], set()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            in_flight = set()
+
+            def submit(batch):
+                nonlocal in_flight
+                in_flight.add(pool.submit(_embed_and_upsert, index, embeddings, namespace, batch, limiter))
+                # 동시에 처리 중인 묶음 수를 workers로 제한 (원본 전체를 메모리에 올리지 않음)
+                if len(in_flight) >= workers:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        _record(future)
+
+            for cid, digest, text, metadata in iter_chunks(namespace, source):
+                documents.add(metadata["source_id"])
+                seen.add(cid)
+                summary["chunks"] += 1
+                if chunks.get(cid) == digest:
+                    summary["unchanged"] += 1
+                    continue
+                if dry_run:
+                    summary["upserted"] += 1
+                    continue
+                pending.append((cid, digest, text, metadata))
+                if len(pending) >= EMBED_BATCH:
+                    submit(pending)
+                    pending = []
+            if pending:
+                submit(pending)
+            for future in wait(in_flight).done:
+                _record(future)
+        summary["documents"] = len(documents)
+
+        stale = [cid for cid in chunks if cid not in seen] if delete_stale else []
+        summary["deleted"] = len(stale)
+        if stale and not dry_run:
+            for start in range(0, len(stale), DELETE_BATCH):
+                part = stale[start:start + DELETE_BATCH]
+                limiter.acquire({"pinecone": 1})
+                index.delete(ids=part, namespace=namespace)
+                for cid in part:
+                    chunks.pop(cid, None)
+    finally:
+        # 업서트가 끝난 청크까지 기록 (실패 후 다시 실행하면 이어서 적재)
+        # 설정 변경으로 다시 임베딩하지 못한 청크(None)는 다음 실행의 삭제 대상으로 남김
+        if not dry_run and (summary["upserted"] or summary["deleted"] or reset):
+            manifest["updated_at"] = datetime.now().isoformat(timespec="seconds")
+            _write_json(manifest_path(namespace, state_dir), manifest)
+
+    changed = summary["upserted"] + summary["deleted"]
+    if changed and not dry_run:
+        summary["version"] = bump_version(namespace, state_dir)
+    else:
+        summary["version"] = namespace_version(namespace, state_dir)
+    summary["elapsed_s"] = round(time.perf_counter() - t0, 2)
+    metrics.inc("adaptive_rag_ingest_chunks_total", summary["upserted"], namespace=namespace, op="upsert")
+    metrics.inc("adaptive_rag_ingest_chunks_total", summary["deleted"], namespace=namespace, op="delete")
+    print(f"[INGEST] {namespace}: 문서 {summary['documents']}개, 청크 {summary['chunks']}개 "
+          f"(변경 없음 {summary['unchanged']}, 업서트 {summary['upserted']}, 삭제 {summary['deleted']}), "
+          f"버전 {summary['version']}, {summary['elapsed_s']}초{' (dry run)' if dry_run else ''}")
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pinecone 네임스페이스 증분 적재")
+    parser.add_argument("namespace", choices=NAMESPACES)
+    parser.add_argument("source", help="원본 JSONL 파일 또는 디렉터리")
+    parser.add_argument("--state-dir", default=INGEST_STATE_DIR, help="manifest / 버전 파일 디렉터리")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    parser.add_argument("--keep-stale", action="store_true", help="원본에 없는 청크를 삭제하지 않음 (원본 일부만 다시 적재할 때)")
+    parser.add_argument("--dry-run", action="store_true", help="바뀐 청크 수만 보고")
+    parser.add_argument("--openai-rpm", type=float, default=3000)
+    parser.add_argument("--pinecone-rpm", type=float, default=0, help="0이면 제한 없음")
+    args = parser.parse_args()
+
+    ingest(
+        args.namespace,
+        args.source,
+        state_dir=args.state_dir,
+        workers=args.workers,
+        delete_stale=not args.keep_stale,
+        dry_run=args.dry_run,
+        rate_limits={"openai": args.openai_rpm, "pinecone": args.pinecone_rpm},
+    )
@@ -0,0 +1,207 @@
+"""
+intent.py
+
+이 모듈은 그래프 입구에서 인사/작별(감사)/범위 밖 메시지를 로컬에서 판별해, LLM 호출 없이 fallback 프롬프트의 고정 응답을 돌려주는
+intent short-circuit을 제공합니다. "안녕", "고마워요", "ㅂㅂ" 같은 메시지가 욕설 모델 → 라우팅 LLM → fallback LLM을 모두 거치지 않게 합니다.
+
+판별 순서:
+1. 규칙/사전: 끝의 ㅋㅎㅠ·문장부호·이모지를 떼고 정규화한 메시지 전체가 인사/작별 사전과 일치하면 확정
+2. 임베딩 kNN: 문자 bigram 해싱 벡터로 예문(INTENT_EXAMPLES)과 코사인 유사도를 구해 상위 KNN_K개의 유사도 가중 투표
+   - 최고 유사도가 KNN_MIN_SIMILARITY 이상이고 득표율이 INTENT_MIN_CONFIDENCE 이상일 때만 확정
+   - 입시/교육과정 용어나 gazetteer 개체(대학/학과/과목/계열, "의대"·"컴공" 같은 줄임말 포함)가 있으면 어떤 의도로도 확정하지 않음
+   - 인사/작별은 질문 표현(?·의문사·요청)이 없고, 인사/작별 토큰과 군말을 빼면 거의 아무것도 남지 않을 때만 확정
+     ("감사합니다 의대는", "고마워요 컴공은"처럼 인사 뒤에 질문 대상만 붙은 메시지는 질문으로 처리)
+   (인사·감사와 질문이 섞인 메시지는 "감사합니다 내신 관리 방법도"처럼 질문 표현이 없어도 fallback 프롬프트의 규칙처럼 질문으로 처리)
+
+그래프 연결 (pipeline.build_adaptive_rag):
+- [classify_intent] → 사전으로 확정된 인사/작별 → [canned_response] → end (욕설 모델도 건너뜀)
+- [classify_intent] → 그 외 → [profanity_prevention] → kNN으로 확정된 의도가 있으면 [canned_response], 아니면 라우팅
+- [canned_response]는 다른 응답 노드처럼 유저 메모리와 대화 로그에 기록 (route="canned")
+
+LLM 호출 없이 끝난 턴의 비율은 `analytics.py routes`의 canned 경로 비율과 adaptive_rag_intent_shortcuts_total{intent}로 확인합니다.
+
+설정 (환경 변수): ADAPTIVE_RAG_INTENT_SHORTCUT (0이면 끔), INTENT_MIN_CONFIDENCE
+"""
+
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+from adaptive_rag.utils import gazetteer, metrics
+from adaptive_rag.utils.generate import record_turn
+from adaptive_rag.utils.prompts import CANNED_REPLIES
+from adaptive_rag.utils.state import AdaptiveRagState
+
+INTENT_SHORTCUT = os.environ.get("ADAPTIVE_RAG_INTENT_SHORTCUT", "1") != "0"
+
+# kNN 투표 득표율 / 최고 유사도 하한, 이웃 수
+INTENT_MIN_CONFIDENCE = float(os.environ.get("INTENT_MIN_CONFIDENCE", "0.8"))
+KNN_MIN_SIMILARITY = 0.5
+KNN_K = 5
+
+# 정규화한 메시지 전체가 일치해야 하는 사전 (끝의 "요" 유무는 무시)
+GREETING_LEXICON = {
+    "안녕", "안녕하세요", "안녕하십니까", "안뇽", "하이", "하이루", "ㅎㅇ", "ㅎㅇㅎㅇ", "반가워", "반갑습니다",
+    "처음뵙겠습니다", "hi", "hello", "hey", "헬로", "좋은아침", "굿모닝",
+}
+FAREWELL_LEXICON = {
+    "고마워", "고맙습니다", "감사", "감사합니다", "감사해", "감사해요", "ㄳ", "ㄱㅅ", "ㄱㅅㄱㅅ", "땡큐", "땡스",
+    "thanks", "thankyou", "thx", "ㅂㅂ", "ㅂㅇ", "ㅃㅃ", "ㅂㅂㅂ", "바이", "바이바이", "bye", "잘가", "잘있어",
+    "안녕히계세요", "안녕히가세요", "수고하세요", "수고하셨습니다", "도움됐어", "도움이됐어", "도움이되었어요",
+    "덕분이야", "덕분에살았어",
+}
+
+# 범위 밖으로 판단하지 않을 입시/교육과정 용어
+DOMAIN_TERMS = (
+    "고교학점제", "학점", "졸업", "이수", "과목", "성취", "세특", "생기부", "생활기록부", "수행평가", "내신", "등급",
+    "대학", "학과", "전공", "전형", "수시", "정시", "학종", "입시", "계열", "수능", "책", "도서", "탐구", "진로",
+    "교과", "동아리", "선택과목", "공동교육과정", "미적", "확통", "물리", "화학", "생명", "지구과학", "국어", "영어", "수학",
+)
+
+# 인사/작별로 판단하지 않을 질문 표현
+QUESTION_CUES = re.compile(r"[?？]|뭐|무엇|어떻게|어떤|어디|언제|왜|몇|알려|궁금|추천|할까|될까|나요|까요|인가|있어|없어")
+
+# 인사/작별 토큰 판별: 이 어간으로 시작하거나 군말(FILLER_TOKENS)이면 인사/작별 토큰으로 보고,
+# 나머지 토큰의 글자 수가 LEFTOVER_MAX_CHARS를 넘으면 인사/작별로 확정하지 않음
+GREETING_STEMS = (
+    "안녕", "안뇽", "하이", "ㅎㅇ", "반가", "반갑", "처음", "헬로", "hi", "hello", "hey", "좋은", "굿모닝",
+    "고마", "고맙", "감사", "ㄳ", "ㄱㅅ", "땡큐", "땡스", "thank", "thx", "ㅂㅂ", "ㅂㅇ", "ㅃㅃ", "바이", "bye",
+    "잘", "수고", "덕분", "도움", "됐", "알겠", "알았", "살았", "왔어", "갈게",
+)
+FILLER_TOKENS = {"정말", "진짜", "너무", "많이", "오늘", "오늘도", "이제", "네", "넵", "넹", "챗봇", "챗봇아", "설명", "답변", "아침"}
+LEFTOVER_MAX_CHARS = 1
+
+# kNN 예문 (question: 입시/교육과정 질문, 라우팅 대상)
+INTENT_EXAMPLES = {
+    "greeting": [
+        "안녕", "안녕하세요", "안녕하세여", "안뇽하세요", "하이", "ㅎㅇ", "반가워요", "처음 왔어요", "안녕 챗봇아",
+        "안녕하세요 반갑습니다", "하이하이", "헬로우",
+    ],
+    "farewell": [
+        "고마워", "고마워요", "감사합니다", "감사해용", "정말 감사해요", "ㄳㄳ", "ㅂㅂ", "바이바이", "잘 있어",
+        "도움 많이 됐어요", "덕분에 알았어요", "수고하셨어요", "이제 갈게", "오늘도 고마워", "설명 고마워요",
+        "알겠어요 감사합니다",
+    ],
+    "out_of_scope": [
+        "오늘 날씨 어때", "점심 뭐 먹지", "노래 추천해줘", "영화 추천해줘", "주식 뭐 사야 돼", "로또 번호 알려줘",
+        "너 몇 살이야", "너는 누가 만들었어", "심심해", "게임 추천해줘", "맛집 알려줘", "오늘 무슨 요일이야",
+        "농담 해줘", "연애 상담 해줘", "비트코인 전망 어때", "지금 몇 시야", "배고파", "축구 경기 결과 알려줘",
+    ],
+    "question": [
+        "고교학점제 졸업 요건이 어떻게 돼", "세특은 어떻게 작성하나요", "미적분 과목에서는 뭘 배우나요",
+        "서울대 경영학과에 대해 알려줘", "컴퓨터공학과 학종 준비는 어떻게 해", "경영학과 가려면 어떤 책 읽으면 좋아",
+        "물리학 세특 추천 부탁해", "진로 선택 과목이 뭐야", "수행평가는 성적에 어떻게 반영돼", "간호학과는 어떤 계열이야",
+        "안녕 고교학점제가 뭐야", "고마워 그럼 수시는 어떻게 준비해", "심리학 관련 책 추천해줘", "확통 세특 주제 추천해줘",
+        "정시로 갈 수 있어", "학점은 몇 학점 이수해야 졸업해", "성취평가제가 뭐야", "생기부 세특이 얼마나 중요해",
+    ],
+}
+
+# 모든 의도: 교육과정 용어·개체가 없어야 확정, 인사/작별은 질문 표현과 남는 토큰도 없어야 확정
+SHORTCUT_INTENTS = ("greeting", "farewell", "out_of_scope")
+
+_TRAILING = re.compile(r"[\sㅋㅎㅠㅜ~!.,^;:)(♡♥❤️😊😄😀🙏🏻👍]+$")
+
+def normalize(text: str) -> str:
+    """
+    공백/대소문자를 없애고 끝의 웃음·울음 자모, 문장부호, 이모지를 뗀 비교용 문자열
+    """
+    text = _TRAILING.sub("", (text or "").strip().lower())
+    return re.sub(r"\s+", "", text)
+
+def _lexicon_intent(normalized: str):
+    for candidate in (normalized, normalized[:-1] if normalized.endswith(("요", "용", "여")) else None):
+        if not candidate:
+            continue
+        if candidate in GREETING_LEXICON:
+            return "greeting"
+        if candidate in FAREWELL_LEXICON:
+            return "farewell"
+    return None
+
+def _embed(text: str) -> dict:
+    # 문자 bigram 빈도 벡터 (앞뒤 경계 포함, L2 정규화)
+    padded = f" {normalize(text)} "
+    counts = Counter(padded[i:i + 2] for i in range(len(padded) - 1))
+    norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {gram: v / norm for gram, v in counts.items()}
+
+def _cosine(a: dict, b: dict) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(gram, 0.0) for gram, v in a.items())
+
+# 예문 벡터 (import 시 한 번만 계산)
+_EXAMPLE_VECTORS = [(label, _embed(text)) for label, texts in INTENT_EXAMPLES.items() for text in texts]
+
+def _leftover_chars(text: str) -> int:
+    # 인사/작별 토큰과 군말을 뺀 나머지 토큰의 글자 수
+    leftover = 0
+    for token in (text or "").split():
+        token = normalize(token)
+        if not token or token in FILLER_TOKENS or _lexicon_intent(token) or token.startswith(GREETING_STEMS):
+            continue
+        leftover += len(token)
+    return leftover
+
+def _has_entity(text: str) -> bool:
+    return any(gazetteer.extract(text).values())
+
+def _knn_intent(text: str) -> tuple:
+    vector = _embed(text)
+    neighbours = sorted(((_cosine(vector, v), label) for label, v in _EXAMPLE_VECTORS), reverse=True)[:KNN_K]
+    if not neighbours or neighbours[0][0] < KNN_MIN_SIMILARITY:
+        return None, 0.0
+    votes = defaultdict(float)
+    for similarity, label in neighbours:
+        votes[label] += similarity
+    label = max(votes, key=votes.get)
+    return label, votes[label] / sum(votes.values())
+
+def classify(text: str) -> tuple:
+    """
+    메시지의 고정 응답 의도를 판별한다.
+
+    Returns:
+        tuple: (intent, confidence) - intent는 greeting / farewell / out_of_scope, 확실하지 않으면 (None, 신뢰도)
+    """
+    normalized = normalize(text)
+    if not normalized:
+        return None, 0.0
+
+    intent = _lexicon_intent(normalized)
+    if intent:
+        return intent, 1.0
+
+    intent, confidence = _knn_intent(text)
+    if intent not in SHORTCUT_INTENTS or confidence < INTENT_MIN_CONFIDENCE:
+        return None, confidence
+    if any(term in normalized for term in DOMAIN_TERMS) or _has_entity(text):
+        return None, confidence
+    if intent != "out_of_scope" and (QUESTION_CUES.search(text) or _leftover_chars(text) > LEFTOVER_MAX_CHARS):
+        return None, confidence
+    return intent, confidence
+
+# 그래프 입구 노드: 고정 응답으로 처리할 의도를 state에 기록
+def classify_intent(state: AdaptiveRagState) -> AdaptiveRagState:
+    if not INTENT_SHORTCUT:
+        return {}
+    intent, _ = classify(state.get("question", ""))
+    return {"intent": intent} if intent else {}
+
+def route_after_intent(state: AdaptiveRagState) -> str:
+    # 사전과 정확히 일치한 인사/작별만 욕설 검사도 건너뛰고 바로 고정 응답 (사전에는 욕설이 없음)
+    if state.get("intent") and _lexicon_intent(normalize(state.get("question", ""))):
+        return "canned_response"
+    return "profanity_prevention"
+
+# 고정 응답 노드 (LLM 호출 없음)
+def canned_response(state: AdaptiveRagState) -> AdaptiveRagState:
+    intent = state["intent"]
+    generation = CANNED_REPLIES[intent]
+    metrics.inc("adaptive_rag_intent_shortcuts_total", intent=intent)
+
+    # 메모리 & 로그 저장
+    record_turn({**state, "route": "canned", "prompt_key": "fallback"}, state["question"], generation)
+
+    return {"generation": generation, "route": "canned", "prompt_key": "fallback"}
@@ -0,0 +1,349 @@
+"""
+llm_gateway.py
+
+이 모듈은 모든 OpenAI LLM 호출이 거쳐 가는 클라이언트 측 요청 스케줄러(LLM gateway)입니다.
+각 노드가 따로 호출하고 따로 재시도하던 것을 한 곳에서 조율하여, 트래픽이 몰릴 때 provider rate limit에 걸리지 않도록 합니다.
+
+구성:
+- 분당 요청 수(RPM) / 분당 토큰 수(TPM) token bucket (TPM은 예상 토큰으로 먼저 차감하고 실제 사용량으로 보정)
+- 동시 실행 상한 (max_concurrency)
+- 우선순위 클래스: interactive(응답 생성 경로) > background(대화 요약 등) > batch(배치 평가)
+- 같은 우선순위 안에서는 유저별 round-robin으로 순서를 배정 (한 유저가 큐를 독점하지 않도록)
+- provider 429 응답 시 전체 호출을 잠시 멈추고(cooldown) gateway에서 재시도 (SDK 자체 재시도는 끔)
+- 메트릭: 큐 대기 시간, 한도에 걸린 횟수(원인별), 동시 실행/대기 수
+- 턴 마감 시각(deadline.scope)이 있으면 순서 대기/호출 timeout을 남은 예산으로 제한하고, 예산이 없으면 재시도하지 않음
+- hedge 대상 호출(hedging.HEDGE_SITES)은 실행 순서를 받은 뒤 provider 호출만 hedge하고,
+  hedge 요청은 슬롯을 바로 받을 수 있을 때만 보냄 (`try_acquire`, 대기열에 넣지 않음)
+
+사용:
+- 체인: chains.py에서 `prompt | guard(llm, "generate") | parser` 형태로 LLM 앞에 gateway를 둠
+- 직접 호출: `gateway.run(fn, kind="slang", prompt_tokens=...)`
+- 요청 맥락: `with context(user_id=..., priority="batch"):` 안의 호출은 해당 유저/우선순위로 스케줄링
+
+설정 (환경 변수): LLM_RPM, LLM_TPM (0이면 제한 없음), LLM_MAX_CONCURRENCY, LLM_MAX_RETRIES
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from langchain_core.runnables import RunnableLambda
+
+from adaptive_rag.utils import deadline, hedging, metrics
+from adaptive_rag.utils.prompts import count_tokens
+from adaptive_rag.utils.ratelimit import TokenBucket
+
+# 우선순위 클래스 (숫자가 작을수록 먼저)
+PRIORITIES = {"interactive": 0, "background": 1, "batch": 2}
+
+# 호출 종류별 (기본 우선순위, 예상 completion 토큰 수)
+CALL_PROFILES = {
+    "generate": ("interactive", 700),
+    "rephrase": ("interactive", 80),
+    "route": ("interactive", 20),
+    "check": ("interactive", 5),
+    "slang": ("interactive", 80),
+    "preprocess": ("interactive", 120),
+    "summary": ("background", 200),
+}
+
+# provider 429 이후 기본 대기 시간(초)
+RATE_LIMIT_COOLDOWN = 2.0
+
+_current_user: ContextVar = ContextVar("llm_gateway_user", default=None)
+_current_priority: ContextVar = ContextVar("llm_gateway_priority", default=None)
+
+class LLMGatewayTimeout(TimeoutError):
+    """대기 시간 안에 gateway에서 실행 순서를 받지 못한 경우"""
+
+@contextmanager
+def context(user_id: str = None, priority: str = None):
+    """
+    이 블록 안의 LLM 호출에 유저(공정 큐잉 단위)와 우선순위를 지정한다.
+    LangGraph 노드 스레드로도 contextvar가 전달되므로 그래프 실행을 감싸면 된다.
+    """
+    user_token = _current_user.set(str(user_id) if user_id is not None else _current_user.get())
+    priority_token = _current_priority.set(priority or _current_priority.get())
+    try:
+        yield
+    finally:
+        _current_user.reset(user_token)
+        _current_priority.reset(priority_token)
+
+def _is_retryable(e) -> tuple:
+    """
+    (재시도 여부, rate limit 여부, Retry-After 초)
+    """
+    name = type(e).__name__
+    if name == "RateLimitError":
+        retry_after = None
+        headers = getattr(getattr(e, "response", None), "headers", None) or {}
+        try:
+            retry_after = float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+        return True, True, retry_after
+    return name in ("APIConnectionError", "APITimeoutError", "InternalServerError"), False, None
+
+class _Waiter:
+    __slots__ = ("priority", "user", "tokens", "event", "enqueued", "cancelled")
+
+    def __init__(self, priority: int, user: str, tokens: int):
+        self.priority = priority
+        self.user = user
+        self.tokens = tokens
+        self.event = threading.Event()
+        self.enqueued = time.monotonic()
+        self.cancelled = False
+
+class LLMGateway:
+    """
+    RPM/TPM token bucket + 동시 실행 상한 + 우선순위/유저별 공정 큐를 가진 LLM 호출 스케줄러
+    """
+
+    def __init__(self, rpm: float = 5000, tpm: float = 2_000_000, max_concurrency: int = 16, max_retries: int = 2):
+        self.rpm = TokenBucket(rpm) if rpm else None
+        self.tpm = TokenBucket(tpm) if tpm else None
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        # 우선순위별 {유저: 대기열} (OrderedDict 순서 = round-robin 순서)
+        self._queues = [OrderedDict() for _ in PRIORITIES]
+        self._queued = 0
+        self._inflight = 0
+        self._cooldown_until = 0.0
+        self._timer = None
+        self.stats = {"requests": 0, "throttled": 0, "rate_limited": 0, "retries": 0}
+
+    # ------------------------------------------------------------------
+    # 스케줄링
+    # ------------------------------------------------------------------
+
+    def _next_waiter(self):
+        # 우선순위가 가장 높은 클래스에서, 가장 오래 차례를 기다린 유저의 맨 앞 요청
+        for queues in self._queues:
+            while queues:
+                user, waiters = next(iter(queues.items()))
+                waiter = waiters[0]
+                if waiter.cancelled:
+                    waiters.popleft()
+                    self._queued -= 1
+                    if not waiters:
+                        del queues[user]
+                    continue
+                return queues, user, waiters, waiter
+        return None
+
+    def _schedule_retry(self, delay: float):
+        if self._timer is not None:
+            return
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            self._dispatch()
+
+    def _throttle(self, reason: str, delay: float):
+        self.stats["throttled"] += 1
+        metrics.inc("adaptive_rag_llm_throttled_total", reason=reason)
+        self._schedule_retry(delay)
+
+    def _dispatch(self):
+        """
+        한도가 허락하는 만큼 대기 중인 요청에 실행 순서를 준다 (self._lock 안에서 호출).
+        """
+        while self._inflight < self.max_concurrency:
+            picked = self._next_waiter()
+            if picked is None:
+                break
+            queues, user, waiters, waiter = picked
+
+            now = time.monotonic()
+            if now < self._cooldown_until:
+                self._throttle("provider_429", self._cooldown_until - now)
+                break
+            rpm_wait = self.rpm.wait_time(1) if self.rpm else 0.0
+            tpm_wait = self.tpm.wait_time(waiter.tokens) if self.tpm else 0.0
+            if rpm_wait or tpm_wait:
+                self._throttle("rpm" if rpm_wait >= tpm_wait else "tpm", max(rpm_wait, tpm_wait))
+                break
+            if self.rpm:
+                self.rpm.try_acquire(1)
+            if self.tpm:
+                self.tpm.try_acquire(waiter.tokens)
+
+            # 이 유저는 round-robin 순서의 맨 뒤로
+            waiters.popleft()
+            self._queued -= 1
+            del queues[user]
+            if waiters:
+                queues[user] = waiters
+            self._inflight += 1
+            waiter.event.set()
+
+        metrics.set_gauge("adaptive_rag_llm_inflight", self._inflight)
+        metrics.set_gauge("adaptive_rag_llm_queued", self._queued)
+
+    def acquire(self, tokens: int, priority: str = "interactive", user: str = None, timeout: float = None) -> float:
+        """
+        실행 순서를 받을 때까지 대기하고 대기 시간(초)을 반환한다. timeout 안에 받지 못하면 LLMGatewayTimeout.
+        """
+        waiter = _Waiter(PRIORITIES.get(priority, 0), user or "anonymous", tokens)
+        with self._lock:
+            queues = self._queues[waiter.priority]
+            queues.setdefault(waiter.user, deque()).append(waiter)
+            self._queued += 1
+            self._dispatch()
+
+        if not waiter.event.wait(timeout):
+            with self._lock:
+                if not waiter.event.is_set():
+                    waiter.cancelled = True
+                    metrics.inc("adaptive_rag_llm_queue_timeouts_total", priority=priority)
+                    raise LLMGatewayTimeout(f"LLM gateway 대기 시간 초과 ({timeout:.2f}s)")
+
+        waited = time.monotonic() - waiter.enqueued
+        metrics.observe("adaptive_rag_llm_queue_wait_seconds", waited, priority=priority)
+        return waited
+
+    def try_acquire(self, tokens: int) -> bool:
+        """
+        기다리지 않고 바로 실행 순서를 받을 수 있으면 받고 True를 반환한다 (hedge 요청용).
+        대기 중인 요청이 있거나 동시 실행/RPM/TPM 한도, 429 cooldown에 걸리면 받지 않고 False.
+        """
+        with self._lock:
+            if self._queued or self._inflight >= self.max_concurrency or time.monotonic() < self._cooldown_until:
+                return False
+            if (self.rpm and self.rpm.wait_time(1)) or (self.tpm and self.tpm.wait_time(tokens)):
+                return False
+            if self.rpm:
+                self.rpm.try_acquire(1)
+            if self.tpm:
+                self.tpm.try_acquire(tokens)
+            self._inflight += 1
+            metrics.set_gauge("adaptive_rag_llm_inflight", self._inflight)
+            return True
+
+    def release(self, estimated_tokens: int = 0, actual_tokens: int = None):
+        """
+        실행 슬롯을 반납하고, 실제 토큰 사용량을 알면 TPM bucket을 보정한다.
+        """
+        with self._lock:
+            self._inflight -= 1
+            if self.tpm and actual_tokens is not None:
+                self.tpm.adjust(actual_tokens - estimated_tokens)
+            self._dispatch()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _cooldown(self, seconds: float):
+        with self._lock:
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + seconds)
+
+    # ------------------------------------------------------------------
+    # 실행
+    # ------------------------------------------------------------------
+
+    def run(self, fn, kind: str = "generate", prompt_tokens: int = 0, usage=None, priority: str = None,
+            timeout: float = None):
+        """
+        gateway 순서를 받아 fn()을 실행한다. rate limit/일시 오류는 gateway에서 재시도한다.
+        kind가 hedge 대상이면 순서를 받은 뒤의 fn() 실행만 hedge한다 (큐 대기는 hedge 기준 지연 시간에 포함되지 않음).
+
+        Args:
+            fn: 실제 호출 함수
+            kind (str): 호출 종류 (CALL_PROFILES 키, 기본 우선순위와 예상 completion 토큰 결정)
+            prompt_tokens (int): 예상 prompt 토큰 수
+            usage: 결과에서 실제 총 토큰 수를 꺼내는 함수 (없거나 None을 반환하면 예상치 유지)
+            priority (str): 우선순위 (없으면 context → 호출 종류 기본값 중 더 낮은 우선순위)
+            timeout (float): 실행 순서를 기다릴 최대 시간(초) (없으면 턴 마감 시각까지 남은 예산 기준)
+        """
+        default_priority, completion_tokens = CALL_PROFILES.get(kind, ("interactive", 200))
+        if priority is None:
+            candidates = [default_priority, _current_priority.get() or default_priority]
+            priority = max(candidates, key=lambda p: PRIORITIES.get(p, 0))
+        estimated = prompt_tokens + completion_tokens
+        user = _current_user.get()
+
+        def call():
+            # 실행 슬롯 하나로 provider를 한 번 호출하고, 끝나면 (hedge에서 진 쪽도) 그 슬롯을 반납
+            actual = None
+            try:
+                result = fn()
+                actual = usage(result) if usage is not None else None
+                return result
+            finally:
+                self.release(estimated, actual)
+
+        for attempt in range(self.max_retries + 1):
+            self.acquire(estimated, priority=priority, user=user,
+                         timeout=timeout if timeout is not None else deadline.call_timeout(kind))
+            error = None
+            try:
+                # hedge 요청은 슬롯을 바로 받을 수 있을 때만 보내고, 시작 전에 취소되면 그 슬롯을 반납
+                # (재시도 대기(backoff) 전에 실행 슬롯은 이미 반납됨)
+                result = hedging.call(kind, call, admit=lambda: self.try_acquire(estimated),
+                                      abandon=lambda: self.release(estimated))
+            except Exception as e:
+                error = e
+
+            if error is None:
+                self._count("requests")
+                metrics.inc("adaptive_rag_llm_requests_total", kind=kind, priority=priority, status="ok")
+                return result
+
+            retryable, rate_limited, retry_after = _is_retryable(error)
+            if rate_limited:
+                self._count("rate_limited")
+                metrics.inc("adaptive_rag_llm_throttled_total", reason="provider_429")
+                self._cooldown(retry_after or RATE_LIMIT_COOLDOWN * 2 ** attempt)
+            out_of_budget = deadline.remaining() < deadline.MIN_CALL_TIMEOUT
+            if not retryable or attempt == self.max_retries or out_of_budget:
+                metrics.inc("adaptive_rag_llm_requests_total", kind=kind, priority=priority, status="error")
+                raise error
+            self._count("retries")
+            if not rate_limited:
+                time.sleep(0.5 * 2 ** attempt)
+
+    def guard(self, runnable, kind: str):
+        """
+        LangChain Runnable(LLM) 앞에 gateway를 둔 Runnable을 반환한다.
+        입력 프롬프트로 토큰을 추정하고, 응답의 usage_metadata로 실제 사용량을 보정한다.
+        턴 마감 시각이 있으면 남은 예산으로 계산한 timeout을 LLM 호출에 넘기고,
+        hedge 대상 호출(hedging.HEDGE_SITES)이면 run 안에서 p90 안에 끝나지 않을 때 같은 요청을 한 번 더 보낸다.
+        """
+        def _invoke(prompt_value, config):
+            text = prompt_value.to_string() if hasattr(prompt_value, "to_string") else str(prompt_value)
+            return self.run(
+                lambda: runnable.invoke(prompt_value, config, **deadline.timeout_kwargs(kind)),
+                kind=kind,
+                prompt_tokens=count_tokens(text),
+                usage=_message_tokens,
+            )
+        return RunnableLambda(_invoke, name=f"llm_gateway[{kind}]")
+
+def _message_tokens(result):
+    meta = getattr(result, "usage_metadata", None)
+    return meta.get("total_tokens") if meta else None
+
+# 프로세스 전역 gateway
+gateway = LLMGateway(
+    rpm=float(os.environ.get("LLM_RPM", "5000")),
+    tpm=float(os.environ.get("LLM_TPM", "2000000")),
+    max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", "16")),
+    max_retries=int(os.environ.get("LLM_MAX_RETRIES", "2")),
+)
+
+def guard(runnable, kind: str):
+    return gateway.guard(runnable, kind)
+
+def run(fn, kind: str = "generate", **kwargs):
+    return gateway.run(fn, kind=kind, **kwargs)
@@ -0,0 +1,184 @@
+"""
+log_backends.py
+
+이 모듈은 MongoDB 없이 대화 로그를 저장할 수 있는 로컬 로그 저장소를 제공합니다.
+MONGODB_URI가 없거나 CHAT_LOG_BACKEND=sqlite 로 설정하면 `mongoDB.create_log_backend`가 이 저장소를 선택하며,
+저장 경로(`mongoDB.save_chat_log` → `log_writer.BatchedLogWriter` → backend.insert_many)는 MongoDB와 동일합니다.
+오프라인 개발/테스트/벤치마크에서 전체 파이프라인을 그대로 실행하는 용도입니다.
+
+로그 저장소 인터페이스 (mongoDB.MongoLogBackend와 공통):
+- `name`: 저장소 이름
+- `insert_many(documents, on_inserted)`: 로그 리스트 저장 (`_id`가 이미 있으면 무시), 새로 저장된 로그를 on_inserted로 전달
+- `is_duplicate_error(e)`: 재저장 시 이미 저장된 로그로 볼 예외인지 판별
+- `ping()`: 연결 확인
+- `ensure_indexes()`: 분석용 인덱스 생성
+- `apply_rollups(increments)` / `query_rollups(...)` / `delete_rollups(start, end)`: 집계 갱신/조회/삭제 (analytics.py)
+- `iter_logs(start, end, category, batch_size)`: ts 순서로 로그를 스트리밍 조회
+- `close()`: 연결 정리
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+from adaptive_rag.utils.log_writer import json_default, json_object_hook
+
+class SQLiteLogBackend:
+    """
+    SQLite(WAL) 로그 저장소. 로그 원문은 JSON으로, 조회용 필드는 별도 컬럼으로 저장한다.
+    시각 컬럼(ts, bucket)은 UTC ISO 문자열이라 문자열 비교로 범위 조회가 가능하다.
+    """
+
+    name = "sqlite"
+
+    # 조회용 컬럼 (원문 JSON과 별도로 저장)
+    COLUMNS = ("ts", "user_id", "category", "route", "prompt_key", "relevance_score", "latency_ms")
+
+    def __init__(self, path: str = "chat_logs.db"):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_logs ("
+            "_id TEXT PRIMARY KEY, timestamp TEXT, user_id TEXT, category TEXT, document TEXT NOT NULL)"
+        )
+        # 분석용 컬럼이 없던 기존 파일은 컬럼만 추가
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(chat_logs)")}
+        for column in ("ts", "route", "prompt_key", "relevance_score", "latency_ms"):
+            if column not in existing:
+                conn.execute(f"ALTER TABLE chat_logs ADD COLUMN {column}")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_log_rollups ("
+            "granularity TEXT NOT NULL, bucket TEXT NOT NULL, category TEXT NOT NULL, route TEXT NOT NULL, "
+            "count INTEGER NOT NULL DEFAULT 0, latency_ms_sum REAL NOT NULL DEFAULT 0, "
+            "latency_ms_count INTEGER NOT NULL DEFAULT 0, latency_ms_max REAL NOT NULL DEFAULT 0, "
+            "relevant INTEGER NOT NULL DEFAULT 0, scored INTEGER NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (granularity, bucket, category, route))"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _iso(value) -> str:
+        return value.isoformat() if isinstance(value, datetime) else value
+
+    def insert_many(self, documents: list, on_inserted=None):
+        conn = self._conn()
+        inserted = []
+        with conn:
+            for doc in documents:
+                # 같은 _id는 이미 저장된 로그이므로 무시 (spill 재저장 시 중복 방지)
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO chat_logs "
+                    "(_id, timestamp, document, ts, user_id, category, route, prompt_key, relevance_score, latency_ms) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (doc["_id"], str(doc.get("timestamp")), json.dumps(doc, ensure_ascii=False, default=json_default),
+                     *(self._iso(doc.get(column)) for column in self.COLUMNS)),
+                )
+                if cursor.rowcount:
+                    inserted.append(doc)
+        if on_inserted is not None and inserted:
+            on_inserted(inserted)
+
+    def is_duplicate_error(self, e) -> bool:
+        return False
+
+    def ping(self) -> bool:
+        self._conn().execute("SELECT 1").fetchone()
+        return True
+
+    def ensure_indexes(self):
+        conn = self._conn()
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_logs_ts ON chat_logs(ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_logs_category_ts ON chat_logs(category, ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_logs_user_ts ON chat_logs(user_id, ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_logs_prompt_key_ts ON chat_logs(prompt_key, ts)")
+
+    def apply_rollups(self, increments: dict):
+        rows = [
+            (granularity, bucket.isoformat(), category, route, inc["count"], inc["latency_ms_sum"],
+             inc["latency_ms_count"], inc["latency_ms_max"], inc["relevant"], inc["scored"])
+            for (granularity, bucket, category, route), inc in increments.items()
+        ]
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT INTO chat_log_rollups "
+                "(granularity, bucket, category, route, count, latency_ms_sum, latency_ms_count, latency_ms_max, relevant, scored) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(granularity, bucket, category, route) DO UPDATE SET "
+                "count = count + excluded.count, latency_ms_sum = latency_ms_sum + excluded.latency_ms_sum, "
+                "latency_ms_count = latency_ms_count + excluded.latency_ms_count, "
+                "latency_ms_max = MAX(latency_ms_max, excluded.latency_ms_max), "
+                "relevant = relevant + excluded.relevant, scored = scored + excluded.scored",
+                rows,
+            )
+
+    def _range(self, column: str, start, end, where: list, params: list):
+        if start is not None:
+            where.append(f"{column} >= ?")
+            params.append(self._iso(start))
+        if end is not None:
+            where.append(f"{column} < ?")
+            params.append(self._iso(end))
+
+    def query_rollups(self, granularity: str, start=None, end=None, category=None) -> list:
+        where, params = ["granularity = ?"], [granularity]
+        self._range("bucket", start, end, where, params)
+        if category is not None:
+            where.append("category = ?")
+            params.append(category)
+        cursor = self._conn().execute(
+            f"SELECT * FROM chat_log_rollups WHERE {' AND '.join(where)} ORDER BY bucket", params
+        )
+        names = [d[0] for d in cursor.description]
+        rows = [dict(zip(names, row)) for row in cursor]
+        for row in rows:
+            row["bucket"] = datetime.fromisoformat(row["bucket"])
+        return rows
+
+    def delete_rollups(self, start, end):
+        where, params = [], []
+        self._range("bucket", start, end, where, params)
+        conn = self._conn()
+        with conn:
+            conn.execute(f"DELETE FROM chat_log_rollups WHERE {' AND '.join(where) or '1'}", params)
+
+    def iter_logs(self, start=None, end=None, category=None, batch_size: int = 1000):
+        where, params = [], []
+        self._range("ts", start, end, where, params)
+        if category is not None:
+            where.append("category = ?")
+            params.append(category)
+        # 별도 connection의 커서로 batch_size씩 읽어 전체를 메모리에 올리지 않음
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        try:
+            cursor = conn.execute(
+                f"SELECT document FROM chat_logs {'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY ts",
+                params,
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                for (raw,) in rows:
+                    yield json.loads(raw, object_hook=json_object_hook)
+        finally:
+            conn.close()
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM chat_logs").fetchone()[0]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
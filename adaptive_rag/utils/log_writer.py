@@ -0,0 +1,330 @@
+"""
+log_writer.py
+
+이 모듈은 대화 로그를 요청 경로 밖에서 묶어서 저장하는 백그라운드 log writer를 제공합니다.
+`save_chat_log`는 큐에 로그를 넣기만 하고, worker 스레드가 모아서 `insert_many`로 한 번에 저장합니다.
+MongoDB가 느려지거나 잠시 끊겨도 챗봇 응답 시간에는 영향을 주지 않습니다.
+
+특징:
+- 크기 상한이 있는 메모리 큐 + 크기(batch_size)/시간(flush_interval) 기준 flush
+- 큐가 가득 찼을 때의 정책 (overflow): "spill"(로컬 JSONL 파일에 기록), "drop"(버림), "block"(빈 자리가 날 때까지 대기)
+- 저장 실패 시 재시도 후 spill 파일로 보관하고, 이후 spill 파일을 다시 저장 (at-least-once)
+- 재저장할 파일은 프로세스별 이름(`.replay-<pid>-<ns>`)으로 떼어내므로 같은 spill 경로를 쓰는 여러 worker가 같은 파일을
+  동시에 재저장하지 않음 (종료된 프로세스가 남긴 파일은 이름을 바꿔 가져온 한 프로세스만 처리)
+- worker 스레드는 한 주기의 오류로 멈추지 않으며, 멈췄으면 다음 로그 접수 시 다시 시작됨
+- 로그마다 미리 `_id`를 부여하므로 재저장 시 이미 들어간 로그는 중복 키로 무시됨
+- 프로세스 종료 시(atexit) 남은 로그를 flush하고, 시간 안에 저장하지 못한 로그는 spill 파일로 보관
+"""
+
+import glob
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from adaptive_rag.utils import metrics
+
+# 종료 신호용 sentinel
+_STOP = object()
+
+def json_default(value):
+    # datetime은 MongoDB extended JSON 형식({"$date": ...})으로 보관해 재저장 시 datetime으로 복원
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return str(value)
+
+def json_object_hook(obj: dict):
+    if len(obj) == 1 and "$date" in obj:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+class BatchedLogWriter:
+    """
+    로그 dict를 큐에 모아 sink(로그 리스트를 한 번에 저장하는 함수)로 묶어 저장하는 writer
+
+    사용 예:
+        writer = BatchedLogWriter(lambda docs: collection.insert_many(docs, ordered=False))
+        writer.submit({"user": "...", "bot": "..."})
+    """
+
+    # 저장 재시도 횟수 / spill 파일 재저장 주기(초)
+    MAX_ATTEMPTS = 3
+    REPLAY_INTERVAL = 30.0
+
+    def __init__(self, sink, name: str = "chat_logs", max_queue: int = 10_000, batch_size: int = 100,
+                 flush_interval: float = 1.0, overflow: str = "spill", spill_path: str = "chat_logs.spill.jsonl",
+                 block_timeout: float = 1.0, is_duplicate_error=None):
+        if overflow not in ("spill", "drop", "block"):
+            raise ValueError(f"지원하지 않는 overflow 정책입니다: {overflow}")
+        self.sink = sink
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.spill_path = spill_path
+        self.block_timeout = block_timeout
+        # 재저장 시 "이미 저장된 로그"로 보고 성공 처리할 예외 판별 함수 (예: MongoDB 중복 키 오류)
+        self.is_duplicate_error = is_duplicate_error or (lambda e: False)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._spill_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._worker = None
+        self._closed = False
+        self._last_replay = 0.0
+        self.stats = {"enqueued": 0, "written": 0, "dropped": 0, "spilled": 0, "replayed": 0, "errors": 0}
+
+    # ------------------------------------------------------------------
+    # 요청 경로
+    # ------------------------------------------------------------------
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                if self._worker is not None:
+                    print(f"[LOG WRITER ERROR] {self.name} worker 스레드가 멈춰 다시 시작합니다.")
+                self._worker = threading.Thread(target=self._run, name=f"log-writer-{self.name}", daemon=True)
+                self._worker.start()
+
+    def submit(self, document: dict):
+        """
+        로그를 큐에 넣는다 (저장은 백그라운드에서). 큐가 가득 차면 overflow 정책을 따른다.
+        """
+        document.setdefault("_id", uuid.uuid4().hex)
+        if self._closed:
+            self._spill([document])
+            return
+        self._ensure_worker()
+        try:
+            if self.overflow == "block":
+                self._queue.put(document, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(document)
+        except queue.Full:
+            if self.overflow == "spill":
+                self._spill([document])
+            else:
+                self._count("dropped", 1)
+            return
+        self._count("enqueued", 1)
+
+    # ------------------------------------------------------------------
+    # worker
+    # ------------------------------------------------------------------
+
+    def _count(self, key: str, n: int):
+        self.stats[key] += n
+        metrics.inc(f"adaptive_rag_log_writer_{key}_total", n, writer=self.name)
+
+    def _next_batch(self) -> tuple:
+        """
+        첫 로그를 기다린 뒤 batch_size개가 차거나 flush_interval이 지날 때까지 모은다.
+        Returns: (batch, stop 여부)
+        """
+        try:
+            item = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return [], False
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _write(self, batch: list) -> bool:
+        """
+        batch를 sink로 저장한다. 재시도 후에도 실패하면 False.
+        """
+        for attempt in range(self.MAX_ATTEMPTS):
+            t0 = time.perf_counter()
+            try:
+                self.sink(batch)
+                metrics.observe("adaptive_rag_log_writer_flush_seconds", time.perf_counter() - t0, writer=self.name)
+                return True
+            except Exception as e:
+                if self.is_duplicate_error(e):
+                    return True
+                self._count("errors", 1)
+                print(f"[LOG WRITER ERROR] {self.name} 로그 {len(batch)}건 저장 실패 ({attempt + 1}/{self.MAX_ATTEMPTS}): {e}")
+                if attempt + 1 < self.MAX_ATTEMPTS:
+                    time.sleep(0.5 * 2 ** attempt)
+        return False
+
+    def _flush(self, batch: list):
+        if not batch:
+            return
+        if self._write(batch):
+            self._count("written", len(batch))
+        else:
+            self._spill(batch)
+
+    def _run(self):
+        self._safe_replay()
+        while True:
+            batch, stop = [], False
+            try:
+                batch, stop = self._next_batch()
+                self._flush(batch)
+                metrics.set_gauge("adaptive_rag_log_writer_queue_depth", self._queue.qsize(), writer=self.name)
+            except Exception as e:
+                # 한 주기의 오류(sink 버그 등)로 worker가 멈추지 않도록 기록만 하고 계속 (꺼낸 batch는 spill로 보관)
+                self._count("errors", 1)
+                print(f"[LOG WRITER ERROR] {self.name} worker 주기 실패: {type(e).__name__}: {e}")
+                self._spill(batch)
+            if stop:
+                return
+            if self._queue.empty() and time.monotonic() - self._last_replay >= self.REPLAY_INTERVAL:
+                self._safe_replay()
+
+    def _safe_replay(self):
+        try:
+            self._replay()
+        except Exception as e:
+            self._count("errors", 1)
+            print(f"[LOG WRITER ERROR] {self.name} spill 파일 재저장 실패: {type(e).__name__}: {e}")
+
+    # ------------------------------------------------------------------
+    # spill 파일
+    # ------------------------------------------------------------------
+
+    def _spill(self, documents: list):
+        """
+        저장하지 못한 로그를 spill 파일(JSONL)에 덧붙인다. 파일 기록도 실패하면 버린다.
+        """
+        try:
+            with self._spill_lock, open(self.spill_path, "a", encoding="utf-8") as f:
+                for document in documents:
+                    f.write(json.dumps(document, ensure_ascii=False, default=json_default) + "\n")
+            self._count("spilled", len(documents))
+        except OSError as e:
+            self._count("dropped", len(documents))
+            print(f"[LOG WRITER ERROR] spill 파일 기록 실패, 로그 {len(documents)}건 유실: {e}")
+
+    def _replay_name(self) -> str:
+        return f"{self.spill_path}.replay-{os.getpid()}-{time.time_ns()}"
+
+    def _claim_replay_files(self) -> list:
+        """
+        이 프로세스가 재저장할 파일 목록. 다른 프로세스가 떼어낸 파일은 그 프로세스가 살아 있으면 건너뛰고,
+        종료되었으면 이 프로세스 이름으로 바꿔 가져온다 (rename은 한 프로세스만 성공하므로 같은 파일을 둘이 처리하지 않음).
+        """
+        prefix = f"{self.spill_path}.replay-"
+        claimed = []
+        for path in sorted(glob.glob(f"{glob.escape(prefix)}*")):
+            owner = path[len(prefix):].split("-")[0] if "-" in path[len(prefix):] else None
+            if owner == str(os.getpid()):
+                claimed.append(path)
+                continue
+            if owner is not None and owner.isdigit() and _pid_alive(int(owner)):
+                continue
+            target = self._replay_name()
+            try:
+                os.replace(path, target)
+            except FileNotFoundError:
+                # 다른 프로세스가 먼저 가져감
+                continue
+            claimed.append(target)
+        return claimed
+
+    def _replay(self):
+        """
+        spill 파일의 로그를 다시 저장한다. 파일을 먼저 이름을 바꿔 떼어낸 뒤 처리하므로,
+        처리 중 새로 spill되는 로그와 섞이지 않으며 중간에 프로세스가 죽어도 다음 재저장에서 이어서 처리된다.
+        """
+        self._last_replay = time.monotonic()
+        with self._spill_lock:
+            try:
+                os.replace(self.spill_path, self._replay_name())
+            except FileNotFoundError:
+                # spill 파일이 없거나 다른 프로세스가 먼저 떼어냄
+                pass
+
+        for path in self._claim_replay_files():
+            try:
+                if not self._replay_file(path):
+                    # 저장소가 아직 불안정하면 파일을 남겨두고 다음 주기에 다시 시도
+                    return
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                self._count("errors", 1)
+                print(f"[LOG WRITER ERROR] {self.name} spill 파일 {path} 재저장 실패: {e}")
+
+    def _replay_file(self, path: str) -> bool:
+        with open(path, encoding="utf-8") as f:
+            documents = []
+            for line in f:
+                try:
+                    documents.append(json.loads(line, object_hook=json_object_hook))
+                except ValueError:
+                    # 비정상 종료로 잘린 마지막 줄
+                    continue
+        for i in range(0, len(documents), self.batch_size):
+            if not self._write(documents[i:i + self.batch_size]):
+                return False
+        self._count("replayed", len(documents))
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return True
+
+    # ------------------------------------------------------------------
+    # 종료
+    # ------------------------------------------------------------------
+
+    def close(self, timeout: float = 5.0):
+        """
+        새 로그 접수를 멈추고 큐에 남은 로그를 flush한다.
+        timeout 안에 끝나지 않으면 남은 로그를 spill 파일로 보관한다.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        worker = self._worker
+        if worker is not None and worker.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            worker.join(timeout)
+
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        if leftover:
+            self._spill(leftover)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
@@ -1,32 +1,259 @@
-from langchain.memory import ConversationBufferWindowMemory
-from datetime import datetime, timedelta
+"""
+memory.py
+
+이 모듈은 유저별 대화 이력(세션)을 보관하는 세션 저장소를 제공합니다.
+SESSION_BACKEND 설정에 따라 프로세스 내 저장소(기본값) 또는 프로세스 밖 저장소(session_backends.py)를 사용합니다.
+
+- SESSION_BACKEND=memory : 프로세스 내 저장소 (`SessionStore`)
+- SESSION_BACKEND=sqlite : SQLite(WAL) 파일 저장소 (SESSION_SQLITE_PATH, 기본 sessions.db)
+- SESSION_BACKEND=redis  : Redis 저장소 (SESSION_REDIS_URL, 기본 redis://localhost:6379/0)
+
+프로세스 내 저장소 특징:
+- 전체 세션 수 상한(capacity)을 두고 LRU 순서로 제거
+- SESSION_TIMEOUT이 지난 세션은 접근할 때마다 조금씩(amortized) 정리
+- 유저 ID 해시로 나눈 여러 개의 stripe에 각자 lock을 두어 동시 접근 시 경합 감소
+- 세션은 최근 WINDOW_SIZE 턴만 (질문, 답변) 문자열 쌍으로 보관 (그 이전 대화는 history.py의 누적 요약으로 유지)
+
+턴 단위 세션 범위 (`scope`):
+- 턴 시작 시 세션을 저장소에서 한 번 읽어 두고, 그 턴의 노드(전처리, 재작성, 생성)는 모두 이 세션을 읽음
+- 턴 저장(`append_turn`)은 저장소의 읽기-수정-쓰기 한 번으로 처리하고 갱신된 세션으로 범위를 바꿔 둠
+- 원격 백엔드도 한 턴에 읽기 1회 + 쓰기 1회만 왕복 (pipeline.get_chatbot_response, pipeline.run_chatbot이 턴을 이 범위로 감쌈)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from langchain_core.messages import HumanMessage, AIMessage
 from adaptive_rag.utils.state import AdaptiveRagState
-# 유저별 메모리와 마지막 활동 시각 저장소
-memory_store: dict[str, ConversationBufferWindowMemory] = {}
-last_activity: dict[str, datetime] = {}
 
-# 세션 유지 시간 
+# 세션 유지 시간
 SESSION_TIMEOUT = timedelta(minutes=5)
 
-# 유지할 최근 메시지 수
+# 유지할 최근 대화 턴 수
 WINDOW_SIZE = 5
 
-def get_user_memory(user_id: str) -> ConversationBufferWindowMemory:
-    now = datetime.now()
-
-    # 초기화 조건: 세션이 없거나 5분 이상 경과 시
-    if (
-        user_id not in memory_store or
-        user_id not in last_activity or
-        now - last_activity[user_id] > SESSION_TIMEOUT
-    ):
-        memory_store[user_id] = ConversationBufferWindowMemory(
-            memory_key="chat_history",
-            return_messages=True,
-            k=WINDOW_SIZE  # 최근 k개 메시지만 유지
-        )
-
-    # 활동 시간 갱신
-    last_activity[user_id] = now
-
-    return memory_store[user_id]
\ No newline at end of file
+# 보관할 최대 세션 수 / lock stripe 수
+MAX_SESSIONS = int(os.environ.get("MEMORY_MAX_SESSIONS", "100000"))
+LOCK_STRIPES = int(os.environ.get("MEMORY_LOCK_STRIPES", "16"))
+
+# 접근 1회당 정리할 만료 세션 최대 개수
+SWEEP_BATCH = 8
+
+class Session:
+    """
+    한 유저의 대화 세션. 최근 WINDOW_SIZE 턴을 (질문, 답변) 문자열 쌍으로 보관한다.
+    summary는 history.py가 관리하는 누적 요약 (요약 텍스트, 요약에 포함된 마지막 턴) 이며,
+    rendered는 목적별로 렌더링된 history_text 캐시이다 (턴/요약이 바뀌면 비워짐).
+    """
+    __slots__ = ("turns", "last_activity", "summary", "rendered")
+
+    def __init__(self, now: float = None):
+        self.turns = deque(maxlen=WINDOW_SIZE)
+        self.last_activity = time.monotonic() if now is None else now
+        self.summary = None
+        self.rendered = None
+
+    def add_turn(self, question: str, answer: str):
+        self.turns.append((question, answer))
+        self.rendered = None
+
+    def set_summary(self, text: str, last_turn: tuple):
+        self.summary = (text, tuple(last_turn))
+        self.rendered = None
+
+    @property
+    def messages(self) -> list:
+        """
+        보관된 턴을 HumanMessage / AIMessage 리스트로 펼쳐 반환한다.
+        """
+        messages = []
+        for question, answer in list(self.turns):
+            messages.append(HumanMessage(content=question))
+            messages.append(AIMessage(content=answer))
+        return messages
+
+    def render(self, last_messages: int = None) -> str:
+        """
+        대화 이력을 "User: ... / Bot: ..." 줄 단위 텍스트로 만든다.
+
+        Args:
+            last_messages (int): 최근 메시지 수 제한 (None이면 전체)
+        """
+        lines = []
+        for question, answer in list(self.turns):
+            lines.append(f"User: {question}")
+            lines.append(f"Bot: {answer}")
+        if last_messages is not None:
+            lines = lines[-last_messages:]
+        return "\n".join(lines)
+
+class SessionStore:
+    """
+    용량 상한 + TTL + LRU 제거를 지원하는 lock striping 세션 저장소
+    """
+
+    def __init__(self, capacity: int = MAX_SESSIONS, ttl: timedelta = SESSION_TIMEOUT, stripes: int = LOCK_STRIPES):
+        self.ttl = ttl.total_seconds()
+        self.stripe_capacity = max(1, -(-capacity // stripes))
+        self._stripes = [(threading.Lock(), OrderedDict()) for _ in range(stripes)]
+        # 제거 횟수는 stripe별로 세고(각 stripe lock 안에서 갱신) 읽을 때 합산
+        self._evicted = [{"ttl": 0, "lru": 0} for _ in range(stripes)]
+
+    @property
+    def evicted(self) -> dict:
+        return {reason: sum(counts[reason] for counts in self._evicted) for reason in ("ttl", "lru")}
+
+    def _stripe_index(self, user_id) -> int:
+        return hash(user_id) % len(self._stripes)
+
+    def _stripe(self, user_id):
+        return self._stripes[self._stripe_index(user_id)]
+
+    def _sweep(self, sessions: OrderedDict, evicted: dict, now: float):
+        # 가장 오래 접근하지 않은 쪽(앞쪽)부터 만료된 세션을 최대 SWEEP_BATCH개 제거
+        for _ in range(SWEEP_BATCH):
+            if not sessions:
+                return
+            user_id, session = next(iter(sessions.items()))
+            if now - session.last_activity <= self.ttl:
+                return
+            del sessions[user_id]
+            evicted["ttl"] += 1
+
+    def get_or_create(self, user_id) -> Session:
+        """
+        유효한 세션을 반환하고, 없거나 만료되었으면 새 세션을 만든다. 활동 시각도 갱신한다.
+        """
+        now = time.monotonic()
+        index = self._stripe_index(user_id)
+        lock, sessions = self._stripes[index]
+        evicted = self._evicted[index]
+        with lock:
+            self._sweep(sessions, evicted, now)
+            session = sessions.get(user_id)
+            if session is None or now - session.last_activity > self.ttl:
+                session = sessions[user_id] = Session(now)
+            else:
+                session.last_activity = now
+            sessions.move_to_end(user_id)
+            if len(sessions) > self.stripe_capacity:
+                sessions.popitem(last=False)
+                evicted["lru"] += 1
+            return session
+
+    def get(self, user_id) -> Session:
+        """
+        세션을 만들지 않고 유효한 세션만 조회한다 (없거나 만료되었으면 None).
+        """
+        now = time.monotonic()
+        lock, sessions = self._stripe(user_id)
+        with lock:
+            session = sessions.get(user_id)
+            if session is None or now - session.last_activity > self.ttl:
+                return None
+            return session
+
+    def append_turn(self, user_id, question: str, answer: str) -> Session:
+        session = self.get_or_create(user_id)
+        session.add_turn(question, answer)
+        return session
+
+    def set_summary(self, user_id, text: str, last_turn: tuple):
+        session = self.get(user_id)
+        if session is not None:
+            session.set_summary(text, last_turn)
+
+    def __len__(self) -> int:
+        return sum(len(sessions) for _, sessions in self._stripes)
+
+def create_session_store(backend: str = None):
+    """
+    설정된 백엔드의 세션 저장소를 만든다.
+
+    Args:
+        backend (str): "memory" | "sqlite" | "redis" (None이면 SESSION_BACKEND 환경 변수, 기본 "memory")
+    """
+    backend = backend or os.environ.get("SESSION_BACKEND", "memory")
+    if backend == "sqlite":
+        from adaptive_rag.utils.session_backends import SQLiteSessionStore
+        return SQLiteSessionStore(os.environ.get("SESSION_SQLITE_PATH", "sessions.db"))
+    if backend == "redis":
+        from adaptive_rag.utils.session_backends import RedisSessionStore
+        return RedisSessionStore(os.environ.get("SESSION_REDIS_URL", "redis://localhost:6379/0"))
+    return SessionStore()
+
+# 프로세스 전역 세션 저장소
+session_store = create_session_store()
+
+class TurnSession:
+    """
+    한 턴 동안 노드들이 함께 쓰는 세션 (턴 시작 시 한 번 읽고, 턴 저장 후 갱신된 세션으로 교체)
+    """
+    __slots__ = ("user_id", "session")
+
+    def __init__(self, user_id, session: Session):
+        self.user_id = user_id
+        self.session = session
+
+_current_turn: ContextVar = ContextVar("adaptive_rag_session", default=None)
+
+@contextmanager
+def scope(user_id):
+    """
+    이 블록(한 턴) 안에서 실행되는 노드가 쓸 유저 세션을 저장소에서 한 번 읽어 둔다.
+    LangGraph 노드 스레드로도 전달되며, 블록이 끝나면 범위를 해제한다.
+    """
+    turn = TurnSession(user_id, session_store.get_or_create(user_id))
+    token = _current_turn.set(turn)
+    try:
+        yield turn
+    finally:
+        _current_turn.reset(token)
+
+def _turn_for(user_id) -> TurnSession:
+    # 현재 범위가 이 유저의 턴이면 반환 (범위 밖이거나 다른 유저면 None)
+    turn = _current_turn.get()
+    if turn is not None and str(turn.user_id) == str(user_id):
+        return turn
+    return None
+
+def get_user_memory(user_id: str) -> Session:
+    # 턴 범위 안이면 턴 시작 시 읽어 둔 세션을 사용
+    turn = _turn_for(user_id)
+    if turn is not None:
+        return turn.session
+    # 세션이 없거나 5분 이상 경과 시 새 세션으로 초기화, 활동 시간 갱신
+    return session_store.get_or_create(user_id)
+
+def append_turn(user_id: str, question: str, answer: str) -> Session:
+    """
+    세션 저장소에 한 턴(질문, 답변)을 추가하고 갱신된 세션을 반환한다.
+    원격 백엔드는 한 번의 왕복(읽기-수정-쓰기)으로 처리하며, 턴 범위 안이면 범위의 세션도 갱신된 세션으로 바꾼다.
+    """
+    session = session_store.append_turn(user_id, question, answer)
+    turn = _turn_for(user_id)
+    if turn is not None:
+        turn.session = session
+    return session
+
+def has_history(user_id: str) -> bool:
+    """
+    유효한 세션에 이전 대화가 있는지 확인한다 (턴 범위 안이면 저장소를 다시 조회하지 않음).
+    """
+    turn = _turn_for(user_id)
+    session = turn.session if turn is not None else session_store.get(user_id)
+    return bool(session and session.turns)
+
+def get_state_memory(state: AdaptiveRagState) -> Session:
+    """
+    state에 맞는 메모리를 반환한다.
+    ephemeral 실행(배치 평가 등)에서는 유저 세션을 만들지 않고 빈 임시 세션을 돌려준다.
+    """
+    if state.get("ephemeral"):
+        return Session()
+    return get_user_memory(state.get("user_id", "anonymous"))
@@ -0,0 +1,114 @@
+"""
+metrics.py
+
+이 모듈은 Adaptive RAG 챗봇의 프로세스 내 메트릭 저장소를 제공합니다.
+카운터/게이지/히스토그램 값을 라벨별로 누적하고, Prometheus 텍스트 포맷으로 내보냅니다.
+
+제공 기능:
+- 카운터 증가 (`inc`)
+- 게이지 설정 (`set_gauge`)
+- 히스토그램 관측 (`observe`)
+- Prometheus 텍스트 포맷 출력 (`render_prometheus`)
+- 현재 값 스냅샷 (`snapshot`)
+"""
+
+import threading
+from collections import defaultdict
+
+# 지연 시간 히스토그램 기본 버킷 (초)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class MetricsRegistry:
+    """
+    라벨별 카운터/게이지/히스토그램을 보관하는 스레드 안전한 메트릭 저장소
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self._lock = threading.Lock()
+        self._buckets = buckets
+        self._counters = defaultdict(float)
+        self._gauges = {}
+        self._histograms = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        with self._lock:
+            self._counters[self._key(name, labels)] += value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = {"buckets": [0] * len(self._buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self._buckets):
+                if value <= bound:
+                    hist["buckets"][i] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    def snapshot(self) -> dict:
+        """
+        현재 메트릭 값을 {"counters": ..., "gauges": ..., "histograms": ...} 형태로 반환한다.
+        """
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "histograms": {k: {**v, "buckets": list(v["buckets"])} for k, v in self._histograms.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def render_prometheus(self) -> str:
+        """
+        Prometheus 텍스트 포맷(exposition format)으로 메트릭을 직렬화한다.
+        """
+        snap = self.snapshot()
+        lines = []
+        for kind, values in (("counter", snap["counters"]), ("gauge", snap["gauges"])):
+            for name in sorted({k[0] for k in values}):
+                lines.append(f"# TYPE {name} {kind}")
+                for (metric, labels), value in sorted(values.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {value}")
+        for name in sorted({k[0] for k in snap["histograms"]}):
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, labels), hist in sorted(snap["histograms"].items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(self._buckets, hist["buckets"]):
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {hist['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {hist['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {hist['count']}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return "{" + body + "}"
+
+# 프로세스 전역 메트릭 저장소
+registry = MetricsRegistry()
+
+inc = registry.inc
+set_gauge = registry.set_gauge
+observe = registry.observe
+snapshot = registry.snapshot
+render_prometheus = registry.render_prometheus
@@ -1,10 +1,26 @@
-from pymongo import MongoClient
-from datetime import datetime
-import json
+"""
+mongoDB.py
+
+이 모듈은 대화 로그 저장소(기본 MongoDB Atlas)와 로그 저장 함수를 제공합니다.
+
+- MongoClient는 import 시점이 아니라 첫 저장(또는 warmup) 때 만들어지며, 연결 풀 크기와 타임아웃을 명시적으로 설정
+- 저장소 객체도 `get_log_backend()`로 처음 필요할 때 만듦 (import만 해서는 로컬 sqlite 파일을 만들거나 안내 문구를 출력하지 않음)
+- CHAT_LOG_BACKEND=mongo | sqlite 로 저장소 선택 (기본: MONGODB_URI가 있으면 mongo, 없으면 로컬 sqlite)
+- `warmup()`: 서버 시작 시 미리 연결을 맺어 첫 요청의 연결 비용 제거
+- `health()`: 저장소 연결 상태와 로그 writer 큐 상태 확인
+- 로그에는 분석용 필드(ts: datetime, route, prompt_key, relevance_score, latency_ms)를 함께 저장하고,
+  새로 저장된 로그로 analytics.py의 시간별/일별 집계를 갱신
+"""
+
+from datetime import datetime, timezone
+import atexit
+import threading
+import time
 # API 키를 환경변수로 관리하기 위한 설정 파일
 from dotenv import load_dotenv
 import os
-from adaptive_rag.utils.state import AdaptiveRagState
+from adaptive_rag.utils import analytics
+from adaptive_rag.utils.log_writer import BatchedLogWriter
 
 # API 키 정보 로드
 load_dotenv()
@@ -12,17 +28,235 @@ load_dotenv()
 # API 키 읽어오기
 MONGODB_URI = os.environ.get("MONGODB_URI")
 
-# MongoDB Atlas 연결
-client = MongoClient(MONGODB_URI)
-db = client["chatbot_db"]
-collection = db["chat_logs"]
+# MongoClient 연결 풀 / 타임아웃 설정
+MONGO_CLIENT_OPTIONS = {
+    "maxPoolSize": int(os.environ.get("MONGODB_MAX_POOL_SIZE", "10")),
+    "minPoolSize": int(os.environ.get("MONGODB_MIN_POOL_SIZE", "1")),
+    "maxIdleTimeMS": int(os.environ.get("MONGODB_MAX_IDLE_TIME_MS", "300000")),
+    "serverSelectionTimeoutMS": int(os.environ.get("MONGODB_TIMEOUT_MS", "5000")),
+    "connectTimeoutMS": int(os.environ.get("MONGODB_TIMEOUT_MS", "5000")),
+    "socketTimeoutMS": int(os.environ.get("MONGODB_SOCKET_TIMEOUT_MS", "10000")),
+    "retryWrites": True,
+    "tz_aware": True,
+}
+
+class MongoLogBackend:
+    """
+    MongoDB 로그 저장소. MongoClient는 처음 필요할 때 한 번만 만든다.
+    (저장소 인터페이스는 log_backends.py 참고)
+    """
+
+    name = "mongo"
+
+    def __init__(self, uri: str, db_name: str = "chatbot_db", collection_name: str = "chat_logs",
+                 rollup_collection_name: str = "chat_log_rollups", **client_options):
+        self.uri = uri
+        self.db_name = db_name
+        self.collection_name = collection_name
+        self.rollup_collection_name = rollup_collection_name
+        self.client_options = {**MONGO_CLIENT_OPTIONS, **client_options}
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import pymongo
+                    self._client = pymongo.MongoClient(self.uri, **self.client_options)
+        return self._client
+
+    @property
+    def collection(self):
+        return self.client[self.db_name][self.collection_name]
+
+    @property
+    def rollup_collection(self):
+        return self.client[self.db_name][self.rollup_collection_name]
+
+    def insert_many(self, documents: list, on_inserted=None):
+        """
+        로그를 저장하고, 실제로 새로 저장된 로그(중복 키로 무시된 로그 제외)를 on_inserted로 넘긴다.
+        중복 키 외의 오류는 on_inserted 호출 뒤 다시 올린다.
+        """
+        from pymongo.errors import BulkWriteError
+        inserted, error = documents, None
+        try:
+            self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            failed = {err["index"] for err in e.details.get("writeErrors", [])}
+            inserted = [doc for i, doc in enumerate(documents) if i not in failed]
+            error = None if self.is_duplicate_error(e) else e
+        if on_inserted is not None and inserted:
+            on_inserted(inserted)
+        if error is not None:
+            raise error
+
+    def is_duplicate_error(self, e) -> bool:
+        # insert_many(ordered=False)에서 모든 실패가 중복 키(11000)인 경우 = 이미 저장된 로그 (spill 재저장 시)
+        details = getattr(e, "details", None) or {}
+        errors = details.get("writeErrors") or []
+        return bool(errors) and all(err.get("code") == 11000 for err in errors) and not details.get("writeConcernErrors")
+
+    def ping(self) -> bool:
+        self.client.admin.command("ping")
+        return True
+
+    def ensure_indexes(self):
+        self.collection.create_index([("ts", -1)])
+        self.collection.create_index([("category", 1), ("ts", -1)])
+        self.collection.create_index([("user_id", 1), ("ts", -1)])
+        self.collection.create_index([("prompt_key", 1), ("ts", -1)])
+        self.rollup_collection.create_index(
+            [("granularity", 1), ("bucket", 1), ("category", 1), ("route", 1)], unique=True
+        )
+
+    def apply_rollups(self, increments: dict):
+        from pymongo import UpdateOne
+        ops = []
+        for (granularity, bucket, category, route), inc in increments.items():
+            ops.append(UpdateOne(
+                {"granularity": granularity, "bucket": bucket, "category": category, "route": route},
+                {
+                    "$inc": {k: v for k, v in inc.items() if k != "latency_ms_max"},
+                    "$max": {"latency_ms_max": inc["latency_ms_max"]},
+                },
+                upsert=True,
+            ))
+        if ops:
+            self.rollup_collection.bulk_write(ops, ordered=False)
+
+    @staticmethod
+    def _range_query(start, end) -> dict:
+        query = {}
+        if start is not None:
+            query["$gte"] = start
+        if end is not None:
+            query["$lt"] = end
+        return query
+
+    def query_rollups(self, granularity: str, start=None, end=None, category=None) -> list:
+        query = {"granularity": granularity}
+        if start is not None or end is not None:
+            query["bucket"] = self._range_query(start, end)
+        if category is not None:
+            query["category"] = category
+        return list(self.rollup_collection.find(query, {"_id": 0}).sort("bucket", 1))
+
+    def delete_rollups(self, start, end):
+        self.rollup_collection.delete_many({"bucket": self._range_query(start, end)})
+
+    def iter_logs(self, start=None, end=None, category=None, batch_size: int = 1000):
+        query = {}
+        if start is not None or end is not None:
+            query["ts"] = self._range_query(start, end)
+        if category is not None:
+            query["category"] = category
+        cursor = self.collection.find(query, batch_size=batch_size).sort("ts", 1)
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+def create_log_backend(backend: str = None):
+    """
+    설정된 대화 로그 저장소를 만든다 (연결은 첫 사용 시).
+
+    Args:
+        backend (str): "mongo" | "sqlite" (None이면 CHAT_LOG_BACKEND 환경 변수, 없으면 MONGODB_URI 유무로 결정)
+    """
+    backend = backend or os.environ.get("CHAT_LOG_BACKEND") or ("mongo" if MONGODB_URI else "sqlite")
+    if backend == "mongo":
+        if not MONGODB_URI:
+            raise ValueError("CHAT_LOG_BACKEND=mongo 를 사용하려면 MONGODB_URI 설정이 필요합니다.")
+        return MongoLogBackend(MONGODB_URI)
+    from adaptive_rag.utils.log_backends import SQLiteLogBackend
+    path = os.environ.get("CHAT_LOG_SQLITE_PATH", "chat_logs.db")
+    if not os.environ.get("CHAT_LOG_BACKEND"):
+        print(f"[MONGO] MONGODB_URI가 없어 로컬 로그 저장소({path})를 사용합니다.")
+    return SQLiteLogBackend(path)
+
+# 대화 로그 저장소 (처음 필요할 때 한 번만 생성)
+_log_backend = None
+_log_backend_lock = threading.Lock()
+
+def get_log_backend():
+    global _log_backend
+    if _log_backend is None:
+        with _log_backend_lock:
+            if _log_backend is None:
+                _log_backend = create_log_backend()
+    return _log_backend
+
+def _write_logs(documents: list):
+    # 새로 저장된 로그만 집계에 반영 (spill 재저장으로 이미 들어간 로그가 두 번 집계되지 않음)
+    backend = get_log_backend()
+    backend.insert_many(documents, on_inserted=lambda inserted: analytics.record_rollups(inserted, backend))
+
+# 대화 로그 백그라운드 writer (요청 경로에서는 큐에 넣기만 함)
+log_writer = BatchedLogWriter(
+    _write_logs,
+    name="chat_logs",
+    max_queue=int(os.environ.get("CHAT_LOG_QUEUE_SIZE", "10000")),
+    batch_size=int(os.environ.get("CHAT_LOG_BATCH_SIZE", "100")),
+    flush_interval=float(os.environ.get("CHAT_LOG_FLUSH_INTERVAL", "1.0")),
+    overflow=os.environ.get("CHAT_LOG_OVERFLOW", "spill"),
+    spill_path=os.environ.get("CHAT_LOG_SPILL_PATH", "chat_logs.spill.jsonl"),
+    is_duplicate_error=lambda e: get_log_backend().is_duplicate_error(e),
+)
+
+# 프로세스 종료 시 남은 로그 flush
+atexit.register(log_writer.close)
+
+def warmup() -> bool:
+    """
+    저장소 연결을 미리 맺는다 (API 서버 시작 시 호출). 실패해도 예외를 올리지 않고 False를 반환한다.
+    """
+    log_backend = None
+    try:
+        t0 = time.perf_counter()
+        log_backend = get_log_backend()
+        log_backend.ping()
+        analytics.ensure_indexes(log_backend)
+        print(f"[MONGO] {log_backend.name} 로그 저장소 연결 및 인덱스 확인 완료 ({(time.perf_counter() - t0) * 1000:.0f}ms)")
+        return True
+    except Exception as e:
+        print(f"[MONGO ERROR] {getattr(log_backend, 'name', '-')} 로그 저장소 연결 실패: {e}")
+        return False
+
+def health() -> dict:
+    """
+    로그 저장소 연결 상태와 writer 큐 상태를 반환한다 (헬스 체크 엔드포인트용).
+    """
+    log_backend = get_log_backend()
+    status = {"backend": log_backend.name, "ok": False, "pending": log_writer.pending(), **log_writer.stats}
+    t0 = time.perf_counter()
+    try:
+        status["ok"] = log_backend.ping()
+    except Exception as e:
+        status["error"] = f"{type(e).__name__}: {e}"
+    status["latency_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return status
 
-def save_chat_log(user_input, bot_response, category="미지정", user_id = "anonymous"):
+def save_chat_log(user_input, bot_response, category="미지정", user_id = "anonymous",
+                  route=None, prompt_key=None, relevance_score=None, latency_ms=None):
+    now = datetime.now(timezone.utc)
     log_entry = {
-        "timestamp": datetime.now().isoformat(),
+        "ts": now,  # 분석/인덱스용 datetime (UTC)
+        "timestamp": now.astimezone().isoformat(),  # 기존 문자열 필드 (로컬 시각)
         "user": user_input,
         "bot": bot_response,
         "category": category,
-        "user_id": user_id
+        "user_id": user_id,
+        "route": route,
+        "prompt_key": prompt_key,
+        "relevance_score": relevance_score,
+        "latency_ms": round(latency_ms, 1) if latency_ms is not None else None,
     }
-    collection.insert_one(log_entry)  # <- 이게 저장하는 코드
\ No newline at end of file
+    log_writer.submit(log_entry)  # <- 큐에 넣으면 백그라운드에서 묶어서 저장
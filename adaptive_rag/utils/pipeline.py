@@ -1,15 +1,16 @@
-from adaptive_rag.utils import tools, safeguard, search, generate, memory, mongoDB, router, slang, state
+from adaptive_rag.utils import tools, safeguard, search, generate, memory, mongoDB, router, slang, state, check, tracing, singleflight, llm_gateway, clients, deadline, preprocess, intent, docstore, boot
 from adaptive_rag.utils.state import AdaptiveRagState
+from adaptive_rag.utils.tools import warm_retrievers
 
 from typing import TypedDict, List
 from langchain_core.documents import Document
 from langgraph.graph import StateGraph, START, END
-from IPython.display import Image, display
 from functools import partial
 
 import random
 import threading
 import sys
+import time
 from typing import Dict, Any, Union # Added Union
 
 # 툴 설정 함수
@@ -30,16 +31,24 @@ def set_tools():
 # 툴 설정
 tools = set_tools()
 
-def build_adaptive_rag() -> StateGraph:
+def build_adaptive_rag(preprocess_mode: str = None) -> StateGraph:
     """
     LangGraph 기반 Adaptive RAG 챗봇을 위한 상태 그래프 생성 함수.
     각 노드들은 질문 처리의 단계(욕설 필터링 → 라우팅 → 검색 → 관련성 평가 → 생성)로 구성됨.
 
+    Args:
+        preprocess_mode (str): 검색 전 전처리 방식 (None이면 ADAPTIVE_RAG_PREPROCESS_MODE)
+            - legacy: [route_question_adaptive]에서 슬랭 치환 → 라우팅, 검색 노드에서 질의 재작성
+            - fused: [preprocess_question]에서 슬랭 해석·라우팅·질의 재작성을 한 번에 (preprocess.py)
+
     Returns:
         StateGraph: 실행 가능한 상태 그래프
 
     - 구조
-    [profanity_prevention] 
+    [classify_intent]
+    → (사전과 일치한 인사/작별) → [canned_response] → end
+    → [profanity_prevention] 
+    → (그 밖의 인사/작별/범위 밖) → [canned_response] → end
     → (clean) → [route_question_adaptive] 
         → [search_xxx] 
             → [check_relevance]
@@ -47,53 +56,77 @@ def build_adaptive_rag() -> StateGraph:
                 → (0, not retried) → [re_route_question_adaptive] → [search_xxx2] → ...
                 → (0, retried) → [llm_fallback] → end
     → (profane) → end
+    (fused 모드에서는 [route_question_adaptive] 자리에 [preprocess_question])
 
     """
+    preprocess_mode = preprocess.resolve_mode(preprocess_mode)
+    route_node = "preprocess_question" if preprocess_mode == "fused" else "route_question_adaptive"
 
     # 그래프 초기화 (state 타입은 AdaptiveRagState)
     builder = StateGraph(AdaptiveRagState)
 
-    # 시작 지점을 욕설 필터링 노드로 지정
-    builder.set_entry_point("profanity_prevention")
+    # 시작 지점을 의도 판별 노드로 지정 (인사/작별/범위 밖 메시지는 LLM 없이 고정 응답)
+    builder.set_entry_point("classify_intent")
 
     # === 주요 노드 등록 ===
+    # 모든 노드는 tracing 래퍼를 거쳐 등록 (계측 비활성 시 원래 함수 그대로 등록됨)
+    def add_node(name, fn):
+        builder.add_node(name, tracing.traced_node(name, fn))
+
+    # 0. 의도 판별 및 고정 응답
+    add_node("classify_intent", intent.classify_intent)
+    add_node("canned_response", intent.canned_response)
 
     # 1. 욕설 필터링 (욕설 감지 및 종료/계속 판단)
-    builder.add_node("profanity_prevention", partial(safeguard.profanity_prevention))
+    add_node("profanity_prevention", partial(safeguard.profanity_prevention))
 
     # 2. 라우팅 (질문 유형에 따라 search 노드 결정)
-    builder.add_node("route_question_adaptive", router.route_question_adaptive)
-    builder.add_node("re_route_question_adaptive", router.re_route_question_adaptive)
+    if preprocess_mode == "fused":
+        add_node("preprocess_question", preprocess.preprocess_question)
+    else:
+        add_node("route_question_adaptive", router.route_question_adaptive)
+    add_node("re_route_question_adaptive", router.re_route_question_adaptive)
 
     # 3. 관련성 판단 (검색 결과와 질문이 연결되는지 판단)
-    builder.add_node("check_relevance", check.check_relevance)
+    add_node("check_relevance", check.check_relevance)
 
     # 4. 검색 노드 (주제별로 분리)
-    builder.add_node("search_policy", search.search_policy_adaptive)
-    builder.add_node("search_subject", search.search_subject_adaptive)
-    builder.add_node("search_admission", search.search_admission_adaptive)
-    builder.add_node("search_book", search.search_book_adaptive)
-    builder.add_node("search_seteuk", search.search_seteuk_adaptive)
+    add_node("search_policy", search.search_policy_adaptive)
+    add_node("search_subject", search.search_subject_adaptive)
+    add_node("search_admission", search.search_admission_adaptive)
+    add_node("search_book", search.search_book_adaptive)
+    add_node("search_seteuk", search.search_seteuk_adaptive)
 
     # 5. 응답 생성 또는 fallback
-    builder.add_node("generate", generate.generate_adaptive)
-    builder.add_node("llm_fallback", generate.llm_fallback_adaptive)
+    add_node("generate", generate.generate_adaptive)
+    add_node("llm_fallback", generate.llm_fallback_adaptive)
 
     # === 상태 간 연결 정의 ===
 
-    # Step 1: 욕설이 감지되면 종료, 없으면 다음 단계로 진행
+    # Step 0: 사전과 일치한 인사/작별이면 바로 고정 응답, 아니면 욕설 필터링
+    builder.add_conditional_edges(
+        "classify_intent",
+        intent.route_after_intent,
+        {
+            "canned_response": "canned_response",
+            "profanity_prevention": "profanity_prevention",
+        }
+    )
+
+    # Step 1: 욕설이 감지되면 종료, 고정 응답 의도면 고정 응답, 없으면 다음 단계로 진행
     builder.add_conditional_edges(
         "profanity_prevention",
         safeguard.check_profanity_result,
         {
             "__end__": "__end__",  # 욕설 감지 시 종료
-            "route_question_adaptive": "route_question_adaptive",  # 정상 질문 → 라우팅
+            "canned_response": "canned_response",  # 인사/작별/범위 밖 메시지 → 고정 응답
+            "route_question_adaptive": route_node,  # 정상 질문 → 라우팅 (또는 fused 전처리)
         }
     )
 
     # Step 2: 라우팅 결과에 따라 적절한 검색 노드로 이동
     builder.add_conditional_edges(
-        "route_question_adaptive",
+        route_node,
         lambda state: state["next_node"],
         {
             "search_policy": "search_policy",
@@ -112,13 +145,7 @@ def build_adaptive_rag() -> StateGraph:
     # Step 4: 관련성이 높으면 generate로, 낮고 재시도 가능하면 재라우팅, 아니면 fallback
     builder.add_conditional_edges(
         "check_relevance",
-        lambda state: (
-            "generate" if state.get("relevance_score") == 1
-            else (
-                "re_route_question_adaptive" if not state.get("retried", False)
-                else "llm_fallback"
-            )
-        ),
+        check.route_after_check,
         {
             "generate": "generate",
             "re_route_question_adaptive": "re_route_question_adaptive",
@@ -130,8 +157,8 @@ def build_adaptive_rag() -> StateGraph:
     builder.add_conditional_edges(
         "re_route_question_adaptive",
         lambda state: (
-            "llm_fallback"  # 재시도인데 또 같은 노드라면 fallback
-            if state["next_node"] in state.get("visited_nodes", [])
+            "llm_fallback"  # 재시도인데 또 같은 노드라면 fallback (마지막 항목은 방금 고른 노드이므로 그 앞까지 비교)
+            if state["next_node"] in state.get("visited_nodes", [])[:-1]
             else state["next_node"]  # 새 노드이면 해당 노드로
         ),
         {
@@ -147,6 +174,7 @@ def build_adaptive_rag() -> StateGraph:
     # Step 6: generate 또는 fallback 이후 종료
     builder.add_edge("generate", "__end__")
     builder.add_edge("llm_fallback", "__end__")
+    builder.add_edge("canned_response", "__end__")
 
     # 그래프 최종 컴파일
     return builder.compile()
@@ -159,13 +187,58 @@ def initialize_graph_for_api():
     global compiled_graph_instance
     if compiled_graph_instance is None:
         print("Initializing RAG graph for API...")
-        compiled_graph_instance = build_adaptive_rag()
+        # 서로 의존하지 않는 초기화 단계를 동시에 실행하고 모두 끝나면 ready (boot.py)
+        # (그래프 컴파일 실패는 예외, 욕설 검사 모델 / 슬랭 사전이 실패하면 준비될 때까지 ready를 미루고 백그라운드에서 재시도,
+        #  로그 저장소 / 외부 provider 연결 warmup은 실패해도 서버는 시작)
+        results = boot.run({
+            "graph": build_adaptive_rag,
+            "retrievers": warm_retrievers,
+            "safeguard": safeguard.get_unsmile_pipeline,
+            "slang": slang.get_slang_dict,
+            "log_store": mongoDB.warmup,
+            "clients": clients.warmup,
+        }, required=("graph",), retry=("safeguard", "slang"))
+        compiled_graph_instance = results["graph"]
         print("RAG graph initialized for API.")
 
-def get_chatbot_response(question: str, user_id: str, category :str) -> Dict[str, Any]:
+# 동일 질문 동시 요청 합치기 (single-flight)
+coalescer = singleflight.SingleFlight("chatbot")
+
+# API 응답에 담는 state 필드 (검색 문서 ID, 마감 시각 등 그래프 내부 값은 응답에서 제외)
+RESPONSE_FIELDS = (
+    "question", "generation", "user_id", "category", "route", "prompt_key", "relevance_score",
+    "visited_nodes", "next_node", "retried", "degradations", "intent", "stop",
+)
+
+def response_view(final_state: dict) -> Dict[str, Any]:
+    """
+    최종 state에서 API 응답에 담을 필드만 골라낸다.
+    """
+    return {key: final_state[key] for key in RESPONSE_FIELDS if key in final_state}
+
+def _run_graph(inputs: dict) -> Dict[str, Any]:
+    """
+    그래프를 한 번 실행하고 응답 필드만 고른 최종 state를 반환한다.
+    """
+    # 턴 단위 계측 (노드별 지연 시간, 외부 호출, 토큰, 실행 경로)
+    # (llm_gateway.context: 이 턴의 LLM 호출을 유저 단위로 공정하게 스케줄링)
+    # (deadline.scope: 외부 호출 timeout을 턴 마감 시각까지 남은 예산으로 제한)
+    # (docstore.scope: 검색 문서는 이 턴의 문서 테이블에 두고 state에는 ID만 전달)
+    with tracing.turn(user_id=inputs.get("user_id"), category=inputs.get("category")) as trace, \
+            llm_gateway.context(user_id=inputs.get("user_id")), deadline.scope(inputs.get("deadline")), docstore.scope():
+        # 노드는 바뀐 필드만 반환하므로 마지막 노드 출력이 아닌 병합된 최종 state를 받음
+        final_state = compiled_graph_instance.invoke(inputs, config=tracing.graph_config())
+        trace.finish(final_state)
+
+    return response_view(final_state)
+
+def get_chatbot_response(question: str, user_id: str, category :str, budget: float = None) -> Dict[str, Any]:
     """
     Processes a question using the RAG graph and returns the chatbot's response.
     Designed for API usage.
+
+    budget: 턴 전체 예산(초). None이면 deadline.TURN_BUDGET, 0이면 마감 없음.
+    예산이 부족해 줄인 단계는 응답 state의 degradations에 기록된다.
     """
     global compiled_graph_instance
     if compiled_graph_instance is None:
@@ -179,18 +252,30 @@ def get_chatbot_response(question: str, user_id: str, category :str) -> Dict[str
     inputs = {
         "question": question,
         "user_id": user_id,
-        "category": category
+        "category": category,
+        "started_at": time.time(),
+        "deadline": deadline.new_deadline(budget),
+        "degradations": [],
     }
-    final_node_output_state = {}
-    
-    # The stream yields dictionaries where keys are node names and values are the state dicts.
-    # We want the state from the node that produces the 'generation'.
-    for output_chunk in compiled_graph_instance.stream(inputs):
-        for node_name, state_after_node in output_chunk.items():
-            # We are interested in the state that contains the 'generation'.
-            # This will typically be the state after 'generate' or 'llm_fallback' nodes.
-            # The last such state before the stream ends should be the overall final state.
-            final_node_output_state = state_after_node 
+
+    # 턴 단위 세션 범위: 세션은 턴 시작 시 한 번만 읽고, 노드들은 이 세션을 함께 씀 (턴 저장은 한 번의 읽기-수정-쓰기)
+    with memory.scope(user_id):
+        # 대화 이력이 없는 첫 질문은 같은 질문/카테고리로 진행 중인 실행이 있으면 그 결과를 공유
+        if memory.has_history(user_id):
+            final_node_output_state = _run_graph(inputs)
+        else:
+            key = singleflight.coalesce_key(question, category)
+            final_node_output_state, shared = coalescer.do(key, lambda: _run_graph(inputs))
+            if shared:
+                final_node_output_state = {**final_node_output_state, "user_id": user_id, "category": category}
+                # 공유받은 결과도 요청자별 메모리와 로그에는 각각 기록 (욕설 차단으로 종료된 경우는 기록하지 않음)
+                # 질문은 leader가 정규화한 질문이 아니라 이 요청자가 보낸 질문으로 기록
+                if "generation" in final_node_output_state and not final_node_output_state.get("stop"):
+                    generate.record_turn(
+                        {**final_node_output_state, **inputs},
+                        question,
+                        final_node_output_state["generation"],
+                    )
 
     if 'generation' not in final_node_output_state:
         # Check if it's an error or if the graph ended via a path that doesn't set 'generation'.
@@ -230,9 +315,8 @@ def run_chatbot():
                 "category": None  # 일단 로컬에서는 없음
             }
 
-            for output in graph.stream(inputs):
-                for key, value in output.items():
-                    final_output = value
+            with memory.scope(user_id), docstore.scope():
+                final_output = graph.invoke(inputs)
 
             print(f"🤖 답변: {final_output['generation']}")
 
@@ -0,0 +1,83 @@
+"""
+preprocess.py
+
+이 모듈은 검색 전 전처리(슬랭 해석, 라우팅, 검색 질의 재작성)를 구조화 출력 LLM 호출 한 번으로 합친 fused 전처리 노드를 제공합니다.
+기존(legacy) 방식은 검색 전에 슬랭 문맥 판단(slang.select_contextual_word), 라우팅(ToolSelector), 질의 재작성(rephrase)을
+차례로 호출하는데, 세 호출의 입력(질문 + 대화 이력)이 거의 같으므로 fused 방식은 이를 한 번의 왕복으로 처리합니다.
+
+구성:
+- `preprocess_question(state)`: 그래프 노드. '(슬랭/정식)' 표기를 붙인 질문과 압축된 대화 이력으로 `chains.Preprocessed`
+  (정규화된 질문, 도구, 차순위 도구, 검색 질의)를 한 번에 받아 state 갱신 값으로 반환
+- state["retrieval_query"]: 검색 노드가 재작성 호출 대신 사용
+- state["runner_up"]: 재라우팅 시 LLM 호출 없이 다음 도구로 사용 (router.re_route_question_adaptive)
+- 전처리 호출이 실패하면 legacy 라우팅(router.route_question_adaptive)으로 처리
+
+모드 (환경 변수 ADAPTIVE_RAG_PREPROCESS_MODE, 또는 `pipeline.build_adaptive_rag(preprocess_mode=...)`):
+- legacy (기본): 슬랭 → 라우팅 → 재작성을 각각 호출
+- fused: 이 모듈의 전처리 노드 사용
+
+A/B 비교:
+- 지연 시간 / 검색 전 LLM 호출 수: `python -m benchmarks.bench_preprocess`
+- 라우팅 정확도: 같은 질문 파일을 `batch.py --preprocess-mode legacy|fused`로 각각 실행해 결과의 route 비교
+"""
+
+import os
+
+from adaptive_rag.utils import router, slang
+from adaptive_rag.utils.chains import get_chain
+from adaptive_rag.utils.history import history_text as render_history
+from adaptive_rag.utils.memory import get_state_memory
+from adaptive_rag.utils.state import AdaptiveRagState
+
+PREPROCESS_MODES = ("legacy", "fused")
+
+# 그래프 전처리 방식
+PREPROCESS_MODE = os.environ.get("ADAPTIVE_RAG_PREPROCESS_MODE", "legacy")
+
+def resolve_mode(mode: str = None) -> str:
+    """
+    전처리 방식을 정한다 (None이면 PREPROCESS_MODE, 알 수 없는 값이면 legacy).
+    """
+    mode = (mode or PREPROCESS_MODE).strip().lower()
+    if mode not in PREPROCESS_MODES:
+        print(f"[PREPROCESS] 알 수 없는 전처리 방식({mode}), legacy로 실행합니다.")
+        return "legacy"
+    return mode
+
+def annotate_slang(question: str) -> str:
+    """
+    질문의 슬랭을 '(슬랭/정식표현)' 형태로 표기한다 (LLM 호출 없음, 슬랭이 없거나 슬랭 사전이 없으면 원문 그대로).
+    """
+    slang_dict = slang.slang_dict_or_empty()
+    if not any(s in question for s in slang_dict.keys()):
+        return question
+    return slang.slangword_translate(question, slang_dict)
+
+# fused 전처리 노드
+def preprocess_question(state: AdaptiveRagState) -> AdaptiveRagState:
+    annotated = annotate_slang(state["question"])
+    memory = get_state_memory(state)
+
+    try:
+        result = get_chain("preprocess").invoke({
+            "history": render_history(memory, "rephrase"),  # 누적 요약 + 최근 턴 (재작성용 토큰 상한)
+            "question": annotated,
+        })
+    except Exception as e:
+        # 전처리 실패(timeout, 구조화 출력 파싱 오류 등) 시 기존 방식으로 라우팅
+        print(f"[PREPROCESS ERROR] {str(e)}")
+        return router.route_question_adaptive(state)
+
+    # 빈 값은 LLM 없이 만들 수 있는 값으로 대신함
+    question = result.normalized_question.strip() or slang.strip_slang_markers(annotated)
+    tool = result.tool
+    runner_up = result.runner_up if result.runner_up != tool else "llm_fallback"
+    return {
+        "question": question,
+        "next_node": tool,
+        "runner_up": runner_up,
+        "retrieval_query": result.retrieval_query.strip() or question,
+        "prompt_key": tool.replace("search_", ""),
+        "visited_nodes": [tool],
+        "retried": False,
+    }
@@ -11,15 +11,20 @@ prompts.py
 - 전공 관련 도서 추천 프롬프트 (`get_book_prompt`)
 - 대학 및 학과 정보 제공 프롬프트 (`get_admission_prompt`)
 - fallback 응답용 rule-based 프롬프트 (`get_fallback_prompt`)
+- 라우팅/재라우팅/질문 재작성/대화 요약/관련성 판단/fused 전처리용 프롬프트
+- 모든 템플릿을 한 번만 생성해 두는 레지스트리 (`PROMPT_REGISTRY`)
 - 키워드 기반 프롬프트 선택 함수 (`get_prompt_by_key`)
+- 프롬프트별 캐시 가능한 prefix 길이 보고 (`prefix_report`)
+
+모든 프롬프트는 긴 고정 system 텍스트를 앞에, 요청마다 바뀌는 내용을 뒤에 두어 prefix 캐시가 적용되도록 구성합니다.
 """
 
 from langchain.prompts import ChatPromptTemplate
+from string import Formatter
+from textwrap import dedent
 
 #고교학점제 정책 질문에 대한 프롬프트
-def get_policy_prompt():
-    return ChatPromptTemplate.from_messages([
-        ("system", """You are an assistant that answers user questions using only the provided documents.  
+POLICY_SYSTEM = """You are an assistant that answers user questions using only the provided documents.  
 Follow all general and special rules exactly.
 
 ## General Rules
@@ -52,14 +57,17 @@ These expressions may be informal, abbreviated, or emotionally driven. Focus on
   If the user asks how 성취도/등급 are calculated, you can answer normally.
 
   Always end your answer with:**  
-"추가로 궁금한 점이 있다면 질문해주세요!"""),
-        ("human", "Answer using:\nDocuments: {documents}\nQuestion: {question}\nHistory: {history}")
+"추가로 궁금한 점이 있다면 질문해주세요!"""
+POLICY_HUMAN = "Answer using:\nDocuments: {documents}\nQuestion: {question}\nHistory: {history}"
+
+def get_policy_prompt():
+    return ChatPromptTemplate.from_messages([
+        ("system", POLICY_SYSTEM),
+        ("human", POLICY_HUMAN)
     ])
 
 #고등학교 과목 관련 질문용 프롬프트
-def get_subject_prompt():
-    return ChatPromptTemplate.from_messages([
-        ("system", """You are an assistant that answers user questions using only the provided documents.  
+SUBJECT_SYSTEM = """You are an assistant that answers user questions using only the provided documents.  
 Follow all general and special rules exactly.
 
 ## General Rules
@@ -77,14 +85,17 @@ Follow all general and special rules exactly.
 Respond with:  
 "그건 제가 도와드릴 수 없는 부분이에요. 😰 고교학점제, 입시, 서비스 등 궁금한 게 있다면 언제든지 물어봐 주세요!
 
-"""),
-        ("human", "Answer using:\nDocuments: {documents}\nQuestion: {question}\nHistory: {history}")
+"""
+SUBJECT_HUMAN = "Answer using:\nDocuments: {documents}\nQuestion: {question}\nHistory: {history}"
+
+def get_subject_prompt():
+    return ChatPromptTemplate.from_messages([
+        ("system", SUBJECT_SYSTEM),
+        ("human", SUBJECT_HUMAN)
     ])
 
 #세특 주제 추천용 프롬프트
-def get_seteuk_prompt():
-    return ChatPromptTemplate.from_messages([
-        ("system", """You are an assistant that answers user questions using only the provided documents.  
+SETEUK_SYSTEM = """You are an assistant that answers user questions using only the provided documents.  
 Follow all general and special rules exactly.
 
 ## General Rules
@@ -124,14 +135,17 @@ Respond with:
 
 - 최대한 사람마다 다른 주제를 추천합니다.
 
-"""),
-        ("human", "Answer using:\nDocuments: {documents}\nQuestion: {question}\nHistory: {history}")
+"""
+SETEUK_HUMAN = "Answer using:\nDocuments: {documents}\nQuestion: {question}\nHistory: {history}"
+
+def get_seteuk_prompt():
+    return ChatPromptTemplate.from_messages([
+        ("system", SETEUK_SYSTEM),
+        ("human", SETEUK_HUMAN)
     ])
 
 #전공 관련 도서 추천 프롬프트
-def get_book_prompt():
-    return ChatPromptTemplate.from_messages([
-        ("system", """You are an assistant that answers user questions using only the provided documents.  
+BOOK_SYSTEM = """You are an assistant that answers user questions using only the provided documents.  
 Follow all general and special rules exactly.
 
 ## General Rules
@@ -157,14 +171,17 @@ Respond with:
   저자:  
   요약:
 
-"""),
-        ("human", "{question}")
+"""
+BOOK_HUMAN = "{question}"
+
+def get_book_prompt():
+    return ChatPromptTemplate.from_messages([
+        ("system", BOOK_SYSTEM),
+        ("human", BOOK_HUMAN)
     ])
 
 #대학 및 학과 정보 제공 프롬프트
-def get_admission_prompt():
-    return ChatPromptTemplate.from_messages([
-        ("system", """You are an assistant that answers user questions using only the provided documents.  
+ADMISSION_SYSTEM = """You are an assistant that answers user questions using only the provided documents.  
 Follow all general and special rules exactly.
 
 ## General Rules
@@ -182,14 +199,17 @@ Follow all general and special rules exactly.
 Respond with:  
 "그건 제가 도와드릴 수 없는 부분이에요. 😰 고교학점제, 입시, 서비스 등 궁금한 게 있다면 언제든지 물어봐 주세요!
 
-"""),
-        ("human", "{question}")
+"""
+ADMISSION_HUMAN = "{question}"
+
+def get_admission_prompt():
+    return ChatPromptTemplate.from_messages([
+        ("system", ADMISSION_SYSTEM),
+        ("human", ADMISSION_HUMAN)
     ])
 
 # fallback 응답용 rule-based 프롬프트
-def get_fallback_prompt():
-    return ChatPromptTemplate.from_messages([
-        ("system", """
+FALLBACK_SYSTEM = """
 You are a strict rule-based fallback assistant.  
 You must interpret and respond to user messages accurately **even without external documents**.  
 Use your internal knowledge and classification rules to determine the best response, but **never guess or hallucinate information**.
@@ -237,18 +257,251 @@ Respond with:
 - Follow ethical and appropriate language at all times.
 - Do not use any profanity or hate speech.
 - 이전 대화 맥락을 고려하여 답변을 생성하세요.
-"""),
-        ("human", "{question}")
+"""
+FALLBACK_HUMAN = "{question}"
+
+# fallback 프롬프트의 고정 응답 (intent.py가 LLM 호출 없이 바로 사용)
+CANNED_REPLIES = {
+    "greeting": "안녕하세요! 😊 궁금한 점이 있다면 언제든지 물어봐 주세요!",
+    "farewell": "감사합니다. 다음에도 입시 관련 질문이 있다면 언제든지 물어봐주세요! 😊",
+    "out_of_scope": "그건 제가 도와드릴 수 없는 부분이에요. 😰 고교학점제, 입시, 서비스 등 궁금한 게 있다면 언제든지 물어봐 주세요!",
+}
+
+def get_fallback_prompt():
+    return ChatPromptTemplate.from_messages([
+        ("system", FALLBACK_SYSTEM),
+        ("human", FALLBACK_HUMAN)
+    ])
+
+# 질문 라우팅용 프롬프트 (router.py)
+ROUTE_SYSTEM = dedent("""You are a high school curriculum chatbot that classifies user questions into one of six categories.
+
+Use the following routing rules:
+
+- If the question is about how the 고교학점제 is operated—such as graduation requirements, subject completion standards, school-level implementation, course registration, or the 성취평가제—use the **search_policy** tool.
+
+- If it's a question about a particular school subject  
+  The content taught in each subject, subject selection criteria, subject classification, subject-related activities and 세특(세부특기 능력사항),  
+  (e.g., general choice, career choice), recommended subject based on career interest,  
+  Alternatively, the **subject grade calculation method (e.g., grading system, achievement)** — use the **search_subject** tool.  
+  👉 Use this tool **when the user is asking about the subject itself**: what the subject teaches, who should take it, or how it's evaluated.
+
+- If the question asks about university admissions or majors—such as what departments exist, what a certain major is about or teaches, what "계열" (academic tracks) are available, how entrance exams work, or how to prepare for 전형 types like 수시, 정시, 학과 and 학종—use the **search_admission** tool.  
+  For example, questions like “What do you learn in 호텔경영학과?” or “Tell me about 서울대 경영학과” belong here.  
+  If the user asks about a university, such as in "신한대학교에 대해 알려줘", extract only the key term immediately preceding "대학교" or "대" (e.g., "신한") and use it as the core search keyword.
+
+- If the question asks for book recommendations or summaries related to specific majors, subjects, or academic interests, use the **search_book** tool.
+
+- If the question asks for 세특 (세부능력 및 특기사항) topic suggestions—especially topic ideas, example activities, or related keywords—use the **search_seteuk** tool.  
+  👉 Use this tool **when the user is asking about what kind of 세특 activity or topic to write** related to a subject or major, such as:  
+  “세특 활동 추천해줘”, “어떤 탐구 주제를 쓰면 좋을까?”, “~~학과랑 연계된 수학 세특 주제가 궁금해”, "~~랑 관련된 주제 추천해줘".
+
+🟨 To clarify:
+Use the following rules to distinguish between 세특-related questions:
+
+1. If the question is about the **subject itself**, such as:  
+   - 과목의 개념이 궁금해요  
+   - 이 과목에서 뭘 배우나요?  
+   - 성취수준이 어떻게 되나요?  
+   → Use **search_subject**
+
+2. If the question is about **세특 topics related to a subject or major**, such as:  
+   - 수학이랑 관련된 세특 주제가 궁금해요  
+   - 경영학과에 맞는 세특 활동 추천해줘  
+   - 어떤 탐구 주제를 쓰면 좋을까?  
+   → Use **search_seteuk**
+
+3. If the question is about the **definition, rules, or writing method of 세특 itself**, such as:  
+   - 세특이 뭔가요?  
+   - 세특은 어떻게 작성하나요?  
+   - 생활기록부에는 세특을 어떻게 기재해요?  
+   → Use **search_policy**
+
+
+- 맥락을 고려하여서, 고등학교 과목에 대한 질문이라면 search_subject 툴을 사용하고, 대학 전공에 대한 질문이라면 search_admission 툴을 사용합니다.
+
+Always choose the single most relevant tool that best matches the user's intent.
+""")
+ROUTE_HUMAN = "{question}"
+
+def get_route_prompt():
+    return ChatPromptTemplate.from_messages([
+        ("system", ROUTE_SYSTEM),
+        ("human", ROUTE_HUMAN)
+    ])
+
+# 재라우팅용 프롬프트
+# 시도한 도구 목록(요청마다 바뀌는 값)은 고정된 라우팅 규칙 뒤에 두어야 provider 측 prefix 캐시가 유지됨
+RE_ROUTE_HINT = (
+    "🔁 현재까지 시도한 도구 목록: {visited}\n"
+    "이번에는 **이전에 시도하지 않은 도구 중에서 반드시 하나만** 선택해야 해.\n"
+    "⚠️ 절대 이전과 동일한 도구를 반복해서 선택하지 마.\n"
+    "만약 적절한 도구가 없다고 판단되면 'llm_fallback'을 선택해.\n"
+)
+
+def get_re_route_prompt():
+    return ChatPromptTemplate.from_messages([
+        ("system", ROUTE_SYSTEM),
+        ("system", RE_ROUTE_HINT),
+        ("human", ROUTE_HUMAN)
+    ])
+
+# 대화 이력 기반 질문 재작성 프롬프트 (search.py)
+REPHRASE_SYSTEM = "당신은 고도의 대화 이해 및 재작성 전문가입니다.아래 대화 이력을 꼼꼼히 분석하여, 사용자의 원래 의도를 온전히 반영하면서 핵심 정보를 보강하고 자연스럽고 간결한 질문으로 재작성해 주세요."
+REPHRASE_HUMAN = "대화 기록:\n{history}\n\n질문: {question}\n\n보완된 질문:"
+
+def get_rephrase_prompt():
+    return ChatPromptTemplate.from_messages([
+        ("system", REPHRASE_SYSTEM),
+        ("human", REPHRASE_HUMAN)
+    ])
+
+# fused 전처리 프롬프트 (preprocess.py)
+# 라우팅 규칙(ROUTE_SYSTEM)을 그대로 앞에 두어 라우팅 프롬프트와 같은 prefix 캐시를 사용
+PREPROCESS_HINT = (
+    "이번에는 도구 선택과 함께 검색 전 전처리를 한 번에 수행해.\n"
+    "1. normalized_question: 질문에 '(슬랭/정식표현)' 형태로 병기된 어구가 있으면 괄호마다 문맥상 더 적절한 어구 하나만 남겨. "
+    "괄호와 슬래시는 제거하고 그 외의 원래 텍스트(어미, 조사, 띄어쓰기 등)는 절대 바꾸지 마. 병기된 어구가 없으면 질문을 그대로 써.\n"
+    "2. tool: 위 라우팅 규칙에 따라 normalized_question에 가장 적합한 도구 하나.\n"
+    "3. runner_up: tool 다음으로 적합한 도구 하나 (tool과 달라야 하며, 없으면 'llm_fallback').\n"
+    "4. retrieval_query: 대화 기록을 참고해 사용자의 원래 의도를 온전히 반영하면서 핵심 정보를 보강한, 자연스럽고 간결한 검색용 질문.\n"
+)
+PREPROCESS_HUMAN = "대화 기록:\n{history}\n\n질문: {question}"
+
+def get_preprocess_prompt():
+    return ChatPromptTemplate.from_messages([
+        ("system", ROUTE_SYSTEM),
+        ("system", PREPROCESS_HINT),
+        ("human", PREPROCESS_HUMAN)
+    ])
+
+# 대화 요약 프롬프트 (history.py)
+SUMMARY_SYSTEM = (
+    "당신은 대화 요약 전문가입니다.\n"
+    "기존 요약과 새로 추가된 대화를 합쳐, 이후 질문을 이해하는 데 필요한 정보(희망 학과, 관심 과목, 이미 추천받은 책/주제, 질문 의도 등)만 남긴 "
+    "간결한 한국어 요약을 작성하세요.\n"
+    "표, 목록, 인사말은 옮기지 말고 핵심 사실만 3문장 이내로 정리하세요."
+)
+SUMMARY_HUMAN = "기존 요약:\n{summary}\n\n새 대화:\n{turns}\n\n갱신된 요약:"
+
+def get_summary_prompt():
+    return ChatPromptTemplate.from_messages([
+        ("system", SUMMARY_SYSTEM),
+        ("human", SUMMARY_HUMAN)
+    ])
+
+# 관련성 판단 프롬프트 (check.py)
+CHECK_SYSTEM = (
+    "너는 고등학생의 질문에 답변하는 교육 챗봇을 위한 RAG 평가 전문가야.\n"
+    "사용자의 질문과 아래 문서들이 **논리적으로 연결되어 답변이 가능한지**를 판단해.\n\n"
+    "문서가 학생의 질문에 의미 있는 정보를 제공할 수 있어야 해.\n"
+    "너는 논리적인 판단을 하는 전문가이므로, 철저하게 **학생의 질문에 문서가 응답 가능할지를 기준으로** 판단해야 해.\n\n"
+    "사용자의 질문과 아래 문서들이 **의미적으로 연결되어 있고**, 문서가 질문에 답할 수 있는 실질적 정보를 담고 있는지를 판단해.\n\n"
+    "질문과 문서의 단어가 정확히 일치하지 않더라도, 같은 주제를 다루거나 관련 맥락이 담겨 있다면 '1'을 줘.\n"
+    "반대로 전혀 다른 주제거나, 질문의 의도와 무관한 정보만 있다면 '0'을 줘.\n\n"
+    "단, **가능한 한 유연하게 판단**하되, 문서가 질문에 대해 의미 있는 힌트나 정보, 규정을 제공하지 않으면 '0'으로 판단해야 해.\n\n"
+    "출력은 반드시 숫자 '1' 또는 '0' 중 하나로만 해야 해.\n"
+    "절대 설명이나 다른 텍스트를 추가하지 마.\n"
+    "무조건 1 또는 0만 단독으로 출력해야 해."
+)
+CHECK_HUMAN = "질문: {question}\n\n문서 미리보기:\n{docs}\n\n관련 여부만 숫자로 답해:"
+
+def get_check_prompt():
+    return ChatPromptTemplate.from_messages([
+        ("system", CHECK_SYSTEM),
+        ("human", CHECK_HUMAN)
     ])
 
-# 주제 키 → 함수 매핑 딕셔너리
+# 프롬프트 키 → 생성 함수 매핑
+PROMPT_BUILDERS = {
+    "policy": get_policy_prompt,
+    "subject": get_subject_prompt,
+    "seteuk": get_seteuk_prompt,
+    "book": get_book_prompt,
+    "admission": get_admission_prompt,
+    "fallback": get_fallback_prompt,
+    "route": get_route_prompt,
+    "re_route": get_re_route_prompt,
+    "rephrase": get_rephrase_prompt,
+    "summary": get_summary_prompt,
+    "check": get_check_prompt,
+    "preprocess": get_preprocess_prompt,
+}
+
+# 모든 템플릿을 import 시점에 한 번만 생성해 두는 레지스트리
+PROMPT_REGISTRY = {key: builder() for key, builder in PROMPT_BUILDERS.items()}
+
+# 주제 키 → 프롬프트 조회 (매 요청마다 템플릿을 새로 만들지 않음)
 def get_prompt_by_key(key: str):
-    prompt_map = {
-        "policy": get_policy_prompt,
-        "subject": get_subject_prompt,
-        "seteuk": get_seteuk_prompt,
-        "book": get_book_prompt,
-        "admission": get_admission_prompt,
-        "fallback": get_fallback_prompt
-    }
-    return prompt_map.get(key, lambda: None)()
+    return PROMPT_REGISTRY.get(key)
+
+def _static_prefix(prompt: ChatPromptTemplate) -> str:
+    """
+    템플릿에서 첫 번째 입력 변수가 나오기 전까지의 고정 텍스트를 반환한다.
+    provider 측 prompt prefix 캐시는 이 구간까지만 재사용할 수 있다.
+    """
+    parts = []
+    for message in prompt.messages:
+        template = message.prompt.template
+        for literal, field, _, _ in Formatter().parse(template):
+            parts.append(literal.replace("{{", "{").replace("}}", "}"))
+            if field is not None:
+                return "".join(parts)
+    return "".join(parts)
+
+# tiktoken 인코더 (최초 사용 시 한 번만 로드, 실패하면 False로 기록해 다시 시도하지 않음)
+_encoder = None
+
+def _get_encoder():
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoder = False
+    return _encoder
+
+def count_tokens(text: str) -> int:
+    """
+    gpt-4o 계열 토크나이저 기준 토큰 수. tiktoken을 쓸 수 없으면 문자 수 기반으로 근사한다.
+    """
+    encoder = _get_encoder()
+    if encoder is False:
+        return len(text) // 2
+    return len(encoder.encode(text))
+
+def truncate_tokens(text: str, max_tokens: int, keep: str = "head") -> str:
+    """
+    텍스트를 count_tokens와 같은 기준의 토큰 수로 잘라 max_tokens 이하로 만든다.
+
+    Args:
+        keep (str): "head"면 앞부분, "tail"이면 뒷부분을 남김
+    """
+    if max_tokens <= 0:
+        return ""
+    encoder = _get_encoder()
+    if encoder is False:
+        chars = max_tokens * 2
+        if len(text) <= chars:
+            return text
+        return text[:chars] if keep == "head" else text[-chars:]
+    tokens = encoder.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    tokens = tokens[:max_tokens] if keep == "head" else tokens[-max_tokens:]
+    # 자른 경계가 한글 글자(여러 바이트)의 중간이면 깨진 문자가 생기므로 제거
+    return encoder.decode(tokens).strip("\ufffd")
+
+def prefix_report() -> dict:
+    """
+    프롬프트별 캐시 가능한 고정 prefix 길이를 반환한다.
+
+    Returns:
+        dict: {프롬프트 키: {"chars": 문자 수, "tokens": 토큰 수}}
+    """
+    report = {}
+    for key, prompt in PROMPT_REGISTRY.items():
+        prefix = _static_prefix(prompt)
+        report[key] = {"chars": len(prefix), "tokens": count_tokens(prefix)}
+    return report
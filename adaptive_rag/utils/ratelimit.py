@@ -0,0 +1,97 @@
+"""
+ratelimit.py
+
+이 모듈은 외부 provider(OpenAI, Cohere, Pinecone) 호출 속도를 제한하기 위한 token bucket 구현을 제공합니다.
+
+제공 기능:
+- 분당 허용량 기반 token bucket (`TokenBucket`)
+- provider별 bucket 묶음 (`ProviderRateLimiter`)
+- 실제 사용량 기반 보정 (`TokenBucket.adjust`, 분당 토큰 한도처럼 사용량을 호출 후에 알 수 있는 경우)
+"""
+
+import threading
+import time
+
+class TokenBucket:
+    """
+    분당 허용량(per_minute)만큼 토큰이 선형으로 다시 채워지는 token bucket.
+    burst 크기는 기본적으로 1초 분량(최소 1)으로 잡는다.
+    """
+
+    def __init__(self, per_minute: float, burst: float = None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float = 1.0) -> float:
+        """
+        토큰을 차감하지 않고, amount만큼 얻으려면 기다려야 할 시간(초)을 반환한다 (바로 가능하면 0).
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            need = min(amount, self.capacity)
+            return 0.0 if self._tokens >= need else (need - self._tokens) / self.rate
+
+    def try_acquire(self, amount: float = 1.0) -> float:
+        """
+        토큰을 바로 차감할 수 있으면 0을, 아니면 기다려야 할 시간(초)을 반환한다 (차감하지 않음).
+        bucket 용량보다 큰 요청은 bucket이 가득 찼을 때 통과시킨다.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            need = min(amount, self.capacity)
+            if self._tokens >= need:
+                self._tokens -= amount
+                return 0.0
+            return (need - self._tokens) / self.rate
+
+    def adjust(self, delta: float):
+        """
+        이미 차감한 양을 실제 사용량에 맞게 보정한다 (delta > 0이면 추가 차감, 음수가 되면 이후 대기 시간이 늘어남).
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens - delta)
+
+    def acquire(self, amount: float = 1.0, timeout: float = None) -> bool:
+        """
+        토큰을 얻을 때까지 대기한다. timeout 안에 얻지 못하면 False를 반환한다.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(amount)
+            if wait == 0.0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+class ProviderRateLimiter:
+    """
+    provider 이름별 TokenBucket 묶음
+
+    사용 예:
+        limiter = ProviderRateLimiter({"openai": 500, "cohere": 100})
+        limiter.acquire({"openai": 6, "cohere": 2})
+    """
+
+    def __init__(self, per_minute: dict):
+        self.buckets = {name: TokenBucket(rpm) for name, rpm in per_minute.items() if rpm}
+
+    def acquire(self, costs: dict) -> float:
+        """
+        provider별 비용만큼 토큰을 얻을 때까지 대기하고, 대기한 시간(초)을 반환한다.
+        """
+        t0 = time.monotonic()
+        for name, amount in costs.items():
+            bucket = self.buckets.get(name)
+            if bucket is not None and amount:
+                bucket.acquire(amount)
+        return time.monotonic() - t0
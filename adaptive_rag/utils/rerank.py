@@ -0,0 +1,267 @@
+"""
+rerank.py
+
+이 모듈은 검색마다 Cohere 리랭크가 결과를 바꿀 수 있는지 판단해, 벡터 점수만으로 결과가 분명하면 리랭크 호출을 건너뛰는
+adaptive reranking을 제공합니다. tools.py의 네임스페이스 리트리버(`AdaptiveCompressionRetriever`)가 사용합니다.
+
+판단 규칙 (위에서부터 먼저 맞는 규칙, reason으로 기록):
+- empty: 후보가 없음 → 건너뜀
+- fits: 후보 수가 top_n 이하 → 리랭크해도 같은 문서 집합(순서만 바뀜)이므로 건너뜀
+- gap: 1위 벡터 점수가 2위보다 gap 이상 앞섬 (1위 문서가 분명) → 건너뜀
+- margin: top_n번째와 top_n+1번째 점수 차가 margin 이상 (상위 top_n 집합이 분명) → 건너뜀
+- close: 그 밖 → 리랭크
+건너뛰면 벡터 점수 순 상위 top_n 문서를 사용합니다. 네임스페이스별 gap/margin은 NAMESPACE_RULES로 바꿀 수 있습니다 (None이면 그 규칙 사용 안 함).
+
+턴 마감(deadline.py): 벡터 검색과 리랭크는 SDK 기본 timeout(HTTP_READ_TIMEOUT) 대신 턴의 남은 예산(`deadline.bounded`) 안에서만 기다림
+- 벡터 검색이 시간 안에 끝나지 않으면 후보 없음으로 처리 (검색 노드가 "관련 정보 없음" 안내와 fallback 프롬프트 사용)
+- 리랭크가 시간 안에 끝나지 않으면 벡터 점수 순 상위 top_n 문서를 사용 (decision="timeout")
+
+정확도 비용 기록:
+- 건너뛴 검색 중 ADAPTIVE_RERANK_AUDIT_RATE 비율은 백그라운드에서 리랭크도 실행해 결과 차이를 기록 (응답에는 벡터 순 결과 사용)
+- ADAPTIVE_RERANK=shadow: 판단만 기록하고 항상 리랭크 결과 사용 (모든 판단의 정확도 비용 기록)
+- overlap: 벡터 순 상위 top_n 중 리랭크 상위 top_n에도 든 비율 / top1_match: 1위 문서 일치 여부
+- 메트릭: adaptive_rag_rerank_decisions_total{namespace, decision, reason},
+  adaptive_rag_rerank_audit_overlap{namespace} (histogram), adaptive_rag_rerank_audit_top1_miss_total{namespace}
+- RERANK_DECISION_LOG를 지정하면 판단마다 JSONL 한 줄 (벡터 점수, 판단, 리랭크가 고른 후보 순번)
+  → `python -m adaptive_rag.utils.rerank tune <log>`로 기록된 트래픽에서 gap/margin 조합별 건너뜀 비율과 정확도 비용을 다시 계산
+
+설정 (환경 변수):
+- ADAPTIVE_RERANK=on | off | shadow (기본 on, off면 항상 리랭크)
+- ADAPTIVE_RERANK_GAP / ADAPTIVE_RERANK_MARGIN (기본 0.1 / 0.06, 코사인 유사도 차)
+- ADAPTIVE_RERANK_AUDIT_RATE (기본 0.05)
+- RERANK_DECISION_LOG (JSONL 경로, 기본 기록 안 함)
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+from langchain.retrievers.contextual_compression import ContextualCompressionRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+
+from adaptive_rag.utils import deadline, metrics, tracing
+
+RERANK_MODES = ("on", "off", "shadow")
+
+ADAPTIVE_RERANK = os.environ.get("ADAPTIVE_RERANK", "on").strip().lower()
+DEFAULT_GAP = float(os.environ.get("ADAPTIVE_RERANK_GAP", "0.1"))
+DEFAULT_MARGIN = float(os.environ.get("ADAPTIVE_RERANK_MARGIN", "0.06"))
+AUDIT_RATE = float(os.environ.get("ADAPTIVE_RERANK_AUDIT_RATE", "0.05"))
+DECISION_LOG = os.environ.get("RERANK_DECISION_LOG")
+
+# 네임스페이스별 규칙 (지정하지 않은 값은 기본값)
+NAMESPACE_RULES = {
+    # 대학/학과 이름만 다른 문서가 많아 1위가 앞서도 나머지 top_n은 촘촘함 → 1위 gap만으로는 건너뛰지 않음
+    "admission": {"gap": None},
+}
+
+# 로그에 남길 벡터 점수 수 (top_n + 여유분)
+LOG_SCORES = 12
+
+class RerankPolicy:
+    """
+    네임스페이스 / 벡터 점수 / top_n으로 리랭크 여부를 정하는 규칙과 감사(audit) 설정
+    """
+
+    def __init__(self, mode: str = ADAPTIVE_RERANK, gap: float = DEFAULT_GAP, margin: float = DEFAULT_MARGIN,
+                 audit_rate: float = AUDIT_RATE, rules: dict = None, seed: int = None):
+        if mode not in RERANK_MODES:
+            print(f"[RERANK] 알 수 없는 ADAPTIVE_RERANK 값({mode}), on으로 실행합니다.")
+            mode = "on"
+        self.mode = mode
+        self.gap = gap
+        self.margin = margin
+        self.audit_rate = audit_rate
+        self.rules = NAMESPACE_RULES if rules is None else rules
+        self._rng = random.Random(seed)
+
+    def thresholds(self, namespace: str) -> tuple:
+        rule = self.rules.get(namespace, {})
+        return rule.get("gap", self.gap), rule.get("margin", self.margin)
+
+    def decide(self, namespace: str, scores: List[float], top_n: int) -> tuple:
+        """
+        Returns:
+            tuple: (리랭크 여부, reason)
+        """
+        if not scores:
+            return False, "empty"
+        if len(scores) <= top_n:
+            return False, "fits"
+        gap, margin = self.thresholds(namespace)
+        if gap is not None and scores[0] - scores[1] >= gap:
+            return False, "gap"
+        if margin is not None and scores[top_n - 1] - scores[top_n] >= margin:
+            return False, "margin"
+        return True, "close"
+
+    def should_audit(self) -> bool:
+        return self.audit_rate > 0 and self._rng.random() < self.audit_rate
+
+# 프로세스 전역 규칙
+policy = RerankPolicy()
+
+_log_lock = threading.Lock()
+_audit_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rerank-audit")
+
+def rerank_order(candidates: List[Document], reranked: List[Document]) -> List[int]:
+    """
+    리랭크 결과 문서가 벡터 후보 목록의 몇 번째였는지 (리랭커는 문서를 복사해 돌려주므로 본문으로 찾음)
+    """
+    positions = {}
+    for i, doc in enumerate(candidates):
+        positions.setdefault(doc.page_content, []).append(i)
+    order = []
+    for doc in reranked:
+        slots = positions.get(doc.page_content)
+        if slots:
+            order.append(slots.pop(0))
+    return order
+
+def accuracy_cost(order: List[int], top_n: int) -> dict:
+    """
+    벡터 순 상위 top_n을 썼을 때 리랭크 결과와의 차이 (overlap, top1_match)
+    """
+    if not order:
+        return {"overlap": 1.0, "top1_match": True}
+    chosen = set(order[:top_n])
+    kept = sum(1 for i in range(min(top_n, len(order))) if i in chosen)
+    return {"overlap": round(kept / min(top_n, len(order)), 3), "top1_match": order[0] == 0}
+
+def record(entry: dict):
+    """
+    판단 1건을 메트릭과 (설정 시) 판단 로그에 기록한다.
+    """
+    if "overlap" in entry:
+        metrics.observe("adaptive_rag_rerank_audit_overlap", entry["overlap"], namespace=entry["namespace"])
+        if not entry["top1_match"]:
+            metrics.inc("adaptive_rag_rerank_audit_top1_miss_total", namespace=entry["namespace"])
+    if DECISION_LOG:
+        line = json.dumps(entry, ensure_ascii=False)
+        with _log_lock:
+            with open(DECISION_LOG, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+def _audit(compressor, candidates: List[Document], query: str, entry: dict):
+    try:
+        order = rerank_order(candidates, list(compressor.compress_documents(candidates, query)))
+    except Exception as e:
+        print(f"[RERANK ERROR] 감사용 리랭크 실패: {e}")
+        return
+    record({**entry, "audited": True, "rerank_order": order, **accuracy_cost(order, entry["top_n"])})
+
+class AdaptiveCompressionRetriever(ContextualCompressionRetriever):
+    """
+    벡터 점수로 리랭크 여부를 판단하는 ContextualCompressionRetriever
+    (base_retriever는 VectorStoreRetriever, base_compressor는 top_n개를 돌려주는 리랭커)
+    """
+
+    namespace: str
+    top_n: int
+    policy: Optional[Any] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun,
+                                **kwargs: Any) -> List[Document]:
+        search_kwargs = {**self.base_retriever.search_kwargs, **kwargs}
+        k = search_kwargs.pop("k", 4)
+        try:
+            scored = deadline.bounded("vector", lambda: self.base_retriever.vectorstore.similarity_search_with_score(
+                query, k=k, **search_kwargs))
+        except TimeoutError as e:
+            print(f"[VECTOR TIMEOUT] {self.namespace}: {e}")
+            return []
+        candidates = [doc for doc, _ in scored]
+        scores = [float(score) for _, score in scored]
+
+        rules = self.policy or policy
+        if rules.mode == "off":
+            rerank, reason = bool(candidates), "off"
+        else:
+            rerank, reason = rules.decide(self.namespace, scores, self.top_n)
+        entry = {"namespace": self.namespace, "top_n": self.top_n, "candidates": len(candidates),
+                 "scores": [round(s, 4) for s in scores[:LOG_SCORES]], "reason": reason}
+
+        if rerank or (rules.mode == "shadow" and candidates):
+            tracing.record_call("rerank")
+            try:
+                reranked = deadline.bounded("rerank", lambda: list(
+                    self.base_compressor.compress_documents(candidates, query, callbacks=run_manager.get_child())))
+            except TimeoutError as e:
+                # 턴 예산 안에 리랭크가 끝나지 않으면 벡터 점수 순 결과 사용
+                print(f"[RERANK TIMEOUT] {self.namespace}: {e}")
+                metrics.inc("adaptive_rag_rerank_decisions_total", namespace=self.namespace, decision="timeout", reason=reason)
+                record({**entry, "decision": "timeout"})
+                return candidates[:self.top_n]
+            if rerank:
+                metrics.inc("adaptive_rag_rerank_decisions_total", namespace=self.namespace, decision="rerank", reason=reason)
+                record({**entry, "decision": "rerank", "rerank_order": rerank_order(candidates, reranked)})
+            else:
+                # shadow: 건너뛸 판단이었지만 리랭크 결과를 쓰고 차이만 기록
+                order = rerank_order(candidates, reranked)
+                metrics.inc("adaptive_rag_rerank_decisions_total", namespace=self.namespace, decision="shadow_skip", reason=reason)
+                record({**entry, "decision": "shadow_skip", "rerank_order": order, **accuracy_cost(order, self.top_n)})
+            return reranked
+
+        metrics.inc("adaptive_rag_rerank_decisions_total", namespace=self.namespace, decision="skip", reason=reason)
+        if len(candidates) > self.top_n and rules.should_audit():
+            _audit_executor.submit(_audit, self.base_compressor, candidates, query, {**entry, "decision": "skip"})
+        else:
+            record({**entry, "decision": "skip"})
+        return candidates[:self.top_n]
+
+# ---------------------------------------------------------------------------
+# 기록된 판단으로 gap/margin 다시 계산
+# ---------------------------------------------------------------------------
+
+def load_log(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def tune(entries: list, gaps: list, margins: list) -> dict:
+    """
+    기록된 판단을 gap/margin 조합별로 다시 판단해 네임스페이스별 건너뜀 비율과 정확도 비용을 계산한다.
+    정확도 비용은 리랭크 결과(rerank_order)가 있는 기록 중 새 조합에서 건너뛰게 되는 기록으로 계산한다
+    (shadow 모드 로그면 모든 기록에 리랭크 결과가 있음).
+    """
+    report = {}
+    for namespace in sorted({e["namespace"] for e in entries}):
+        rows = [e for e in entries if e["namespace"] == namespace]
+        results = []
+        for gap in gaps:
+            for margin in margins:
+                rules = RerankPolicy(mode="on", gap=gap, margin=margin, audit_rate=0, rules={})
+                skipped, costs = 0, []
+                for e in rows:
+                    rerank, _ = rules.decide(namespace, e["scores"], e["top_n"])
+                    if rerank:
+                        continue
+                    skipped += 1
+                    if e.get("rerank_order") is not None:
+                        costs.append(accuracy_cost(e["rerank_order"], e["top_n"]))
+                results.append({
+                    "gap": gap, "margin": margin,
+                    "skip_rate": round(skipped / len(rows), 3),
+                    "measured": len(costs),
+                    "overlap": round(sum(c["overlap"] for c in costs) / len(costs), 3) if costs else None,
+                    "top1_match": round(sum(c["top1_match"] for c in costs) / len(costs), 3) if costs else None,
+                })
+        report[namespace] = {"decisions": len(rows), "grid": results}
+    return report
+
+def _floats(text: str) -> list:
+    return [float(v) for v in text.split(",") if v.strip()]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="adaptive rerank 판단 로그 분석")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_tune = sub.add_parser("tune", help="gap/margin 조합별 건너뜀 비율과 정확도 비용")
+    p_tune.add_argument("log", help="RERANK_DECISION_LOG JSONL")
+    p_tune.add_argument("--gaps", default="0.05,0.1,0.15,0.2")
+    p_tune.add_argument("--margins", default="0.03,0.06,0.1")
+    args = parser.parse_args()
+    print(json.dumps(tune(load_log(args.log), _floats(args.gaps), _floats(args.margins)), ensure_ascii=False, indent=2))
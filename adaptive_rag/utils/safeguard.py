@@ -1,8 +1,21 @@
-from transformers import TextClassificationPipeline, BertForSequenceClassification, AutoTokenizer
+import os
+import threading
+import time
+
 from adaptive_rag.utils.state import AdaptiveRagState
 
-# 최초 1회만 실행해서 모델 로딩
+# kor_unsmile 모델 (transformers/torch import와 모델 로딩이 무거우므로 처음 쓸 때 한 번만 로드, API 서버는 boot 단계에서 미리 로드)
+_unsmile_pipe = None
+_unsmile_lock = threading.Lock()
+
+# 로드 실패 후 다시 로드하기까지 기다릴 시간(초). 그동안은 요청마다 모델을 다시 로드하지 않고 바로 예외
+SAFEGUARD_RETRY_INTERVAL = float(os.environ.get("SAFEGUARD_RETRY_INTERVAL", "30"))
+_load_error = None
+_failed_at = None
+
 def load_unsmile_pipeline(device: int = -1):
+    from transformers import TextClassificationPipeline, BertForSequenceClassification, AutoTokenizer
+
     model_name = 'smilegate-ai/kor_unsmile'
     model = BertForSequenceClassification.from_pretrained(model_name)
     tokenizer = AutoTokenizer.from_pretrained(model_name)
@@ -14,22 +27,37 @@ def load_unsmile_pipeline(device: int = -1):
         function_to_apply='sigmoid'
     )
 
-unsmile_pipe = load_unsmile_pipeline(device=-1)
+def get_unsmile_pipeline():
+    """
+    공유 kor_unsmile 파이프라인. 로드에 실패하면 SAFEGUARD_RETRY_INTERVAL 동안은 다시 로드하지 않고 같은 예외를 올린다.
+    """
+    global _unsmile_pipe, _load_error, _failed_at
+    if _unsmile_pipe is None:
+        with _unsmile_lock:
+            if _unsmile_pipe is None:
+                if _failed_at is not None and time.monotonic() - _failed_at < SAFEGUARD_RETRY_INTERVAL:
+                    raise RuntimeError(f"kor_unsmile 모델을 불러오지 못했습니다: {_load_error}")
+                try:
+                    _unsmile_pipe = load_unsmile_pipeline(device=-1)
+                except Exception as e:
+                    _load_error, _failed_at = f"{type(e).__name__}: {e}", time.monotonic()
+                    raise
+                _load_error = _failed_at = None
+    return _unsmile_pipe
 
 def profanity_prevention(
     state: dict,
-    pipe: TextClassificationPipeline = unsmile_pipe
+    pipe=None
 ) -> dict:
     question = state.get("question", "")
     if not question.strip():
-        return state
+        return {}
 
-    result = pipe(question)[0]
+    result = (pipe or get_unsmile_pipeline())(question)[0]
     scores = {r['label']: r['score'] for r in result}
 
     if scores.get('악플/욕설', 0) > 0.5 or scores.get('clean', 1) < 0.3:
         new_state = {
-            **state,
             "generation": """죄송합니다. 입력하신 질문에 부적절한 표현이 포함되어 있어 답변을 드릴 수 없습니다. 😰
 욕설이나 비속어 없이 다시 질문해 주시기 바랍니다. 🙏🏻""",
             "stop": True
@@ -37,10 +65,13 @@ def profanity_prevention(
 
         return new_state
 
-    return state
+    return {}
 
 
 def check_profanity_result(state):
     if state.get("stop"):
         return "__end__"
-    return "route_question_adaptive"
\ No newline at end of file
+    # 고정 응답 의도로 분류된 메시지는 욕설 검사만 거친 뒤 고정 응답 (intent.py)
+    if state.get("intent"):
+        return "canned_response"
+    return "route_question_adaptive"
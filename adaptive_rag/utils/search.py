@@ -1,16 +1,12 @@
 from dotenv import load_dotenv
 import os
-from langchain_openai import ChatOpenAI
 from adaptive_rag.utils.state import AdaptiveRagState
-from adaptive_rag.utils import tools
-from adaptive_rag.utils.memory import get_user_memory
-from langchain_core.prompts import ChatPromptTemplate
+from adaptive_rag.utils import deadline, docstore, filters, metrics, tools
+from adaptive_rag.utils.memory import get_state_memory
+from adaptive_rag.utils.history import history_text as render_history
+from adaptive_rag.utils.chains import llm, get_chain
 
-from langchain.memory import ConversationBufferWindowMemory
-from datetime import datetime, timedelta
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser  
+from langchain_core.documents import Document
 
 # API 키 정보 로드
 load_dotenv()
@@ -18,109 +14,116 @@ load_dotenv()
 # API 키 읽어오기
 openai_api_key = os.environ.get('OPENAI_API_KEY')
 
-# 기본 LLM
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, streaming=True)
+# 턴 예산이 부족할 때 검색 k를 줄이는 비율
+SMALL_K_RATIO = 0.5
 
 def rephrase_question_with_history(memory, current_question):
-    history = memory.chat_memory.messages[-5:]  # 최근 5개만
-    history_text = "\n".join([
-        f"User: {m.content}" if isinstance(m, HumanMessage) else f"Bot: {m.content}"
-        for m in history
-    ])
-
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", "당신은 고도의 대화 이해 및 재작성 전문가입니다.아래 대화 이력을 꼼꼼히 분석하여, 사용자의 원래 의도를 온전히 반영하면서 핵심 정보를 보강하고 자연스럽고 간결한 질문으로 재작성해 주세요."),
-        ("human", f"대화 기록:\n{history_text}\n\n질문: {current_question}\n\n보완된 질문:")
-    ])
-
-    rephrase_chain = prompt | llm | StrOutputParser()
-    enriched = rephrase_chain.invoke({"question": current_question})
+    history_text = render_history(memory, "rephrase")  # 누적 요약 + 최근 턴 (재작성용 토큰 상한)
+
+    # 재작성 체인 실행 (대화 이력과 질문은 템플릿 변수로 전달)
+    try:
+        enriched = get_chain("rephrase").invoke({
+            "history": history_text,
+            "question": current_question
+        })
+    except Exception as e:
+        # 재작성 실패(timeout 등) 시 원래 질문으로 검색
+        print(f"[REPHRASE ERROR] {str(e)}")
+        return current_question
     return enriched
 
-def search_policy_adaptive(state: AdaptiveRagState):
+def retrieval_query(state: AdaptiveRagState) -> str:
     """
-    Node for searching information in the 고교학점제 운영
+    검색에 사용할 질의. fused 전처리가 재작성한 질의가 있으면 그대로 쓰고, 없으면 대화 이력으로 재작성한다.
     """
-    question = state["question"]
-    user_id = state.get("user_id", "anonymous")
-    memory = get_user_memory(user_id)
+    if state.get("retrieval_query"):
+        return state["retrieval_query"]
+    return rephrase_question_with_history(get_state_memory(state), state["question"])
 
-    # 질문 리프레이징
-    enriched_question = rephrase_question_with_history(memory, question)
+def retrieve_for_state(state: AdaptiveRagState, namespace: str, query: str, k: int = None, filter: dict = None) -> dict:
+    """
+    검색 결과로 갱신할 state 값. 턴 예산이 부족하면 k를 줄여 검색하고 degradations에 기록한다.
+    k를 주지 않으면 네임스페이스 기본 k, filter는 벡터 검색 메타데이터 필터.
+    """
+    if deadline.should_degrade(state, "small_k"):
+        k = max(2, int((k or tools.default_k(namespace)) * SMALL_K_RATIO))
+        return {"documents": tools.retrieve(namespace, query, k=k, filter=filter), "degradations": deadline.degrade(state, "small_k")}
+    return {"documents": tools.retrieve(namespace, query, k=k, filter=filter)}
 
-    docs = tools.search_policy.invoke(enriched_question)
+def retrieve_filtered(state: AdaptiveRagState, namespace: str, query: str) -> dict:
+    """
+    category와 질문의 개체(대학, 학과, 과목, 계열, 학년)로 만든 메타데이터 필터로 후보를 좁혀 검색하고,
+    필터에 맞는 문서가 없으면 기존처럼 네임스페이스 전체에서 검색한다.
+    """
+    metadata_filter = filters.build(namespace, query, state.get("category"))
+    if not metadata_filter:
+        return retrieve_for_state(state, namespace, query)
+
+    k = filters.filtered_k(tools.default_k(namespace))
+    result = retrieve_for_state(state, namespace, query, k=k, filter=metadata_filter)
+    if tools.found(result["documents"]):
+        metrics.inc("adaptive_rag_prefilter_total", namespace=namespace, outcome="hit")
+        return result
+    metrics.inc("adaptive_rag_prefilter_total", namespace=namespace, outcome="miss")
+    return {**result, **retrieve_for_state({**state, **result}, namespace, query)}
+
+def to_state_update(namespace: str, result: dict) -> dict:
+    """
+    검색 결과를 state 갱신 값으로 바꾼다. 문서는 요청 단위 문서 테이블에 넣고 state에는 ID만 남긴다 (docstore.py).
+    검색된 문서가 없으면 안내 문서 하나와 fallback 프롬프트를 사용한다.
+    """
+    update = {k: v for k, v in result.items() if k != "documents"}
+    docs = result["documents"]
     if len(docs) > 0:
-        return {**state, "documents": docs}
+        return {**update, "doc_ids": docstore.add(namespace, docs)}
     else:
-        return {**state, "documents": [Document(page_content="관련 정보를 찾을 수 없습니다")], "prompt_key": "fallback"}
+        return {**update, "doc_ids": docstore.add(namespace, [Document(page_content="관련 정보를 찾을 수 없습니다")]), "prompt_key": "fallback"}
+
+def search_policy_adaptive(state: AdaptiveRagState):
+    """
+    Node for searching information in the 고교학점제 운영
+    """
+    # 질문 리프레이징 (fused 전처리 결과가 있으면 재사용)
+    enriched_question = retrieval_query(state)
+
+    return to_state_update("policy", retrieve_filtered(state, "policy", enriched_question))
 
 
 def search_subject_adaptive(state: AdaptiveRagState):
     """
     Node for searching information in the subject whthin the 고교학점제
     """
-    question = state["question"]
-    user_id = state.get("user_id", "anonymous")
-    memory = get_user_memory(user_id)
-
-    # 질문 리프레이징
-    enriched_question = rephrase_question_with_history(memory, question)
+    # 질문 리프레이징 (fused 전처리 결과가 있으면 재사용)
+    enriched_question = retrieval_query(state)
 
-    docs = tools.search_subject.invoke(enriched_question)
+    return to_state_update("subject", retrieve_filtered(state, "subject", enriched_question))
 
-    if len(docs) > 0:
-        return {**state, "documents": docs}
-    else:
-        return {**state, "documents": [Document(page_content="관련 정보를 찾을 수 없습니다")], "prompt_key": "fallback"}
 
 def search_admission_adaptive(state: AdaptiveRagState):
     """
     Node for searching information in the admission
     """
-    question = state["question"]
-    user_id = state.get("user_id", "anonymous")
-    memory = get_user_memory(user_id)
+    # 질문 리프레이징 (fused 전처리 결과가 있으면 재사용)
+    enriched_question = retrieval_query(state)
 
-    # 질문 리프레이징
-    enriched_question = rephrase_question_with_history(memory, question)
+    return to_state_update("admission", retrieve_filtered(state, "admission", enriched_question))
 
-    docs = tools.search_admission.invoke(enriched_question)
-    if len(docs) > 0:
-        return {**state, "documents": docs}
-    else:
-        return {**state, "documents": [Document(page_content="관련 정보를 찾을 수 없습니다")], "prompt_key": "fallback"}
 
 def search_book_adaptive(state: AdaptiveRagState):
     """
     Node for searching information in the book
     """
-    question = state["question"]
-    user_id = state.get("user_id", "anonymous")
-    memory = get_user_memory(user_id)
+    # 질문 리프레이징 (fused 전처리 결과가 있으면 재사용)
+    enriched_question = retrieval_query(state)
 
-    # 질문 리프레이징
-    enriched_question = rephrase_question_with_history(memory, question)
-    
-    docs = tools.search_book.invoke(enriched_question)
-    if len(docs) > 0:
-        return {**state, "documents": docs}
-    else:
-        return {**state, "documents": [Document(page_content="관련 정보를 찾을 수 없습니다")], "prompt_key": "fallback"}
+    return to_state_update("book", retrieve_filtered(state, "book", enriched_question))
 
 
 def search_seteuk_adaptive(state: AdaptiveRagState):
     """
     Node for searching the 세특 추천 관련 information
     """
-    question = state["question"]
-    user_id = state.get("user_id", "anonymous")
-    memory = get_user_memory(user_id)
+    # 질문 리프레이징 (fused 전처리 결과가 있으면 재사용)
+    enriched_question = retrieval_query(state)
 
-    # 질문 리프레이징
-    enriched_question = rephrase_question_with_history(memory, question)
-
-    docs = tools.search_seteuk.invoke(enriched_question)
-    if len(docs) > 0:
-        return {**state, "documents": docs}
-    else:
-        return {**state, "documents": [Document(page_content="관련 정보를 찾을 수 없습니다")], "prompt_key": "fallback"}
\ No newline at end of file
+    return to_state_update("seteuk", retrieve_filtered(state, "seteuk", enriched_question))
@@ -0,0 +1,201 @@
+"""
+session_backends.py
+
+이 모듈은 여러 API worker 프로세스가 같은 대화 이력을 공유할 수 있도록 프로세스 밖에 세션을 저장하는 백엔드를 제공합니다.
+`memory.get_user_memory` 뒤에서 SESSION_BACKEND 설정에 따라 선택되며, 프로세스 내 저장소(memory.SessionStore)와 같은 인터페이스를 가집니다.
+
+제공 백엔드:
+- `SQLiteSessionStore`: SQLite(WAL) 파일 기반 저장소. 같은 호스트의 여러 worker 또는 로컬 대체용
+- `RedisSessionStore`: Redis 프로토콜 기반 저장소 (redis 패키지 필요)
+
+공통 특징:
+- 세션 TTL (마지막 턴 이후 SESSION_TIMEOUT이 지나면 만료)
+- 턴 저장은 읽기-수정-쓰기를 한 번의 트랜잭션/파이프라인으로 처리하고 갱신된 이력을 함께 돌려받음
+- 누적 대화 요약(history.py)도 세션과 함께 저장되어 worker 간에 공유됨
+- 프로세스 안에 세션을 캐시하지 않음: 한 턴의 노드들은 memory.scope가 턴 시작 시 한 번 읽은 세션을 함께 쓰고,
+  턴 저장이 돌려준 갱신된 이력으로 범위를 바꾸므로 한 턴의 왕복은 읽기 1회 + 쓰기 1회
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+
+from adaptive_rag.utils.memory import Session, SESSION_TIMEOUT, WINDOW_SIZE
+
+class RemoteSessionStore:
+    """
+    프로세스 밖 세션 저장소의 공통 부분.
+    하위 클래스는 `_load`(이력 조회), `_append`(턴 추가 후 갱신된 이력 반환), `_save_summary`(요약 저장)를 구현한다.
+    `_load`/`_append`는 (턴 리스트, 요약 JSON 문자열 또는 None)을 반환한다.
+    """
+
+    def __init__(self, ttl: timedelta = SESSION_TIMEOUT):
+        self.ttl = ttl.total_seconds()
+        self.round_trips = 0
+
+    def _load(self, user_id: str) -> tuple:
+        raise NotImplementedError
+
+    def _append(self, user_id: str, question: str, answer: str) -> tuple:
+        raise NotImplementedError
+
+    def _save_summary(self, user_id: str, raw: str):
+        raise NotImplementedError
+
+    @staticmethod
+    def _session(turns: list, summary: str = None) -> Session:
+        session = Session()
+        session.turns.extend(tuple(t) for t in turns)
+        if summary:
+            data = json.loads(summary)
+            session.set_summary(data["text"], data["last"])
+        return session
+
+    def get(self, user_id) -> Session:
+        """
+        유효한 세션을 원격 저장소에서 읽어 반환한다 (이력이 없으면 None).
+        """
+        session = self.get_or_create(user_id)
+        return session if session.turns else None
+
+    def get_or_create(self, user_id) -> Session:
+        """
+        원격 저장소에서 세션을 한 번의 왕복으로 읽는다 (이력이 없으면 빈 세션).
+        """
+        self.round_trips += 1
+        return self._session(*self._load(str(user_id)))
+
+    def append_turn(self, user_id, question: str, answer: str) -> Session:
+        """
+        턴을 원격 저장소에 한 번의 왕복(읽기-수정-쓰기)으로 추가하고, 갱신된 세션을 반환한다.
+        """
+        self.round_trips += 1
+        return self._session(*self._append(str(user_id), question, answer))
+
+    def set_summary(self, user_id, text: str, last_turn: tuple):
+        """
+        누적 요약을 원격 저장소에 기록한다.
+        """
+        self.round_trips += 1
+        self._save_summary(str(user_id), json.dumps({"text": text, "last": list(last_turn)}, ensure_ascii=False))
+
+class SQLiteSessionStore(RemoteSessionStore):
+    """
+    SQLite(WAL) 세션 저장소. 스레드마다 별도 connection을 사용한다.
+    """
+
+    # 쓰기 몇 번마다 만료 세션을 정리할지
+    SWEEP_EVERY = 500
+
+    def __init__(self, path: str = "sessions.db", **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "user_id TEXT PRIMARY KEY, turns TEXT NOT NULL, last_activity REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_activity ON sessions(last_activity)")
+        # 요약 컬럼이 없던 기존 파일은 컬럼만 추가
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+        if "summary" not in columns:
+            conn.execute("ALTER TABLE sessions ADD COLUMN summary TEXT")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _load(self, user_id: str) -> tuple:
+        row = self._conn().execute(
+            "SELECT turns, summary FROM sessions WHERE user_id = ? AND last_activity >= ?",
+            (user_id, time.time() - self.ttl),
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else ([], None)
+
+    def _append(self, user_id: str, question: str, answer: str) -> tuple:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT turns, last_activity, summary FROM sessions WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            alive = row is not None and row[1] >= now - self.ttl
+            turns = json.loads(row[0]) if alive else []
+            summary = row[2] if alive else None
+            turns = (turns + [[question, answer]])[-WINDOW_SIZE:]
+            conn.execute(
+                "INSERT INTO sessions (user_id, turns, last_activity, summary) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET turns = excluded.turns, last_activity = excluded.last_activity, "
+                "summary = excluded.summary",
+                (user_id, json.dumps(turns, ensure_ascii=False), now, summary),
+            )
+            self._writes += 1
+            if self._writes % self.SWEEP_EVERY == 0:
+                conn.execute("DELETE FROM sessions WHERE last_activity < ?", (now - self.ttl,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return turns, summary
+
+    def _save_summary(self, user_id: str, raw: str):
+        self._conn().execute("UPDATE sessions SET summary = ? WHERE user_id = ?", (raw, user_id))
+
+    def __len__(self) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM sessions WHERE last_activity >= ?", (time.time() - self.ttl,)
+        ).fetchone()[0]
+
+class RedisSessionStore(RemoteSessionStore):
+    """
+    Redis 세션 저장소. 유저별 리스트 키에 턴을 JSON으로 저장하고 키 TTL로 만료를 처리한다.
+    누적 요약은 별도 문자열 키(summary_prefix)에 저장하며 세션 키와 같은 TTL을 갖는다.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "chat:session:",
+                 summary_prefix: str = "chat:summary:", **kwargs):
+        super().__init__(**kwargs)
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("RedisSessionStore를 사용하려면 redis 패키지가 필요합니다: pip install redis") from e
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.summary_prefix = summary_prefix
+
+    def _load(self, user_id: str) -> tuple:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.lrange(self.prefix + user_id, 0, -1)
+        pipe.get(self.summary_prefix + user_id)
+        raw_turns, summary = pipe.execute()
+        return [json.loads(raw) for raw in raw_turns], summary
+
+    def _append(self, user_id: str, question: str, answer: str) -> tuple:
+        key = self.prefix + user_id
+        summary_key = self.summary_prefix + user_id
+        # RPUSH → LTRIM → EXPIRE → LRANGE (+ 요약 TTL 연장/조회) 를 한 번의 왕복(트랜잭션 파이프라인)으로 처리
+        pipe = self.client.pipeline(transaction=True)
+        pipe.rpush(key, json.dumps([question, answer], ensure_ascii=False))
+        pipe.ltrim(key, -WINDOW_SIZE, -1)
+        pipe.expire(key, int(self.ttl))
+        pipe.lrange(key, 0, -1)
+        pipe.expire(summary_key, int(self.ttl))
+        pipe.get(summary_key)
+        *_, raw_turns, _, summary = pipe.execute()
+        return [json.loads(raw) for raw in raw_turns], summary
+
+    def _save_summary(self, user_id: str, raw: str):
+        self.client.set(self.summary_prefix + user_id, raw, ex=int(self.ttl))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + "*"))
@@ -0,0 +1,86 @@
+"""
+singleflight.py
+
+이 모듈은 동일한 키로 동시에 들어온 요청들을 하나의 실행으로 합치는(single-flight) 기능을 제공합니다.
+같은 반 학생들이 같은 첫 질문을 몇 초 안에 보내는 경우처럼, 진행 중인 실행과 같은 질문이 들어오면
+새로 그래프를 실행하지 않고 진행 중인 실행의 결과를 함께 받습니다.
+
+제공 기능:
+- 질문/카테고리 정규화 키 생성 (`coalesce_key`)
+- 키 단위 single-flight 실행기 (`SingleFlight`)
+- 실행/합류 횟수 카운터 (`SingleFlight.stats`, metrics의 adaptive_rag_singleflight_* 카운터)
+"""
+
+import re
+import threading
+
+from adaptive_rag.utils import metrics
+
+def coalesce_key(question: str, category: str = None) -> tuple:
+    """
+    공백/대소문자/끝 문장부호 차이를 무시한 (질문, 카테고리) 키를 만든다.
+    """
+    normalized = re.sub(r"\s+", " ", (question or "").strip().lower())
+    normalized = normalized.rstrip("?!.~ ")
+    return normalized, category
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    같은 키로 진행 중인 실행이 있으면 그 결과를 기다렸다가 공유하는 실행기
+
+    사용 예:
+        flight = SingleFlight("chatbot")
+        result, shared = flight.do(key, lambda: run_graph(inputs))
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {"executions": 0, "coalesced": 0}
+
+    def do(self, key, fn):
+        """
+        키에 대해 fn을 한 번만 실행한다.
+
+        Returns:
+            tuple: (결과, shared) - shared가 True면 다른 요청의 실행 결과를 공유받은 것
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.stats["coalesced"] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.stats["executions"] += 1
+                leader = True
+
+        if not leader:
+            metrics.inc("adaptive_rag_singleflight_coalesced_total", flight=self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        metrics.inc("adaptive_rag_singleflight_executions_total", flight=self.name)
+        try:
+            call.result = fn()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
@@ -1,9 +1,12 @@
 import re
 import json
+import threading
+import time
 import requests
-import openai
 from dotenv import load_dotenv
 import os
+from adaptive_rag.utils import clients, deadline, llm_gateway, tracing
+from adaptive_rag.utils.prompts import count_tokens
 
 # API 키 정보 로드
 load_dotenv()
@@ -11,6 +14,58 @@ load_dotenv()
 # API 키 읽어오기
 openai_api_key = os.environ.get('OPENAI_API_KEY')
 
+# 슬랭 사전 주소 (import 시 내려받지 않고 처음 쓸 때 한 번만 내려받음, API 서버는 boot 단계에서 미리 내려받음)
+SLANG_DICT_URL = "https://raw.githubusercontent.com/khuyejinbda/college-admission-chatbot/main/slang_dict.json"
+
+# 다운로드 timeout(초) / 실패 후 다시 내려받기까지 기다릴 시간(초)
+SLANG_DOWNLOAD_TIMEOUT = float(os.environ.get("SLANG_DOWNLOAD_TIMEOUT", "10"))
+SLANG_RETRY_INTERVAL = float(os.environ.get("SLANG_RETRY_INTERVAL", "30"))
+
+_slang_dict = None
+_slang_lock = threading.Lock()
+_failed_at = None
+
+def _download() -> dict:
+    global _slang_dict, _failed_at
+    try:
+        response = requests.get(SLANG_DICT_URL, timeout=SLANG_DOWNLOAD_TIMEOUT)
+        response.raise_for_status()
+        _slang_dict = json.loads(response.text) # JSON 문자열을 파싱하여 딕셔너리로 변환!
+    except Exception:
+        _failed_at = time.monotonic()
+        raise
+    _failed_at = None
+    return _slang_dict
+
+def get_slang_dict() -> dict:
+    """
+    {슬랭: 정식표현} 사전 (프로세스에서 한 번만 내려받아 공유). 다운로드에 실패하면 예외 (boot 단계용).
+    """
+    if _slang_dict is None:
+        with _slang_lock:
+            if _slang_dict is None:
+                return _download()
+    return _slang_dict
+
+def slang_dict_or_empty() -> dict:
+    """
+    요청 경로용 슬랭 사전. 사전이 아직 없으면 빈 사전을 반환하여 슬랭 치환 없이 진행한다.
+    (다른 요청이 내려받는 중이거나 최근 SLANG_RETRY_INTERVAL 안에 실패했으면 기다리지 않고, 그 외에는 한 번 내려받아 봄)
+    """
+    if _slang_dict is not None:
+        return _slang_dict
+    if _failed_at is not None and time.monotonic() - _failed_at < SLANG_RETRY_INTERVAL:
+        return {}
+    if not _slang_lock.acquire(blocking=False):
+        return {}
+    try:
+        return _slang_dict if _slang_dict is not None else _download()
+    except Exception as e:
+        print(f"[SLANG ERROR] 슬랭 사전을 내려받지 못해 슬랭 치환 없이 진행합니다: {type(e).__name__}: {e}")
+        return {}
+    finally:
+        _slang_lock.release()
+
 def slangword_translate(text: str, slang_dict: dict) -> str:
     """
     주어진 텍스트에서 슬랭(줄임말)을 모두 '(슬랭/정식표현)' 형태로 변환하는 함수
@@ -60,12 +115,25 @@ def select_contextual_word(input_translate: str) -> str:
         "그 외의 원래 텍스트(어미, 조사, 띄어쓰기 등)는 절대 변경하지 마세요."
         "당신은 오로지, 문맥에 맞는 표현을 선택하는 역할만 수행합니다.\n"
     )
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system",  "content": system_prompt},
-            {"role": "user",    "content": input_translate}
-        ]
+    # llm_gateway 순서를 받아 호출 (동시 실행/분당 한도/재시도)
+    response = llm_gateway.run(
+        lambda: clients.openai_client().chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system",  "content": system_prompt},
+                {"role": "user",    "content": input_translate}
+            ],
+            **deadline.timeout_kwargs("slang"),
+        ),
+        kind="slang",
+        prompt_tokens=count_tokens(system_prompt + input_translate),
+        usage=lambda r: getattr(getattr(r, "usage", None), "total_tokens", None),
+    )
+    usage = getattr(response, "usage", None)
+    tracing.record_call(
+        "llm",
+        getattr(usage, "prompt_tokens", 0) or 0,
+        getattr(usage, "completion_tokens", 0) or 0,
     )
     return response.choices[0].message.content.strip()
 
@@ -92,17 +160,18 @@ def strip_slang_markers(intermediate: str) -> str:
     return "".join(result_parts)
 
 
-def replace_slang_word(text: str, slang_dict: dict) -> dict:
+def replace_slang_word(text: str, slang_dict: dict, contextual: bool = True) -> dict:
     """
     텍스트에 슬랭이 포함된 경우 아래 단계로 변환:
       1) slangword_translate → '(슬랭/정식)' 형태 생성
       2) 첫 '(.../...)'의 정식표현에 쉼표가 있으면 strip_slang_markers 사용
-      3) 쉼표 없으면 select_contextual_word로 GPT 호출
+      3) 쉼표 없으면 select_contextual_word로 GPT 호출 (contextual=False면 GPT 없이 정식표현으로 치환)
     슬랭이 없으면 원문을 그대로 반환
 
     Args:
         text (str): 원본 텍스트
         slang_dict (dict): 슬랭-정식 매핑 사전
+        contextual (bool): 문맥 판단 GPT 호출 여부 (턴 예산이 부족하면 False)
     Returns:
         dict: {'question': 최종 처리된 문자열}
     """
@@ -115,7 +184,7 @@ def replace_slang_word(text: str, slang_dict: dict) -> dict:
     m = re.search(r"\(([^/]+)/([^\)]+)\)", intermediate)
     if m:
         formal_part = m.group(2).strip()
-        if "," in formal_part:
+        if "," in formal_part or not contextual:
             result_text = strip_slang_markers(intermediate)
             return {"question": result_text}
     final_text = select_contextual_word(intermediate)
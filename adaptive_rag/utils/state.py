@@ -1,14 +1,14 @@
 from typing import TypedDict, List
-from langchain_core.documents import Document
 
 class AdaptiveRagState(TypedDict, total=False):
     """
     LangGraph 에이전트와 함께 사용하는 RAG 상태 객체
     - LangGraph 프레임워크의 에이전트 상태(state) 표현을 위해 설계
     - total=False 로 설정하여 모든 필드가 optional(선택적)임을 지정
+    - 노드는 바뀐 필드만 반환하고, 한 번 쓰고 끝나는 값(doc_ids, retrieval_query, runner_up)은 소비한 노드가 None으로 비움
     """
     question: str # 사용자의 질문
-    documents: List[Document] # 검색된 문서 목록
+    doc_ids: List[str] # 검색된 문서 ID 목록 (문서 본문은 요청 단위 문서 테이블에 보관, docstore.py)
     generation: str # 생성된 답변
     category: str
     user_id: str
@@ -17,3 +17,12 @@ class AdaptiveRagState(TypedDict, total=False):
     visited_nodes: List[str]  # ✅ 검색에 사용된 노드 추적
     relevance_score: int = 0  # 관련성 점수 (0 또는 1)
     next_node: str # 다음 실행할 노드 이름
+    ephemeral: bool # True면 유저 메모리/대화 로그에 기록하지 않음 (배치 평가 등)
+    started_at: float # 요청 시작 시각 (time.time(), 응답 지연 시간 기록용)
+    route: str # 최종 응답을 만든 경로 (마지막 검색 노드 또는 "llm_fallback")
+    deadline: float # 턴 마감 시각 (time.time() 기준, 없으면 마감 없음)
+    degradations: List[str] # 턴 예산이 부족해 줄이거나 건너뛴 단계 (예: "skip_slang", "small_k")
+    runner_up: str # fused 전처리가 고른 차순위 도구 (재라우팅 시 LLM 호출 없이 사용)
+    retrieval_query: str # fused 전처리가 재작성한 검색 질의 (있으면 검색 노드가 재작성 호출을 건너뜀)
+    intent: str # 고정 응답으로 처리할 의도 (greeting / farewell / out_of_scope, intent.py)
+    stop: bool # True면 욕설 차단 응답으로 종료 (safeguard.py)
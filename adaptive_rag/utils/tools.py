@@ -1,15 +1,13 @@
 # 필요한 라이브러리 임포트
 from dotenv import load_dotenv
 import os
-from langchain_pinecone import PineconeVectorStore
-from langchain_openai import OpenAIEmbeddings
+import threading
 from langchain_core.documents import Document
-from langchain_community.tools import TavilySearchResults
 from langchain_core.tools import tool
 from typing import List
 from langchain.retrievers.contextual_compression import ContextualCompressionRetriever
-from langchain_cohere import CohereRerank
-from langchain_community.llms import Cohere
+from adaptive_rag.utils import clients, tracing
+from adaptive_rag.utils.rerank import AdaptiveCompressionRetriever
 
 # API 키 정보 로드
 load_dotenv()
@@ -19,29 +17,69 @@ openai_api_key = os.environ.get('OPENAI_API_KEY')
 pinecone_api_key = os.environ.get("PINECONE_API_KEY")
 cohere_api_key = os.environ.get("COHERE_API_KEY")
 
-# OpenAI 임베딩 인스턴스 생성
-embeddings = OpenAIEmbeddings(
-    model='text-embedding-3-large',
-    openai_api_key=openai_api_key
-)
-
-compressor = CohereRerank(model="rerank-multilingual-v3.0",top_n=4)
+# 검색 결과가 없을 때 돌려주는 문서 내용
+NOT_FOUND = "관련 정보를 찾을 수 없습니다."
+
+# 리랭커 포함 리트리버 실행 (tracing: 질의 임베딩 1회, 벡터 검색 1회, 리랭크는 실제로 호출했을 때만 rerank.py에서 기록)
+# k를 주면 리트리버 기본값 대신 k개만 검색 (턴 예산이 부족하거나 메타데이터 필터로 후보가 좁혀졌을 때)
+# filter를 주면 벡터 검색에 메타데이터 필터를 적용 (Pinecone 필터 문법)
+def _retrieve(retriever: ContextualCompressionRetriever, query: str, k: int = None, filter: dict = None) -> List[Document]:
+    tracing.record_call("embedding")
+    tracing.record_call("vector")
+    kwargs = {}
+    if k is not None:
+        kwargs["k"] = k
+    if filter:
+        kwargs["filter"] = filter
+    return retriever.invoke(query, **kwargs)
+
+# 네임스페이스별 벡터 검색 k / 리랭크 top_n
+RETRIEVER_SPECS = {
+    "policy": {"k": 6, "top_n": 4},  # 운영 문의 정보
+    "subject": {"k": 6, "top_n": 4},  # 과목 정보
+    "admission": {"k": 30, "top_n": 7},  # 입시 정보
+    "book": {"k": 8, "top_n": 4},  # 도서 정보
+    "seteuk": {"k": 6, "top_n": 4},  # 세특 관련 정보
+}
+
+_build_lock = threading.Lock()
+_compressors = {}
+
+def build_retriever(namespace: str) -> ContextualCompressionRetriever:
+    """
+    공유 Index의 네임스페이스를 Pinecone 리트리버로 감싸고 리랭커를 붙인다 (같은 top_n이면 리랭커 공유).
+    벡터 점수로 결과가 분명하면 리랭크를 건너뛴다 (rerank.py).
+    """
+    spec = RETRIEVER_SPECS[namespace]
+    if spec["top_n"] not in _compressors:
+        _compressors[spec["top_n"]] = clients.reranker(top_n=spec["top_n"])
+    base_retriever = clients.vector_store(namespace).as_retriever(search_kwargs={"k": spec["k"]})
+    return AdaptiveCompressionRetriever(
+        base_compressor=_compressors[spec["top_n"]], base_retriever=base_retriever,
+        namespace=namespace, top_n=spec["top_n"],
+    )
+
+class _RetrieverTable(dict):
+    """
+    네임스페이스별 리랭커 포함 리트리버. import 시에는 만들지 않고 처음 쓸 때 만든다
+    (API 서버는 boot 단계에서 warm_retrievers로 미리 만들어 Pinecone/Cohere 연결 준비를 다른 초기화와 겹침).
+    """
 
-# 운영 문의 정보 검색
-pinecone_policy = PineconeVectorStore.from_documents(
-    documents=[], # 빈 리스트로 초기화
-    index_name="college-admission-chatbot",   # 인덱스 이름
-    embedding=embeddings,               # 임베딩 인스턴스
-    pinecone_api_key=pinecone_api_key,
-    namespace="policy", # 네임스페이스 설정 : 운영 문의 -> policy
-)
+    def __missing__(self, namespace: str) -> ContextualCompressionRetriever:
+        with _build_lock:
+            if not dict.__contains__(self, namespace):
+                dict.__setitem__(self, namespace, build_retriever(namespace))
+        return dict.__getitem__(self, namespace)
 
-# 2. Pinecone 리트리버를 LangChain retriever로 감싸기
-policy_retriever = pinecone_policy.as_retriever(search_kwargs={"k": 6})
+# 네임스페이스별 리랭커 포함 리트리버 (검색 노드가 k를 바꿔 검색할 때 사용)
+RETRIEVERS = _RetrieverTable()
 
-compression_retriever_policy = ContextualCompressionRetriever(
-    base_compressor=compressor, base_retriever=policy_retriever
-)
+def warm_retrievers():
+    """
+    모든 네임스페이스 리트리버를 미리 만든다 (boot.py).
+    """
+    for namespace in RETRIEVER_SPECS:
+        RETRIEVERS[namespace]
 
 # 운영 정보 검색 tool 정의
 @tool
@@ -53,28 +91,12 @@ def search_policy(query: str) -> List[Document]:
     To maintain data integrity and clarity, use this tool only for questions about system operations of the High School Credit System,
     such as curriculum rules, credit units, or graduation criteria.
     """
-    docs = compression_retriever_policy.invoke(query)
+    docs = _retrieve(RETRIEVERS["policy"], query)
     if len(docs) > 0:
         return docs
     
     return [Document(page_content="관련 정보를 찾을 수 없습니다.")]
 
-# 과목 정보 검색
-pinecone_subject = PineconeVectorStore.from_documents(
-    documents=[], # 빈 리스트로 초기화
-    index_name="college-admission-chatbot",   # 인덱스 이름
-    embedding=embeddings,               # 임베딩 인스턴스
-    pinecone_api_key=pinecone_api_key,
-    namespace="subject", # 네임스페이스 설정: 과목 문의 -> subject
-)
-
-# 2. Pinecone 리트리버를 LangChain retriever로 감싸기
-subject_retriever = pinecone_subject.as_retriever(search_kwargs={"k": 6})
-
-compression_retriever_subject = ContextualCompressionRetriever(
-    base_compressor=compressor, base_retriever=subject_retriever
-)
-
 # 과목 점보 검색 tool 정의
 @tool
 def search_subject(query: str) -> List[Document]:
@@ -84,29 +106,11 @@ def search_subject(query: str) -> List[Document]:
 
     To ensure appropriate guidance, use this tool only for questions related to subject within the High School Credit System
     """
-    docs = compression_retriever_subject.invoke(query)
+    docs = _retrieve(RETRIEVERS["subject"], query)
     if docs:
         return docs
     return [Document(page_content="관련 정보를 찾을 수 없습니다.")]
 
-admission_compressor = CohereRerank(model="rerank-multilingual-v3.0",top_n=7)
-
-# 입시 정보 검색
-pinecone_admission = PineconeVectorStore.from_documents(
-    documents=[], # 빈 리스트로 초기화
-    index_name="college-admission-chatbot",   # 인덱스 이름
-    embedding=embeddings,               # 임베딩 인스턴스
-    pinecone_api_key=pinecone_api_key,
-    namespace="admission", # 네임스페이스 설정: 과목 문의 -> subject
-)
-
-# 2. Pinecone 리트리버를 LangChain retriever로 감싸기
-admission_retriever = pinecone_admission.as_retriever(search_kwargs={"k": 30})
-
-compression_retriever_admission = ContextualCompressionRetriever(
-    base_compressor=admission_compressor, base_retriever=admission_retriever
-)
-
 # 입시 점보 검색 tool 정의
 @tool
 def search_admission(query: str) -> List[Document]:
@@ -118,28 +122,12 @@ def search_admission(query: str) -> List[Document]:
     Use this tool for queries about selecting a major or university, understanding admission systems, or learning about specific departments.
     """
 
-    docs = compression_retriever_admission.invoke(query)
+    docs = _retrieve(RETRIEVERS["admission"], query)
     if len(docs) > 0:
         return docs
     
     return [Document(page_content="관련 정보를 찾을 수 없습니다.")]
 
-# 도서 정보 검색
-pinecone_book = PineconeVectorStore.from_documents(
-    documents=[], # 빈 리스트로 초기화
-    index_name="college-admission-chatbot",   # 인덱스 이름
-    embedding=embeddings,               # 임베딩 인스턴스
-    pinecone_api_key=pinecone_api_key,
-    namespace="book", # 네임스페이스 설정: 과목 문의 -> subject
-)
-
-# 2. Pinecone 리트리버를 LangChain retriever로 감싸기
-book_retriever = pinecone_book.as_retriever(search_kwargs={"k": 8})
-
-compression_retriever_book = ContextualCompressionRetriever(
-    base_compressor=compressor, base_retriever=book_retriever
-)
-
 # 도서 추천 검색 tool 정의
 @tool
 def search_book(query: str) -> List[Document]:
@@ -150,29 +138,12 @@ def search_book(query: str) -> List[Document]:
     Use this tool only for questions about books related to a student’s interests or field of study.
     """
 
-    docs = compression_retriever_book.invoke(query)
+    docs = _retrieve(RETRIEVERS["book"], query)
     if len(docs) > 0:
         return docs
     
     return [Document(page_content="관련 정보를 찾을 수 없습니다.")]
 
-# 세특 관련 정보 검색
-pinecone_seteuk = PineconeVectorStore.from_documents(
-    documents=[], # 빈 리스트로 초기화
-    index_name="college-admission-chatbot",   # 인덱스 이름
-    embedding=embeddings,               # 임베딩 인스턴스
-    pinecone_api_key=pinecone_api_key,
-    namespace="seteuk", 
-)
-
-# 2. Pinecone 리트리버를 LangChain retriever로 감싸기
-seteuk_retriever = pinecone_seteuk.as_retriever(search_kwargs={"k": 6})
-
-# 3. 리랭커를 포함한 리트리버 생성
-compression_retriever_seteuk = ContextualCompressionRetriever(
-    base_compressor=compressor, base_retriever=seteuk_retriever
-)
-
 # 서비스 검색
 @tool
 def search_seteuk(query: str) -> List[str]:
@@ -188,8 +159,26 @@ def search_seteuk(query: str) -> List[str]:
 
     """
 
-    docs = compression_retriever_seteuk.invoke(query)
+    docs = _retrieve(RETRIEVERS["seteuk"], query)
     if len(docs) > 0:
         return docs
     
-    return [Document(page_content="관련 정보를 찾을 수 없습니다.")]
\ No newline at end of file
+    return [Document(page_content="관련 정보를 찾을 수 없습니다.")]
+
+def default_k(namespace: str) -> int:
+    return RETRIEVERS[namespace].base_retriever.search_kwargs["k"]
+
+def retrieve(namespace: str, query: str, k: int = None, filter: dict = None) -> List[Document]:
+    """
+    네임스페이스 검색 (search_xxx tool과 같은 결과, k와 메타데이터 필터를 지정할 수 있음)
+    """
+    docs = _retrieve(RETRIEVERS[namespace], query, k, filter)
+    if docs:
+        return docs
+    return [Document(page_content=NOT_FOUND)]
+
+def found(docs: List[Document]) -> bool:
+    """
+    retrieve 결과에 실제 검색 문서가 있는지
+    """
+    return bool(docs) and not (len(docs) == 1 and docs[0].page_content == NOT_FOUND)
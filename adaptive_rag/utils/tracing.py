@@ -0,0 +1,272 @@
+"""
+tracing.py
+
+이 모듈은 LangGraph 파이프라인의 노드별 지연 시간과 외부 호출/토큰 사용량을 계측하는 tracing 레이어입니다.
+`pipeline.build_adaptive_rag`에 등록되는 모든 노드를 `traced_node`로 감싸 한 턴(turn)이 어디에서 시간을 썼는지 기록합니다.
+
+기록 항목:
+- 노드별 wall time
+- 외부 호출 횟수 (llm / embedding / vector / rerank)
+- prompt / completion 토큰 수
+- 실행 경로 (visited_nodes, retried, fallback 여부)
+
+내보내기:
+- Prometheus 스타일 메트릭 (`metrics.render_prometheus`)
+- 선택적으로 턴 단위 JSONL span 파일 (ADAPTIVE_RAG_TRACE_FILE)
+
+환경 변수:
+- ADAPTIVE_RAG_TRACING=1 : 계측 활성화 (기본 비활성, 비활성 시 노드 함수를 감싸지 않음)
+- ADAPTIVE_RAG_TRACE_FILE : 턴 단위 span을 JSONL로 기록할 파일 경로
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from adaptive_rag.utils import metrics
+
+# 계측 활성화 여부 / JSONL span 파일 경로
+TRACING_ENABLED = os.environ.get("ADAPTIVE_RAG_TRACING", "0") == "1"
+TRACE_FILE = os.environ.get("ADAPTIVE_RAG_TRACE_FILE")
+
+# 외부 호출 종류
+CALL_KINDS = ("llm", "embedding", "vector", "rerank")
+
+class NodeSpan:
+    """
+    노드 한 번 실행에 대한 계측 기록
+    """
+    __slots__ = ("node", "start", "wall_ms", "calls", "prompt_tokens", "completion_tokens", "error")
+
+    def __init__(self, node: str):
+        self.node = node
+        self.start = time.time()
+        self.wall_ms = 0.0
+        self.calls = dict.fromkeys(CALL_KINDS, 0)
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.error = None
+
+    def to_dict(self) -> dict:
+        return {
+            "node": self.node,
+            "start": self.start,
+            "wall_ms": round(self.wall_ms, 3),
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "error": self.error,
+        }
+
+class TurnTrace:
+    """
+    get_chatbot_response 한 번(한 턴)에 대한 계측 기록
+    """
+
+    def __init__(self, user_id: str = None, category: str = None):
+        self.turn_id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.category = category
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self.wall_ms = 0.0
+        self.spans = []
+        self.path = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, span: NodeSpan):
+        with self._lock:
+            self.spans.append(span)
+
+    def finish(self, final_state: dict):
+        """
+        최종 state에서 실행 경로를 기록하고 턴 메트릭을 갱신한다.
+        """
+        nodes = [span.node for span in self.spans]
+        self.path = {
+            "nodes": nodes,
+            "visited_nodes": list((final_state or {}).get("visited_nodes", [])),
+            "retried": bool((final_state or {}).get("retried", False)),
+            "fallback": "llm_fallback" in nodes,
+            "degradations": list((final_state or {}).get("degradations") or []),
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "turn_id": self.turn_id,
+            "user_id": self.user_id,
+            "category": self.category,
+            "start": self.start,
+            "wall_ms": round(self.wall_ms, 3),
+            "path": self.path,
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+class _NullTurn:
+    """계측 비활성 시 사용하는 no-op 턴 객체"""
+    def finish(self, final_state: dict):
+        pass
+
+_NULL_TURN = _NullTurn()
+
+# 현재 턴 / 현재 노드 span (LangGraph가 노드 실행 시 context를 복사하므로 스레드 간에도 전달됨)
+_current_turn: ContextVar = ContextVar("adaptive_rag_turn", default=None)
+_current_span: ContextVar = ContextVar("adaptive_rag_span", default=None)
+
+_trace_file_lock = threading.Lock()
+
+# 턴이 끝날 때마다 TurnTrace를 전달받는 리스너 (벤치마크 등에서 span 수집용)
+_turn_listeners = []
+
+def add_turn_listener(fn):
+    """
+    턴 계측이 끝날 때마다 호출될 함수(fn(trace: TurnTrace))를 등록한다.
+    """
+    _turn_listeners.append(fn)
+
+def record_call(kind: str, prompt_tokens: int = 0, completion_tokens: int = 0, count: int = 1):
+    """
+    현재 실행 중인 노드 span에 외부 호출 1건(및 토큰 사용량)을 기록한다.
+    계측이 비활성이거나 노드 밖에서 호출되면 아무 것도 하지 않는다.
+
+    Args:
+        kind (str): 호출 종류 ("llm", "embedding", "vector", "rerank")
+        prompt_tokens (int): prompt 토큰 수
+        completion_tokens (int): completion 토큰 수
+        count (int): 호출 횟수
+    """
+    span = _current_span.get()
+    if span is None:
+        return
+    span.calls[kind] = span.calls.get(kind, 0) + count
+    span.prompt_tokens += prompt_tokens
+    span.completion_tokens += completion_tokens
+
+def llm_usage(response) -> tuple:
+    """
+    LangChain LLMResult에서 (prompt 토큰 수, completion 토큰 수)를 꺼낸다.
+    llm_output의 token_usage가 없으면(스트리밍 등) 메시지의 usage_metadata를 합산한다.
+    """
+    prompt_tokens = completion_tokens = 0
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    for generations in response.generations:
+        for generation in generations:
+            meta = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt_tokens += meta.get("input_tokens", 0)
+            completion_tokens += meta.get("output_tokens", 0)
+    return prompt_tokens, completion_tokens
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """
+    LangChain LLM 호출이 끝날 때 호출 횟수와 토큰 사용량을 현재 노드 span에 기록하는 콜백
+    """
+    run_inline = True
+
+    def on_llm_end(self, response, **kwargs):
+        record_call("llm", *llm_usage(response))
+
+token_usage_callback = TokenUsageCallback()
+
+def graph_config() -> dict:
+    """
+    graph.stream / graph.invoke 에 넘길 config (계측 활성 시 토큰 콜백 포함)
+    """
+    if not TRACING_ENABLED:
+        return {}
+    return {"callbacks": [token_usage_callback]}
+
+def traced_node(name: str, fn):
+    """
+    노드 함수를 계측 래퍼로 감싼다. 계측이 비활성이면 원래 함수를 그대로 반환한다.
+
+    Args:
+        name (str): 그래프에 등록되는 노드 이름
+        fn (callable): 노드 함수 (state -> state)
+
+    Returns:
+        callable: 계측 래퍼가 적용된 노드 함수
+    """
+    if not TRACING_ENABLED:
+        return fn
+
+    @wraps(fn)
+    def wrapper(state):
+        span = NodeSpan(name)
+        token = _current_span.set(span)
+        t0 = time.perf_counter()
+        try:
+            return fn(state)
+        except Exception as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.wall_ms = (time.perf_counter() - t0) * 1000
+            _current_span.reset(token)
+            _observe_span(span)
+            turn = _current_turn.get()
+            if turn is not None:
+                turn.add_span(span)
+
+    return wrapper
+
+def _observe_span(span: NodeSpan):
+    metrics.observe("adaptive_rag_node_latency_seconds", span.wall_ms / 1000, node=span.node)
+    for kind, count in span.calls.items():
+        if count:
+            metrics.inc("adaptive_rag_node_external_calls_total", count, node=span.node, kind=kind)
+    if span.prompt_tokens:
+        metrics.inc("adaptive_rag_node_tokens_total", span.prompt_tokens, node=span.node, type="prompt")
+    if span.completion_tokens:
+        metrics.inc("adaptive_rag_node_tokens_total", span.completion_tokens, node=span.node, type="completion")
+    if span.error:
+        metrics.inc("adaptive_rag_node_errors_total", node=span.node)
+
+def _observe_turn(turn: TurnTrace):
+    path = turn.path
+    metrics.observe("adaptive_rag_turn_latency_seconds", turn.wall_ms / 1000)
+    metrics.inc(
+        "adaptive_rag_turns_total",
+        path="->".join(path.get("nodes", [])),
+        retried=str(path.get("retried", False)).lower(),
+        fallback=str(path.get("fallback", False)).lower(),
+    )
+    for listener in _turn_listeners:
+        listener(turn)
+    if TRACE_FILE:
+        line = json.dumps(turn.to_dict(), ensure_ascii=False)
+        with _trace_file_lock:
+            with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+@contextmanager
+def turn(user_id: str = None, category: str = None):
+    """
+    한 턴(get_chatbot_response 1회)의 계측 범위를 지정하는 context manager.
+    블록 안에서 실행된 노드 span이 모두 이 턴에 기록된다.
+
+    사용 예:
+        with tracing.turn(user_id, category) as trace:
+            ... graph.stream(inputs, config=tracing.graph_config()) ...
+            trace.finish(final_state)
+    """
+    if not TRACING_ENABLED:
+        yield _NULL_TURN
+        return
+
+    trace = TurnTrace(user_id=user_id, category=category)
+    token = _current_turn.set(trace)
+    try:
+        yield trace
+    finally:
+        trace.wall_ms = (time.perf_counter() - trace._t0) * 1000
+        _current_turn.reset(token)
+        _observe_turn(trace)
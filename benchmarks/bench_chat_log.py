@@ -0,0 +1,67 @@
+"""
+bench_chat_log.py
+
+대화 로그 저장이 요청 경로에 더하는 시간을 측정하는 벤치마크입니다.
+MongoDB를 지연 시간이 있는 대체 구현(fakes.FakeCollection)으로 바꾼 뒤,
+동기 저장(`insert_one`)과 백그라운드 batch writer(`mongoDB.save_chat_log`)의 호출당 지연 시간을 비교합니다.
+
+보고 항목:
+- 방식별 호출당 p50 / p95 / p99 지연 시간
+- writer가 실제로 수행한 insert_many 횟수와 저장/유실/spill 건수
+
+실행:
+    python -m benchmarks.bench_chat_log --logs 2000 --concurrency 16
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import fakes
+from benchmarks.common import latency_summary
+
+def _timed(fn, jobs: int, concurrency: int) -> list:
+    def one(i):
+        t0 = time.perf_counter()
+        fn(i)
+        return (time.perf_counter() - t0) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, range(jobs)))
+
+def run(args) -> dict:
+    clock = fakes.install_fakes(fakes.FakeConfig(seed=args.seed, latency_scale=args.latency_scale))
+    os.environ.setdefault("CHAT_LOG_SPILL_PATH", os.path.join(tempfile.mkdtemp(), "chat_logs.spill.jsonl"))
+    from adaptive_rag.utils import mongoDB
+
+    def sync_insert(i):
+        mongoDB.get_log_backend().collection.insert_one({"user": f"질문 {i}", "bot": "답변", "category": "벤치마크", "user_id": f"u{i}"})
+
+    def queued_insert(i):
+        mongoDB.save_chat_log(f"질문 {i}", "답변", category="벤치마크", user_id=f"u{i}")
+
+    sync_ms = _timed(sync_insert, args.logs, args.concurrency)
+    calls_before = clock.calls.get("mongo", 0)
+    queued_ms = _timed(queued_insert, args.logs, args.concurrency)
+    mongoDB.log_writer.close(timeout=30)
+
+    return {
+        "logs": args.logs,
+        "concurrency": args.concurrency,
+        "insert_one": latency_summary(sync_ms),
+        "batched_writer": latency_summary(queued_ms),
+        "insert_many_calls": clock.calls.get("mongo", 0) - calls_before,
+        "writer_stats": dict(mongoDB.log_writer.stats),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="대화 로그 저장의 요청 경로 지연 시간 비교")
+    parser.add_argument("--logs", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(json.dumps(run(args), ensure_ascii=False, indent=2))
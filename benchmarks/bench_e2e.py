@@ -0,0 +1,116 @@
+"""
+bench_e2e.py
+
+OpenAI / Pinecone / Cohere / MongoDB를 로컬 대체 구현(benchmarks/fakes.py)으로 바꿔 끼운 상태에서
+`pipeline.get_chatbot_response`에 질문 코퍼스를 지정한 동시성으로 재생하는 오프라인 end-to-end 벤치마크입니다.
+API 비용이나 rate limit 없이 그래프 변경 전후의 성능 기준선을 반복 측정할 수 있습니다.
+
+보고 항목:
+- 처리량 (requests/s)
+- 턴 전체 및 노드별 p50 / p95 / p99 지연 시간
+- 노드별 외부 호출 수
+- 턴 예산 부족으로 줄인 단계(degradations)별 횟수
+- 최대 RSS
+
+실행:
+    python -m benchmarks.bench_e2e --requests 200 --concurrency 16
+    python -m benchmarks.bench_e2e --latency-scale 0.01 --requests 50      # 빠른 스모크 실행
+    python -m benchmarks.bench_e2e --latency-config my_latency.json        # {"latencies": {"llm": {"median_ms": 900, "sigma": 0.6}}}
+    python -m benchmarks.bench_e2e --budget 8                              # 턴 예산 8초 (0이면 마감 없음)
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import fakes
+from benchmarks.common import latency_summary, load_questions, peak_rss_mb
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "questions.jsonl")
+
+def run(args) -> dict:
+    if args.latency_config:
+        config = fakes.FakeConfig.from_json(args.latency_config, seed=args.seed)
+    else:
+        config = fakes.FakeConfig(seed=args.seed)
+    config.latency_scale = args.latency_scale
+    config.fake_safeguard = not args.real_safeguard
+    clock = fakes.install_fakes(config)
+
+    # 노드별 span 수집을 위해 tracing을 켠 뒤 파이프라인을 import
+    os.environ["ADAPTIVE_RAG_TRACING"] = "1"
+    from adaptive_rag.utils import pipeline, tracing
+
+    spans = defaultdict(list)
+    calls = defaultdict(lambda: defaultdict(int))
+    degradations = defaultdict(int)
+    lock = threading.Lock()
+
+    def on_turn(trace):
+        with lock:
+            for step in (trace.path or {}).get("degradations", []):
+                degradations[step] += 1
+            for span in trace.spans:
+                spans[span.node].append(span.wall_ms)
+                for kind, count in span.calls.items():
+                    calls[span.node][kind] += count
+
+    tracing.add_turn_listener(on_turn)
+    pipeline.initialize_graph_for_api()
+
+    questions = load_questions(args.corpus)
+    jobs = [(questions[i % len(questions)], f"bench-user-{i % args.users}") for i in range(args.requests)]
+    turn_ms = []
+    errors = 0
+
+    def one(job):
+        item, user_id = job
+        t0 = time.perf_counter()
+        result = pipeline.get_chatbot_response(item["question"], user_id, item.get("category"), budget=args.budget)
+        return (time.perf_counter() - t0) * 1000, "error" in result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for elapsed, failed in pool.map(one, jobs):
+            turn_ms.append(elapsed)
+            errors += int(failed)
+    wall = time.perf_counter() - start
+
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "latency_scale": args.latency_scale,
+        "throughput_rps": round(args.requests / wall, 2),
+        "errors": errors,
+        "turn": latency_summary(turn_ms),
+        "nodes": {node: latency_summary(values) for node, values in sorted(spans.items())},
+        "node_calls": {node: dict(kinds) for node, kinds in sorted(calls.items())},
+        "degradations": dict(degradations),
+        "fake_calls": dict(clock.calls),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="오프라인 end-to-end 파이프라인 벤치마크")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="질문 코퍼스 JSONL 경로")
+    parser.add_argument("--requests", type=int, default=200, help="총 요청 수 (코퍼스를 순환 재생)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--users", type=int, default=50, help="요청을 분배할 가상 사용자 수")
+    parser.add_argument("--latency-config", default=None, help="지연 시간 분포 JSON 파일")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--budget", type=float, default=None, help="턴 예산(초), 기본값은 TURN_DEADLINE_SECONDS")
+    parser.add_argument("--real-safeguard", action="store_true", help="kor_unsmile 모델을 실제로 로드")
+    parser.add_argument("--output", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
@@ -0,0 +1,111 @@
+"""
+bench_gazetteer.py
+
+admission 검색을 대학/학과 개체 필터 유무로 비교하는 오프라인 벤치마크입니다 (외부 서비스는 benchmarks/fakes.py 대체 구현).
+gazetteer.json의 모든 대학 × 학과로 합성 admission 코퍼스를 만들고, 정식 이름/줄임말을 섞은 질문으로 두 경로를 재생합니다.
+
+보고 항목:
+- 경로별(unfiltered: k=30 전체 검색 / filtered: search.retrieve_filtered) 정답 문서(질문의 대학+학과)가 리랭크 결과(top_n=7)에 있는 비율
+- 경로별 리랭크로 보내는 후보 문서 수, 검색 지연 시간 p50/p95/p99
+- 개체 추출 지연 시간 p50 / p99 (µs), 대학·학과를 모두 찾은 질문 비율
+
+실행:
+    python -m benchmarks.bench_gazetteer --questions 300
+    python -m benchmarks.bench_gazetteer --latency-scale 0.01 --questions 100      # 빠른 스모크 실행
+"""
+
+import argparse
+import json
+import random
+import time
+
+from langchain_core.documents import Document
+
+from benchmarks import fakes
+from benchmarks.common import latency_summary
+
+TEMPLATES = (
+    "{univ} {major} 입결 어때?",
+    "{univ} {major} 가려면 어떤 전형이 좋아",
+    "{major} 쪽으로 {univ} 수시 준비하려면 뭐 해야 돼",
+    "{univ} {major}에서는 뭘 배워?",
+)
+
+def _corpus(data: dict) -> list:
+    docs, n = [], 0
+    for univ in data["universities"]:
+        for major in data["majors"]:
+            for topic in ("교육과정", "전형"):
+                text = f"{univ['name']} {major['name']} {topic}: 전공 기초와 심화 과정을 운영하며 학생부종합전형과 정시로 신입생을 선발합니다."
+                docs.append(Document(page_content=text, metadata={"id": f"admission-{n}", "university": univ["name"], "major": major["name"]}))
+                n += 1
+    return docs
+
+def _questions(data: dict, count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    questions = []
+    for _ in range(count):
+        univ, major = rng.choice(data["universities"]), rng.choice(data["majors"])
+        # 정식 이름과 사전 줄임말을 섞어 질문 생성
+        univ_form = rng.choice([univ["name"]] + univ.get("aliases", []) + univ.get("weak_aliases", []))
+        major_form = rng.choice([major["name"]] + major.get("aliases", []))
+        text = rng.choice(TEMPLATES).format(univ=univ_form, major=major_form)
+        questions.append((text, univ["name"], major["name"]))
+    return questions
+
+def _replay(questions: list, retrieve) -> dict:
+    hits, ms = 0, []
+    for text, univ, major in questions:
+        t0 = time.perf_counter()
+        docs = retrieve(text)
+        ms.append((time.perf_counter() - t0) * 1000)
+        hits += any(d.metadata.get("university") == univ and d.metadata.get("major") == major for d in docs)
+    return {"recall": round(hits / len(questions), 3), "retrieval": latency_summary(ms)}
+
+def run(args) -> dict:
+    config = fakes.FakeConfig(seed=args.seed)
+    config.latency_scale = args.latency_scale
+    fakes.install_fakes(config)
+
+    from adaptive_rag.utils import filters, gazetteer, search, tools
+
+    with open(gazetteer.GAZETTEER_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    corpus = _corpus(data)
+    # admission 리트리버의 벡터 저장소를 gazetteer 전체 대학 × 학과 코퍼스로 교체
+    retriever = tools.RETRIEVERS["admission"]
+    retriever.base_retriever.vectorstore = fakes.FakePineconeVectorStore(namespace="admission", documents=corpus)
+
+    questions = _questions(data, args.questions, args.seed)
+    unfiltered = _replay(questions, lambda q: search.retrieve_for_state({}, "admission", q)["documents"])
+    filtered = _replay(questions, lambda q: search.retrieve_filtered({}, "admission", q)["documents"])
+    unfiltered["rerank_candidates"] = tools.default_k("admission")
+    filtered["rerank_candidates"] = filters.filtered_k(tools.default_k("admission"))
+
+    extract_us = []
+    resolved = 0
+    for text, univ, major in questions:
+        t0 = time.perf_counter()
+        entities = gazetteer.extract(text)
+        extract_us.append((time.perf_counter() - t0) * 1e6)
+        resolved += entities["universities"][:1] == [univ] and entities["majors"][:1] == [major]
+    extract_us.sort()
+    return {
+        "corpus": len(corpus),
+        "questions": len(questions),
+        "unfiltered": unfiltered,
+        "filtered": filtered,
+        "extraction": {
+            "trie_entries": gazetteer.gazetteer.size,
+            "resolved_share": round(resolved / len(questions), 3),
+            "p50_us": round(extract_us[len(extract_us) // 2], 1),
+            "p99_us": round(extract_us[int(len(extract_us) * 0.99)], 1),
+        },
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="admission 검색 대학/학과 개체 필터 유무 비교 벤치마크")
+    parser.add_argument("--questions", type=int, default=300)
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    print(json.dumps(run(parser.parse_args()), ensure_ascii=False, indent=2))
@@ -0,0 +1,99 @@
+"""
+bench_history_tokens.py
+
+여러 턴으로 이루어진 대화(benchmarks/data/conversations.jsonl)를 오프라인 대체 구현(fakes.py) 위에서 재생하여,
+대화 이력 렌더링 방식별로 턴당 평균 prompt 토큰 수를 비교하는 벤치마크입니다.
+
+- legacy : 기존 방식 (생성 프롬프트에 전체 이력 원문, 재작성 프롬프트에 최근 메시지 5개 원문)
+- summary: history.py의 누적 요약 + 최근 원문 턴 + 프롬프트별 토큰 상한
+
+답변에는 표를 붙여(--table-rows) 실제 답변처럼 긴 이력이 쌓이도록 합니다.
+요약은 턴 사이에 완료된다고 가정하며(사용자가 답변을 읽는 시간), --no-wait으로 요약이 밀린 경우도 볼 수 있습니다.
+백그라운드 요약 호출에 쓰인 토큰은 턴 토큰과 별도로 보고합니다.
+
+실행:
+    python -m benchmarks.bench_history_tokens
+    python -m benchmarks.bench_history_tokens --table-rows 12 --no-wait
+"""
+
+import argparse
+import json
+import os
+import threading
+from collections import defaultdict
+
+from benchmarks import fakes
+
+DEFAULT_CONVERSATIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "conversations.jsonl")
+
+def _counter_total(name: str) -> float:
+    from adaptive_rag.utils import metrics
+    return sum(value for key, value in metrics.snapshot()["counters"].items() if key[0] == name)
+
+def replay(conversations: list, mode: str, wait: bool) -> dict:
+    from adaptive_rag.utils import history, pipeline, tracing
+
+    history.SUMMARY_ENABLED = mode == "summary"
+    node_tokens = defaultdict(list)
+    turn_tokens = []
+    lock = threading.Lock()
+
+    def on_turn(trace):
+        with lock:
+            turn_tokens.append(sum(span.prompt_tokens for span in trace.spans))
+            for span in trace.spans:
+                if span.prompt_tokens:
+                    node_tokens[span.node].append(span.prompt_tokens)
+
+    tracing._turn_listeners.append(on_turn)
+    summary_before = _counter_total("adaptive_rag_history_summary_tokens_total")
+    try:
+        for conversation in conversations:
+            user_id = f"{mode}-{conversation['id']}"
+            for question in conversation["turns"]:
+                pipeline.get_chatbot_response(question, user_id, conversation.get("category"))
+                if wait:
+                    history.flush(timeout=30)
+        history.flush(timeout=30)
+    finally:
+        tracing._turn_listeners.remove(on_turn)
+
+    summary_tokens = _counter_total("adaptive_rag_history_summary_tokens_total") - summary_before
+    turns = len(turn_tokens)
+    return {
+        "turns": turns,
+        "avg_prompt_tokens_per_turn": round(sum(turn_tokens) / max(turns, 1), 1),
+        "max_prompt_tokens_per_turn": max(turn_tokens, default=0),
+        "avg_prompt_tokens_by_node": {
+            node: round(sum(values) / len(values), 1) for node, values in sorted(node_tokens.items())
+        },
+        "background_summary_tokens_per_turn": round(summary_tokens / max(turns, 1), 1),
+    }
+
+def run(args) -> dict:
+    config = fakes.FakeConfig(seed=args.seed, latency_scale=args.latency_scale, answer_table_rows=args.table_rows)
+    # 모든 질문이 검색 → 생성 경로를 타도록 관련성 판단을 항상 통과시킴
+    config.relevance_rate = 1.0
+    fakes.install_fakes(config)
+    os.environ["ADAPTIVE_RAG_TRACING"] = "1"
+    from adaptive_rag.utils import pipeline
+
+    pipeline.initialize_graph_for_api()
+    with open(args.conversations, encoding="utf-8") as f:
+        conversations = [json.loads(line) for line in f if line.strip()]
+
+    report = {mode: replay(conversations, mode, wait=not args.no_wait) for mode in ("legacy", "summary")}
+    legacy = report["legacy"]["avg_prompt_tokens_per_turn"]
+    if legacy:
+        report["reduction_pct"] = round(100 * (1 - report["summary"]["avg_prompt_tokens_per_turn"] / legacy), 1)
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="대화 이력 렌더링 방식별 턴당 prompt 토큰 비교")
+    parser.add_argument("--conversations", default=DEFAULT_CONVERSATIONS, help="대화 JSONL 경로")
+    parser.add_argument("--table-rows", type=int, default=8, help="대체 답변에 붙일 표 행 수")
+    parser.add_argument("--latency-scale", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-wait", action="store_true", help="턴 사이에 요약 완료를 기다리지 않음")
+    args = parser.parse_args()
+    print(json.dumps(run(args), ensure_ascii=False, indent=2))
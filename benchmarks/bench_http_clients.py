@@ -0,0 +1,198 @@
+"""
+bench_http_clients.py
+
+외부 provider 연결 방식에 따른 연결 수립 횟수와 첫 바이트 지연 시간(TTFB)을 비교하는 벤치마크입니다.
+provider(OpenAI, Cohere, Pinecone)마다 로컬 HTTP 서버를 띄우고, 새 연결마다 handshake 지연(TCP+TLS 왕복 모사)을 준 뒤
+챗봇 한 턴의 호출 패턴(LLM 3회, slang 1회, 임베딩 1회, 벡터 검색 1회, 리랭크 1회)을 여러 유저가 동시에 재생합니다.
+
+비교 방식:
+- per_module: 모듈별로 SDK 클라이언트를 만들던 구성 (OpenAI 3개, Cohere 2개, Pinecone 5개 연결 풀)
+- shared: clients.http_client의 provider별 공유 연결 풀
+- shared_warm: 공유 연결 풀 + 시작 시 warmup (clients.warm_connections)
+
+Pinecone SDK는 httpx가 아닌 urllib3 연결 풀을 쓰므로 여기서는 같은 상한의 httpx 연결 풀로 모사합니다.
+
+보고 항목:
+- 방식별 서버가 받은 새 연결 수, 요청 TTFB p50/p95/p99, 첫 턴(콜드 스타트) TTFB
+
+실행:
+    python -m benchmarks.bench_http_clients --users 16 --turns 10 --handshake-ms 60
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from adaptive_rag.utils import clients
+from benchmarks.common import latency_summary
+
+PROVIDERS = ("openai", "cohere", "pinecone")
+
+# 한 턴의 호출: (provider, 모듈별 구성에서 사용하던 클라이언트)
+TURN_CALLS = [
+    ("openai", "chat"),        # 라우팅
+    ("openai", "slang"),       # openai 모듈 직접 호출
+    ("openai", "embeddings"),  # 질의 임베딩
+    ("pinecone", "{namespace}"),
+    ("cohere", "{compressor}"),
+    ("openai", "chat"),        # 관련성 판단
+    ("openai", "chat"),        # 답변 생성
+]
+NAMESPACES = ("policy", "subject", "admission", "book", "seteuk")
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, handshake_ms: float, server_ms: float):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.handshake_ms = handshake_ms
+        self.server_ms = server_ms
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.connections = 0
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        with self.server._lock:
+            self.server.connections += 1
+        # 새 연결마다 handshake 비용
+        time.sleep(self.server.handshake_ms / 1000)
+
+    def _respond(self, body: bytes = b""):
+        time.sleep(self.server.server_ms / 1000)
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self._respond()
+
+    def do_GET(self):
+        self._respond(b'{"ok": true}')
+
+    def log_message(self, *args):
+        pass
+
+def _start_servers(args) -> dict:
+    servers = {}
+    for provider in PROVIDERS:
+        server = _Server(args.handshake_ms, args.server_ms)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers[provider] = server
+    return servers
+
+def _new_client() -> httpx.Client:
+    # 모듈별 SDK 클라이언트가 각자 만들던 기본 연결 풀
+    return httpx.Client(timeout=clients.HTTP_TIMEOUT)
+
+def _ttfb(client: httpx.Client, url: str) -> float:
+    t0 = time.perf_counter()
+    with client.stream("GET", url) as response:
+        elapsed = (time.perf_counter() - t0) * 1000
+        response.read()
+    return elapsed
+
+def _replay(args, servers: dict, pick_client) -> dict:
+    for server in servers.values():
+        server.reset()
+    urls = {p: f"http://127.0.0.1:{s.server_address[1]}/" for p, s in servers.items()}
+    ttfb, first_turn = [], []
+    lock = threading.Lock()
+
+    def user(u: int):
+        rng = random.Random(args.seed + u)
+        for t in range(args.turns):
+            namespace = rng.choice(NAMESPACES)
+            compressor = "admission_compressor" if namespace == "admission" else "compressor"
+            for provider, name in TURN_CALLS:
+                name = name.format(namespace=namespace, compressor=compressor)
+                ms = _ttfb(pick_client(provider, name), urls[provider])
+                with lock:
+                    ttfb.append(ms)
+                    if t == 0:
+                        first_turn.append(ms)
+
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        list(pool.map(user, range(args.users)))
+    return {
+        "connections": {p: s.connections for p, s in servers.items()},
+        "connections_total": sum(s.connections for s in servers.values()),
+        "ttfb": latency_summary(ttfb),
+        "first_turn_ttfb": latency_summary(first_turn),
+    }
+
+class _NoReset:
+    """warmup에서 맺은 연결 수도 합산하도록 reset을 막는 래퍼"""
+
+    def __init__(self, server):
+        self._server = server
+        self.server_address = server.server_address
+
+    @property
+    def connections(self):
+        return self._server.connections
+
+    def reset(self):
+        pass
+
+def run(args) -> dict:
+    servers = _start_servers(args)
+    report = {"http2": clients.HTTP2, "users": args.users, "turns": args.turns, "handshake_ms": args.handshake_ms}
+
+    # 1) 모듈별 클라이언트
+    per_module = {}
+    def pick_per_module(provider, name):
+        key = (provider, name)
+        if key not in per_module:
+            per_module[key] = _new_client()
+        return per_module[key]
+    for key in [("openai", "chat"), ("openai", "slang"), ("openai", "embeddings"),
+                ("cohere", "compressor"), ("cohere", "admission_compressor")] + [("pinecone", ns) for ns in NAMESPACES]:
+        pick_per_module(*key)
+    report["per_module"] = {"pools": len(per_module), **_replay(args, servers, pick_per_module)}
+    for client in per_module.values():
+        client.close()
+
+    # 2) provider별 공유 연결 풀 (warmup 없음)
+    report["shared"] = {"pools": len(PROVIDERS), **_replay(args, servers, lambda p, _: clients.http_client(p))}
+    clients.close()
+
+    # 3) 공유 연결 풀 + warmup (동시 유저 수만큼 연결을 미리 맺음)
+    t0 = time.perf_counter()
+    for server in servers.values():
+        server.reset()
+    for provider, server in servers.items():
+        clients.warm_connections(provider, f"http://127.0.0.1:{server.server_address[1]}/", args.users)
+    warmup_ms = round((time.perf_counter() - t0) * 1000, 1)
+    report["shared_warm"] = {"pools": len(PROVIDERS), "warmup_ms": warmup_ms,
+                             **_replay(args, {p: _NoReset(s) for p, s in servers.items()},
+                                       lambda p, _: clients.http_client(p))}
+    clients.close()
+
+    for server in servers.values():
+        server.shutdown()
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="provider 연결 풀 공유/warmup 벤치마크")
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--handshake-ms", type=float, default=60)
+    parser.add_argument("--server-ms", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    print(json.dumps(run(parser.parse_args()), ensure_ascii=False, indent=2))
@@ -0,0 +1,104 @@
+"""
+bench_ingest.py
+
+증분 적재 파이프라인(ingest.py)을 합성 원본 코퍼스로 여러 번 실행해, 매번 전체를 다시 임베딩하는 방식과 비교하는 오프라인 벤치마크입니다
+(OpenAI 임베딩 / Pinecone Index는 benchmarks/fakes.py 대체 구현, 호출마다 지연 시간 적용).
+
+실행 단계:
+1. initial: manifest 없이 전체 적재
+2. no_change: 같은 원본으로 다시 실행 (임베딩/업서트 호출 0회여야 함)
+3. incremental: 문서 일부 수정·삭제·추가 후 다시 실행
+4. full_reembed: 3과 같은 원본을 manifest 없이 전체 적재 (지금까지의 수동 전체 재적재)
+
+보고 항목: 단계별 소요 시간, 임베딩 호출 수, 업서트/삭제 청크 수, 네임스페이스 버전, 적재 후 Index 벡터 수와 manifest 청크 수 일치 여부
+
+실행:
+    python -m benchmarks.bench_ingest --documents 2000
+    python -m benchmarks.bench_ingest --latency-scale 0.05 --documents 500      # 빠른 스모크 실행
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+
+from benchmarks import fakes
+
+PARAGRAPH = (
+    "{major} 진학을 희망하는 학생을 위한 추천 도서 {n}번입니다. 전공 분야의 핵심 개념과 최근 연구 흐름을 고등학생 눈높이에서 설명하며, "
+    "책을 읽고 세특 탐구 보고서 주제로 발전시킬 수 있는 질문을 장마다 제시합니다. "
+)
+
+def _write_corpus(path: str, docs: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        for doc_id, (title, text) in docs.items():
+            f.write(json.dumps({"id": doc_id, "text": text, "metadata": {"title": title}}, ensure_ascii=False) + "\n")
+
+def _corpus(majors: list, count: int, rng: random.Random) -> dict:
+    docs = {}
+    for i in range(count):
+        major = rng.choice(majors)
+        # 문서당 청크 2~4개가 되도록 문단 반복
+        text = "\n\n".join(PARAGRAPH.format(major=major, n=i) * 3 for _ in range(rng.randint(2, 4)))
+        docs[f"book-{i}"] = (f"{major} 추천 도서 {i}", text)
+    return docs
+
+def _mutate(docs: dict, majors: list, rng: random.Random, share: float) -> dict:
+    # share 비율만큼 수정, 절반만큼 삭제/추가
+    docs = dict(docs)
+    ids = sorted(docs)
+    rng.shuffle(ids)
+    n = max(1, int(len(ids) * share))
+    for doc_id in ids[:n]:
+        title, text = docs[doc_id]
+        docs[doc_id] = (title, text + "\n\n개정판에서 추가된 장: 최신 입시 경향과 연계한 탐구 활동 예시.")
+    for doc_id in ids[n:n + n // 2]:
+        del docs[doc_id]
+    extra = _corpus(majors, n // 2, rng)
+    docs.update({f"new-{k}": v for k, v in extra.items()})
+    return docs
+
+def run(args) -> dict:
+    config = fakes.FakeConfig(seed=args.seed)
+    config.latency_scale = args.latency_scale
+    fakes.install_fakes(config)
+
+    from adaptive_rag.utils import clients, gazetteer, ingest
+
+    with open(gazetteer.GAZETTEER_PATH, encoding="utf-8") as f:
+        majors = [m["name"] for m in json.load(f)["majors"]]
+    rng = random.Random(args.seed)
+    report = {"documents": args.documents}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "book.jsonl")
+        state_dir = os.path.join(tmp, "state")
+        index = clients.pinecone_index()
+
+        def step(name: str, target_index, target_state: str):
+            before = dict(target_index.requests)
+            result = ingest.ingest("book", source, state_dir=target_state, workers=args.workers, index=target_index)
+            result["upsert_requests"] = target_index.requests["upsert"] - before.get("upsert", 0)
+            manifest = ingest.load_manifest("book", target_state)
+            result["index_matches_manifest"] = set(target_index.vectors["book"]) == set(manifest["chunks"])
+            report[name] = result
+
+        docs = _corpus(majors, args.documents, rng)
+        _write_corpus(source, docs)
+        step("initial", index, state_dir)
+        step("no_change", index, state_dir)
+
+        _write_corpus(source, _mutate(docs, majors, rng, args.change_share))
+        step("incremental", index, state_dir)
+        step("full_reembed", fakes.FakeIndex(name="full"), os.path.join(tmp, "full"))
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="증분 적재 / 전체 재적재 비교 벤치마크")
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--change-share", type=float, default=0.02, help="수정할 문서 비율 (삭제/추가는 그 절반씩)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    print(json.dumps(run(parser.parse_args()), ensure_ascii=False, indent=2))
@@ -0,0 +1,81 @@
+"""
+bench_intent.py
+
+그래프 입구의 로컬 의도 판별(intent.py)을 측정하는 벤치마크입니다.
+
+보고 항목:
+- 라벨 데이터(data/intents.jsonl) 기준 의도별 precision / recall, 질문을 고정 응답으로 잘못 처리한 메시지 목록
+- 메시지 1개 판별 지연 시간 p50 / p99 (µs)
+- 트래픽 파일에서 모든 LLM 호출을 건너뛰는(고정 응답으로 끝나는) 메시지 비율
+  (운영 트래픽은 `python -m adaptive_rag.utils.analytics export logs.jsonl`로 내보낸 대화 로그를 --traffic으로 지정)
+
+실행:
+    python -m benchmarks.bench_intent
+    python -m benchmarks.bench_intent --traffic logs.jsonl
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+
+from benchmarks import fakes
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_LABELS = os.path.join(DATA_DIR, "intents.jsonl")
+DEFAULT_TRAFFIC = os.path.join(DATA_DIR, "questions.jsonl")
+
+def _load(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def _evaluate(intent, labels: list) -> dict:
+    predicted = [(item, intent.classify(item["question"])[0] or "question") for item in labels]
+    report = {}
+    for name in intent.SHORTCUT_INTENTS:
+        tp = sum(1 for item, p in predicted if p == name and item["intent"] == name)
+        fp = sum(1 for item, p in predicted if p == name and item["intent"] != name)
+        fn = sum(1 for item, p in predicted if p != name and item["intent"] == name)
+        report[name] = {
+            "precision": round(tp / (tp + fp), 3) if tp + fp else None,
+            "recall": round(tp / (tp + fn), 3) if tp + fn else None,
+        }
+    # 질문인데 고정 응답으로 처리된 메시지 (잘못 처리하면 답변을 못 받으므로 0이어야 함)
+    report["false_shortcuts"] = [item["question"] for item, p in predicted if item["intent"] == "question" and p != "question"]
+    return report
+
+def _latency_us(intent, texts: list, rounds: int) -> dict:
+    samples = []
+    for _ in range(rounds):
+        for text in texts:
+            t0 = time.perf_counter()
+            intent.classify(text)
+            samples.append((time.perf_counter() - t0) * 1e6)
+    samples.sort()
+    return {"p50_us": round(samples[len(samples) // 2], 1), "p99_us": round(samples[int(len(samples) * 0.99)], 1)}
+
+def run(args) -> dict:
+    fakes.install_fakes(fakes.FakeConfig())
+    from adaptive_rag.utils import intent
+
+    labels = _load(args.labels)
+    traffic = [item.get("question") or item.get("user") or "" for item in _load(args.traffic)]
+    intents = Counter(intent.classify(text)[0] for text in traffic)
+    shortcut = sum(count for name, count in intents.items() if name)
+    return {
+        "labels": {"count": len(labels), **_evaluate(intent, labels)},
+        "latency": _latency_us(intent, [item["question"] for item in labels], args.rounds),
+        "traffic": {
+            "count": len(traffic),
+            "llm_free_share": round(shortcut / len(traffic), 4) if traffic else None,
+            "intents": {name or "question": count for name, count in intents.most_common()},
+        },
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="로컬 의도 판별 정확도/지연 시간/LLM 생략 비율 벤치마크")
+    parser.add_argument("--labels", default=DEFAULT_LABELS, help="라벨 JSONL ({question, intent})")
+    parser.add_argument("--traffic", default=DEFAULT_TRAFFIC, help="트래픽 JSONL (question 또는 대화 로그의 user 필드)")
+    parser.add_argument("--rounds", type=int, default=50)
+    print(json.dumps(run(parser.parse_args()), ensure_ascii=False, indent=2))
@@ -0,0 +1,141 @@
+"""
+bench_llm_gateway.py
+
+LLM gateway(llm_gateway.LLMGateway)가 provider rate limit과 우선순위/공정성을 지키는지 확인하는 벤치마크입니다.
+분당 요청 한도를 넘기면 429(RateLimitError)를 돌려주는 가짜 provider에 트래픽을 한꺼번에 몰아넣고,
+gateway 없이 각자 호출+재시도하는 경우와 gateway를 거치는 경우를 비교합니다.
+
+트래픽 구성:
+- 요청을 몰아서 보내는 유저 1명 (heavy) + 일반 유저 여러 명 (interactive)
+- 배치 평가 요청 (batch 우선순위)
+
+보고 항목:
+- 방식별 provider 429 횟수, 전체 소요 시간
+- gateway: 우선순위별 지연 시간(큐 대기 포함) p50/p95, heavy 유저와 일반 유저의 완료 시간 p50 (round-robin 공정성)
+
+실행:
+    python -m benchmarks.bench_llm_gateway --rpm 600 --call-ms 50
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from adaptive_rag.utils.ratelimit import TokenBucket
+from benchmarks.common import latency_summary
+
+class RateLimitError(Exception):
+    """openai.RateLimitError와 같은 이름의 가짜 예외 (gateway는 예외 이름으로 판별)"""
+
+class FakeProvider:
+    """
+    분당 요청 한도(rpm)를 넘는 요청을 429로 거절하는 가짜 LLM provider
+    (한도는 provider들이 안내하는 방식대로 연속적으로 다시 채워지는 bucket, burst는 1초 분량)
+    """
+
+    def __init__(self, rpm: float, call_ms: float):
+        self.limit = TokenBucket(rpm)
+        self.call_ms = call_ms
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def call(self):
+        if self.limit.try_acquire(1):
+            with self._lock:
+                self.rejected += 1
+            raise RateLimitError("429 Too Many Requests")
+        time.sleep(self.call_ms / 1000)
+        return "ok"
+
+def _workload(args) -> list:
+    jobs = [("heavy", "interactive")] * args.heavy_requests
+    for u in range(args.users):
+        jobs += [(f"user-{u}", "interactive")] * args.user_requests
+    jobs += [(f"batch-{i}", "batch") for i in range(args.batch_requests)]
+    # heavy 유저와 배치 요청이 먼저 몰려 들어온 상황
+    return jobs
+
+def _direct(provider: FakeProvider, max_retries: int):
+    # gateway 없이 각 호출이 SDK 방식으로 재시도 (지수 backoff)
+    for attempt in range(max_retries + 1):
+        try:
+            return provider.call()
+        except RateLimitError:
+            if attempt == max_retries:
+                raise
+            time.sleep(0.5 * 2 ** attempt)
+
+def run(args) -> dict:
+    from adaptive_rag.utils import llm_gateway
+
+    jobs = _workload(args)
+    report = {"jobs": len(jobs), "rpm": args.rpm}
+
+    # 1) gateway 없이 직접 호출
+    provider = FakeProvider(args.rpm, args.call_ms)
+    failed = 0
+    t0 = time.perf_counter()
+
+    def direct_one(job):
+        nonlocal failed
+        try:
+            _direct(provider, args.max_retries)
+        except RateLimitError:
+            failed += 1
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(direct_one, jobs))
+    report["direct"] = {"provider_429": provider.rejected, "failed": failed,
+                        "elapsed_s": round(time.perf_counter() - t0, 2)}
+
+    # 2) gateway 경유
+    provider = FakeProvider(args.rpm, args.call_ms)
+    gateway = llm_gateway.LLMGateway(rpm=args.rpm, tpm=0, max_concurrency=args.max_concurrency,
+                                     max_retries=args.max_retries)
+    waits = {"interactive": [], "batch": []}
+    finished = {"heavy": [], "users": []}
+    failed = 0
+    t0 = time.perf_counter()
+
+    def gateway_one(job):
+        nonlocal failed
+        user, priority = job
+        start = time.perf_counter()
+        try:
+            with llm_gateway.context(user_id=user, priority=priority):
+                gateway.run(provider.call, kind="check")
+        except RateLimitError:
+            failed += 1
+            return
+        elapsed = (time.perf_counter() - t0) * 1000
+        waits[priority].append((time.perf_counter() - start) * 1000)
+        if priority == "interactive":
+            finished["heavy" if user == "heavy" else "users"].append(elapsed)
+
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        list(pool.map(gateway_one, jobs))
+    report["gateway"] = {
+        "provider_429": provider.rejected,
+        "failed": failed,
+        "elapsed_s": round(time.perf_counter() - t0, 2),
+        "throttled": gateway.stats["throttled"],
+        "latency_by_priority": {k: latency_summary(v) for k, v in waits.items()},
+        "finish_time_heavy_user": latency_summary(finished["heavy"]),
+        "finish_time_other_users": latency_summary(finished["users"]),
+    }
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM gateway rate limit/우선순위 벤치마크")
+    parser.add_argument("--rpm", type=float, default=600)
+    parser.add_argument("--call-ms", type=float, default=50)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--max-retries", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=32, help="gateway 없이 호출할 때의 동시 호출 수")
+    parser.add_argument("--heavy-requests", type=int, default=40)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--user-requests", type=int, default=4)
+    parser.add_argument("--batch-requests", type=int, default=20)
+    print(json.dumps(run(parser.parse_args()), ensure_ascii=False, indent=2))
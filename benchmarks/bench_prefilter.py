@@ -0,0 +1,169 @@
+"""
+bench_prefilter.py
+
+세특·도서처럼 학과/과목 이름만 다르고 내용이 거의 같은 문서가 많은 네임스페이스에서, 메타데이터 필터(filters.py) 유무별 검색 결과를 비교하는
+오프라인 벤치마크입니다 (외부 서비스는 benchmarks/fakes.py 대체 구현).
+gazetteer.json의 과목 × 학과(세특), 학과 × 도서 번호(도서)로 합성 코퍼스를 만들고, 줄임말과 category를 섞은 질문으로 두 경로를 재생합니다.
+
+보고 항목:
+- 네임스페이스별, 경로별(unfiltered: 기존 검색 / filtered: search.retrieve_filtered) precision
+  (리랭크 결과 중 질문이 가리키는 학과·과목·계열과 맞는 문서의 비율)
+- 경로별 검색 지연 시간 p50/p95/p99, 벡터 검색에서 유사도를 계산한 문서 수 평균, 필터 재검색(miss) 비율
+- grades: 학년 추출 사례(GRADE_CASES)의 정답 일치율과 틀린 사례 ("2023학년도", "최고 3개"처럼 학년이 아닌 숫자가
+  subject 네임스페이스의 grade 필터가 되면 필터 재검색 없이 다른 학년 문서로 답하므로, 틀린 사례가 있으면 안 됨)
+
+실행:
+    python -m benchmarks.bench_prefilter --questions 200
+    python -m benchmarks.bench_prefilter --latency-scale 0.01 --questions 50      # 빠른 스모크 실행
+"""
+
+import argparse
+import json
+import random
+import time
+
+from langchain_core.documents import Document
+
+from benchmarks import fakes
+from benchmarks.common import latency_summary
+
+BOOKS_PER_MAJOR = 6
+
+def _forms(entry: dict) -> list:
+    # 질문에 쓸 이름 (aliases_only면 줄임말만)
+    names = [] if entry.get("aliases_only") else [entry["name"]]
+    return names + entry.get("aliases", [])
+
+def _book_corpus(data: dict) -> list:
+    docs = []
+    for major in data["majors"]:
+        for j in range(BOOKS_PER_MAJOR):
+            text = f"{major['name']} 진학 희망 학생을 위한 추천 도서 {j + 1}: 전공 분야의 핵심 주제를 쉽게 풀어낸 교양서입니다."
+            docs.append(Document(page_content=text, metadata={"id": f"book-{len(docs)}", "major": major["name"], "track": major["track"]}))
+    return docs
+
+def _seteuk_corpus(data: dict) -> list:
+    docs = []
+    for subject in data["subjects"]:
+        for major in data["majors"]:
+            text = f"{subject['name']} 세특 탐구 주제 - {major['name']} 연계: {subject['name']} 개념을 활용한 {major['name']} 관련 탐구 보고서 작성"
+            docs.append(Document(page_content=text, metadata={"id": f"seteuk-{len(docs)}", "subject": subject["name"], "major": major["name"], "track": major["track"]}))
+    return docs
+
+def _book_questions(data: dict, rng: random.Random, count: int) -> list:
+    questions = []
+    for _ in range(count):
+        major = rng.choice(data["majors"])
+        if rng.random() < 0.7:
+            text = rng.choice(("{} 가고 싶은데 읽을 책 추천해줘", "{} 진학하려면 어떤 책 읽으면 좋아?")).format(rng.choice(_forms(major)))
+            questions.append((text, None, {"major": major["name"]}))
+        else:
+            # 계열은 요청 category로만 전달
+            questions.append(("전공 관련 책 추천해줘", major["track"], {"track": major["track"]}))
+    return questions
+
+def _seteuk_questions(data: dict, rng: random.Random, count: int) -> list:
+    questions = []
+    for _ in range(count):
+        subject, major = rng.choice(data["subjects"]), rng.choice(data["majors"])
+        subject_form, major_form = rng.choice(_forms(subject)), rng.choice(_forms(major))
+        if rng.random() < 0.7:
+            text = rng.choice(("{} 세특 주제 추천해줘 {} 지망이야", "{} 가고 싶은데 {} 세특 뭐 쓰지?"))
+            text = text.format(subject_form, major_form) if text.startswith("{} 세특") else text.format(major_form, subject_form)
+            questions.append((text, None, {"subject": subject["name"], "major": major["name"]}))
+        else:
+            questions.append((f"{subject_form} 세특 탐구 주제 추천해줘", major["track"], {"subject": subject["name"], "track": major["track"]}))
+    return questions
+
+def _replay(namespace: str, questions: list, retrieve, store) -> dict:
+    matched, returned, ms, scanned = 0, 0, [], []
+    for text, category, target in questions:
+        before = store.scored
+        t0 = time.perf_counter()
+        docs = retrieve(namespace, text, category)
+        ms.append((time.perf_counter() - t0) * 1000)
+        scanned.append(store.scored - before)
+        returned += len(docs)
+        matched += sum(all(d.metadata.get(k) == v for k, v in target.items()) for d in docs)
+    return {
+        "precision": round(matched / returned, 3) if returned else None,
+        "retrieval": latency_summary(ms),
+        "scored_docs_avg": round(sum(scanned) / len(scanned), 1),
+    }
+
+class CountingStore(fakes.FakePineconeVectorStore):
+    """필터를 통과해 유사도를 계산한 문서 수를 세는 대체 벡터 저장소"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scored = 0
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: dict = None, **kwargs):
+        self.scored += sum(1 for doc in self._docs if fakes._match_filter(doc.metadata, filter))
+        return super().similarity_search_with_score(query, k=k, filter=filter, **kwargs)
+
+# (문장, 정답 학년) - 학년이 아닌 숫자·단어 일부를 학년으로 읽지 않는지 확인
+GRADE_CASES = [
+    ("고2 미적분 성취기준 알려줘", [2]),
+    ("고등학교 3학년 선택 과목", [3]),
+    ("1학년이랑 2학년 과목 차이", [1, 2]),
+    ("고 1 국어 과목", [1]),
+    ("2023학년도 수시 일정", []),
+    ("2025학년도 고교학점제 시행", []),
+    ("최고 3개 과목 추천해줘", []),
+    ("제고 2회 시험 범위", []),
+    ("12학년제 학교", []),
+    ("2학년도 교육과정", []),
+]
+
+def _grade_report() -> dict:
+    from adaptive_rag.utils import filters
+    wrong = []
+    for text, expected in GRADE_CASES:
+        got = filters.extract_grades(text)
+        if got != expected:
+            wrong.append({"text": text, "expected": expected, "got": got, "subject_filter": filters.build("subject", text)})
+    return {"cases": len(GRADE_CASES), "accuracy": round(1 - len(wrong) / len(GRADE_CASES), 3), "wrong": wrong}
+
+def _misses(namespace: str) -> float:
+    from adaptive_rag.utils import metrics
+    key = ("adaptive_rag_prefilter_total", (("namespace", namespace), ("outcome", "miss")))
+    return metrics.snapshot()["counters"].get(key, 0)
+
+def run(args) -> dict:
+    config = fakes.FakeConfig(seed=args.seed)
+    config.latency_scale = args.latency_scale
+    fakes.install_fakes(config)
+
+    from adaptive_rag.utils import gazetteer, search, tools
+
+    with open(gazetteer.GAZETTEER_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    rng = random.Random(args.seed)
+    workloads = {
+        "book": (_book_corpus(data), _book_questions(data, rng, args.questions)),
+        "seteuk": (_seteuk_corpus(data), _seteuk_questions(data, rng, args.questions)),
+    }
+
+    report = {"grades": _grade_report()}
+    for namespace, (corpus, questions) in workloads.items():
+        # 네임스페이스 리트리버의 벡터 저장소를 합성 코퍼스로 교체
+        store = CountingStore(namespace=namespace, documents=corpus)
+        tools.RETRIEVERS[namespace].base_retriever.vectorstore = store
+        misses = _misses(namespace)
+        report[namespace] = {
+            "corpus": len(corpus),
+            "questions": len(questions),
+            "unfiltered": _replay(namespace, questions, lambda ns, q, c: search.retrieve_for_state({"category": c}, ns, q)["documents"], store),
+            "filtered": _replay(namespace, questions, lambda ns, q, c: search.retrieve_filtered({"category": c}, ns, q)["documents"], store),
+        }
+        misses = _misses(namespace) - misses
+        report[namespace]["filtered"]["miss_share"] = round(misses / len(questions), 3)
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="세특/도서 네임스페이스 메타데이터 필터 유무 비교 벤치마크")
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    print(json.dumps(run(parser.parse_args()), ensure_ascii=False, indent=2))
@@ -0,0 +1,112 @@
+"""
+bench_preprocess.py
+
+검색 전 전처리 방식(legacy: 슬랭 GPT → 라우팅 → 질의 재작성 각각 호출 / fused: preprocess.py의 구조화 출력 호출 한 번)을
+같은 질문 코퍼스로 재생해 비교하는 오프라인 A/B 벤치마크입니다 (외부 서비스는 benchmarks/fakes.py 대체 구현).
+
+보고 항목:
+- 방식별 턴 지연 시간 p50/p95/p99, 검색 전 구간(라우팅/전처리 노드 + 검색 노드) 지연 시간
+- 방식별 턴당 검색 전 LLM 호출 수 (슬랭, 라우팅, 재작성, 전처리, 재라우팅 포함)
+- 방식별 재라우팅된 턴 수, 그중 재라우팅이 검색 도구를 고른 턴 수와 두 번째 검색을 실제로 실행한 턴 수
+  (재라우팅이 고른 검색이 실행되지 않고 fallback으로 빠지면 뒤의 두 값이 달라짐)
+- 두 방식의 첫 라우팅 결과 일치율 (대체 구현은 키워드 기반이므로 실제 라우팅 정확도는 batch.py --preprocess-mode로 비교)
+
+실행:
+    python -m benchmarks.bench_preprocess --requests 200 --concurrency 8
+    python -m benchmarks.bench_preprocess --latency-scale 0.01 --requests 40      # 빠른 스모크 실행
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import fakes
+from benchmarks.common import latency_summary, load_questions
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "questions.jsonl")
+
+# 검색 전 LLM 호출로 세는 대체 구현 호출 종류 (재작성은 "llm" 중 검색 노드에서 나온 호출만)
+PRE_RETRIEVAL_KINDS = ("slang", "llm_structured", "llm_preprocess")
+ROUTE_NODES = ("route_question_adaptive", "preprocess_question")
+
+def _pre_retrieval(trace) -> tuple:
+    # 라우팅/전처리 노드 + 검색 노드(재작성 포함) 지연 시간, 검색 노드의 재작성 LLM 호출 수, 실행된 검색 노드 수
+    total, rephrase, searches = 0.0, 0, 0
+    for span in trace.spans:
+        if span.node in ROUTE_NODES or span.node.startswith("search_"):
+            total += span.wall_ms
+        if span.node.startswith("search_"):
+            rephrase += span.calls.get("llm", 0)
+            searches += 1
+    return total, rephrase, searches
+
+def _replay(args, mode: str, pipeline, clock, turns: list) -> dict:
+    pipeline.compiled_graph_instance = pipeline.build_adaptive_rag(preprocess_mode=mode)
+    turns.clear()
+    before = dict(clock.calls)
+    questions = load_questions(args.corpus)
+    jobs = [(i, questions[i % len(questions)], f"{mode}-user-{i % args.users}") for i in range(args.requests)]
+    turn_ms, routes = [], {}
+
+    def one(job):
+        i, item, user_id = job
+        t0 = time.perf_counter()
+        result = pipeline.get_chatbot_response(item["question"], user_id, item.get("category"), budget=0)
+        visited = result.get("visited_nodes") or [result.get("next_node")]
+        rerouted_to = visited[-1] if result.get("retried") and len(visited) >= 2 else None
+        return i, (time.perf_counter() - t0) * 1000, visited[0], "error" in result, rerouted_to
+
+    errors, reroutes = 0, []
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for i, elapsed, route, failed, rerouted_to in pool.map(one, jobs):
+            turn_ms.append(elapsed)
+            routes[i] = route
+            errors += int(failed)
+            if rerouted_to:
+                reroutes.append(rerouted_to)
+
+    calls = {k: clock.calls.get(k, 0) - before.get(k, 0) for k in PRE_RETRIEVAL_KINDS}
+    calls["rephrase"] = sum(rephrase for _, rephrase, _ in turns)
+    return {
+        "errors": errors,
+        "turn": latency_summary(turn_ms),
+        "pre_retrieval": latency_summary([ms for ms, _, _ in turns]),
+        "pre_retrieval_llm_calls": calls,
+        "pre_retrieval_llm_calls_per_turn": round(sum(calls.values()) / args.requests, 2),
+        "reroutes": {
+            "turns": len(reroutes),
+            "to_search": sum(1 for tool in reroutes if tool.startswith("search_")),
+            "second_searches": sum(1 for _, _, searches in turns if searches >= 2),
+        },
+        "routes": routes,
+    }
+
+def run(args) -> dict:
+    config = fakes.FakeConfig(seed=args.seed)
+    config.latency_scale = args.latency_scale
+    clock = fakes.install_fakes(config)
+
+    os.environ["ADAPTIVE_RAG_TRACING"] = "1"
+    from adaptive_rag.utils import pipeline, tracing
+
+    turns = []
+    tracing.add_turn_listener(lambda trace: turns.append(_pre_retrieval(trace)))
+
+    report = {"requests": args.requests, "concurrency": args.concurrency, "latency_scale": args.latency_scale}
+    for mode in ("legacy", "fused"):
+        report[mode] = _replay(args, mode, pipeline, clock, turns)
+    legacy, fused = report["legacy"].pop("routes"), report["fused"].pop("routes")
+    report["route_agreement"] = round(sum(legacy[i] == fused[i] for i in legacy) / len(legacy), 3)
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="검색 전 전처리 방식(legacy / fused) A/B 벤치마크")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="질문 코퍼스 JSONL 경로")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--users", type=int, default=50, help="요청을 분배할 가상 사용자 수")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    print(json.dumps(run(parser.parse_args()), ensure_ascii=False, indent=2))
@@ -0,0 +1,59 @@
+"""
+bench_prompt_registry.py
+
+요청마다 ChatPromptTemplate과 `prompt | llm | parser` 체인을 새로 만들던 기존 방식과
+import 시점에 한 번만 구성하는 레지스트리 방식의 요청당 구성 비용을 비교하는 벤치마크입니다.
+외부 API를 호출하지 않도록 LLM은 langchain_core의 FakeListChatModel로 대체합니다.
+
+실행:
+    python -m benchmarks.bench_prompt_registry --iterations 2000
+"""
+
+import argparse
+import json
+import time
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.output_parsers import StrOutputParser
+
+from adaptive_rag.utils import prompts
+
+# 한 턴에서 생성되는 체인 (라우팅 → 재작성 → 관련성 판단 → 재라우팅 → 답변 생성)
+TURN_KEYS = ["route", "rephrase", "check", "re_route", "policy"]
+
+def per_request_build(llm, parser):
+    # 기존 방식: 매 요청마다 템플릿과 체인을 새로 생성
+    return [prompts.PROMPT_BUILDERS[key]() | llm | parser for key in TURN_KEYS]
+
+def registry_lookup(registry):
+    # 레지스트리 방식: 미리 구성된 체인을 조회만 함
+    return [registry[key] for key in TURN_KEYS]
+
+def run(iterations: int) -> dict:
+    llm = FakeListChatModel(responses=["ok"])
+    parser = StrOutputParser()
+    registry = {key: prompts.get_prompt_by_key(key) | llm | parser for key in TURN_KEYS}
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        per_request_build(llm, parser)
+    legacy = (time.perf_counter() - start) / iterations
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        registry_lookup(registry)
+    cached = (time.perf_counter() - start) / iterations
+
+    return {
+        "iterations": iterations,
+        "per_turn_build_us": round(legacy * 1e6, 2),
+        "per_turn_registry_us": round(cached * 1e6, 2),
+        "saved_per_turn_us": round((legacy - cached) * 1e6, 2),
+        "cacheable_prefix": prompts.prefix_report(),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="프롬프트/체인 레지스트리 구성 비용 벤치마크")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.iterations), ensure_ascii=False, indent=2))
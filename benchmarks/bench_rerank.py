@@ -0,0 +1,144 @@
+"""
+bench_rerank.py
+
+네임스페이스 리트리버의 리랭크 방식(always: 항상 Cohere 리랭크 / adaptive: rerank.py 판단으로 분명한 검색은 건너뜀)을 비교하는
+오프라인 벤치마크입니다 (외부 서비스는 benchmarks/fakes.py 대체 구현).
+대체 리랭커는 벡터 검색과 같은 임베딩 코사인으로 순위를 매기므로, 벡터 점수에 (질문, 문서)별로 정해진 잡음을 더해
+dense 검색과 cross-encoder 리랭커가 서로 다르게 판단하는 상황을 흉내 냅니다 (`--noise`, 0이면 두 순위가 같음).
+
+보고 항목 (네임스페이스별):
+- always / adaptive 경로의 리랭크 호출 수, 검색 지연 시간 p50/p95/p99
+- adaptive 경로의 판단 reason별 건수와 건너뜀 비율
+- 정확도 비용: adaptive 결과가 always 결과 상위 top_n과 겹치는 비율(overlap), 1위 문서 일치율(top1_match)
+- tune: ADAPTIVE_RERANK=shadow로 재생한 판단 로그를 rerank.tune으로 다시 계산한 gap/margin 조합별 건너뜀 비율과 정확도 비용
+
+실행:
+    python -m benchmarks.bench_rerank
+    python -m benchmarks.bench_rerank --gap 0.03 --margin 0.02 --noise 0.03
+    python -m benchmarks.bench_rerank --latency-scale 0.01      # 빠른 스모크 실행
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import zlib
+from collections import Counter
+
+from benchmarks import fakes
+from benchmarks.common import latency_summary, load_questions
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "questions.jsonl")
+NAMESPACES = ("policy", "subject", "admission", "book", "seteuk")
+
+class NoisyStore(fakes.FakePineconeVectorStore):
+    """코사인 유사도에 (질문, 문서)별로 정해진 가우시안 잡음을 더하는 대체 벡터 저장소"""
+
+    def __init__(self, *args, noise: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.noise = noise
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: dict = None, **kwargs):
+        scored = super().similarity_search_with_score(query, k=len(self._docs), filter=filter, **kwargs)
+        if self.noise:
+            scored = [(doc, score + self.noise * random.Random(zlib.crc32(f"{query}\x00{doc.page_content}".encode())).gauss(0, 1))
+                      for doc, score in scored]
+            scored.sort(key=lambda x: x[1], reverse=True)
+        return scored[:k]
+
+def _replay(retriever, questions: list, clock) -> tuple:
+    calls = clock.calls.get("rerank", 0)
+    results, ms = [], []
+    for question in questions:
+        t0 = time.perf_counter()
+        docs = retriever.invoke(question)
+        ms.append((time.perf_counter() - t0) * 1000)
+        results.append([d.page_content for d in docs])
+    return results, latency_summary(ms), clock.calls.get("rerank", 0) - calls
+
+def _decisions(namespace: str) -> Counter:
+    from adaptive_rag.utils import metrics
+    counts = Counter()
+    for (name, labels), value in metrics.snapshot()["counters"].items():
+        labels = dict(labels)
+        if name == "adaptive_rag_rerank_decisions_total" and labels.get("namespace") == namespace:
+            counts[(labels["decision"], labels["reason"])] += value
+    return counts
+
+def run(args) -> dict:
+    config = fakes.FakeConfig(seed=args.seed)
+    config.latency_scale = args.latency_scale
+    clock = fakes.install_fakes(config)
+
+    from adaptive_rag.utils import rerank, tools
+
+    questions = [item["question"] for item in load_questions(args.corpus)][:args.questions or None]
+    report = {"questions": len(questions), "noise": args.noise, "gap": args.gap, "margin": args.margin, "namespaces": {}}
+    log_path = os.path.join(tempfile.mkdtemp(prefix="bench-rerank-"), "decisions.jsonl")
+
+    for namespace in NAMESPACES:
+        retriever = tools.RETRIEVERS[namespace]
+        retriever.base_retriever.vectorstore = NoisyStore(namespace=namespace, noise=args.noise)
+        top_n = retriever.top_n
+
+        # 1) 항상 리랭크 (기존 동작)
+        retriever.policy = rerank.RerankPolicy(mode="off", audit_rate=0)
+        always, always_ms, always_calls = _replay(retriever, questions, clock)
+
+        # 2) adaptive (감사 없이)
+        retriever.policy = rerank.RerankPolicy(mode="on", gap=args.gap, margin=args.margin, audit_rate=0)
+        before = _decisions(namespace)
+        adaptive, adaptive_ms, adaptive_calls = _replay(retriever, questions, clock)
+        decisions = _decisions(namespace) - before
+
+        overlaps, top1 = [], []
+        for got, expected in zip(adaptive, always):
+            n = min(top_n, len(expected))
+            overlaps.append(len(set(got[:n]) & set(expected[:n])) / n if n else 1.0)
+            top1.append(bool(got) and bool(expected) and got[0] == expected[0])
+
+        # 3) shadow 재생으로 판단 로그 기록 → gap/margin 조합별 재계산
+        retriever.policy = rerank.RerankPolicy(mode="shadow", gap=args.gap, margin=args.margin, audit_rate=0)
+        rerank.DECISION_LOG = log_path
+        try:
+            _replay(retriever, questions, clock)
+        finally:
+            rerank.DECISION_LOG = None
+        retriever.policy = None
+
+        skipped = sum(count for (decision, _), count in decisions.items() if decision == "skip")
+        report["namespaces"][namespace] = {
+            "top_n": top_n,
+            "always": {"rerank_calls": always_calls, "retrieval": always_ms},
+            "adaptive": {
+                "rerank_calls": adaptive_calls,
+                "retrieval": adaptive_ms,
+                "skip_rate": round(skipped / len(questions), 3),
+                "reasons": {reason: count for (_, reason), count in sorted(decisions.items())},
+                "overlap": round(sum(overlaps) / len(overlaps), 3),
+                "top1_match": round(sum(top1) / len(top1), 3),
+            },
+        }
+
+    tuned = rerank.tune(rerank.load_log(log_path), args.tune_gaps, args.tune_margins)
+    for namespace, result in tuned.items():
+        report["namespaces"][namespace]["tune"] = result["grid"]
+    return report
+
+def _floats(text: str) -> list:
+    return [float(v) for v in text.split(",") if v.strip()]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="항상 리랭크 / adaptive 리랭크 비교 벤치마크")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="질문 코퍼스 JSONL 경로 (모든 네임스페이스에 같은 질문으로 검색)")
+    parser.add_argument("--questions", type=int, default=0, help="사용할 질문 수 (0이면 코퍼스 전체)")
+    parser.add_argument("--noise", type=float, default=0.03, help="벡터 점수에 더할 잡음의 표준편차")
+    parser.add_argument("--gap", type=float, default=0.1, help="adaptive 경로의 1위-2위 점수 차 기준")
+    parser.add_argument("--margin", type=float, default=0.06, help="adaptive 경로의 top_n-top_n+1 점수 차 기준")
+    parser.add_argument("--tune-gaps", type=_floats, default=_floats("0.02,0.05,0.1"))
+    parser.add_argument("--tune-margins", type=_floats, default=_floats("0.01,0.03,0.06"))
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    print(json.dumps(run(parser.parse_args()), ensure_ascii=False, indent=2))
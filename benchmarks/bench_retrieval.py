@@ -0,0 +1,294 @@
+"""
+bench_retrieval.py
+
+5개 검색 도구(search_policy, search_subject, search_admission, search_book, search_seteuk)의 검색 품질과 단계별 지연 시간을
+골든 셋(질문 → 관련 문서 ID)으로 평가하는 회귀 검사 스위트입니다. k / top_n / 프롬프트 / 라우터를 바꾼 뒤
+검색이 나아졌는지 나빠졌는지를 같은 질문, 같은 인덱스 스냅샷으로 비교합니다.
+
+fixture (benchmarks/data/retrieval/):
+- golden.jsonl: {"id", "question", "tool": 정답 search_xxx, "relevant": [관련 문서 ID, ...], "category": (선택)}
+- snapshots/<namespace>.jsonl: 인덱스 스냅샷 (ingest.py 원본 JSONL 형식 {"id", "text", "metadata"},
+  `--record <namespace>`로 운영 인덱스에서 기록하거나 직접 작성)
+- baseline.json: `--write-baseline`으로 저장한 기준 보고서와 허용치
+
+질문마다 평가하는 단계:
+1. route: question_router(router.select_tool) 라우팅 결과가 정답 도구와 같은지 → routing accuracy
+2. vector: 정답 네임스페이스에서 리트리버 k개 벡터 검색 → recall@k (리랭크 전 후보 recall)
+3. rerank: 후보 전체를 리랭커로 재정렬 → recall@top_n, MRR / rerank gain = 리랭크 결과 - 벡터 순 상위 top_n
+4. retrieve: 검색 노드와 같은 경로(search.retrieve_filtered: 메타데이터 필터 + adaptive rerank) → recall@top_n, MRR
+라우팅과 검색 품질을 따로 보도록 검색은 항상 정답 네임스페이스에서, 골든 질문을 그대로 질의로 사용합니다 (대화 이력 재작성 없음).
+문서 ID는 메타데이터의 source_id(ingest 청크의 원본 문서 ID), 없으면 id를 사용합니다.
+
+평가 대상:
+- 기본: 외부 서비스는 benchmarks/fakes.py 대체 구현, 네임스페이스 벡터 저장소는 스냅샷으로 교체
+  (임베딩·리랭커·라우터가 대체 구현이므로 k/top_n, 필터, adaptive rerank, 라우팅 규칙 변경의 회귀를 봄)
+- --live: 실제 Pinecone/Cohere/OpenAI (임베딩·리랭크 모델과 라우팅 프롬프트 변경 평가, API 키 필요, `--baseline`으로 기준값을 따로 관리)
+
+회귀 검사 (`--check`): 기준 보고서와 비교해 아래 중 하나면 exit code 1 (허용치는 기준값 저장 시 함께 저장)
+- 네임스페이스별 recall@k, rerank/retrieve 단계 recall@top_n·MRR이 기준값 - quality 허용치보다 낮음
+- 네임스페이스별 routing accuracy가 기준값 - routing 허용치보다 낮음
+- 같은 latency scale에서 단계별 전체 p95가 기준값의 (1 + latency 허용치)배 + latency_ms 허용치 초과
+  (latency_ms는 작은 latency scale에서 ms 단위 측정 잡음으로 실패하지 않도록 더하는 절대 여유분)
+
+실행:
+    python -m benchmarks.bench_retrieval
+    python -m benchmarks.bench_retrieval --latency-scale 0.01 --check     # CI 회귀 검사
+    python -m benchmarks.bench_retrieval --latency-scale 0.01 --write-baseline
+    python -m benchmarks.bench_retrieval --record admission                # 운영 인덱스 → snapshots/admission.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+from langchain_core.documents import Document
+
+from benchmarks import fakes
+from benchmarks.common import latency_summary
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "retrieval")
+GOLDEN_PATH = os.path.join(FIXTURE_DIR, "golden.jsonl")
+SNAPSHOT_DIR = os.path.join(FIXTURE_DIR, "snapshots")
+BASELINE_PATH = os.path.join(FIXTURE_DIR, "baseline.json")
+
+NAMESPACES = ("policy", "subject", "admission", "book", "seteuk")
+STAGES = ("route", "vector", "rerank", "retrieve")
+
+# 회귀 검사 대상 품질 지표 (네임스페이스 보고서 안의 경로)
+QUALITY_METRICS = (
+    ("recall_at_k",),
+    ("rerank", "recall_at_top_n"), ("rerank", "mrr"),
+    ("retrieve", "recall_at_top_n"), ("retrieve", "mrr"),
+)
+
+def load_golden(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def load_snapshot(namespace: str, snapshot_dir: str = SNAPSHOT_DIR) -> list:
+    from adaptive_rag.utils import ingest
+    path = os.path.join(snapshot_dir, f"{namespace}.jsonl")
+    return [Document(page_content=text, metadata={**metadata, "id": doc_id})
+            for doc_id, text, metadata in ingest.iter_documents(path)]
+
+def record(namespace: str, snapshot_dir: str = SNAPSHOT_DIR) -> int:
+    """
+    운영 인덱스 네임스페이스의 청크 전체를 스냅샷으로 저장한다 (serverless Index의 list/fetch 사용, 벡터는 저장하지 않음).
+    """
+    from adaptive_rag.utils import clients, ingest
+    index = clients.pinecone_index()
+    path = os.path.join(snapshot_dir, f"{namespace}.jsonl")
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for ids in index.list(namespace=namespace):
+            fetched = index.fetch(ids=list(ids), namespace=namespace)
+            for vector_id in ids:
+                vector = fetched.vectors.get(vector_id)
+                if vector is None:
+                    continue
+                metadata = dict(vector.metadata or {})
+                text = metadata.pop(ingest.TEXT_KEY, "")
+                f.write(json.dumps({"id": vector_id, "text": text, "metadata": metadata}, ensure_ascii=False) + "\n")
+                count += 1
+    return count
+
+# ---------------------------------------------------------------------------
+# 지표
+# ---------------------------------------------------------------------------
+
+def doc_keys(docs: list) -> list:
+    """
+    문서 목록을 순서대로 문서 ID로 바꾼다 (같은 원본의 청크는 처음 것만, ID 없는 안내 문서는 제외).
+    """
+    keys, seen = [], set()
+    for doc in docs:
+        key = doc.metadata.get("source_id") or doc.metadata.get("id")
+        if key and key not in seen:
+            seen.add(key)
+            keys.append(key)
+    return keys
+
+def recall(docs: list, relevant: set) -> float:
+    return len(set(doc_keys(docs)) & relevant) / len(relevant) if relevant else 1.0
+
+def reciprocal_rank(docs: list, relevant: set) -> float:
+    for rank, key in enumerate(doc_keys(docs), 1):
+        if key in relevant:
+            return 1 / rank
+    return 0.0
+
+def _mean(values: list) -> float:
+    return round(sum(values) / len(values), 3) if values else None
+
+def _timed(latencies: dict, stage: str, fn):
+    t0 = time.perf_counter()
+    result = fn()
+    latencies[stage].append((time.perf_counter() - t0) * 1000)
+    return result
+
+# ---------------------------------------------------------------------------
+# 평가
+# ---------------------------------------------------------------------------
+
+def evaluate(golden: list) -> dict:
+    from adaptive_rag.utils import router, search, tools
+
+    rows = defaultdict(lambda: defaultdict(list))
+    latencies = {ns: defaultdict(list) for ns in NAMESPACES}
+    misrouted = []
+
+    for item in golden:
+        namespace = item["tool"].replace("search_", "")
+        question, relevant = item["question"], set(item["relevant"])
+        retriever = tools.RETRIEVERS[namespace]
+        k, top_n = tools.default_k(namespace), retriever.top_n
+        row, stage_ms = rows[namespace], latencies[namespace]
+
+        try:
+            routed = _timed(stage_ms, "route", lambda: router.select_tool(question))
+        except Exception as e:
+            routed = f"error: {type(e).__name__}"
+        row["routed"].append(routed == item["tool"])
+        if routed != item["tool"]:
+            misrouted.append({"id": item["id"], "expected": item["tool"], "routed": routed})
+
+        scored = _timed(stage_ms, "vector", lambda: retriever.base_retriever.vectorstore.similarity_search_with_score(question, k=k))
+        candidates = [doc for doc, _ in scored]
+        reranked = _timed(stage_ms, "rerank", lambda: list(retriever.base_compressor.compress_documents(candidates, question)))
+        final = _timed(stage_ms, "retrieve", lambda: search.retrieve_filtered({"category": item.get("category")}, namespace, question)["documents"])
+
+        row["recall_at_k"].append(recall(candidates, relevant))
+        row["vector_recall"].append(recall(candidates[:top_n], relevant))
+        row["vector_mrr"].append(reciprocal_rank(candidates[:top_n], relevant))
+        row["rerank_recall"].append(recall(reranked, relevant))
+        row["rerank_mrr"].append(reciprocal_rank(reranked, relevant))
+        row["retrieve_recall"].append(recall(final, relevant))
+        row["retrieve_mrr"].append(reciprocal_rank(final, relevant))
+
+    namespaces = {}
+    for namespace in NAMESPACES:
+        row = rows.get(namespace)
+        if not row:
+            continue
+        vector = {"recall_at_top_n": _mean(row["vector_recall"]), "mrr": _mean(row["vector_mrr"])}
+        rerank = {"recall_at_top_n": _mean(row["rerank_recall"]), "mrr": _mean(row["rerank_mrr"])}
+        namespaces[namespace] = {
+            "questions": len(row["routed"]),
+            "k": tools.default_k(namespace),
+            "top_n": tools.RETRIEVERS[namespace].top_n,
+            "routing_accuracy": _mean(row["routed"]),
+            "recall_at_k": _mean(row["recall_at_k"]),
+            "vector": vector,
+            "rerank": rerank,
+            "rerank_gain": {
+                "recall_at_top_n": round(rerank["recall_at_top_n"] - vector["recall_at_top_n"], 3),
+                "mrr": round(rerank["mrr"] - vector["mrr"], 3),
+            },
+            "retrieve": {"recall_at_top_n": _mean(row["retrieve_recall"]), "mrr": _mean(row["retrieve_mrr"])},
+            "latency": {stage: latency_summary(latencies[namespace][stage]) for stage in STAGES if latencies[namespace][stage]},
+        }
+
+    routed = [ok for row in rows.values() for ok in row["routed"]]
+    overall_ms = {stage: [ms for ns in NAMESPACES for ms in latencies[ns][stage]] for stage in STAGES}
+    return {
+        "questions": len(golden),
+        "routing_accuracy": _mean(routed),
+        "misrouted": misrouted,
+        "latency": {stage: latency_summary(values) for stage, values in overall_ms.items() if values},
+        "namespaces": namespaces,
+    }
+
+def _metric(report: dict, path: tuple):
+    for key in path:
+        report = report.get(key) if isinstance(report, dict) else None
+    return report
+
+def check(report: dict, baseline: dict) -> list:
+    """
+    기준 보고서 대비 회귀 목록 (비어 있으면 통과)
+    """
+    tolerance = baseline.get("tolerance", {})
+    quality_tol = tolerance.get("quality", 0.02)
+    routing_tol = tolerance.get("routing", 0.0)
+    latency_tol = tolerance.get("latency", 0.5)
+    latency_slack = tolerance.get("latency_ms", 10.0)
+
+    failures = []
+    for namespace, base in baseline["namespaces"].items():
+        current = report["namespaces"].get(namespace)
+        if current is None:
+            failures.append(f"{namespace}: 골든 질문이 없습니다")
+            continue
+        if current["routing_accuracy"] < base["routing_accuracy"] - routing_tol:
+            failures.append(f"{namespace}: routing accuracy {current['routing_accuracy']} < 기준 {base['routing_accuracy']}")
+        for path in QUALITY_METRICS:
+            now, before = _metric(current, path), _metric(base, path)
+            if before is not None and (now is None or now < before - quality_tol):
+                failures.append(f"{namespace}: {'.'.join(path)} {now} < 기준 {before} (허용치 {quality_tol})")
+
+    if report.get("latency_scale") == baseline.get("latency_scale"):
+        for stage, base in baseline.get("latency", {}).items():
+            current = report["latency"].get(stage)
+            limit = base["p95_ms"] * (1 + latency_tol) + latency_slack
+            if current and current["p95_ms"] > limit:
+                failures.append(f"{stage} p95 {current['p95_ms']}ms > 기준 {base['p95_ms']}ms의 허용치 {limit:.1f}ms")
+    return failures
+
+def main(args) -> int:
+    if args.record:
+        count = record(args.record, args.snapshots)
+        print(json.dumps({"namespace": args.record, "chunks": count}, ensure_ascii=False))
+        return 0
+
+    if not args.live:
+        config = fakes.FakeConfig(seed=args.seed)
+        config.latency_scale = args.latency_scale
+        fakes.install_fakes(config)
+
+    from adaptive_rag.utils import tools
+
+    golden = load_golden(args.golden)
+    if not args.live:
+        # 네임스페이스 리트리버의 벡터 저장소를 스냅샷으로 교체
+        for namespace in {item["tool"].replace("search_", "") for item in golden}:
+            tools.RETRIEVERS[namespace].base_retriever.vectorstore = fakes.FakePineconeVectorStore(
+                namespace=namespace, documents=load_snapshot(namespace, args.snapshots))
+
+    report = {"target": "live" if args.live else "snapshot", "latency_scale": None if args.live else args.latency_scale,
+              **evaluate(golden)}
+
+    if args.write_baseline:
+        tolerance = {"quality": args.quality_tolerance, "routing": args.routing_tolerance,
+                     "latency": args.latency_tolerance, "latency_ms": args.latency_slack_ms}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({**report, "tolerance": tolerance}, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+
+    status = 0
+    if args.check:
+        with open(args.baseline, encoding="utf-8") as f:
+            failures = check(report, json.load(f))
+        report["regressions"] = failures
+        status = 1 if failures else 0
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return status
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="네임스페이스별 검색 품질 / 지연 시간 회귀 검사")
+    parser.add_argument("--golden", default=GOLDEN_PATH, help="골든 셋 JSONL 경로")
+    parser.add_argument("--snapshots", default=SNAPSHOT_DIR, help="인덱스 스냅샷 디렉터리")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="기준 보고서 경로")
+    parser.add_argument("--live", action="store_true", help="대체 구현 없이 실제 인덱스/리랭커/라우터로 평가")
+    parser.add_argument("--record", metavar="NAMESPACE", help="운영 인덱스의 네임스페이스를 스냅샷으로 저장하고 종료")
+    parser.add_argument("--check", action="store_true", help="기준 보고서와 비교해 회귀가 있으면 exit code 1")
+    parser.add_argument("--write-baseline", action="store_true", help="현재 보고서를 기준값으로 저장")
+    parser.add_argument("--quality-tolerance", type=float, default=0.02, help="기준값 저장 시 recall/MRR 허용 하락폭")
+    parser.add_argument("--routing-tolerance", type=float, default=0.0, help="기준값 저장 시 routing accuracy 허용 하락폭")
+    parser.add_argument("--latency-tolerance", type=float, default=0.5, help="기준값 저장 시 단계별 p95 허용 증가율")
+    parser.add_argument("--latency-slack-ms", type=float, default=10.0, help="기준값 저장 시 단계별 p95 절대 여유분 (ms)")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,176 @@
+"""
+bench_startup.py
+
+API worker의 시작 시간을 측정하고 import 회귀를 검사하는 벤치마크입니다. 측정마다 새 프로세스를 띄웁니다.
+
+측정 단계:
+1. import: `python -X importtime -c "import adaptive_rag.utils.pipeline"`를 대체 구현 없이 실행
+   (더미 API 키, 네트워크 연결 차단, 임시 작업 디렉터리)
+   - pipeline import 누적 시간 (ms)
+   - self 시간 합계 상위 패키지 / 상위 모듈 (`-X importtime` 보고서 요약)
+   - import 중 시도한 네트워크 연결
+   - import 시 로드되면 안 되는 무거운/선택 모듈(LAZY_MODULES) 중 로드된 것
+2. boot: 대체 구현(benchmarks/fakes.py, 모델 로드·슬랭 사전 다운로드·Index 연결 지연 시간 포함)으로
+   import → initialize_graph_for_api(ready) → 첫 요청까지의 시간을 BOOT_PARALLEL=1 / 0 각각 측정
+
+회귀 검사 (`--check`): benchmarks/data/startup_baseline.json과 비교해 아래 중 하나면 exit code 1
+- LAZY_MODULES 중 하나라도 import 시 로드됨
+- import 중 네트워크 연결 시도
+- pipeline import 누적 시간이 기준값의 (1 + tolerance)배 초과
+
+실행:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --check              # CI 회귀 검사 (boot 측정 생략)
+    python -m benchmarks.bench_startup --write-baseline     # 현재 import 보고서를 기준값으로 저장
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "data", "startup_baseline.json")
+
+# pipeline import 시 로드되면 안 되는 모듈 (처음 쓸 때 또는 boot 단계에서 로드)
+LAZY_MODULES = (
+    "IPython", "transformers", "torch",
+    "pymongo", "cohere", "langchain_cohere", "pinecone", "langchain_pinecone",
+)
+
+RESULT_MARKER = "STARTUP_RESULT "
+
+IMPORT_SCRIPT = """
+import json, socket, sys
+_connects = []
+def _blocked(self, address):
+    _connects.append(str(address))
+    raise OSError("network disabled during startup benchmark")
+socket.socket.connect = _blocked
+import adaptive_rag.utils.pipeline
+print({marker!r} + json.dumps({{"connects": _connects, "modules": sorted(sys.modules)}}))
+"""
+
+BOOT_SCRIPT = """
+import json, time
+from benchmarks import fakes
+config = fakes.FakeConfig(seed={seed})
+config.latency_scale = {latency_scale}
+fakes.install_fakes(config)
+t0 = time.perf_counter()
+from adaptive_rag.utils import pipeline
+t_import = time.perf_counter()
+pipeline.initialize_graph_for_api()
+t_ready = time.perf_counter()
+pipeline.get_chatbot_response({question!r}, "startup-bench", None, budget=0)
+t_first = time.perf_counter()
+print({marker!r} + json.dumps({{
+    "import_ms": round((t_import - t0) * 1000, 1),
+    "init_ms": round((t_ready - t_import) * 1000, 1),
+    "ready_ms": round((t_ready - t0) * 1000, 1),
+    "first_request_ms": round((t_first - t_ready) * 1000, 1),
+}}))
+"""
+
+def _run(script: str, env: dict, cwd: str, importtime: bool = False) -> tuple:
+    args = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", script]
+    proc = subprocess.run(args, env=env, cwd=cwd, capture_output=True, text=True, timeout=600)
+    lines = [line for line in proc.stdout.splitlines() if line.startswith(RESULT_MARKER)]
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError(f"startup 측정 프로세스 실패 (exit {proc.returncode}):\n{proc.stderr[-2000:]}")
+    return json.loads(lines[-1][len(RESULT_MARKER):]), proc.stderr
+
+def parse_importtime(stderr: str) -> list:
+    """
+    `-X importtime` 출력을 (모듈, self_us, cumulative_us, depth) 목록으로 바꾼다.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+def import_report(top: int = 15) -> dict:
+    env = {**os.environ, "PYTHONPATH": ROOT, "OPENAI_API_KEY": "sk-startup-bench",
+           "COHERE_API_KEY": "startup-bench", "PINECONE_API_KEY": "startup-bench"}
+    env.pop("MONGODB_URI", None)
+    with tempfile.TemporaryDirectory() as tmp:
+        env["CHAT_LOG_SQLITE_PATH"] = os.path.join(tmp, "chat_logs.db")
+        result, stderr = _run(IMPORT_SCRIPT.format(marker=RESULT_MARKER), env, tmp, importtime=True)
+
+    entries = parse_importtime(stderr)
+    pipeline_us = next(cumulative for name, _, cumulative, _ in entries if name == "adaptive_rag.utils.pipeline")
+    by_package = defaultdict(int)
+    for name, self_us, _, _ in entries:
+        by_package[name.split(".")[0]] += self_us
+    packages = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    modules = sorted(entries, key=lambda entry: entry[1], reverse=True)[:top]
+    return {
+        "pipeline_import_ms": round(pipeline_us / 1000, 1),
+        "modules_loaded": len(result["modules"]),
+        "network_connects": result["connects"],
+        "lazy_modules_loaded": [m for m in LAZY_MODULES if m in result["modules"]],
+        "top_packages_self_ms": {name: round(us / 1000, 1) for name, us in packages},
+        "top_modules_self_ms": {name: round(self_us / 1000, 1) for name, self_us, _, _ in modules},
+    }
+
+def boot_report(parallel: bool, latency_scale: float, seed: int) -> dict:
+    env = {**os.environ, "PYTHONPATH": ROOT, "BOOT_PARALLEL": "1" if parallel else "0"}
+    script = BOOT_SCRIPT.format(marker=RESULT_MARKER, seed=seed, latency_scale=latency_scale,
+                                question="고교학점제 졸업 요건이 어떻게 돼?")
+    with tempfile.TemporaryDirectory() as tmp:
+        result, _ = _run(script, env, tmp)
+    return result
+
+def check(report: dict, baseline: dict) -> list:
+    """
+    기준값 대비 회귀 목록 (비어 있으면 통과)
+    """
+    failures = []
+    if report["lazy_modules_loaded"]:
+        failures.append(f"import 시 로드된 지연 로드 대상 모듈: {report['lazy_modules_loaded']}")
+    if report["network_connects"]:
+        failures.append(f"import 중 네트워크 연결 시도: {report['network_connects']}")
+    limit = baseline["pipeline_import_ms"] * (1 + baseline.get("tolerance", 0.5))
+    if report["pipeline_import_ms"] > limit:
+        failures.append(f"pipeline import {report['pipeline_import_ms']}ms > 기준 {baseline['pipeline_import_ms']}ms의 허용치 {limit:.0f}ms")
+    return failures
+
+def main(args) -> int:
+    report = {"import": import_report(args.top)}
+
+    if args.write_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump({**report["import"], "tolerance": args.tolerance}, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+
+    if not args.check:
+        report["boot"] = {
+            mode: boot_report(mode == "parallel", args.latency_scale, args.seed)
+            for mode in ("parallel", "serial")
+        }
+
+    status = 0
+    if args.check:
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            failures = check(report["import"], json.load(f))
+        report["regressions"] = failures
+        status = 1 if failures else 0
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return status
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="worker 시작 시간 / import 회귀 벤치마크")
+    parser.add_argument("--check", action="store_true", help="기준값과 비교해 회귀가 있으면 exit code 1")
+    parser.add_argument("--write-baseline", action="store_true", help="현재 import 보고서를 기준값으로 저장")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="기준값 저장 시 pipeline import 시간 허용 증가율")
+    parser.add_argument("--top", type=int, default=15, help="보고서에 넣을 상위 패키지/모듈 수")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,89 @@
+"""
+bench_state.py
+
+질문 코퍼스를 한 번에 하나씩 재생하며 요청당 메모리 할당과 그래프 state 크기를 측정하는 오프라인 벤치마크입니다
+(외부 서비스는 benchmarks/fakes.py 대체 구현).
+
+보고 항목:
+- 요청당 할당 최고치 (tracemalloc peak - 요청 시작 시점, KB) p50 / p95 / max
+- API 응답(get_chatbot_response 반환값) pickle 크기 (bytes) 평균 / 최대
+- 노드 사이 state (stream_mode="values"로 받은 각 단계의 전체 state) pickle 크기: 단계 평균 / 최대, 턴 합계 평균
+- 턴당 벡터 검색 호출 수
+
+실행:
+    python -m benchmarks.bench_state --requests 200
+"""
+
+import argparse
+import json
+import os
+import pickle
+import tracemalloc
+
+from benchmarks import fakes
+from benchmarks.common import load_questions, percentile
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "questions.jsonl")
+
+def _summary(values: list, unit: float = 1.0) -> dict:
+    return {
+        "p50": round(percentile(values, 50) / unit, 1),
+        "p95": round(percentile(values, 95) / unit, 1),
+        "max": round(max(values) / unit, 1),
+        "mean": round(sum(values) / len(values) / unit, 1),
+    }
+
+def run(args) -> dict:
+    config = fakes.FakeConfig(seed=args.seed)
+    config.latency_scale = args.latency_scale
+    clock = fakes.install_fakes(config)
+
+    from adaptive_rag.utils import docstore, pipeline
+
+    pipeline.initialize_graph_for_api()
+    questions = load_questions(args.corpus)
+    jobs = [(questions[i % len(questions)], f"state-user-{i % args.users}") for i in range(args.requests)]
+
+    # 1) API 경로: 요청당 할당 최고치와 응답 크기
+    vector_before = clock.calls.get("vector", 0)
+    tracemalloc.start()
+    peaks, api_bytes = [], []
+    for item, user_id in jobs:
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        result = pipeline.get_chatbot_response(item["question"], user_id, item.get("category"), budget=0)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - start)
+        api_bytes.append(len(pickle.dumps(result)))
+    tracemalloc.stop()
+    vector_calls = clock.calls.get("vector", 0) - vector_before
+
+    # 2) 노드 사이 state 크기 (유저 메모리/로그에 남기지 않도록 ephemeral 실행)
+    step_bytes, turn_bytes = [], []
+    for item, user_id in jobs:
+        inputs = {"question": item["question"], "user_id": user_id, "category": item.get("category"), "ephemeral": True}
+        total = 0
+        with docstore.scope():
+            for state in pipeline.compiled_graph_instance.stream(inputs, stream_mode="values"):
+                size = len(pickle.dumps(state))
+                step_bytes.append(size)
+                total += size
+        turn_bytes.append(total)
+
+    return {
+        "requests": args.requests,
+        "alloc_peak_kb": _summary(peaks, 1024),
+        "api_result_bytes": _summary(api_bytes),
+        "state_step_bytes": _summary(step_bytes),
+        "state_turn_bytes": _summary(turn_bytes),
+        "vector_calls_per_turn": round(vector_calls / args.requests, 2),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="요청당 메모리 할당 / 그래프 state 크기 벤치마크")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="질문 코퍼스 JSONL 경로")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--users", type=int, default=50, help="요청을 분배할 가상 사용자 수")
+    parser.add_argument("--latency-scale", type=float, default=0.0, help="대체 구현 지연 시간 배율 (크기 측정이 목적이므로 기본 0)")
+    parser.add_argument("--seed", type=int, default=42)
+    print(json.dumps(run(parser.parse_args()), ensure_ascii=False, indent=2))
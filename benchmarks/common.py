@@ -0,0 +1,54 @@
+"""
+common.py
+
+벤치마크 스크립트들이 공유하는 보조 함수 모음입니다.
+"""
+
+import json
+import resource
+import sys
+
+def load_questions(path: str) -> list:
+    """
+    질문 코퍼스(JSONL: {"question": ..., "category": ...})를 읽어 리스트로 반환한다.
+    """
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def percentile(values: list, q: float) -> float:
+    """
+    선형 보간 백분위수 (q: 0~100)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+def latency_summary(values_ms: list) -> dict:
+    return {
+        "count": len(values_ms),
+        "p50_ms": round(percentile(values_ms, 50), 2),
+        "p95_ms": round(percentile(values_ms, 95), 2),
+        "p99_ms": round(percentile(values_ms, 99), 2),
+    }
+
+def peak_rss_mb() -> float:
+    """
+    프로세스 최대 RSS (MB). Linux는 KB, macOS는 byte 단위로 보고된다.
+    """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+
+def current_rss_mb() -> float:
+    """
+    현재 RSS (MB). /proc를 쓸 수 없는 환경에서는 최대 RSS로 대신한다.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * resource.getpagesize() / (1024 * 1024), 1)
+    except OSError:
+        return peak_rss_mb()
@@ -0,0 +1,594 @@
+"""
+fakes.py
+
+외부 API 없이 챗봇 파이프라인 전체를 실행하기 위한 결정적(deterministic) 로컬 대체 구현 모음입니다.
+OpenAI(ChatOpenAI, OpenAIEmbeddings, openai.chat, openai.OpenAI), Pinecone(PineconeVectorStore, Pinecone), Cohere(CohereRerank),
+MongoDB(MongoClient), kor_unsmile 분류 모델을 대체하며, 각 대체 구현은 설정 가능한 지연 시간 분포와 정해진 출력을 가집니다.
+
+사용법:
+    from benchmarks import fakes
+    fakes.install_fakes(fakes.FakeConfig())   # adaptive_rag 모듈 import 전에 호출해야 함
+    from adaptive_rag.utils import pipeline
+"""
+
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import types
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Sequence
+
+from langchain_core.documents import Document
+from langchain_core.documents.compressor import BaseDocumentCompressor
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langchain_core.vectorstores import VectorStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@dataclass
+class Latency:
+    """
+    로그정규 분포 지연 시간 모델 (median_ms를 중앙값으로, sigma로 꼬리 두께 조절)
+    """
+    median_ms: float = 0.0
+    sigma: float = 0.0
+
+    def sample(self, rng: random.Random, scale: float = 1.0) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        return self.median_ms * math.exp(rng.gauss(0.0, self.sigma)) * scale / 1000
+
+@dataclass
+class FakeConfig:
+    """
+    대체 구현 전체 설정
+
+    - latencies: 호출 종류별 지연 시간 모델
+    - latency_scale: 모든 지연 시간에 곱하는 배율 (빠른 스모크 실행용으로 0.01 등 사용)
+    - relevance_rate: check_relevance가 '1'을 반환하는 비율
+    - seed: 난수 시드
+    - fake_safeguard: kor_unsmile 모델을 대체할지 여부
+    - answer_table_rows: 생성 답변 뒤에 붙일 표의 행 수 (실제 답변처럼 긴 표가 포함된 대화 재생용, 0이면 표 없음)
+    """
+    latencies: dict = field(default_factory=lambda: {
+        "llm": Latency(700, 0.45),
+        "llm_structured": Latency(450, 0.4),
+        "llm_preprocess": Latency(650, 0.4),
+        "slang": Latency(400, 0.4),
+        "embedding": Latency(120, 0.3),
+        "vector": Latency(60, 0.3),
+        "rerank": Latency(180, 0.35),
+        "mongo": Latency(35, 0.5),
+        "safeguard": Latency(25, 0.2),
+        # 시작(boot) 단계: kor_unsmile 모델/토크나이저 로드(각각), 슬랭 사전 다운로드, host 없이 Index 연결(describe_index)
+        "model_load": Latency(1200, 0.1),
+        "slang_download": Latency(300, 0.3),
+        "index_connect": Latency(400, 0.3),
+    })
+    latency_scale: float = 1.0
+    relevance_rate: float = 0.8
+    seed: int = 42
+    fake_safeguard: bool = True
+    answer_table_rows: int = 0
+
+    @classmethod
+    def from_json(cls, path: str, **overrides) -> "FakeConfig":
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+        config = cls(**overrides)
+        for kind, spec in raw.get("latencies", {}).items():
+            config.latencies[kind] = Latency(**spec)
+        for key in ("latency_scale", "relevance_rate", "seed", "answer_table_rows"):
+            if key in raw and key not in overrides:
+                setattr(config, key, raw[key])
+        return config
+
+class _Clock:
+    """대체 구현들이 공유하는 난수 생성기 + 지연 시간 적용기"""
+
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.calls = {}
+
+    def wait(self, kind: str):
+        with self._lock:
+            self.calls[kind] = self.calls.get(kind, 0) + 1
+            delay = self.config.latencies.get(kind, Latency()).sample(self._rng, self.config.latency_scale)
+        if delay > 0:
+            time.sleep(delay)
+
+    def stable_fraction(self, text: str) -> float:
+        # 같은 입력에는 항상 같은 값을 돌려주는 [0, 1) 난수
+        digest = hashlib.sha1(f"{self.config.seed}:{text}".encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+CLOCK: Optional[_Clock] = None
+
+# ---------------------------------------------------------------------------
+# 결정적 텍스트 임베딩 (문자 bigram 해싱)
+# ---------------------------------------------------------------------------
+
+EMBEDDING_DIM = 256
+
+def hashed_embedding(text: str, dim: int = EMBEDDING_DIM) -> List[float]:
+    vec = [0.0] * dim
+    compact = re.sub(r"\s+", " ", text.lower())
+    for i in range(len(compact) - 1):
+        gram = compact[i:i + 2]
+        if gram.strip():
+            h = int.from_bytes(hashlib.md5(gram.encode("utf-8")).digest()[:4], "big")
+            vec[h % dim] += 1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+def cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+class FakeEmbeddings(Embeddings):
+    """OpenAIEmbeddings 대체 구현"""
+
+    def __init__(self, *args, **kwargs):
+        self.model = kwargs.get("model", "fake-embedding")
+
+    def embed_query(self, text: str) -> List[float]:
+        CLOCK.wait("embedding")
+        return hashed_embedding(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        CLOCK.wait("embedding")
+        return [hashed_embedding(t) for t in texts]
+
+# ---------------------------------------------------------------------------
+# 네임스페이스별 합성 코퍼스
+# ---------------------------------------------------------------------------
+
+UNIVERSITIES = ["서울대학교", "연세대학교", "고려대학교", "성균관대학교", "한양대학교", "신한대학교", "경희대학교", "부산대학교"]
+MAJORS = ["경영학과", "컴퓨터공학과", "호텔경영학과", "생명과학과", "국어국문학과", "기계공학과", "심리학과", "간호학과"]
+SUBJECTS = ["미적분", "확률과 통계", "물리학Ⅰ", "화학Ⅱ", "생명과학Ⅰ", "정치와 법", "경제", "정보"]
+
+def build_corpus(namespace: str) -> List[Document]:
+    docs = []
+    if namespace == "policy":
+        topics = ["졸업 요건", "이수 기준", "성취평가제", "수강 신청", "최소 성취수준 보장지도", "학점 인정", "세특 기재 방법", "공동교육과정"]
+        for i, topic in enumerate(topics):
+            docs.append(Document(page_content=f"고교학점제 {topic}: 고등학교 3년 동안 192학점을 이수해야 졸업할 수 있으며 {topic} 관련 규정은 학교별로 운영됩니다.", metadata={"id": f"policy-{i}", "topic": topic}))
+    elif namespace == "subject":
+        for i, subject in enumerate(SUBJECTS):
+            docs.append(Document(page_content=f"{subject} 과목은 진로 선택 과목으로 핵심 개념과 탐구 활동을 다루며 성취도는 A~E로 평가합니다.", metadata={"id": f"subject-{i}", "subject": subject}))
+    elif namespace == "admission":
+        n = 0
+        for univ in UNIVERSITIES:
+            for major in MAJORS:
+                docs.append(Document(page_content=f"{univ} {major}는 전공 기초와 심화 과정을 운영하며 학생부종합전형과 정시로 신입생을 선발합니다.", metadata={"id": f"admission-{n}", "university": univ, "major": major}))
+                n += 1
+    elif namespace == "book":
+        for i, major in enumerate(MAJORS):
+            for j in range(3):
+                docs.append(Document(page_content=f"{major} 진학 희망 학생을 위한 추천 도서 {j + 1}: 전공 분야의 핵심 주제를 쉽게 풀어낸 교양서입니다.", metadata={"id": f"book-{i}-{j}", "major": major}))
+    elif namespace == "seteuk":
+        for i, subject in enumerate(SUBJECTS):
+            for j, major in enumerate(MAJORS[:4]):
+                docs.append(Document(page_content=f"{subject} 세특 탐구 주제 - {major} 연계: {subject} 개념을 활용한 {major} 관련 탐구 보고서 작성", metadata={"id": f"seteuk-{i}-{j}", "subject": subject, "major": major}))
+    return docs
+
+class FakePineconeVectorStore(VectorStore):
+    """PineconeVectorStore 대체 구현 (네임스페이스별 합성 코퍼스에 대한 코사인 유사도 검색)"""
+
+    def __init__(self, *args, embedding: Embeddings = None, namespace: str = None, documents: List[Document] = None, **kwargs):
+        self._embedding = embedding or FakeEmbeddings()
+        self.namespace = namespace
+        self._docs = list(documents) if documents is not None else build_corpus(namespace)
+        self._vectors = [hashed_embedding(d.page_content) for d in self._docs]
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    @classmethod
+    def from_documents(cls, documents: List[Document] = None, embedding: Embeddings = None, **kwargs):
+        return cls(embedding=embedding, namespace=kwargs.get("namespace"), documents=documents or None)
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        docs = [Document(page_content=t, metadata=(metadatas or [{}] * len(texts))[i]) for i, t in enumerate(texts)]
+        return cls(embedding=embedding, namespace=kwargs.get("namespace"), documents=docs)
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        ids = []
+        for i, text in enumerate(texts):
+            metadata = (metadatas or [{}] * len(texts))[i]
+            self._docs.append(Document(page_content=text, metadata=metadata))
+            self._vectors.append(hashed_embedding(text))
+            ids.append(metadata.get("id", str(len(self._docs))))
+        return ids
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: dict = None, **kwargs):
+        vector = self._embedding.embed_query(query)
+        CLOCK.wait("vector")
+        scored = [
+            (doc, cosine(vector, vec))
+            for doc, vec in zip(self._docs, self._vectors)
+            if _match_filter(doc.metadata, filter)
+        ]
+        scored.sort(key=lambda x: x[1], reverse=True)
+        return scored[:k]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+def _match_filter(metadata: dict, filter: Optional[dict]) -> bool:
+    # Pinecone 메타데이터 필터의 부분 집합($eq, $in, $and) 지원
+    if not filter:
+        return True
+    for key, cond in filter.items():
+        if key == "$and":
+            if not all(_match_filter(metadata, c) for c in cond):
+                return False
+            continue
+        value = metadata.get(key)
+        if isinstance(cond, dict):
+            if "$eq" in cond and value != cond["$eq"]:
+                return False
+            if "$in" in cond and value not in cond["$in"]:
+                return False
+        elif value != cond:
+            return False
+    return True
+
+class FakeCohereRerank(BaseDocumentCompressor):
+    """CohereRerank 대체 구현 (문자 bigram 겹침 기반 재정렬)"""
+    model: str = "fake-rerank"
+    top_n: Optional[int] = 3
+
+    def __init__(self, **kwargs):
+        known = {k: v for k, v in kwargs.items() if k in ("model", "top_n")}
+        super().__init__(**known)
+
+    def rerank(self, documents, query: str, *, rank_fields=None, model=None, top_n: Optional[int] = -1, max_tokens_per_doc=None):
+        CLOCK.wait("rerank")
+        texts = [d.page_content if isinstance(d, Document) else (d.get("text", "") if isinstance(d, dict) else str(d)) for d in documents]
+        q = hashed_embedding(query)
+        results = [{"index": i, "relevance_score": cosine(q, hashed_embedding(t))} for i, t in enumerate(texts)]
+        results.sort(key=lambda r: r["relevance_score"], reverse=True)
+        n = self.top_n if top_n == -1 else top_n
+        return results[:n] if n else results
+
+    def compress_documents(self, documents, query: str, callbacks=None):
+        if not documents:
+            return []
+        docs = list(documents)
+        compressed = []
+        for res in self.rerank(docs, query):
+            doc = docs[res["index"]]
+            compressed.append(Document(page_content=doc.page_content, metadata={**doc.metadata, "relevance_score": res["relevance_score"]}))
+        return compressed
+
+# ---------------------------------------------------------------------------
+# LLM 대체 구현
+# ---------------------------------------------------------------------------
+
+TOOL_KEYWORDS = [
+    ("search_book", ["책", "도서"]),
+    ("search_seteuk", ["세특 주제", "세특 활동", "탐구 주제", "세특 추천"]),
+    ("search_admission", ["대학", "학과", "전형", "수시", "정시", "학종", "계열"]),
+    ("search_subject", ["과목", "성취수준", "미적분", "물리", "화학"]),
+    ("search_policy", ["고교학점제", "졸업", "학점", "이수", "성취평가제", "세특"]),
+]
+
+def choose_tool(question: str, exclude: Sequence[str] = ()) -> str:
+    for tool, keywords in TOOL_KEYWORDS:
+        if tool not in exclude and any(k in question for k in keywords):
+            return tool
+    return "llm_fallback"
+
+def _last_human(messages) -> str:
+    for m in reversed(messages):
+        if isinstance(m, HumanMessage):
+            return m.content
+    return ""
+
+def _system_text(messages) -> str:
+    return "\n".join(m.content for m in messages if isinstance(m, SystemMessage))
+
+def _fake_summary(human: str) -> str:
+    # 기존 요약의 질문 목록에 새 대화의 질문을 더하고 최근 4개만 남긴 짧은 요약
+    previous = human.split("기존 요약:\n", 1)[-1].split("\n\n새 대화:", 1)[0]
+    topics = re.findall(r"「([^」]*)」", previous)
+    topics += [line[len("User: "):][:40] for line in human.splitlines() if line.startswith("User: ")]
+    return "학생이 이전에 물어본 내용: " + ", ".join(f"「{t}」" for t in topics[-4:])
+
+class FakeChatOpenAI(BaseChatModel):
+    """
+    ChatOpenAI 대체 구현.
+    system 프롬프트 내용으로 어떤 체인에서 호출되었는지 구분하여 정해진 형태의 출력을 돌려준다.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-openai"
+
+    def _respond(self, messages) -> str:
+        system = _system_text(messages)
+        human = _last_human(messages)
+        if "RAG 평가 전문가" in system:
+            question = human.split("\n", 1)[0]
+            return "1" if CLOCK.stable_fraction(question) < CLOCK.config.relevance_rate else "0"
+        if "재작성 전문가" in system:
+            return human.rsplit("질문: ", 1)[-1].replace("\n\n보완된 질문:", "").strip()
+        if "대화 요약 전문가" in system:
+            return _fake_summary(human)
+        if "rule-based fallback" in system:
+            return "그건 제가 도와드릴 수 없는 부분이에요. 😰 고교학점제, 입시, 서비스 등 궁금한 게 있다면 언제든지 물어봐 주세요!"
+        answer = f"[벤치마크 답변] {human[-80:]}\n"
+        rows = CLOCK.config.answer_table_rows
+        if rows:
+            answer += "\n| 순번 | 추천 항목 | 관련 과목 | 추천 이유 |\n|---|---|---|---|\n"
+            answer += "".join(
+                f"| {i + 1} | 벤치마크 추천 항목 {i + 1} | 관련 선택 과목 {i + 1} | 희망 전공과 연계해 탐구 역량을 보여줄 수 있는 활동입니다. |\n"
+                for i in range(rows)
+            )
+        return answer + "추가로 궁금한 점이 있다면 질문해주세요!"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        CLOCK.wait("llm")
+        text = self._respond(messages)
+        prompt_tokens = sum(len(m.content) for m in messages) // 2
+        message = AIMessage(content=text, usage_metadata={
+            "input_tokens": prompt_tokens,
+            "output_tokens": len(text) // 2,
+            "total_tokens": prompt_tokens + len(text) // 2,
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def with_structured_output(self, schema, **kwargs):
+        if "retrieval_query" in schema.model_fields:
+            return RunnableLambda(lambda prompt_value, **kw: _preprocess(schema, prompt_value))
+
+        def _route(prompt_value, **kwargs):
+            messages = prompt_value.to_messages()
+            CLOCK.wait("llm_structured")
+            system = _system_text(messages)
+            visited = []
+            if "현재까지 시도한 도구 목록:" in system:
+                line = system.split("현재까지 시도한 도구 목록:", 1)[1].split("\n", 1)[0]
+                visited = re.findall(r"search_\w+", line)
+            return schema(tool=choose_tool(_last_human(messages), exclude=visited))
+        return RunnableLambda(_route)
+
+def _preprocess(schema, prompt_value):
+    # fused 전처리: '(슬랭/정식)' 중 정식 표현 선택 → 키워드 라우팅 (차순위는 첫 도구를 제외하고 다시 선택)
+    CLOCK.wait("llm_preprocess")
+    question = _last_human(prompt_value.to_messages()).rsplit("질문: ", 1)[-1].strip()
+    question = re.sub(r"\(([^/]+)/([^\)]+)\)", lambda m: m.group(2), question)
+    tool = choose_tool(question)
+    return schema(
+        normalized_question=question,
+        tool=tool,
+        runner_up=choose_tool(question, exclude=[tool]),
+        retrieval_query=question,
+    )
+
+class _FakeCompletions:
+    """openai.chat.completions 대체 구현 (slang.select_contextual_word 용)"""
+
+    def create(self, model: str, messages: list, **kwargs):
+        CLOCK.wait("slang")
+        text = messages[-1]["content"]
+        # '(슬랭/정식)' 중 정식 표현을 선택
+        result = re.sub(r"\(([^/]+)/([^\)]+)\)", lambda m: m.group(2), text)
+        usage = types.SimpleNamespace(prompt_tokens=len(text) // 2, completion_tokens=len(result) // 2)
+        choice = types.SimpleNamespace(message=types.SimpleNamespace(content=result))
+        return types.SimpleNamespace(choices=[choice], usage=usage)
+
+class FakeOpenAI:
+    """openai.OpenAI 대체 구현 (clients.openai_client 용)"""
+
+    def __init__(self, *args, **kwargs):
+        self.chat = types.SimpleNamespace(completions=_FakeCompletions())
+
+class FakeIndex:
+    """pinecone Index 대체 구현 (ingest.py의 업서트/삭제를 네임스페이스별 dict에 기록, 검색은 FakePineconeVectorStore가 담당)"""
+
+    def __init__(self, name: str = "", host: str = ""):
+        self.name = name
+        self.host = host
+        self.vectors = defaultdict(dict)
+        self.requests = Counter()
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors: list, namespace: str = "", **kwargs):
+        CLOCK.wait("vector")
+        with self._lock:
+            self.requests["upsert"] += 1
+            for vector_id, values, metadata in vectors:
+                self.vectors[namespace][vector_id] = metadata
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids: list = None, namespace: str = "", **kwargs):
+        CLOCK.wait("vector")
+        with self._lock:
+            self.requests["delete"] += 1
+            for vector_id in ids or []:
+                self.vectors[namespace].pop(vector_id, None)
+        return {}
+
+    def describe_index_stats(self, **kwargs):
+        with self._lock:
+            return {"namespaces": {ns: {"vector_count": len(v)} for ns, v in self.vectors.items()}}
+
+class FakePinecone:
+    """pinecone.Pinecone 대체 구현"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def Index(self, name: str = "", host: str = "", **kwargs):
+        if not host:
+            CLOCK.wait("index_connect")
+        return FakeIndex(name=name, host=host)
+
+# ---------------------------------------------------------------------------
+# MongoDB 대체 구현
+# ---------------------------------------------------------------------------
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = []
+        self._lock = threading.Lock()
+
+    def insert_one(self, document: dict):
+        CLOCK.wait("mongo")
+        with self._lock:
+            self.documents.append(document)
+
+    def insert_many(self, documents: list, ordered: bool = True):
+        CLOCK.wait("mongo")
+        with self._lock:
+            self.documents.extend(documents)
+
+    def count_documents(self, filter: dict = None) -> int:
+        return len(self.documents)
+
+    def create_index(self, keys, **kwargs) -> str:
+        return "_".join(f"{k}_{d}" for k, d in keys)
+
+    def bulk_write(self, requests: list, ordered: bool = True):
+        # 집계 갱신용 UpdateOne(upsert, $inc/$max)만 지원
+        CLOCK.wait("mongo")
+        with self._lock:
+            for op in requests:
+                target = next((d for d in self.documents if all(d.get(k) == v for k, v in op._filter.items())), None)
+                if target is None:
+                    target = dict(op._filter)
+                    self.documents.append(target)
+                for field, value in op._doc.get("$inc", {}).items():
+                    target[field] = target.get(field, 0) + value
+                for field, value in op._doc.get("$max", {}).items():
+                    target[field] = max(target.get(field, value), value)
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        collection = self[name] = FakeCollection()
+        return collection
+
+    def command(self, name: str, *args, **kwargs) -> dict:
+        CLOCK.wait("mongo")
+        return {"ok": 1.0}
+
+class FakeMongoClient(dict):
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.options = kwargs
+
+    def __missing__(self, name):
+        db = self[name] = FakeDatabase()
+        return db
+
+    @property
+    def admin(self) -> FakeDatabase:
+        return self["admin"]
+
+    def close(self):
+        pass
+
+# ---------------------------------------------------------------------------
+# kor_unsmile / slang 사전 다운로드 대체 구현
+# ---------------------------------------------------------------------------
+
+class _FakeUnsmilePipeline:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, text: str):
+        CLOCK.wait("safeguard")
+        return [[{"label": "악플/욕설", "score": 0.01}, {"label": "clean", "score": 0.98}]]
+
+class _FakePretrained:
+    @classmethod
+    def from_pretrained(cls, *args, **kwargs):
+        CLOCK.wait("model_load")
+        return None
+
+def _fake_transformers_module() -> types.ModuleType:
+    module = types.ModuleType("transformers")
+    module.TextClassificationPipeline = _FakeUnsmilePipeline
+    module.BertForSequenceClassification = _FakePretrained
+    module.AutoTokenizer = _FakePretrained
+    return module
+
+class _LocalResponse:
+    def __init__(self, text: str):
+        self.text = text
+        self.status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.text)
+
+def install_fakes(config: FakeConfig = None) -> _Clock:
+    """
+    외부 서비스 SDK 클래스를 대체 구현으로 바꿔 끼운다.
+    adaptive_rag 모듈이 `from X import Y` 형태로 가져가므로 반드시 adaptive_rag import 이전에 호출해야 한다.
+
+    Returns:
+        _Clock: 호출 횟수(calls)와 설정을 가진 공유 지연 시간 적용기
+    """
+    global CLOCK
+    CLOCK = _Clock(config or FakeConfig())
+
+    import langchain_openai
+    import langchain_pinecone
+    import langchain_cohere
+    import pymongo
+    import openai
+    import pinecone
+    import requests
+
+    langchain_openai.ChatOpenAI = FakeChatOpenAI
+    langchain_openai.OpenAIEmbeddings = FakeEmbeddings
+    langchain_pinecone.PineconeVectorStore = FakePineconeVectorStore
+    langchain_cohere.CohereRerank = FakeCohereRerank
+    pymongo.MongoClient = FakeMongoClient
+    openai.chat = types.SimpleNamespace(completions=_FakeCompletions())
+    openai.OpenAI = FakeOpenAI
+    pinecone.Pinecone = FakePinecone
+
+    # GitHub에서 내려받던 슬랭 사전은 저장소의 로컬 파일로 응답
+    real_get = requests.get
+    def _get(url, *args, **kwargs):
+        if str(url).endswith("slang_dict.json"):
+            CLOCK.wait("slang_download")
+            with open(os.path.join(ROOT, "slang_dict.json"), encoding="utf-8") as f:
+                return _LocalResponse(f.read())
+        return real_get(url, *args, **kwargs)
+    requests.get = _get
+
+    if CLOCK.config.fake_safeguard:
+        sys.modules["transformers"] = _fake_transformers_module()
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+    os.environ.setdefault("COHERE_API_KEY", "offline-benchmark")
+    os.environ.setdefault("PINECONE_API_KEY", "offline-benchmark")
+    # 대화 로그는 지연 시간이 모델링된 MongoDB 대체 구현으로 저장 (CHAT_LOG_BACKEND=sqlite로 로컬 저장소 사용 가능)
+    os.environ.setdefault("MONGODB_URI", "mongodb://offline-benchmark")
+    # 외부 provider 연결 warmup은 실제 네트워크를 쓰므로 끔
+    os.environ.setdefault("CLIENT_WARMUP", "0")
+    return CLOCK
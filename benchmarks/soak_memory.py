@@ -0,0 +1,171 @@
+"""
+soak_memory.py
+
+API worker처럼 그래프를 오래 실행하며 메모리가 정상 상태(steady state)에서 계속 늘어나는지 확인하는 soak 벤치마크입니다
+(외부 서비스는 benchmarks/fakes.py 대체 구현). 여러 가상 유저가 질문 코퍼스로 여러 턴 대화하도록 `get_chatbot_response`를 반복 호출하며,
+유저 수를 세션 저장소 상한(MEMORY_MAX_SESSIONS)보다 크게 두어 세션 제거(LRU)까지 거치게 합니다.
+
+측정:
+- 구간마다 gc 후 tracemalloc 추적 메모리(KB)와 RSS(MB), 세션 수를 기록
+- 세션 저장소가 상한에 도달하고 --warmup 턴(기본: 전체의 절반)이 지난 첫 구간부터를 정상 상태로 보고
+  (그 전까지는 세션·요약·정규식·linecache 같은 상한 있는 캐시가 채워지며 늘어나는 구간)
+  추적 메모리 증가 기울기(1000턴당 KB, 최소제곱)와 RSS 증가량(MB)을 계산
+- 정상 상태 첫 구간과 마지막 구간의 tracemalloc snapshot 차이를 모듈별 / 코드 줄별로 정렬해 증가 원인 보고
+  (adaptive_rag 모듈만 보려면 --only-package adaptive_rag)
+kor_unsmile 모델은 대체 구현이므로 모델 자체의 상주 메모리는 측정하지 않습니다 (상주 크기는 증가가 아니라 고정 비용).
+
+실행:
+    python -m benchmarks.soak_memory --turns 5000 --users 3000 --capacity 1000
+    python -m benchmarks.soak_memory --turns 2000 --users 600 --capacity 200      # 빠른 회귀 검사
+종료 코드:
+    정상 상태 추적 메모리 증가 기울기가 --max-growth-kb(1000턴당)를 넘거나 RSS 증가량이 --max-rss-growth-mb를 넘으면 1
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks import fakes
+from benchmarks.common import current_rss_mb, load_questions
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "questions.jsonl")
+
+# snapshot 비교에서 제외할 할당 위치 (import 시스템, tracemalloc 자체)
+IGNORED_FILES = ("<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", "<unknown>", tracemalloc.__file__)
+
+def module_of(filename: str) -> str:
+    """
+    소스 파일 경로를 모듈 이름으로 바꾼다 (sys.path에 없는 파일은 경로 그대로).
+    """
+    path = os.path.abspath(filename)
+    for root in sorted((os.path.abspath(p) for p in sys.path if p), key=len, reverse=True):
+        if path.startswith(root + os.sep):
+            name = os.path.splitext(os.path.relpath(path, root))[0].replace(os.sep, ".")
+            return name[:-len(".__init__")] if name.endswith(".__init__") else name
+    return filename
+
+def _snapshot():
+    gc.collect()
+    return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, f) for f in IGNORED_FILES])
+
+def attribute_growth(before, after, top: int, only_package: str = None) -> dict:
+    """
+    두 snapshot 사이에 늘어난 메모리를 모듈별 / 코드 줄별로 정렬한다.
+    """
+    by_module, by_line = {}, []
+    for stat in after.compare_to(before, "lineno"):
+        frame = stat.traceback[0]
+        module = module_of(frame.filename)
+        if only_package and not module.startswith(only_package):
+            continue
+        entry = by_module.setdefault(module, {"size_diff_kb": 0.0, "count_diff": 0})
+        entry["size_diff_kb"] += stat.size_diff / 1024
+        entry["count_diff"] += stat.count_diff
+        by_line.append((stat.size_diff, f"{module}:{frame.lineno}", stat.count_diff))
+
+    modules = sorted(by_module.items(), key=lambda item: item[1]["size_diff_kb"], reverse=True)[:top]
+    lines = sorted(by_line, reverse=True)[:top]
+    return {
+        "modules": {name: {"size_diff_kb": round(e["size_diff_kb"], 1), "count_diff": e["count_diff"]} for name, e in modules},
+        "lines": [{"where": where, "size_diff_kb": round(size / 1024, 1), "count_diff": count} for size, where, count in lines],
+    }
+
+def slope_per_1k(samples: list, key: str) -> float:
+    """
+    구간 기록에서 1000턴당 증가량 (최소제곱 기울기)
+    """
+    if len(samples) < 2:
+        return 0.0
+    xs = [s["turns"] for s in samples]
+    ys = [s[key] for s in samples]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    var = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var * 1000 if var else 0.0
+
+def run(args) -> dict:
+    # 세션 저장소 상한과 로그 저장소는 adaptive_rag import 전에 정함
+    # (MongoDB 대체 구현은 저장한 로그를 메모리 리스트에 쌓으므로, 로그는 실제 로컬 sqlite 저장소로 기록)
+    tmp = tempfile.mkdtemp(prefix="soak-memory-")
+    os.environ["MEMORY_MAX_SESSIONS"] = str(args.capacity)
+    os.environ["CHAT_LOG_BACKEND"] = "sqlite"
+    os.environ["CHAT_LOG_SQLITE_PATH"] = os.path.join(tmp, "chat_logs.db")
+    os.environ["CHAT_LOG_SPILL_PATH"] = os.path.join(tmp, "chat_logs.spill.jsonl")
+
+    config = fakes.FakeConfig(seed=args.seed)
+    config.latency_scale = args.latency_scale
+    fakes.install_fakes(config)
+
+    from adaptive_rag.utils import memory, pipeline
+
+    pipeline.initialize_graph_for_api()
+    questions = load_questions(args.corpus)
+    rng = random.Random(args.seed)
+    step = max(1, args.turns // args.checkpoints)
+    warmup = args.turns // 2 if args.warmup is None else args.warmup
+
+    tracemalloc.start()
+    samples, snapshots = [], {}
+    t0 = time.perf_counter()
+    for turn in range(1, args.turns + 1):
+        item = rng.choice(questions)
+        pipeline.get_chatbot_response(item["question"], f"soak-user-{rng.randrange(args.users)}", item.get("category"), budget=0)
+        if turn % step == 0:
+            snapshot = _snapshot()
+            current, _ = tracemalloc.get_traced_memory()
+            sample = {"turns": turn, "sessions": len(memory.session_store),
+                      "traced_kb": round(current / 1024, 1), "rss_mb": current_rss_mb()}
+            samples.append(sample)
+            steady = len(memory.session_store) >= args.capacity * 0.99 and turn >= warmup
+            if steady:
+                snapshots.setdefault("first", (turn, snapshot))
+                snapshots["last"] = (turn, snapshot)
+    elapsed = time.perf_counter() - t0
+
+    steady_samples = [s for s in samples if "first" in snapshots and s["turns"] >= snapshots["first"][0]]
+    report = {
+        "turns": args.turns,
+        "users": args.users,
+        "capacity": args.capacity,
+        "elapsed_s": round(elapsed, 1),
+        "evicted": dict(getattr(memory.session_store, "evicted", {})),
+        "samples": samples,
+        "steady_from_turn": snapshots["first"][0] if "first" in snapshots else None,
+    }
+    if len(steady_samples) < 2:
+        tracemalloc.stop()
+        report["passed"] = False
+        report["error"] = "정상 상태 구간이 2개 미만입니다 (--turns를 늘리거나 --capacity / --warmup을 줄여 주세요)."
+        return report
+
+    growth_kb = slope_per_1k(steady_samples, "traced_kb")
+    rss_growth = steady_samples[-1]["rss_mb"] - steady_samples[0]["rss_mb"]
+    report["traced_growth_kb_per_1k_turns"] = round(growth_kb, 1)
+    report["rss_growth_mb"] = round(rss_growth, 1)
+    report["growth"] = attribute_growth(snapshots["first"][1], snapshots["last"][1], args.top, args.only_package)
+    tracemalloc.stop()
+    report["passed"] = growth_kb <= args.max_growth_kb and rss_growth <= args.max_rss_growth_mb
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API worker 메모리 soak / 누수 회귀 검사")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="질문 코퍼스 JSONL 경로")
+    parser.add_argument("--turns", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=3000, help="가상 유저 수 (세션 저장소 상한보다 크게)")
+    parser.add_argument("--capacity", type=int, default=1000, help="세션 저장소 상한 (MEMORY_MAX_SESSIONS)")
+    parser.add_argument("--warmup", type=int, help="정상 상태 판단 전 최소 턴 수 (기본: --turns의 절반)")
+    parser.add_argument("--checkpoints", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="보고할 증가 상위 모듈 / 코드 줄 수")
+    parser.add_argument("--only-package", help="증가 원인을 이 패키지 모듈로 한정 (예: adaptive_rag)")
+    parser.add_argument("--max-growth-kb", type=float, default=256.0, help="정상 상태 추적 메모리 허용 증가량 (1000턴당 KB)")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=20.0)
+    parser.add_argument("--latency-scale", type=float, default=0.0, help="대체 구현 지연 시간 배율 (메모리 측정이 목적이므로 기본 0)")
+    parser.add_argument("--seed", type=int, default=42)
+    report = run(parser.parse_args())
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    sys.exit(0 if report["passed"] else 1)
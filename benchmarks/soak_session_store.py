@@ -0,0 +1,53 @@
+"""
+soak_session_store.py
+
+memory.SessionStore에 합성 유저를 대량으로 흘려보내며 메모리 사용량이 용량 상한 이후 평탄하게 유지되는지 확인하는 soak 벤치마크입니다.
+각 유저는 한 턴의 대화를 남기고 다시 돌아오지 않으므로, 상한이 없다면 세션 수와 RSS가 계속 증가합니다.
+
+실행:
+    python -m benchmarks.soak_session_store --users 1000000 --capacity 50000
+종료 코드:
+    용량 상한 도달 이후 RSS 증가량이 --max-growth-mb를 넘으면 1
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+from datetime import timedelta
+
+from adaptive_rag.utils import memory
+from benchmarks.common import current_rss_mb
+
+def run(users: int, capacity: int, checkpoints: int, answer_chars: int) -> dict:
+    store = memory.SessionStore(capacity=capacity, ttl=timedelta(minutes=5))
+    answer = "가" * answer_chars
+    step = max(1, users // checkpoints)
+    samples = []
+    t0 = time.perf_counter()
+    for i in range(users):
+        store.get_or_create(f"anon-{i}").add_turn(f"질문 {i}", answer)
+        if (i + 1) % step == 0:
+            gc.collect()
+            samples.append({"users": i + 1, "sessions": len(store), "rss_mb": current_rss_mb()})
+    elapsed = time.perf_counter() - t0
+    return {"samples": samples, "elapsed_s": round(elapsed, 2), "ops_per_s": round(users / elapsed), "evicted": store.evicted}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="세션 저장소 메모리 soak 벤치마크")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--capacity", type=int, default=50_000)
+    parser.add_argument("--checkpoints", type=int, default=10)
+    parser.add_argument("--answer-chars", type=int, default=400)
+    parser.add_argument("--max-growth-mb", type=float, default=20.0)
+    args = parser.parse_args()
+
+    report = run(args.users, args.capacity, args.checkpoints, args.answer_chars)
+    # 세션 수가 상한에 도달한 첫 시점 이후의 RSS 증가량
+    full = [s for s in report["samples"] if s["sessions"] >= args.capacity * 0.99]
+    growth = full[-1]["rss_mb"] - full[0]["rss_mb"] if len(full) >= 2 else 0.0
+    report["steady_state_growth_mb"] = round(growth, 1)
+    report["passed"] = growth <= args.max_growth_mb
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    sys.exit(0 if report["passed"] else 1)